@@ -1,2 +1,9 @@
 timeout = 120
 graceful_timeout = 120
+
+
+def worker_exit(server, worker):
+    # Write out analytics events still buffered in this worker.
+    from reignitehome.event_writer import shutdown
+
+    shutdown()
@@ -1,8 +1,14 @@
-from django.contrib import admin
-from django.db.models import Count, Q
-from django.urls import reverse
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Substr
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
 
+from . import counters, feed_cache
 from .models import CommunityComment, CommunityPost, CommentLike, ContentReport, PollVote, PostPoll, PostVote, UserBlock
 
 
@@ -13,6 +19,59 @@ def _user_admin_link(user):
     return format_html('<a href="{}">{}</a>', url, user.username)
 
 
+def _target_admin_url(content_type, object_id):
+    model = 'communitypost' if content_type == 'post' else 'communitycomment'
+    return reverse(f'admin:community_{model}_change', args=[object_id])
+
+
+def _target_status(is_deleted):
+    if is_deleted is None:
+        return format_html('<span style="color:#999;">Not found</span>')
+    if is_deleted:
+        return format_html('<span style="color:#999;">Removed</span>')
+    return format_html('<span style="color:#c00;">Live</span>')
+
+
+def _report_count(content_type):
+    """Subquery counting the reports filed against the outer post or comment."""
+    reports = (
+        ContentReport.objects.filter(content_type=content_type, object_id=OuterRef('pk'))
+        .order_by()
+        .values('object_id')
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(reports, output_field=IntegerField()), Value(0))
+
+
+def _target_ids(reports, content_type):
+    return reports.filter(content_type=content_type).values('object_id')
+
+
+def remove_reported_content(reports):
+    """Soft-delete the posts and comments ``reports`` point at; return ``(posts, comments)`` removed."""
+    removed_posts = CommunityPost.objects.filter(
+        pk__in=_target_ids(reports, 'post'), is_deleted=False
+    ).update(is_deleted=True)
+    if removed_posts:
+        feed_cache.invalidate()
+
+    comments = CommunityComment.objects.filter(pk__in=_target_ids(reports, 'comment'), is_deleted=False)
+    post_ids = set(comments.values_list('post_id', flat=True))
+    removed_comments = comments.update(is_deleted=True)
+    counters.reconcile_posts(post_ids)
+    return removed_posts, removed_comments
+
+
+def resolve_reports(reports):
+    """Delete every report on the targets of ``reports``, not only ``reports``; return how many."""
+    targets = Q()
+    for content_type, _ in ContentReport.CONTENT_TYPE_CHOICES:
+        targets |= Q(content_type=content_type, object_id__in=_target_ids(reports, content_type))
+    deleted, _ = ContentReport.objects.filter(targets).delete()
+    return deleted
+
+
 class CommunityCommentInline(admin.TabularInline):
     model = CommunityComment
     # Keep one blank inline row visible so admins can add comments directly
@@ -52,6 +111,7 @@ class CommunityPostAdmin(admin.ModelAdmin):
         'category',
         'vote_score_display',
         'comment_count_display',
+        'report_count_display',
         'is_pinned',
         'is_featured',
         'is_deleted',
@@ -90,6 +150,10 @@ class CommunityPostAdmin(admin.ModelAdmin):
     list_select_related = ('author',)
     list_per_page = 50
 
+    def get_queryset(self, request):
+        # Counted in the page query itself rather than once per row.
+        return super().get_queryset(request).annotate(report_count=_report_count('post'))
+
     def effective_author_name(self, obj):
         if obj.author_display_name:
             return obj.author_display_name
@@ -109,44 +173,55 @@ class CommunityPostAdmin(admin.ModelAdmin):
     author_admin_link.short_description = 'Edit author username'
 
     def vote_score_display(self, obj):
-        result = obj.votes.aggregate(
-            up=Count('id', filter=Q(vote_type='up')),
-            down=Count('id', filter=Q(vote_type='down')),
-        )
-        return (result['up'] or 0) - (result['down'] or 0)
+        return obj.vote_score
     vote_score_display.short_description = 'Score'
+    vote_score_display.admin_order_field = 'vote_score'
 
     def comment_count_display(self, obj):
-        return obj.comments.filter(is_deleted=False).count()
+        return obj.comment_count
     comment_count_display.short_description = 'Comments'
+    comment_count_display.admin_order_field = 'comment_count'
+
+    def report_count_display(self, obj):
+        return obj.report_count
+    report_count_display.short_description = 'Reports'
+    report_count_display.admin_order_field = 'report_count'
 
     @admin.action(description='Pin selected posts to the top of the feed')
     def pin_posts(self, request, queryset):
         queryset.update(is_pinned=True)
+        feed_cache.invalidate()
 
     @admin.action(description='Unpin selected posts')
     def unpin_posts(self, request, queryset):
         queryset.update(is_pinned=False)
+        feed_cache.invalidate()
 
     @admin.action(description='Mark selected posts as featured')
     def mark_featured(self, request, queryset):
         queryset.update(is_featured=True)
+        feed_cache.invalidate()
 
     @admin.action(description='Remove featured status')
     def unfeature(self, request, queryset):
         queryset.update(is_featured=False)
+        feed_cache.invalidate()
 
     @admin.action(description='Remove selected posts (soft delete)')
     def remove_posts(self, request, queryset):
-        queryset.update(is_deleted=True)
+        removed = queryset.filter(is_deleted=False).update(is_deleted=True)
+        feed_cache.invalidate()
+        self.message_user(request, f'Removed {removed} post(s).')
 
     @admin.action(description='Restore selected posts')
     def restore_posts(self, request, queryset):
-        queryset.update(is_deleted=False)
+        restored = queryset.filter(is_deleted=True).update(is_deleted=False)
+        feed_cache.invalidate()
+        self.message_user(request, f'Restored {restored} post(s).')
 
     @admin.action(description='Clear all votes on selected posts')
     def clear_votes(self, request, queryset):
-        deleted, _ = PostVote.objects.filter(post__in=queryset).delete()
+        deleted = counters.clear_post_votes(queryset.values_list('pk', flat=True))
         self.message_user(
             request,
             f'Removed {deleted} vote record(s).',
@@ -161,6 +236,7 @@ class CommunityCommentAdmin(admin.ModelAdmin):
         'author_link',
         'post_link',
         'like_count_display',
+        'report_count_display',
         'is_deleted',
         'created_at',
     )
@@ -173,6 +249,9 @@ class CommunityCommentAdmin(admin.ModelAdmin):
     list_select_related = ('author', 'post')
     list_per_page = 50
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(report_count=_report_count('comment'))
+
     def body_preview(self, obj):
         return obj.body[:80] + '...' if len(obj.body) > 80 else obj.body
     body_preview.short_description = 'Comment'
@@ -201,20 +280,34 @@ class CommunityCommentAdmin(admin.ModelAdmin):
     post_link.short_description = 'Post'
 
     def like_count_display(self, obj):
-        return obj.likes.count()
+        return obj.like_count
     like_count_display.short_description = 'Likes'
+    like_count_display.admin_order_field = 'like_count'
+
+    def report_count_display(self, obj):
+        return obj.report_count
+    report_count_display.short_description = 'Reports'
+    report_count_display.admin_order_field = 'report_count'
 
     @admin.action(description='Remove selected comments (soft delete)')
     def remove_comments(self, request, queryset):
-        queryset.update(is_deleted=True)
+        queryset = queryset.filter(is_deleted=False)
+        post_ids = set(queryset.values_list('post_id', flat=True))
+        removed = queryset.update(is_deleted=True)
+        counters.reconcile_posts(post_ids)
+        self.message_user(request, f'Removed {removed} comment(s).')
 
     @admin.action(description='Restore selected comments')
     def restore_comments(self, request, queryset):
-        queryset.update(is_deleted=False)
+        queryset = queryset.filter(is_deleted=True)
+        post_ids = set(queryset.values_list('post_id', flat=True))
+        restored = queryset.update(is_deleted=False)
+        counters.reconcile_posts(post_ids)
+        self.message_user(request, f'Restored {restored} comment(s).')
 
     @admin.action(description='Clear likes on selected comments')
     def clear_likes(self, request, queryset):
-        deleted, _ = CommentLike.objects.filter(comment__in=queryset).delete()
+        deleted = counters.clear_comment_likes(queryset.values_list('pk', flat=True))
         self.message_user(
             request,
             f'Removed {deleted} like record(s).',
@@ -264,16 +357,61 @@ class CommentLikeAdmin(admin.ModelAdmin):
     comment_link.short_description = 'Comment'
 
 
+def _target_subquery(model, expression):
+    return Subquery(model.objects.filter(pk=OuterRef('object_id')).values(value=expression)[:1])
+
+
 @admin.register(ContentReport)
 class ContentReportAdmin(admin.ModelAdmin):
-    list_display = ('reporter_link', 'content_type', 'reported_content_link', 'reason', 'detail_preview', 'content_status', 'created_at')
+    list_display = (
+        'reporter_link',
+        'content_type',
+        'reported_content_link',
+        'reason',
+        'detail_preview',
+        'content_status',
+        'target_report_count_display',
+        'created_at',
+    )
     list_filter = ('content_type', 'reason', 'created_at')
     search_fields = ('reporter__username', 'detail')
     readonly_fields = ('created_at', 'reported_content_preview')
     autocomplete_fields = ('reporter',)
     list_select_related = ('reporter',)
     list_per_page = 50
-    actions = ['soft_delete_reported_content', 'dismiss_reports']
+    actions = ['soft_delete_reported_content', 'resolve_target_reports', 'dismiss_reports']
+
+    def get_queryset(self, request):
+        # The reported post or comment's label and state, and how often it was
+        # reported, come back with the page instead of being fetched per row.
+        same_target = (
+            ContentReport.objects.filter(content_type=OuterRef('content_type'), object_id=OuterRef('object_id'))
+            .order_by()
+            .values('object_id')
+            .annotate(n=Count('pk'))
+            .values('n')
+        )
+        return super().get_queryset(request).annotate(
+            target_label=Case(
+                When(content_type='post', then=_target_subquery(CommunityPost, Substr('title', 1, 50))),
+                When(content_type='comment', then=_target_subquery(CommunityComment, Substr('body', 1, 50))),
+            ),
+            target_is_deleted=Case(
+                When(content_type='post', then=_target_subquery(CommunityPost, F('is_deleted'))),
+                When(content_type='comment', then=_target_subquery(CommunityComment, F('is_deleted'))),
+            ),
+            target_report_count=Subquery(same_target, output_field=IntegerField()),
+        )
+
+    def get_urls(self):
+        urls = [
+            path(
+                'by-target/',
+                self.admin_site.admin_view(self.reports_by_target_view),
+                name='community_contentreport_by_target',
+            ),
+        ]
+        return urls + super().get_urls()
 
     def reporter_link(self, obj):
         return _user_admin_link(obj.reporter)
@@ -297,27 +435,21 @@ class ContentReportAdmin(admin.ModelAdmin):
 
     def reported_content_link(self, obj):
         """Clickable link to the reported post or comment in admin."""
-        target = self._get_reported_object(obj)
-        if target is None:
+        if obj.target_label is None:
             return format_html('<em>deleted</em>')
-        if obj.content_type == 'post':
-            url = reverse('admin:community_communitypost_change', args=[target.pk])
-            label = target.title[:50]
-        else:
-            url = reverse('admin:community_communitycomment_change', args=[target.pk])
-            label = target.body[:50]
-        return format_html('<a href="{}">{}</a>', url, label)
+        return format_html('<a href="{}">{}</a>', _target_admin_url(obj.content_type, obj.object_id), obj.target_label)
     reported_content_link.short_description = 'Reported Content'
 
     def content_status(self, obj):
         """Show whether the reported content is still live or already removed."""
-        target = self._get_reported_object(obj)
-        if target is None:
-            return format_html('<span style="color:#999;">Not found</span>')
-        if target.is_deleted:
-            return format_html('<span style="color:#999;">Removed</span>')
-        return format_html('<span style="color:#c00;">Live</span>')
+        return _target_status(obj.target_is_deleted)
     content_status.short_description = 'Status'
+    content_status.admin_order_field = 'target_is_deleted'
+
+    def target_report_count_display(self, obj):
+        return obj.target_report_count
+    target_report_count_display.short_description = 'Reports on target'
+    target_report_count_display.admin_order_field = 'target_report_count'
 
     def reported_content_preview(self, obj):
         """Full preview of the reported content shown on the detail page."""
@@ -334,28 +466,91 @@ class ContentReportAdmin(admin.ModelAdmin):
 
     @admin.action(description='Remove reported content (soft delete)')
     def soft_delete_reported_content(self, request, queryset):
-        deleted_posts = 0
-        deleted_comments = 0
-        for report in queryset:
-            target = self._get_reported_object(report)
-            if target is not None and not target.is_deleted:
-                if report.content_type == 'post':
-                    CommunityPost.objects.filter(pk=target.pk).update(is_deleted=True)
-                    deleted_posts += 1
-                elif report.content_type == 'comment':
-                    CommunityComment.objects.filter(pk=target.pk).update(is_deleted=True)
-                    deleted_comments += 1
+        deleted_posts, deleted_comments = remove_reported_content(queryset)
         self.message_user(
             request,
             f'Removed {deleted_posts} post(s) and {deleted_comments} comment(s).',
         )
 
+    @admin.action(description='Resolve all reports on the selected reports\' content')
+    def resolve_target_reports(self, request, queryset):
+        resolved = resolve_reports(queryset)
+        self.message_user(request, f'Resolved {resolved} report(s).')
+
     @admin.action(description='Dismiss selected reports (delete report records)')
     def dismiss_reports(self, request, queryset):
-        count = queryset.count()
-        queryset.delete()
+        count, _ = queryset.delete()
         self.message_user(request, f'Dismissed {count} report(s).')
 
+    def reports_by_target_view(self, request):
+        """Reported posts and comments, most reported first, with one-click resolve."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if request.method == 'POST':
+            return self._resolve_target(request)
+
+        content_type = request.GET.get('content_type', '')
+        groups = ContentReport.objects.all()
+        if content_type in dict(ContentReport.CONTENT_TYPE_CHOICES):
+            groups = groups.filter(content_type=content_type)
+        groups = (
+            groups.values('content_type', 'object_id')
+            .annotate(report_count=Count('pk'), latest_report=Max('created_at'))
+            .order_by('-report_count', '-latest_report', 'content_type', 'object_id')
+        )
+        page = Paginator(groups, self.list_per_page).get_page(request.GET.get('p'))
+
+        rows = list(page.object_list)
+        targets = {}
+        for model, kind, label in ((CommunityPost, 'post', 'title'), (CommunityComment, 'comment', 'body')):
+            ids = [row['object_id'] for row in rows if row['content_type'] == kind]
+            if ids:
+                for pk, text, is_deleted in model.objects.filter(pk__in=ids).values_list('pk', label, 'is_deleted'):
+                    targets[kind, pk] = (text[:80], is_deleted)
+        changelist_url = reverse('admin:community_contentreport_changelist')
+        for row in rows:
+            label, is_deleted = targets.get((row['content_type'], row['object_id']), (None, None))
+            row['label'] = label
+            row['status'] = _target_status(is_deleted)
+            row['admin_url'] = _target_admin_url(row['content_type'], row['object_id']) if label is not None else ''
+            row['reports_url'] = f"{changelist_url}?content_type={row['content_type']}&object_id={row['object_id']}"
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Reports by target',
+            'rows': rows,
+            'page_obj': page,
+            'content_type': content_type,
+            'content_type_choices': ContentReport.CONTENT_TYPE_CHOICES,
+            'can_resolve': self.has_delete_permission(request),
+            'can_remove': self.has_change_permission(request),
+        }
+        return TemplateResponse(request, 'admin/community/contentreport/by_target.html', context)
+
+    def _resolve_target(self, request):
+        content_type = request.POST.get('content_type')
+        try:
+            object_id = int(request.POST.get('object_id', ''))
+        except ValueError:
+            object_id = None
+        if content_type not in dict(ContentReport.CONTENT_TYPE_CHOICES) or object_id is None:
+            self.message_user(request, 'Unknown report target.', messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+
+        reports = ContentReport.objects.filter(content_type=content_type, object_id=object_id)
+        removed = ''
+        if 'remove' in request.POST:
+            if not self.has_change_permission(request):
+                raise PermissionDenied
+            posts, comments = remove_reported_content(reports)
+            removed = f' Removed {posts} post(s) and {comments} comment(s).'
+        resolved = resolve_reports(reports)
+        self.message_user(request, f'Resolved {resolved} report(s) on {content_type} #{object_id}.{removed}')
+        return HttpResponseRedirect(request.get_full_path())
+
 
 @admin.register(UserBlock)
 class UserBlockAdmin(admin.ModelAdmin):
@@ -392,7 +587,7 @@ class PostPollAdmin(admin.ModelAdmin):
     list_display = ('post_link', 'send_it_count', 'dont_send_it_count', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('post__title',)
-    readonly_fields = ('created_at',)
+    readonly_fields = ('send_it_count', 'dont_send_it_count', 'created_at')
     autocomplete_fields = ('post',)
     list_select_related = ('post',)
     inlines = [PollVoteInline]
@@ -402,11 +597,3 @@ class PostPollAdmin(admin.ModelAdmin):
         url = reverse('admin:community_communitypost_change', args=[obj.post_id])
         return format_html('<a href="{}">{}</a>', url, obj.post.title[:50])
     post_link.short_description = 'Post'
-
-    def send_it_count(self, obj):
-        return obj.votes.filter(choice='send_it').count()
-    send_it_count.short_description = 'Send It'
-
-    def dont_send_it_count(self, obj):
-        return obj.votes.filter(choice='dont_send_it').count()
-    dont_send_it_count.short_description = "Don't Send It"
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CommunityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'community'
+
+    def ready(self):
+        from . import counters, feed_cache, ranking, search
+
+        counters.connect_signals()
+        ranking.connect_signals()
+        feed_cache.connect_signals()
+        search.connect_signals(self)
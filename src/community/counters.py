@@ -0,0 +1,286 @@
+"""
+Stored engagement counters for community posts and comments.
+
+``CommunityPost.upvote_count`` / ``downvote_count`` / ``vote_score`` /
+``comment_count`` and ``CommunityComment.like_count`` replace the
+``Count(..., distinct=True)`` annotations the feed used to compute over a
+votes x comments join on every page. ``PostPoll.send_it_count`` /
+``dont_send_it_count`` likewise replace the per-request ``PollVote`` tally.
+
+Counters change only by atomic ``F()`` updates:
+
+* Inserting or deleting a ``PostVote``, ``PollVote``, ``CommentLike`` or
+  ``CommunityComment`` row adjusts them from ``post_save``/``post_delete`` receivers (connected in
+  ``CommunityConfig.ready``), so API views, admin inlines and seed commands
+  all stay in step.
+* Changes that receivers cannot see (a vote or poll vote switching side, a
+  comment soft-deleted or restored with ``QuerySet.update``) call
+  ``vote_changed`` / ``poll_vote_changed`` / ``comments_hidden`` directly.
+* Admin bulk actions use ``clear_post_votes`` / ``clear_comment_likes``,
+  which delete in one statement and reset the counters set-wise.
+
+Every post counter change also refreshes the post's stored hot score
+(``community.ranking``).
+
+``reconcile_posts`` / ``reconcile_comments`` / ``reconcile_polls`` recount from the source rows in
+batches and fix any drift; see the ``reconcile_community_counters`` command.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import ranking
+from .models import CommentLike, CommunityComment, CommunityPost, PollVote, PostPoll, PostVote
+
+POST_COUNTER_FIELDS = ('upvote_count', 'downvote_count', 'vote_score', 'comment_count')
+_VOTE_FIELDS = {'up': 'upvote_count', 'down': 'downvote_count'}
+_VOTE_SIGN = {'up': 1, 'down': -1}
+POLL_COUNTER_FIELDS = ('send_it_count', 'dont_send_it_count')
+_POLL_FIELDS = {'send_it': 'send_it_count', 'dont_send_it': 'dont_send_it_count'}
+
+
+def vote_changed(post_id, old_type=None, new_type=None):
+    """Apply one user's vote going from ``old_type`` to ``new_type`` (None = no vote)."""
+    if old_type == new_type:
+        return
+    updates = {}
+    score_delta = 0
+    if old_type in _VOTE_FIELDS:
+        updates[_VOTE_FIELDS[old_type]] = F(_VOTE_FIELDS[old_type]) - 1
+        score_delta -= _VOTE_SIGN[old_type]
+    if new_type in _VOTE_FIELDS:
+        updates[_VOTE_FIELDS[new_type]] = F(_VOTE_FIELDS[new_type]) + 1
+        score_delta += _VOTE_SIGN[new_type]
+    if not updates:
+        return
+    updates['vote_score'] = F('vote_score') + score_delta
+    CommunityPost.objects.filter(pk=post_id).update(**updates)
+    ranking.refresh_hot_scores([post_id])
+
+
+def comments_hidden(post_id, count=1):
+    """``count`` visible comments on the post were soft-deleted (negative: restored)."""
+    if count:
+        CommunityPost.objects.filter(pk=post_id).update(comment_count=F('comment_count') - count)
+        ranking.refresh_hot_scores([post_id])
+
+
+def poll_vote_changed(poll_id, old_choice=None, new_choice=None):
+    """Apply one user's poll vote going from ``old_choice`` to ``new_choice`` (None = no vote)."""
+    if old_choice == new_choice:
+        return
+    updates = {}
+    if old_choice in _POLL_FIELDS:
+        updates[_POLL_FIELDS[old_choice]] = F(_POLL_FIELDS[old_choice]) - 1
+    if new_choice in _POLL_FIELDS:
+        updates[_POLL_FIELDS[new_choice]] = F(_POLL_FIELDS[new_choice]) + 1
+    if updates:
+        PostPoll.objects.filter(pk=poll_id).update(**updates)
+
+
+def likes_changed(comment_id, delta):
+    if delta:
+        CommunityComment.objects.filter(pk=comment_id).update(like_count=F('like_count') + delta)
+
+
+# --- Bulk moderation --------------------------------------------------------
+
+def _raw_delete(queryset):
+    # One DELETE statement. QuerySet.delete() would load every row to send
+    # post_delete, and the receivers above would then update counters per row.
+    return queryset._raw_delete(queryset.db)
+
+
+def clear_post_votes(post_ids):
+    """Delete every vote on ``post_ids`` and zero their vote counters; return votes deleted."""
+    post_ids = list(post_ids)
+    with transaction.atomic():
+        # Lock the posts first so a vote landing meanwhile counts after the reset.
+        list(CommunityPost.objects.select_for_update().filter(pk__in=post_ids).values_list('pk'))
+        deleted = _raw_delete(PostVote.objects.filter(post_id__in=post_ids))
+        CommunityPost.objects.filter(pk__in=post_ids).update(upvote_count=0, downvote_count=0, vote_score=0)
+    ranking.refresh_hot_scores(post_ids)
+    return deleted
+
+
+def clear_comment_likes(comment_ids):
+    """Delete every like on ``comment_ids`` and zero their like counters; return likes deleted."""
+    comment_ids = list(comment_ids)
+    with transaction.atomic():
+        list(CommunityComment.objects.select_for_update().filter(pk__in=comment_ids).values_list('pk'))
+        deleted = _raw_delete(CommentLike.objects.filter(comment_id__in=comment_ids))
+        CommunityComment.objects.filter(pk__in=comment_ids).update(like_count=0)
+    return deleted
+
+
+# --- Signal receivers -------------------------------------------------------
+
+def _post_vote_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        vote_changed(instance.post_id, None, instance.vote_type)
+
+
+def _post_vote_deleted(sender, instance, **kwargs):
+    vote_changed(instance.post_id, instance.vote_type, None)
+
+
+def _poll_vote_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        poll_vote_changed(instance.poll_id, None, instance.choice)
+    else:
+        # Admin edits may switch the choice without telling us the old one.
+        reconcile_polls([instance.poll_id])
+
+
+def _poll_vote_deleted(sender, instance, **kwargs):
+    poll_vote_changed(instance.poll_id, instance.choice, None)
+
+
+def _comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if not instance.is_deleted:
+            comments_hidden(instance.post_id, -1)
+    else:
+        # Admin edits may flip is_deleted on a single comment; recount that post.
+        reconcile_posts([instance.post_id])
+
+
+def _comment_deleted(sender, instance, **kwargs):
+    if not instance.is_deleted:
+        comments_hidden(instance.post_id, 1)
+
+
+def _comment_like_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        likes_changed(instance.comment_id, 1)
+
+
+def _comment_like_deleted(sender, instance, **kwargs):
+    likes_changed(instance.comment_id, -1)
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    for model, saved, deleted in (
+        (PostVote, _post_vote_saved, _post_vote_deleted),
+        (PollVote, _poll_vote_saved, _poll_vote_deleted),
+        (CommunityComment, _comment_saved, _comment_deleted),
+        (CommentLike, _comment_like_saved, _comment_like_deleted),
+    ):
+        uid = f"community_counters_{model._meta.label_lower}"
+        post_save.connect(saved, sender=model, dispatch_uid=f"{uid}_save")
+        post_delete.connect(deleted, sender=model, dispatch_uid=f"{uid}_delete")
+
+
+# --- Reconciliation ---------------------------------------------------------
+
+def _batches(queryset, fields, batch_size):
+    """Lock and yield ``queryset`` rows in primary-key batches."""
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                queryset.filter(pk__gt=last_pk)
+                .select_for_update()
+                .only('pk', *fields)
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                return
+            last_pk = batch[-1].pk
+            yield batch
+
+
+def reconcile_posts(post_ids=None, batch_size=500, dry_run=False):
+    """Recount post counters from votes and visible comments; return posts fixed."""
+    queryset = CommunityPost.objects.all()
+    if post_ids is not None:
+        queryset = queryset.filter(pk__in=list(post_ids))
+    fixed = 0
+    for batch in _batches(queryset, POST_COUNTER_FIELDS, batch_size):
+        ids = [post.pk for post in batch]
+        votes = {
+            (row['post_id'], row['vote_type']): row['n']
+            for row in PostVote.objects.filter(post_id__in=ids)
+            .values('post_id', 'vote_type')
+            .annotate(n=Count('id'))
+            .order_by()
+        }
+        comments = dict(
+            CommunityComment.objects.filter(post_id__in=ids, is_deleted=False)
+            .values('post_id')
+            .annotate(n=Count('id'))
+            .order_by()
+            .values_list('post_id', 'n')
+        )
+        stale = []
+        for post in batch:
+            up = votes.get((post.pk, 'up'), 0)
+            down = votes.get((post.pk, 'down'), 0)
+            expected = (up, down, up - down, comments.get(post.pk, 0))
+            if tuple(getattr(post, field) for field in POST_COUNTER_FIELDS) != expected:
+                for field, value in zip(POST_COUNTER_FIELDS, expected):
+                    setattr(post, field, value)
+                stale.append(post)
+        if stale and not dry_run:
+            CommunityPost.objects.bulk_update(stale, POST_COUNTER_FIELDS)
+            ranking.refresh_hot_scores([post.pk for post in stale])
+        fixed += len(stale)
+    return fixed
+
+
+def reconcile_comments(comment_ids=None, batch_size=500, dry_run=False):
+    """Recount comment like counters; return comments fixed."""
+    queryset = CommunityComment.objects.all()
+    if comment_ids is not None:
+        queryset = queryset.filter(pk__in=list(comment_ids))
+    fixed = 0
+    for batch in _batches(queryset, ('like_count',), batch_size):
+        likes = dict(
+            CommentLike.objects.filter(comment_id__in=[comment.pk for comment in batch])
+            .values('comment_id')
+            .annotate(n=Count('id'))
+            .order_by()
+            .values_list('comment_id', 'n')
+        )
+        stale = []
+        for comment in batch:
+            expected = likes.get(comment.pk, 0)
+            if comment.like_count != expected:
+                comment.like_count = expected
+                stale.append(comment)
+        if stale and not dry_run:
+            CommunityComment.objects.bulk_update(stale, ['like_count'])
+        fixed += len(stale)
+    return fixed
+
+
+def reconcile_polls(poll_ids=None, batch_size=500, dry_run=False):
+    """Recount poll tallies from their votes; return polls fixed."""
+    queryset = PostPoll.objects.all()
+    if poll_ids is not None:
+        queryset = queryset.filter(pk__in=list(poll_ids))
+    fixed = 0
+    for batch in _batches(queryset, POLL_COUNTER_FIELDS, batch_size):
+        votes = {
+            (row['poll_id'], row['choice']): row['n']
+            for row in PollVote.objects.filter(poll_id__in=[poll.pk for poll in batch])
+            .values('poll_id', 'choice')
+            .annotate(n=Count('id'))
+            .order_by()
+        }
+        stale = []
+        for poll in batch:
+            expected = (votes.get((poll.pk, 'send_it'), 0), votes.get((poll.pk, 'dont_send_it'), 0))
+            if (poll.send_it_count, poll.dont_send_it_count) != expected:
+                poll.send_it_count, poll.dont_send_it_count = expected
+                stale.append(poll)
+        if stale and not dry_run:
+            PostPoll.objects.bulk_update(stale, POLL_COUNTER_FIELDS)
+        fixed += len(stale)
+    return fixed
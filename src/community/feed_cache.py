@@ -0,0 +1,80 @@
+"""
+Shared cache of serialized community feed pages.
+
+A feed page seen by a guest is identical for every guest requesting the same
+``(category, sort, page or cursor)``. ``mobileapi.community_views`` stores that
+guest rendering here for ``COMMUNITY_FEED_CACHE_SECONDS``. Per-user state
+(``user_vote``, the poll ``user_vote``, the requester's own anonymous posts)
+is overlaid in memory on each request. Users who block anyone skip the cache:
+their pages exclude the blocked authors in SQL, so they are never short.
+
+Keys embed a version stamp held in the default cache, as
+``conversation.config_snapshot`` does. Creating, deleting, pinning or featuring
+a post publishes a new stamp after commit, so every worker stops reading the
+old pages at once. Vote, comment and poll counters are not versioned; they may lag
+by at most the TTL.
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import CommunityPost
+
+VERSION_CACHE_KEY = "community_feed:version"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "COMMUNITY_FEED_CACHE_SECONDS", 0) or 0)
+
+
+def enabled() -> bool:
+    return _ttl() > 0
+
+
+def _version() -> str:
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY) or uuid.uuid4().hex
+    return version
+
+
+def _page_key(parts) -> str:
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+    return f"community_feed:{_version()}:{digest}"
+
+
+def get_page(parts):
+    """Cached page for ``parts`` (a JSON-serialisable dict of the request's listing params)."""
+    if not enabled():
+        return None
+    return cache.get(_page_key(parts))
+
+
+def set_page(parts, value):
+    if enabled():
+        cache.set(_page_key(parts), value, _ttl())
+
+
+def invalidate():
+    """Retire every cached page once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None))
+
+
+def _post_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate()
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    # Creates and full saves (admin edits); bulk pin/feature/soft-delete
+    # updates call invalidate() themselves.
+    post_save.connect(_post_changed, sender=CommunityPost, dispatch_uid="community_feed_cache_post_save")
+    post_delete.connect(_post_changed, sender=CommunityPost, dispatch_uid="community_feed_cache_post_delete")
@@ -0,0 +1,26 @@
+"""
+Age the stored community hot scores. Run from cron every few minutes; sort=hot
+and the trending badge read the stored value, so this sets how fresh they are.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from community import ranking
+
+
+class Command(BaseCommand):
+    help = "Recompute CommunityPost.hot_score for posts in the hot window and zero those that left it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows rewritten per batch (default: 500).")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be greater than zero.")
+
+        started = time.perf_counter()
+        updated = ranking.decay_hot_scores(batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Hot scores updated: {updated}. ({elapsed:.2f}s)"))
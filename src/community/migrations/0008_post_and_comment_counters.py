@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:58
+
+"""Add stored vote/comment/like counters and backfill them from existing rows."""
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(model, fk, **filters):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk: OuterRef('pk')}, **filters)
+            .order_by()
+            .values(fk)
+            .annotate(n=Count('id'))
+            .values('n')[:1]
+        ),
+        Value(0),
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    CommunityPost = apps.get_model('community', 'CommunityPost')
+    CommunityComment = apps.get_model('community', 'CommunityComment')
+    PostVote = apps.get_model('community', 'PostVote')
+    CommentLike = apps.get_model('community', 'CommentLike')
+
+    upvotes = _count_subquery(PostVote, 'post', vote_type='up')
+    downvotes = _count_subquery(PostVote, 'post', vote_type='down')
+    CommunityPost.objects.update(
+        upvote_count=upvotes,
+        downvote_count=downvotes,
+        vote_score=upvotes - downvotes,
+        comment_count=_count_subquery(CommunityComment, 'post', is_deleted=False),
+    )
+    CommunityComment.objects.update(like_count=_count_subquery(CommentLike, 'comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0007_add_is_pinned_to_communitypost'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communitycomment',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='downvote_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='upvote_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='vote_score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['-is_pinned', '-is_featured', '-vote_score', '-published_at'], name='community_c_is_pinn_a99616_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:06
+
+"""Add the stored hot score used by sort=hot and score every post in the hot window."""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copy of community.ranking as it stood when this migration was written.
+GRAVITY = 1.8
+AGE_OFFSET_HOURS = 2
+COMMENT_WEIGHT = 0.5
+HOT_WINDOW_HOURS = 7 * 24
+
+
+def hot_score(vote_score, comment_count, age_hours):
+    if age_hours > HOT_WINDOW_HOURS:
+        return 0.0
+    points = max(vote_score + COMMENT_WEIGHT * comment_count + 1, 0)
+    return points / (max(age_hours, 0) + AGE_OFFSET_HOURS) ** GRAVITY
+
+
+def backfill_hot_scores(apps, schema_editor):
+    CommunityPost = apps.get_model('community', 'CommunityPost')
+    now = timezone.now()
+    posts = list(
+        CommunityPost.objects.filter(published_at__gte=now - timedelta(hours=HOT_WINDOW_HOURS))
+        .only('pk', 'vote_score', 'comment_count', 'published_at')
+    )
+    for post in posts:
+        age_hours = (now - post.published_at).total_seconds() / 3600
+        post.hot_score = hot_score(post.vote_score, post.comment_count, age_hours)
+    CommunityPost.objects.bulk_update(posts, ['hot_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0008_post_and_comment_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communitypost',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['-is_pinned', '-is_featured', '-hot_score', '-published_at'], name='community_c_is_pinn_41a6a4_idx'),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+    ]
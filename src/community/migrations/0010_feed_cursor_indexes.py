@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0009_post_hot_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='communitycomment',
+            name='community_c_post_id_da3c42_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='communitypost',
+            name='community_c_is_pinn_a99616_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='communitypost',
+            name='community_c_is_pinn_41a6a4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='communitycomment',
+            index=models.Index(fields=['post', 'is_deleted', 'created_at', 'id'], name='community_c_post_id_86ce5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['-is_pinned', '-is_featured', '-published_at', '-id'], name='community_c_is_pinn_81219b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['-is_pinned', '-is_featured', '-vote_score', '-published_at', '-id'], name='community_c_is_pinn_b1186b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['-is_pinned', '-is_featured', '-hot_score', '-published_at', '-id'], name='community_c_is_pinn_1a4226_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0010_feed_cursor_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitycomment',
+            index=models.Index(fields=['post', 'is_deleted', '-like_count'], name='community_c_post_id_ee6b1d_idx'),
+        ),
+    ]
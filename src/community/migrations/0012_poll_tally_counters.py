@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:40
+
+"""Add stored poll tallies and backfill them from existing votes."""
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _choice_count(PollVote, choice):
+    return Coalesce(
+        Subquery(
+            PollVote.objects.filter(poll=OuterRef('pk'), choice=choice)
+            .order_by()
+            .values('poll')
+            .annotate(n=Count('id'))
+            .values('n')[:1]
+        ),
+        Value(0),
+    )
+
+
+def backfill_poll_counts(apps, schema_editor):
+    PostPoll = apps.get_model('community', 'PostPoll')
+    PollVote = apps.get_model('community', 'PollVote')
+    PostPoll.objects.update(
+        send_it_count=_choice_count(PollVote, 'send_it'),
+        dont_send_it_count=_choice_count(PollVote, 'dont_send_it'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0011_comment_like_count_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postpoll',
+            name='dont_send_it_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='postpoll',
+            name='send_it_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_poll_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:58
+
+"""Create the full-text index over posts and comments (see community.search)."""
+
+from django.db import migrations
+
+# Frozen copy of the index definition in community.search as it stood when
+# this migration was written; that module may change without rewriting history.
+POSTGRES_INSTALL = [
+    "ALTER TABLE community_communitypost ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED",
+    'CREATE INDEX IF NOT EXISTS community_post_search_idx ON community_communitypost USING GIN (search_vector)',
+    "ALTER TABLE community_communitycomment ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "to_tsvector('english', coalesce(body, ''))) STORED",
+    'CREATE INDEX IF NOT EXISTS community_comment_search_idx ON community_communitycomment USING GIN (search_vector)',
+]
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS community_comment_search_idx',
+    'ALTER TABLE community_communitycomment DROP COLUMN IF EXISTS search_vector',
+    'DROP INDEX IF EXISTS community_post_search_idx',
+    'ALTER TABLE community_communitypost DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS community_post_fts USING fts5(title, body, "
+    "content='community_communitypost', content_rowid='id', tokenize='porter unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS community_post_fts_ai AFTER INSERT ON community_communitypost BEGIN '
+    'INSERT INTO community_post_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END',
+    'CREATE TRIGGER IF NOT EXISTS community_post_fts_ad AFTER DELETE ON community_communitypost BEGIN '
+    "INSERT INTO community_post_fts(community_post_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    'CREATE TRIGGER IF NOT EXISTS community_post_fts_au AFTER UPDATE OF title, body ON community_communitypost BEGIN '
+    "INSERT INTO community_post_fts(community_post_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    'INSERT INTO community_post_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END',
+    "INSERT INTO community_post_fts(community_post_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS community_comment_fts USING fts5(body, "
+    "content='community_communitycomment', content_rowid='id', tokenize='porter unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS community_comment_fts_ai AFTER INSERT ON community_communitycomment BEGIN '
+    'INSERT INTO community_comment_fts(rowid, body) VALUES (new.id, new.body); END',
+    'CREATE TRIGGER IF NOT EXISTS community_comment_fts_ad AFTER DELETE ON community_communitycomment BEGIN '
+    "INSERT INTO community_comment_fts(community_comment_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+    'CREATE TRIGGER IF NOT EXISTS community_comment_fts_au AFTER UPDATE OF body ON community_communitycomment BEGIN '
+    "INSERT INTO community_comment_fts(community_comment_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+    'INSERT INTO community_comment_fts(rowid, body) VALUES (new.id, new.body); END',
+    "INSERT INTO community_comment_fts(community_comment_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS community_post_fts_ai',
+    'DROP TRIGGER IF EXISTS community_post_fts_ad',
+    'DROP TRIGGER IF EXISTS community_post_fts_au',
+    'DROP TABLE IF EXISTS community_post_fts',
+    'DROP TRIGGER IF EXISTS community_comment_fts_ai',
+    'DROP TRIGGER IF EXISTS community_comment_fts_ad',
+    'DROP TRIGGER IF EXISTS community_comment_fts_au',
+    'DROP TABLE IF EXISTS community_comment_fts',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        statements = statements_by_vendor.get(schema_editor.connection.vendor, ())
+        with schema_editor.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    return run
+
+
+install = _run({'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL})
+uninstall = _run({'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0012_poll_tally_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -30,11 +30,24 @@ class CommunityPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, maintained by community.counters.
+    upvote_count = models.IntegerField(default=0)
+    downvote_count = models.IntegerField(default=0)
+    vote_score = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    # Time-decayed ranking for sort=hot, maintained by community.ranking.
+    hot_score = models.FloatField(default=0)
+
     class Meta:
         ordering = ['-published_at', '-created_at']
         indexes = [
             models.Index(fields=['category', 'is_deleted', '-published_at']),
             models.Index(fields=['is_featured', 'is_deleted']),
+            # One per feed ordering (mobileapi.community_views.FEED_ORDERINGS),
+            # ending in id so cursor pages seek instead of offset-scanning.
+            models.Index(fields=['-is_pinned', '-is_featured', '-published_at', '-id']),
+            models.Index(fields=['-is_pinned', '-is_featured', '-vote_score', '-published_at', '-id']),
+            models.Index(fields=['-is_pinned', '-is_featured', '-hot_score', '-published_at', '-id']),
         ]
 
     def __str__(self):
@@ -72,11 +85,13 @@ class CommunityComment(models.Model):
     body = models.TextField()
     is_deleted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    like_count = models.IntegerField(default=0)
 
     class Meta:
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['post', 'is_deleted', 'created_at']),
+            models.Index(fields=['post', 'is_deleted', 'created_at', 'id']),
+            models.Index(fields=['post', 'is_deleted', '-like_count']),
         ]
 
     def __str__(self):
@@ -154,6 +169,9 @@ class PostPoll(models.Model):
         on_delete=models.CASCADE,
         related_name='poll',
     )
+    # Denormalized tallies, maintained by community.counters.
+    send_it_count = models.IntegerField(default=0)
+    dont_send_it_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
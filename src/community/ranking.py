@@ -0,0 +1,108 @@
+"""
+Stored, time-decayed "hot" ranking for community posts.
+
+``CommunityPost.hot_score`` is a gravity-decayed score in the style of Hacker News::
+
+    points    = vote_score + COMMENT_WEIGHT * comment_count + 1
+    hot_score = max(points, 0) / (age_hours + AGE_OFFSET_HOURS) ** GRAVITY
+
+The +1 lets a brand-new post with no votes still outrank stale ones. The feed's
+``sort=hot`` reads the column through the ``(-is_pinned, -is_featured,
+-hot_score, -published_at, -id)`` index rather than computing anything per request.
+
+The score is refreshed:
+
+* on a full save of a post (``pre_save``): creation, admin edits of ``published_at``;
+* after each counter change (``community.counters`` calls ``refresh_hot_scores``);
+* periodically by ``decay_hot_scores`` (``manage.py decay_hot_scores``, run
+  every few minutes from cron), which ages every post still in the hot window
+  and zeroes those that left it. Older posts then fall back to recency order.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CommunityPost
+
+GRAVITY = 1.8
+AGE_OFFSET_HOURS = 2
+COMMENT_WEIGHT = 0.5
+# Posts older than this stop competing on hot_score.
+HOT_WINDOW_HOURS = 7 * 24
+
+
+def hot_score(vote_score, comment_count, age_hours):
+    if age_hours > HOT_WINDOW_HOURS:
+        return 0.0
+    points = max(vote_score + COMMENT_WEIGHT * comment_count + 1, 0)
+    return points / (max(age_hours, 0) + AGE_OFFSET_HOURS) ** GRAVITY
+
+
+def _age_hours(published_at, now):
+    return (now - published_at).total_seconds() / 3600
+
+
+def post_hot_score(post, now=None):
+    now = now or timezone.now()
+    return hot_score(post.vote_score, post.comment_count, _age_hours(post.published_at, now))
+
+
+def _rescore(rows, now):
+    """Return ``CommunityPost`` stubs whose stored hot_score differs from the computed one."""
+    stale = []
+    for pk, vote_score, comment_count, published_at, stored in rows:
+        score = hot_score(vote_score, comment_count, _age_hours(published_at, now))
+        if score != stored:
+            stale.append(CommunityPost(pk=pk, hot_score=score))
+    return stale
+
+
+_SCORE_FIELDS = ('pk', 'vote_score', 'comment_count', 'published_at', 'hot_score')
+
+
+def refresh_hot_scores(post_ids, now=None):
+    """Recompute hot_score for ``post_ids`` from their stored counters."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+    now = now or timezone.now()
+    rows = CommunityPost.objects.filter(pk__in=post_ids).values_list(*_SCORE_FIELDS)
+    stale = _rescore(rows, now)
+    if stale:
+        CommunityPost.objects.bulk_update(stale, ['hot_score'])
+    return len(stale)
+
+
+def decay_hot_scores(now=None, batch_size=500):
+    """Age every post that is, or was, inside the hot window; return rows rewritten."""
+    now = now or timezone.now()
+    window_start = now - timedelta(hours=HOT_WINDOW_HOURS)
+    queryset = CommunityPost.objects.filter(Q(published_at__gte=window_start) | Q(hot_score__gt=0))
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(*_SCORE_FIELDS)[:batch_size])
+        if not rows:
+            return updated
+        last_pk = rows[-1][0]
+        stale = _rescore(rows, now)
+        if stale:
+            with transaction.atomic():
+                CommunityPost.objects.bulk_update(stale, ['hot_score'])
+        updated += len(stale)
+
+
+def _post_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Full saves (create, admin edit) rescore in place; partial saves that touch
+    # the inputs go through refresh_hot_scores instead.
+    if not raw and update_fields is None:
+        instance.hot_score = post_hot_score(instance)
+
+
+def connect_signals():
+    from django.db.models.signals import pre_save
+
+    pre_save.connect(_post_pre_save, sender=CommunityPost, dispatch_uid='community_ranking_post_pre_save')
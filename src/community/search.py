@@ -0,0 +1,200 @@
+"""
+Full-text search over community posts and their comments.
+
+The index lives in the database and is kept current on write:
+
+* PostgreSQL: ``search_vector`` is a stored generated ``tsvector`` column on
+  ``community_communitypost`` (title weighted A, body B) and on
+  ``community_communitycomment`` (body), each with a GIN index.
+* SQLite: ``community_post_fts`` / ``community_comment_fts`` are FTS5
+  external-content tables, synced by triggers on insert, delete and
+  title/body updates. SQLite migrations that rebuild a table drop its
+  triggers. ``install_sqlite_index`` therefore runs again after every
+  ``migrate`` and re-creates any that went missing.
+
+Neither column is a model field; ``search_posts`` reaches them through raw SQL.
+
+A query is reduced to at most ``MAX_TERMS`` word prefixes that must all
+match. The same words therefore find the same posts on either backend, and
+no user input reaches the FTS query parser. A post matches on its own title
+or body, or through one of its visible comments.
+
+``search_rank`` is the post's own relevance plus ``COMMENT_WEIGHT`` times its
+best comment's. PostgreSQL uses ``ts_rank_cd`` and SQLite uses the negated
+``bm25``. The ranks are comparable within a backend but not across backends.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+MAX_TERMS = 8
+MIN_TERM_LENGTH = 2
+COMMENT_WEIGHT = 0.5
+
+_POST_TABLE = 'community_communitypost'
+_COMMENT_TABLE = 'community_communitycomment'
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(raw):
+    """Lower-cased word terms of a user query, deduplicated, in order."""
+    terms = []
+    for term in _TERM_RE.findall((raw or '').lower()):
+        term = term[:32]
+        if len(term) >= MIN_TERM_LENGTH and term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _match_query(terms):
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _excluded_authors_sql(alias, author_ids):
+    if not author_ids:
+        return '', []
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    return f' AND {alias}.author_id NOT IN ({placeholders})', list(author_ids)
+
+
+def _postgres_expressions(match, blocked):
+    tsquery = "to_tsquery('english', %s)"
+    not_blocked, blocked_params = _excluded_authors_sql('c', blocked)
+    post_ids = RawSQL(
+        f'SELECT id FROM {_POST_TABLE} WHERE search_vector @@ {tsquery}',
+        [match],
+    )
+    comment_post_ids = RawSQL(
+        f'SELECT c.post_id FROM {_COMMENT_TABLE} c '
+        f'WHERE c.search_vector @@ {tsquery} AND NOT c.is_deleted{not_blocked}',
+        [match, *blocked_params],
+    )
+    post_rank = RawSQL(
+        f'ts_rank_cd({_POST_TABLE}.search_vector, {tsquery})',
+        [match],
+        output_field=FloatField(),
+    )
+    comment_rank = RawSQL(
+        f'SELECT MAX(ts_rank_cd(c.search_vector, {tsquery})) FROM {_COMMENT_TABLE} c '
+        f'WHERE c.post_id = {_POST_TABLE}.id AND c.search_vector @@ {tsquery} '
+        f'AND NOT c.is_deleted{not_blocked}',
+        [match, match, *blocked_params],
+        output_field=FloatField(),
+    )
+    return post_ids, comment_post_ids, post_rank, comment_rank
+
+
+def _sqlite_expressions(match, blocked):
+    not_blocked, blocked_params = _excluded_authors_sql('c', blocked)
+    comment_join = (
+        f'FROM community_comment_fts JOIN {_COMMENT_TABLE} c ON c.id = community_comment_fts.rowid '
+        f'WHERE community_comment_fts MATCH %s AND c.is_deleted = 0{not_blocked}'
+    )
+    post_ids = RawSQL(
+        'SELECT rowid FROM community_post_fts WHERE community_post_fts MATCH %s',
+        [match],
+    )
+    comment_post_ids = RawSQL(f'SELECT c.post_id {comment_join}', [match, *blocked_params])
+    # bm25() is lower-is-better; negate it so every backend ranks descending.
+    post_rank = RawSQL(
+        'SELECT -bm25(community_post_fts, 4.0, 1.0) FROM community_post_fts '
+        f'WHERE community_post_fts MATCH %s AND community_post_fts.rowid = {_POST_TABLE}.id',
+        [match],
+        output_field=FloatField(),
+    )
+    # bm25() cannot feed an aggregate, so the best comment is the first by rank.
+    comment_rank = RawSQL(
+        f'SELECT -bm25(community_comment_fts) {comment_join} AND c.post_id = {_POST_TABLE}.id '
+        'ORDER BY bm25(community_comment_fts) LIMIT 1',
+        [match, *blocked_params],
+        output_field=FloatField(),
+    )
+    return post_ids, comment_post_ids, post_rank, comment_rank
+
+
+def search_posts(posts_qs, terms, blocked_author_ids=()):
+    """Filter ``posts_qs`` to posts matching ``terms`` and annotate ``search_rank``.
+
+    Comments that are soft-deleted or written by ``blocked_author_ids`` never
+    make a post match, and neither do posts by those authors.
+    """
+    blocked = sorted(blocked_author_ids)
+    match = _match_query(terms)
+    build = _postgres_expressions if connection.vendor == 'postgresql' else _sqlite_expressions
+    post_ids, comment_post_ids, post_rank, comment_rank = build(match, blocked)
+
+    qs = posts_qs.filter(Q(pk__in=post_ids) | Q(pk__in=comment_post_ids))
+    if blocked:
+        qs = qs.exclude(author_id__in=blocked)
+    return qs.annotate(
+        search_rank=Coalesce(post_rank, Value(0.0))
+        + Value(COMMENT_WEIGHT) * Coalesce(comment_rank, Value(0.0)),
+    )
+
+
+# --- Index repair -------------------------------------------------------------
+
+# Migration 0013 creates the index; this re-creates the SQLite pieces that a
+# later table rebuild dropped.
+
+# (fts table, content table, indexed columns)
+_SQLITE_INDEXES = (
+    ('community_post_fts', _POST_TABLE, ('title', 'body')),
+    ('community_comment_fts', _COMMENT_TABLE, ('body',)),
+)
+
+
+def _sqlite_triggers(fts, table, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    insert = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    return {
+        f'{fts}_ai': f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END',
+        f'{fts}_ad': f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END',
+        f'{fts}_au': (
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} '
+            f'BEGIN {delete} {insert} END'
+        ),
+    }
+
+
+def install_sqlite_index(cursor):
+    """Create the FTS5 tables and triggers that are missing; rebuild any index that lost sync."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    existing = {name for (name,) in cursor.fetchall()}
+    for fts, table, columns in _SQLITE_INDEXES:
+        if table not in existing:
+            continue
+        triggers = _sqlite_triggers(fts, table, columns)
+        if fts in existing and existing.issuperset(triggers):
+            continue
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(columns)}, "
+            f"content='{table}', content_rowid='id', tokenize='porter unicode61')"
+        )
+        for sql in triggers.values():
+            cursor.execute(sql)
+        # Writes made while a trigger was missing never reached the index.
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _restore_sqlite_index(sender, using='default', **kwargs):
+    from django.db import connections
+
+    if connections[using].vendor == 'sqlite':
+        with connections[using].cursor() as cursor:
+            install_sqlite_index(cursor)
+
+
+def connect_signals(app_config):
+    from django.db.models.signals import post_migrate
+
+    post_migrate.connect(_restore_sqlite_index, sender=app_config, dispatch_uid='community_search_restore_sqlite_index')
@@ -1,6 +1,25 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
 
 
 class ConversationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'conversation'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .config_snapshot import invalidate_config_snapshots
+        from .models import DegradationTier, MobileAppConfig, WebAppConfig
+
+        def _invalidate_config_snapshots(sender, using=None, **kwargs):
+            invalidate_config_snapshots(using=using)
+
+        # Admin edits go through proxy models (mobileapi.admin), which send
+        # signals under their own class, so hook every proxy as well.
+        config_models = (MobileAppConfig, WebAppConfig, DegradationTier)
+        for model in apps.get_models():
+            if model._meta.concrete_model not in config_models:
+                continue
+            uid = f"config_snapshot_{model._meta.label_lower}"
+            post_save.connect(_invalidate_config_snapshots, sender=model, weak=False, dispatch_uid=f"{uid}_save")
+            post_delete.connect(_invalidate_config_snapshots, sender=model, weak=False, dispatch_uid=f"{uid}_delete")
@@ -0,0 +1,198 @@
+"""
+Process-wide read-only snapshots of the admin-editable config singletons.
+
+MobileAppConfig, WebAppConfig and their DegradationTier rows change a few times
+a month but are read several times per request. Each process keeps one frozen
+copy of every config and only reloads it when the shared version stamp in the
+default cache changes. Admin saves/deletes publish a new stamp (see
+``conversation.apps``), so every gunicorn worker sharing the cache picks up the
+change on its next version check.
+"""
+
+import threading
+import time
+import types
+import uuid
+from collections import namedtuple
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_CACHE_KEY = "config_snapshot:version"
+
+TierSnapshot = namedtuple(
+    "TierSnapshot",
+    ["id", "tier_type", "sort_order", "threshold", "model", "thinking_level"],
+)
+
+_lock = threading.RLock()
+_state: Dict[str, Any] = {
+    "version": None,
+    "checked_at": 0.0,
+    "snapshots": {},
+}
+
+
+class ConfigSnapshot:
+    """Immutable stand-in for a config singleton row.
+
+    Field values are copied at load time. Class attributes, properties and
+    methods of the source model (``provider_order()``, ``PROVIDER_GPT`` ...)
+    resolve against the snapshot, so it can be passed wherever the model
+    instance used to be read.
+    """
+
+    __slots__ = ("_model", "_values", "_tiers", "version")
+
+    def __init__(self, model, values, version, tiers=()):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_values", types.MappingProxyType(dict(values)))
+        object.__setattr__(self, "_tiers", tuple(tiers))
+        object.__setattr__(self, "version", version)
+
+    def __getattr__(self, name):
+        values = object.__getattribute__(self, "_values")
+        if name in values:
+            return values[name]
+        attr = getattr(object.__getattribute__(self, "_model"), name)
+        if isinstance(attr, property):
+            return attr.fget(self)
+        if isinstance(attr, types.FunctionType):
+            return types.MethodType(attr, self)
+        return attr
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Config snapshots are read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Config snapshots are read-only")
+
+    def __repr__(self):
+        return f"<ConfigSnapshot {self._model.__name__} version={self.version}>"
+
+    def tiers_for(self, tier_type) -> Tuple[TierSnapshot, ...]:
+        """DegradationTier rows of ``tier_type`` in the order they are walked."""
+        return tuple(tier for tier in self._tiers if tier.tier_type == tier_type)
+
+
+def _check_interval() -> float:
+    return float(getattr(settings, "CONFIG_SNAPSHOT_CHECK_SECONDS", 0) or 0)
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex
+
+
+def _shared_version() -> str:
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        # First process up (or the cache was flushed): claim a stamp. Losing
+        # the add() race is fine, we read back whatever the winner stored.
+        cache.add(VERSION_CACHE_KEY, _new_version(), None)
+        version = cache.get(VERSION_CACHE_KEY) or _new_version()
+    return version
+
+
+def _current_version() -> str:
+    now = time.monotonic()
+    local_version = _state["version"]
+    if local_version is not None and now - _state["checked_at"] < _check_interval():
+        return local_version
+
+    version = _shared_version()
+    if version != local_version:
+        _state["snapshots"] = {}
+        _state["version"] = version
+    _state["checked_at"] = now
+    return version
+
+
+def _snapshot_values(instance) -> Dict[str, Any]:
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    }
+
+
+def _load_mobile(version):
+    from conversation.models import DegradationTier, MobileAppConfig
+
+    cfg = MobileAppConfig.load()
+    tiers = [
+        TierSnapshot(
+            id=tier.pk,
+            tier_type=tier.tier_type,
+            sort_order=tier.sort_order,
+            threshold=tier.threshold,
+            model=tier.model,
+            thinking_level=tier.thinking_level,
+        )
+        for tier in DegradationTier.objects.filter(config_id=cfg.pk)
+    ]
+    tiers.sort(key=lambda tier: (tier.tier_type, tier.sort_order, tier.id))
+    return ConfigSnapshot(MobileAppConfig, _snapshot_values(cfg), version, tiers)
+
+
+def _load_web(version):
+    from conversation.models import WebAppConfig
+
+    cfg = WebAppConfig.load()
+    return ConfigSnapshot(WebAppConfig, _snapshot_values(cfg), version)
+
+
+_LOADERS = {
+    "mobile": _load_mobile,
+    "web": _load_web,
+}
+
+
+def _get_snapshot(name) -> ConfigSnapshot:
+    with _lock:
+        version = _current_version()
+        snapshot = _state["snapshots"].get(name)
+        if snapshot is None:
+            snapshot = _LOADERS[name](version)
+            _state["snapshots"][name] = snapshot
+        return snapshot
+
+
+def get_mobile_config() -> ConfigSnapshot:
+    """Read-only MobileAppConfig (with its DegradationTier rows)."""
+    return _get_snapshot("mobile")
+
+
+def get_web_config() -> ConfigSnapshot:
+    """Read-only WebAppConfig."""
+    return _get_snapshot("web")
+
+
+def config_version() -> str:
+    """Version stamp of the snapshots currently served by this process."""
+    with _lock:
+        return _current_version()
+
+
+def _publish_new_version():
+    cache.set(VERSION_CACHE_KEY, _new_version(), None)
+    clear_local_snapshots()
+
+
+def clear_local_snapshots():
+    """Drop this process' copies; the next read re-checks the shared stamp."""
+    with _lock:
+        _state["version"] = None
+        _state["snapshots"] = {}
+        _state["checked_at"] = 0.0
+
+
+def invalidate_config_snapshots(using: Optional[str] = None):
+    """Publish a new version stamp so every process reloads its snapshots.
+
+    Called from the config model signals. The stamp is bumped immediately (so
+    this process never serves the old row again) and once more after commit,
+    so a worker that reloaded mid-transaction cannot keep the pre-commit copy.
+    """
+    _publish_new_version()
+    transaction.on_commit(_publish_new_version, using=using)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversation', '0025_guestwebconversationattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mobileappconfig',
+            name='opener_hedge_after_ms',
+            field=models.PositiveIntegerField(default=0, help_text="Start the next model in the opener cascade alongside the primary if it has not answered within this many ms (set near the primary's p95 latency). 0 = sequential fallback only"),
+        ),
+        migrations.AddField(
+            model_name='mobileappconfig',
+            name='reply_hedge_after_ms',
+            field=models.PositiveIntegerField(default=0, help_text="Start the next model in the reply cascade alongside the primary if it has not answered within this many ms (set near the primary's p95 latency). 0 = sequential fallback only"),
+        ),
+    ]
@@ -200,6 +200,18 @@ class MobileAppConfig(models.Model):
         help_text="Fallback model (GPT) used after tier2 threshold"
     )
 
+    # --- Hedged fallback ---
+    reply_hedge_after_ms = models.PositiveIntegerField(
+        default=0,
+        help_text="Start the next model in the reply cascade alongside the primary if it has not "
+                  "answered within this many ms (set near the primary's p95 latency). 0 = sequential fallback only",
+    )
+    opener_hedge_after_ms = models.PositiveIntegerField(
+        default=0,
+        help_text="Start the next model in the opener cascade alongside the primary if it has not "
+                  "answered within this many ms (set near the primary's p95 latency). 0 = sequential fallback only",
+    )
+
     # --- Guest thinking levels ---
     free_reply_thinking = models.CharField(
         max_length=20, default="high",
@@ -1,12 +1,34 @@
 import json
-from unittest.mock import patch
+from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from asgiref.sync import async_to_sync
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-
-from .models import Conversation, GuestWebConversationAttempt, WebAppConfig
+from PIL import Image
+
+from .config_snapshot import (
+    VERSION_CACHE_KEY,
+    clear_local_snapshots,
+    config_version,
+    get_mobile_config,
+    get_web_config,
+)
+from .utils import image_prep, llm_clients, response_cache
+from .models import (
+    Conversation,
+    DegradationTier,
+    GuestWebConversationAttempt,
+    MobileAppConfig,
+    WebAppConfig,
+)
 
 class AjaxReplyViewTests(TestCase):
     def setUp(self):
@@ -215,6 +237,7 @@ class ConversationHomeTemplateTests(TestCase):
         self.assertContains(response, "No response generated yet.")
 
 
+@override_settings(EVENT_WRITER={"MODE": "sync"})
 class GuestReplyLimitTests(TestCase):
     def setUp(self):
         self.url = reverse('ajax_reply')
@@ -254,6 +277,7 @@ class GuestReplyLimitTests(TestCase):
         self.assertIn("redirect_url", second.json())
 
 
+@override_settings(EVENT_WRITER={"MODE": "sync"})
 class GuestWebConversationAttemptLoggingTests(TestCase):
     def setUp(self):
         self.url = reverse('ajax_reply')
@@ -480,10 +504,86 @@ class WebAppConfigModelTests(TestCase):
         self.assertEqual(WebAppConfig.objects.count(), 1)
 
 
+class ConfigSnapshotTests(TestCase):
+    def setUp(self):
+        MobileAppConfig.load()
+        WebAppConfig.load()
+        cache.delete(VERSION_CACHE_KEY)
+        clear_local_snapshots()
+
+    def test_warm_snapshot_serves_reads_without_queries(self):
+        get_mobile_config()
+        get_web_config()
+
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(5):
+                cfg = get_mobile_config()
+                cfg.free_daily_credit_limit
+                cfg.tiers_for("reply")
+                get_web_config().provider_order()
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_config_save_publishes_new_version_and_reloads(self):
+        before = config_version()
+        self.assertEqual(get_mobile_config().ocr_thinking, "low")
+
+        cfg = MobileAppConfig.load()
+        cfg.ocr_thinking = "medium"
+        cfg.save()
+
+        self.assertNotEqual(config_version(), before)
+        self.assertEqual(get_mobile_config().ocr_thinking, "medium")
+
+    def test_tier_changes_invalidate_mobile_snapshot(self):
+        cfg = MobileAppConfig.load()
+        cfg.tiers.all().delete()
+        self.assertEqual(get_mobile_config().tiers_for("reply"), ())
+
+        DegradationTier.objects.create(
+            config=cfg,
+            tier_type="reply",
+            sort_order=2,
+            threshold=50,
+            model="gemini-3-flash-preview",
+            thinking_level="low",
+        )
+        DegradationTier.objects.create(
+            config=cfg,
+            tier_type="reply",
+            sort_order=1,
+            threshold=10,
+            model="gemini-3-pro-preview",
+            thinking_level="high",
+        )
+
+        tiers = get_mobile_config().tiers_for("reply")
+        self.assertEqual([tier.model for tier in tiers], ["gemini-3-pro-preview", "gemini-3-flash-preview"])
+        self.assertEqual(get_mobile_config().tiers_for("opener"), ())
+
+    def test_version_change_from_another_worker_reloads(self):
+        get_web_config()
+        WebAppConfig.objects.filter(pk=1).update(primary_provider=WebAppConfig.PROVIDER_GPT)
+        self.assertEqual(get_web_config().primary_provider, WebAppConfig.PROVIDER_GEMINI)
+
+        # Simulate another worker publishing a stamp after an admin save.
+        cache.set(VERSION_CACHE_KEY, "other-worker", None)
+        with self.settings(CONFIG_SNAPSHOT_CHECK_SECONDS=0):
+            cfg = get_web_config()
+
+        self.assertEqual(cfg.primary_provider, WebAppConfig.PROVIDER_GPT)
+        self.assertEqual(cfg.provider_order(), [WebAppConfig.PROVIDER_GPT, WebAppConfig.PROVIDER_GEMINI])
+
+    def test_snapshot_is_read_only(self):
+        cfg = get_mobile_config()
+        with self.assertRaises(AttributeError):
+            cfg.free_daily_credit_limit = 99
+
+
 class WebFallbackUtilityTests(TestCase):
     @patch("conversation.utils.web.custom_web.generate_replies_openai_web")
-    @patch("conversation.utils.web.custom_web._get_client")
-    def test_reply_order_primary_gemini_then_gpt(self, mock_gemini_client, mock_openai):
+    @patch("conversation.utils.web.custom_web.gemini_generate")
+    def test_reply_order_primary_gemini_then_gpt(self, mock_gemini, mock_openai):
         from conversation.utils.web.custom_web import generate_web_response
 
         cfg = WebAppConfig.load()
@@ -503,7 +603,7 @@ class WebFallbackUtilityTests(TestCase):
                 {"input_tokens": 10, "output_tokens": 6, "thinking_tokens": 0, "total_tokens": 16},
             )
 
-        mock_gemini_client.return_value.models.generate_content.side_effect = _gemini_side_effect
+        mock_gemini.side_effect = _gemini_side_effect
         mock_openai.side_effect = _openai_side_effect
 
         ai_reply, success, meta = generate_web_response(
@@ -519,8 +619,8 @@ class WebFallbackUtilityTests(TestCase):
         self.assertEqual(meta["thinking_used"], "n/a")
 
     @patch("conversation.utils.web.custom_web.generate_replies_openai_web")
-    @patch("conversation.utils.web.custom_web._get_client")
-    def test_reply_order_primary_gpt_then_gemini(self, mock_gemini_client, mock_openai):
+    @patch("conversation.utils.web.custom_web.gemini_generate")
+    def test_reply_order_primary_gpt_then_gemini(self, mock_gemini, mock_openai):
         from conversation.utils.web.custom_web import generate_web_response
 
         cfg = WebAppConfig.load()
@@ -547,7 +647,7 @@ class WebFallbackUtilityTests(TestCase):
             return _GeminiResponse()
 
         mock_openai.side_effect = _openai_side_effect
-        mock_gemini_client.return_value.models.generate_content.side_effect = _gemini_side_effect
+        mock_gemini.side_effect = _gemini_side_effect
 
         ai_reply, success, meta = generate_web_response(
             "you: hi\nher: hey",
@@ -562,15 +662,15 @@ class WebFallbackUtilityTests(TestCase):
         self.assertEqual(meta["thinking_used"], "minimal")
 
     @patch("conversation.utils.web.custom_web.generate_replies_openai_web")
-    @patch("conversation.utils.web.custom_web._get_client")
-    def test_generate_web_response_all_failed_returns_default_message(self, mock_gemini_client, mock_openai):
+    @patch("conversation.utils.web.custom_web.gemini_generate")
+    def test_generate_web_response_all_failed_returns_default_message(self, mock_gemini, mock_openai):
         from conversation.utils.web.custom_web import generate_web_response
 
         cfg = WebAppConfig.load()
         cfg.primary_provider = WebAppConfig.PROVIDER_GEMINI
         cfg.save()
 
-        mock_gemini_client.return_value.models.generate_content.side_effect = Exception("gemini failure")
+        mock_gemini.side_effect = Exception("gemini failure")
         mock_openai.side_effect = Exception("openai failure")
 
         ai_reply, success, meta = generate_web_response(
@@ -584,3 +684,354 @@ class WebFallbackUtilityTests(TestCase):
         self.assertIn("We hit a hiccup generating replies.", parsed[0]["message"])
         self.assertEqual(meta["model_used"], "none")
 
+
+class LLMClientTests(TestCase):
+    def setUp(self):
+        llm_clients.reset_clients()
+        self.addCleanup(llm_clients.reset_clients)
+
+    def test_clients_are_shared_per_process(self):
+        self.assertIs(llm_clients.gemini_client(), llm_clients.gemini_client())
+        self.assertIs(llm_clients.openai_client(), llm_clients.openai_client())
+        self.assertEqual(llm_clients.openai_client().timeout, 45.0)
+
+    @override_settings(LLM_PROVIDERS={"gemini": {"MAX_CONCURRENCY": 1, "TIMEOUT": 0.01}})
+    def test_saturated_provider_raises_busy(self):
+        with llm_clients.slot(llm_clients.GEMINI):
+            with self.assertRaises(llm_clients.ProviderBusy):
+                with llm_clients.slot(llm_clients.GEMINI):
+                    pass
+        with llm_clients.slot(llm_clients.GEMINI):
+            pass
+
+        async def _nested():
+            async with llm_clients.aslot(llm_clients.GEMINI):
+                async with llm_clients.aslot(llm_clients.GEMINI):
+                    pass
+
+        with self.assertRaises(llm_clients.ProviderBusy):
+            async_to_sync(_nested)()
+
+    @override_settings(LLM_PROVIDERS={"openai": {"MAX_CONCURRENCY": 1, "TIMEOUT": 0.01}})
+    def test_stream_holds_its_slot_until_the_stream_ends(self):
+        chunks = MagicMock()
+        chunks.__enter__.return_value = iter(["a", "b"])
+        with patch.object(llm_clients, "openai_client") as client:
+            client.return_value.chat.completions.create.return_value = chunks
+            stream = llm_clients.openai_chat_stream(model="gpt")
+            self.assertEqual(next(stream), "a")
+            with self.assertRaises(llm_clients.ProviderBusy):
+                llm_clients.openai_chat(model="gpt")
+            self.assertEqual(list(stream), ["b"])
+            llm_clients.openai_chat(model="gpt")
+
+        client.return_value.chat.completions.create.assert_any_call(model="gpt", stream=True)
+        chunks.__exit__.assert_called_once()
+
+    def test_async_reply_cascade_falls_back_to_openai(self):
+        from conversation.utils.mobile.custom_mobile import agenerate_mobile_response
+
+        openai_response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='[{"message":"async fallback"}]'))],
+            usage=SimpleNamespace(prompt_tokens=7, completion_tokens=3),
+        )
+        with patch(
+            "conversation.utils.mobile.custom_mobile.agemini_generate",
+            new=AsyncMock(side_effect=llm_clients.ProviderBusy("gemini")),
+        ), patch(
+            "conversation.utils.mobile.openai_mobile.aopenai_chat",
+            new=AsyncMock(return_value=openai_response),
+        ):
+            ai_reply, success, meta = async_to_sync(agenerate_mobile_response)(
+                "you: hi\nher: hey",
+                "mobile_stuck_reply_prompt",
+                primary_model="gemini-3-flash-preview",
+                return_meta=True,
+            )
+
+        self.assertTrue(success)
+        self.assertEqual(json.loads(ai_reply), [{"message": "async fallback"}])
+        self.assertEqual(meta["model_used"], "gpt-4.1-mini-2025-04-14")
+        self.assertEqual(meta["usage"]["total_tokens"], 10)
+
+
+
+class HedgedCascadeTests(TestCase):
+    def _sync_call(self, delays, usage_tokens=10):
+        import time as _time
+
+        def call(model):
+            _time.sleep(delays[model])
+            return f'[{{"message":"{model}"}}]', {"total_tokens": usage_tokens}
+
+        return call
+
+    def test_disabled_hedge_is_sequential(self):
+        from .utils.mobile.cascade import run_cascade
+
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            if model == "primary":
+                raise ValueError("invalid")
+            return "ok", {"total_tokens": 5}
+
+        reply, model_used, usage, hedge = run_cascade("replies", ["primary", "fallback"], call)
+        self.assertEqual((reply, model_used, hedge), ("ok", "fallback", None))
+        self.assertEqual(calls, ["primary", "fallback"])
+
+    def test_slow_primary_is_hedged_and_fallback_wins(self):
+        from .utils.mobile.cascade import run_cascade
+
+        call = self._sync_call({"primary": 0.5, "fallback": 0.0})
+        reply, model_used, _usage, hedge = run_cascade("replies", ["primary", "fallback"], call, hedge_after_ms=20)
+        self.assertEqual(model_used, "fallback")
+        self.assertEqual(hedge["winner_role"], "hedge")
+        self.assertTrue(hedge["fired"])
+        self.assertEqual(hedge["cancelled"], 1)
+
+    def test_losers_finishing_after_the_winner_are_counted(self):
+        import time as _time
+        from .utils.mobile import cascade
+
+        before = cascade.late_loser_stats()
+        call = self._sync_call({"primary": 0.3, "fallback": 0.0}, usage_tokens=7)
+        _reply, model_used, _usage, hedge = cascade.run_cascade("replies", ["primary", "fallback"], call, hedge_after_ms=20)
+        self.assertEqual((model_used, hedge["extra_tokens"]), ("fallback", 0))
+
+        deadline = _time.monotonic() + 5
+        while cascade.late_loser_stats()["calls"] == before["calls"] and _time.monotonic() < deadline:
+            _time.sleep(0.02)
+        after = cascade.late_loser_stats()
+        self.assertEqual(after["calls"] - before["calls"], 1)
+        self.assertEqual(after["tokens"] - before["tokens"], 7)
+
+    def test_pool_is_sized_from_provider_concurrency(self):
+        from .utils.mobile import cascade
+
+        providers = {"gemini": {"MAX_CONCURRENCY": 40}, "openai": {"MAX_CONCURRENCY": 24}}
+        with self.settings(LLM_PROVIDERS=providers):
+            self.assertEqual(cascade._pool_size(), 64)
+        with self.settings(LLM_PROVIDERS={}):
+            self.assertEqual(cascade._pool_size(), cascade._MIN_WORKERS)
+
+    def test_fast_primary_never_fires_hedge(self):
+        from .utils.mobile.cascade import run_cascade
+
+        call = self._sync_call({"primary": 0.0, "fallback": 0.0})
+        _reply, model_used, _usage, hedge = run_cascade("replies", ["primary", "fallback"], call, hedge_after_ms=500)
+        self.assertEqual(model_used, "primary")
+        self.assertEqual(hedge, {"after_ms": 500, "fired": False, "winner_role": "primary", "extra_tokens": 0, "cancelled": 0})
+
+    def test_async_hedge_cancels_the_slow_primary(self):
+        import asyncio
+        from .utils.mobile.cascade import arun_cascade
+
+        cancelled = []
+
+        async def call(model):
+            try:
+                await asyncio.sleep(5 if model == "primary" else 0)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+            return "ok", {"total_tokens": 3}
+
+        async def _run():
+            result = await arun_cascade("openers", ["primary", "fallback"], call, hedge_after_ms=20)
+            await asyncio.sleep(0)
+            return result
+
+        _reply, model_used, _usage, hedge = async_to_sync(_run)()
+        self.assertEqual(model_used, "fallback")
+        self.assertEqual(hedge["winner_role"], "hedge")
+        self.assertEqual(cancelled, ["primary"])
+
+    def test_hedged_reply_meta_reports_hedge_outcome(self):
+        from .utils.mobile import custom_mobile
+
+        with patch.object(
+            custom_mobile, "_call_gemini_replies", side_effect=ValueError("No valid messages in response")
+        ), patch.object(
+            custom_mobile, "_call_openai_replies", return_value=('[{"message":"gpt"}]', {"total_tokens": 9})
+        ):
+            reply, success, meta = custom_mobile.generate_mobile_response(
+                "hey", "mobile_stuck_reply_prompt", return_meta=True, hedge_after_ms=1000
+            )
+        self.assertTrue(success)
+        self.assertEqual(meta["model_used"], custom_mobile.GPT_MODEL)
+        self.assertEqual(meta["hedge"]["winner_role"], "fallback")
+        self.assertFalse(meta["hedge"]["fired"])
+
+
+class ResponseCacheTests(TestCase):
+    OCR_TEXT = "You [12:00]: hey\nHer [12:01]: hi there"
+
+    def setUp(self):
+        caches[response_cache.CACHE_ALIAS].clear()
+        self.addCleanup(caches[response_cache.CACHE_ALIAS].clear)
+
+    def _upload(self, data=b"\x89PNG\r\n\x1a\nsame-screenshot"):
+        return SimpleUploadedFile("shot.png", data, content_type="image/png")
+
+    @patch("conversation.utils.mobile.image_mobile._run_ocr_call")
+    def test_repeated_upload_is_served_from_cache(self, mocked_ocr):
+        from .utils.mobile.image_mobile import extract_conversation_from_image_mobile
+
+        mocked_ocr.return_value = (self.OCR_TEXT, {"total_tokens": 50})
+        first, ok, first_meta = extract_conversation_from_image_mobile(self._upload(), return_meta=True)
+        second, ok_again, meta = extract_conversation_from_image_mobile(self._upload(), return_meta=True)
+
+        self.assertEqual(mocked_ocr.call_count, 1)
+        self.assertTrue(ok and ok_again)
+        self.assertEqual(second, first)
+        self.assertFalse(first_meta["cache"]["hit"])
+        self.assertEqual(meta["cache"], {"hit": True, "saved_tokens": 50, "hit_ratio": 0.5})
+        self.assertEqual(meta["usage"]["total_tokens"], 0)
+
+        # A different thinking level is a different key.
+        extract_conversation_from_image_mobile(self._upload(), thinking_level="high")
+        self.assertEqual(mocked_ocr.call_count, 2)
+
+    @patch("conversation.utils.mobile.image_mobile.extract_conversation_from_image_openai", side_effect=ValueError("down"))
+    @patch("conversation.utils.mobile.image_mobile._run_ocr_call", return_value=("no labels here", {"total_tokens": 9}))
+    def test_rejected_output_is_not_cached(self, mocked_ocr, _mocked_openai):
+        from .utils.mobile.image_mobile import extract_conversation_from_image_mobile
+
+        extract_conversation_from_image_mobile(self._upload())
+        extract_conversation_from_image_mobile(self._upload())
+        self.assertEqual(mocked_ocr.call_count, 4)
+
+    def test_async_extract_reads_the_shared_entry(self):
+        from .utils.mobile import image_mobile
+
+        with patch.object(image_mobile, "_run_ocr_call", return_value=(self.OCR_TEXT, {"total_tokens": 12})):
+            image_mobile.extract_conversation_from_image_mobile(self._upload())
+        with patch.object(image_mobile, "_arun_ocr_call", new=AsyncMock()) as mocked_async:
+            text, ok, meta = async_to_sync(image_mobile.aextract_conversation_from_image_mobile)(
+                self._upload(), return_meta=True
+            )
+        mocked_async.assert_not_called()
+        self.assertEqual(text, self.OCR_TEXT)
+        self.assertEqual(meta["cache"]["saved_tokens"], 12)
+
+    def test_stream_ocr_replays_accepted_result_for_either_pass(self):
+        from .utils import image_gpt
+
+        def fake_stream(prompt, data_url, usage=None):
+            usage.update({"total_tokens": 30})
+            yield "You [12:00]: hey\n"
+            yield "Her [12:01]: hi there"
+
+        img = b"\x89PNG\r\n\x1a\nstream-screenshot"
+        with patch.object(image_gpt, "_stream_ocr_call", side_effect=fake_stream) as mocked_stream:
+            first = "".join(image_gpt.stream_conversation_from_image_bytes(img, use_resize=False))
+            info = {}
+            replayed = list(image_gpt.stream_conversation_from_image_bytes(img, use_resize=True, cache_info=info))
+
+        self.assertEqual(mocked_stream.call_count, 1)
+        self.assertEqual(replayed, ["You [12:00]: hey\n", "Her [12:01]: hi there"])
+        self.assertEqual("".join(replayed), first)
+        self.assertEqual(info, {"hit": True, "saved_tokens": 30, "hit_ratio": 0.5})
+
+    @override_settings(LLM_RESPONSE_CACHE_ENABLED=False)
+    def test_disabled_cache_always_calls_the_model(self):
+        from .utils import profile_analyzer
+
+        def fake_stream(prompt, data_url, usage):
+            yield "A long enough profile analysis."
+
+        with patch.object(profile_analyzer, "_stream_profile_call", side_effect=fake_stream) as mocked_stream:
+            for _ in range(2):
+                list(profile_analyzer.stream_profile_analysis_bytes(b"profile-bytes"))
+        self.assertEqual(mocked_stream.call_count, 2)
+
+
+class ImagePrepTests(TestCase):
+    """One decode per upload, per-task sizes, and memoized variants."""
+
+    def _encode(self, size, fmt, orientation=None):
+        out = BytesIO()
+        img = Image.new("RGB", size, (200, 30, 30))
+        if orientation:
+            exif = Image.Exif()
+            exif[0x0112] = orientation
+            img.save(out, format=fmt, exif=exif)
+        else:
+            img.save(out, format=fmt)
+        return out.getvalue()
+
+    def _size(self, variant):
+        with Image.open(BytesIO(variant.data)) as img:
+            return img.size
+
+    def test_variants_are_downsized_per_task(self):
+        image = image_prep.prepare(self._encode((1170, 2532), "PNG"))
+
+        ocr = image.variant("ocr")
+        opener = image.variant("opener")
+
+        self.assertEqual(ocr.mime, "image/webp")
+        self.assertEqual(max(self._size(ocr)), image_prep.TASK_LONG_EDGE["ocr"])
+        self.assertEqual(max(self._size(opener)), image_prep.TASK_LONG_EDGE["opener"])
+        self.assertEqual(image.original.mime, "image/png")
+        self.assertLess(len(ocr.data), len(image.data))
+
+    @override_settings(IMAGE_PREP_FORMAT="JPEG")
+    def test_exif_orientation_is_applied(self):
+        # Stored landscape, displayed portrait (rotate 90 CW).
+        image = image_prep.prepare(self._encode((2400, 1080), "JPEG", orientation=6))
+
+        variant = image.variant("ocr")
+
+        self.assertEqual(variant.mime, "image/jpeg")
+        width, height = self._size(variant)
+        self.assertGreater(height, width)
+        self.assertEqual(height, 1280)
+
+    def test_upload_is_decoded_once_and_variants_memoized(self):
+        image = image_prep.prepare(self._encode((1170, 2532), "PNG"))
+
+        with patch.object(image_prep.Image, "open", wraps=Image.open) as opened:
+            first = image.data_url("ocr")
+            image.data_url("opener")
+            image.data_url("profile")
+            again = image.data_url("ocr")
+
+        self.assertEqual(opened.call_count, 1)
+        self.assertIs(again, first)
+        self.assertIs(image_prep.prepare(image), image)
+
+    def test_small_jpeg_is_sent_unchanged(self):
+        data = self._encode((640, 1136), "JPEG")
+        self.assertEqual(image_prep.prepare(data).variant("ocr").data, data)
+
+    def test_undecodable_bytes_fall_back_to_original(self):
+        data = b"\x89PNG\r\n\x1a\nnot-really-a-png"
+        variant = image_prep.prepare(data).variant("ocr")
+        self.assertEqual((variant.data, variant.mime), (data, "image/png"))
+
+    def test_opener_cascade_sends_one_downsized_variant_to_every_model(self):
+        from .utils.mobile import custom_mobile
+
+        seen = []
+
+        def fake_gemini(image, custom_instructions, model, thinking_level="high"):
+            seen.append(custom_mobile._opener_contents(image, custom_instructions)[1])
+            raise RuntimeError("primary down")
+
+        def fake_openai(image, custom_instructions, model=None):
+            seen.append(image_prep.prepare(image).variant("opener"))
+            return json.dumps([{"message": "hi"}]), {"total_tokens": 1}
+
+        upload = self._encode((1170, 2532), "PNG")
+        with patch.object(custom_mobile, "_call_gemini_openers", side_effect=fake_gemini), \
+                patch.object(custom_mobile, "_call_openai_openers", side_effect=fake_openai), \
+                patch.object(custom_mobile.types.Part, "from_bytes", side_effect=lambda data, mime_type: (data, mime_type)):
+            reply, success = custom_mobile.generate_mobile_openers_from_image(upload, primary_model="gemini-3-flash-preview")
+
+        self.assertTrue(success)
+        gemini_part, openai_variant = seen
+        self.assertEqual(gemini_part, (openai_variant.data, "image/webp"))
+        self.assertLess(len(openai_variant.data), len(upload))
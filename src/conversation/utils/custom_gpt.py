@@ -1,8 +1,6 @@
-from openai import OpenAI
-from decouple import config
+from .llm_clients import openai_chat
 import json
-import base64
-client = OpenAI(api_key=config('GPT_API_KEY'))
+from . import image_prep
 from .prompts import get_prompt_for_coach
 from typing import Dict, Any, Optional
 import tiktoken
@@ -12,8 +10,8 @@ from .dating.openers import get_openers
 def generate_openers_from_image(image_bytes, custom_instructions=""):
     # Generate 3 openers directly from a profile image using GPT-4.1-mini vision.
 
-    # Encode image to base64
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    # Downsize and encode for the opener task
+    data_url = image_prep.prepare(image_bytes).data_url("opener")
 
     system_prompt = """
     You are an expert dating coach specializing in crafting memorable first messages for dating apps.
@@ -41,7 +39,7 @@ def generate_openers_from_image(image_bytes, custom_instructions=""):
 
     success = False
     try:
-        response = client.chat.completions.create(
+        response = openai_chat(
             model="gpt-4.1-mini-2025-04-14",
             messages=[
                 {"role": "system", "content": system_prompt.strip()},
@@ -52,7 +50,7 @@ def generate_openers_from_image(image_bytes, custom_instructions=""):
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
+                                "url": data_url,
                                 "detail": "high"
                             }
                         }
@@ -158,7 +156,7 @@ def generate_custom_response(last_text, situation, her_info, tone="Natural", cus
 
 
 def generate_gpt_response(system_prompt, user_prompt, model="gpt-4.1-mini-2025-04-14"):
-    response = client.chat.completions.create(
+    response = openai_chat(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt.strip()},
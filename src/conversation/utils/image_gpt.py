@@ -1,31 +1,26 @@
-import base64
-from io import BytesIO
-from openai import OpenAI
-from decouple import config
+from .llm_clients import openai_chat, openai_chat_stream
 import time
-from PIL import Image
 from .custom_gpt import extract_usage
+from . import image_prep, response_cache
 
-client = OpenAI(api_key=config('GPT_API_KEY'))
+OCR_MODEL = "gpt-4.1-mini-2025-04-14"
 
 def extract_conversation_from_image(screenshot_file):
-    img_bytes = screenshot_file.read()
-    original_bytes = len(img_bytes)
+    image = image_prep.prepare(screenshot_file.read())
+    original_bytes = len(image.data)
 
     # Resize/compress large images to reduce latency and payload size
-    resized_bytes = _resize_image_bytes(img_bytes)
-    if len(resized_bytes) != original_bytes:
-        print(f"[DEBUG] Resized image bytes: {original_bytes} -> {len(resized_bytes)}")
-
-    mime = _detect_mime(img_bytes)
+    resized = image.variant("ocr")
+    if len(resized.data) != original_bytes:
+        print(f"[DEBUG] Resized image bytes: {original_bytes} -> {len(resized.data)}")
 
     # Log for debugging
     print(f"[DEBUG] Original content_type: {screenshot_file.content_type}")
-    print(f"[DEBUG] Using MIME type: {mime}")
-    print(f"[DEBUG] File size: {len(resized_bytes)} bytes")
-    print(f"[DEBUG] First 10 bytes: {resized_bytes[:10].hex()}")
+    print(f"[DEBUG] Using MIME type: {resized.mime}")
+    print(f"[DEBUG] File size: {len(resized.data)} bytes")
+    print(f"[DEBUG] First 10 bytes: {resized.data[:10].hex()}")
 
-    data_url = _build_data_url(resized_bytes, mime)
+    data_url = resized.data_url
     prompt = _get_conversation_prompt()
     start_time = time.time()
 
@@ -42,8 +37,7 @@ def extract_conversation_from_image(screenshot_file):
         # Retry with original bytes if resized attempt fails
         print(f"[WARN] OCR failed on resized image, retrying original: {str(e)}")
         try:
-            data_url_full = _build_data_url(img_bytes, mime)
-            output = _run_ocr_call(prompt, data_url_full, time.time())
+            output = _run_ocr_call(prompt, image.original.data_url, time.time())
 
             if not any(tag in output.lower() for tag in ("you [", "her [", "system [")):
                 return ("Failed to extract the conversation with timestamps. Please try uploading the screenshot again. "
@@ -55,18 +49,39 @@ def extract_conversation_from_image(screenshot_file):
             return f"Failed to process image: {str(exc)}"
 
 
-def stream_conversation_from_image_bytes(img_bytes, use_resize=True):
-    mime = _detect_mime(img_bytes)
-    payload_bytes = _resize_image_bytes(img_bytes) if use_resize else img_bytes
-    data_url = _build_data_url(payload_bytes, mime)
+def stream_conversation_from_image_bytes(img_bytes, use_resize=True, cache_info=None):
+    """Stream OCR deltas, replaying a cached transcription of the same upload.
+
+    ``img_bytes`` may be a ``PreparedImage`` shared by both passes. The cache
+    key is the original bytes for both passes, so the accepted result of
+    either pass answers the next submission of that screenshot.
+    """
+    image = image_prep.prepare(img_bytes)
     prompt = _get_conversation_prompt()
+    usage = {}
+
+    def produce():
+        payload = image.variant("ocr") if use_resize else image.original
+        return _stream_ocr_call(prompt, payload.data_url, usage=usage)
+
+    yield from response_cache.cached_stream(
+        response_cache.image_key("stream_ocr", image.data, OCR_MODEL, "n/a", prompt),
+        "stream_ocr",
+        produce,
+        model=OCR_MODEL,
+        accept=_has_labeled_lines,
+        usage=usage,
+        info=cache_info,
+    )
+
 
-    for delta in _stream_ocr_call(prompt, data_url):
-        yield delta
+def _has_labeled_lines(text):
+    lowered = text.lower()
+    return any(tag in lowered for tag in ("you [", "her [", "system ["))
 
 
 def _run_ocr_call(prompt, data_url, start_time):
-    resp = client.chat.completions.create(
+    resp = openai_chat(
         model="gpt-4.1-mini-2025-04-14",
         messages=[{
             "role": "user",
@@ -88,9 +103,9 @@ def _run_ocr_call(prompt, data_url, start_time):
     return output
 
 
-def _stream_ocr_call(prompt, data_url):
-    stream = client.chat.completions.create(
-        model="gpt-4.1-mini-2025-04-14",
+def _stream_ocr_call(prompt, data_url, usage=None):
+    stream = openai_chat_stream(
+        model=OCR_MODEL,
         messages=[{
             "role": "user",
             "content": [
@@ -99,53 +114,14 @@ def _stream_ocr_call(prompt, data_url):
             ]
         }],
         max_tokens=1500,
-        stream=True
+        stream_options={"include_usage": True},
     )
 
     for chunk in stream:
         if chunk.choices and chunk.choices[0].delta.content:
             yield chunk.choices[0].delta.content
-
-
-def _resize_image_bytes(img_bytes, max_long_edge=1280, quality=85):
-    try:
-        with Image.open(BytesIO(img_bytes)) as img:
-            width, height = img.size
-            long_edge = max(width, height)
-
-            # Keep small JPEGs as-is to avoid unnecessary recompression
-            if long_edge <= max_long_edge and (img.format or '').upper() in ('JPEG', 'JPG'):
-                return img_bytes
-
-            if long_edge > max_long_edge:
-                scale = max_long_edge / float(long_edge)
-                new_size = (int(width * scale), int(height * scale))
-                img = img.resize(new_size, Image.LANCZOS)
-
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            out = BytesIO()
-            img.save(out, format='JPEG', quality=quality, optimize=True)
-            return out.getvalue()
-    except Exception as exc:
-        print(f"[WARN] Image resize failed: {exc}")
-        return img_bytes
-
-
-def _detect_mime(img_bytes):
-    if img_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-        return 'image/png'
-    if img_bytes.startswith(b'RIFF') and len(img_bytes) > 11 and img_bytes[8:12] == b'WEBP':
-        return 'image/webp'
-    if img_bytes.startswith(b'\xff\xd8\xff'):
-        return 'image/jpeg'
-    return 'image/jpeg'
-
-
-def _build_data_url(img_bytes, mime):
-    b64 = base64.b64encode(img_bytes).decode("utf-8")
-    return f"data:{mime};base64,{b64}"
+        if usage is not None and getattr(chunk, "usage", None):
+            usage.update(extract_usage(chunk))
 
 
 def _get_conversation_prompt():
@@ -0,0 +1,148 @@
+"""
+Shared image preprocessing for the vision calls: OCR, profile analysis and
+openers.
+
+``prepare(img_bytes)`` wraps one upload in a ``PreparedImage``. Each task asks
+it for a variant (``image.variant("ocr")``), which is downsized to that task's
+long edge (``TASK_LONG_EDGE``) and re-encoded to ``IMAGE_PREP_FORMAT`` (WebP,
+or JPEG when Pillow lacks WebP support). Decoding uses Pillow draft mode, so a
+large JPEG is decoded straight at a reduced scale. EXIF orientation is applied
+before resizing. Small JPEG/WebP uploads that need no resize or rotation are
+sent as-is.
+
+The decoded image, the encoded variants and their base64 data URLs are all
+memoized on the ``PreparedImage``. Pass the same object down a request (to the
+resized and original passes of a stream, or to both models of a hedged
+cascade) and each is computed once. If an image cannot be decoded, every
+variant falls back to the original bytes.
+"""
+
+import base64
+import threading
+from io import BytesIO
+from typing import Dict, Optional, Union
+
+from django.conf import settings
+from PIL import ExifTags, Image, ImageOps, features
+
+TASK_LONG_EDGE = {
+    "ocr": 1280,
+    "profile": 1024,
+    "opener": 1024,
+}
+QUALITY = 85
+
+_PASSTHROUGH_FORMATS = {"JPEG", "WEBP"}
+
+
+def detect_mime(img_bytes: bytes) -> str:
+    if img_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if img_bytes.startswith(b"RIFF") and len(img_bytes) > 11 and img_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if img_bytes.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    return "image/jpeg"
+
+
+def output_format() -> str:
+    fmt = str(getattr(settings, "IMAGE_PREP_FORMAT", "WEBP")).upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return "WEBP" if fmt == "WEBP" else "JPEG"
+
+
+class Variant:
+    """Encoded bytes for one task, with a lazily built data URL."""
+
+    def __init__(self, data: bytes, mime: str, size=None):
+        self.data = data
+        self.mime = mime
+        self.size = size
+        self._data_url: Optional[str] = None
+
+    @property
+    def data_url(self) -> str:
+        if self._data_url is None:
+            b64 = base64.b64encode(self.data).decode("utf-8")
+            self._data_url = f"data:{self.mime};base64,{b64}"
+        return self._data_url
+
+
+class PreparedImage:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.original = Variant(data, detect_mime(data))
+        # Hedged cascades may ask for the same variant from two threads.
+        self._lock = threading.Lock()
+        self._variants: Dict[int, Variant] = {}
+        self._image: Optional[Image.Image] = None
+        self._image_edge: Optional[int] = None  # draft scale it was decoded for; None = full size
+        self._source_format = ""
+        self._rotated = False
+
+    def variant(self, task: str) -> Variant:
+        long_edge = TASK_LONG_EDGE[task]
+        with self._lock:
+            variant = self._variants.get(long_edge)
+            if variant is None:
+                try:
+                    variant = self._encode(long_edge)
+                except Exception as exc:
+                    print(f"[WARN] Image resize failed: {exc}")
+                    variant = self.original
+                self._variants[long_edge] = variant
+            return variant
+
+    def data_url(self, task: Optional[str] = None) -> str:
+        return (self.variant(task) if task else self.original).data_url
+
+    def _decoded(self, long_edge: int) -> Image.Image:
+        if self._image is not None and (self._image_edge is None or long_edge <= self._image_edge):
+            return self._image
+        with Image.open(BytesIO(self.data)) as img:
+            self._source_format = (img.format or "").upper()
+            full_size = img.size
+            orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+            # JPEG only: decode at the smallest 1/2^n scale still >= long_edge.
+            img.draft("RGB", (long_edge, long_edge))
+            drafted = img.size != full_size
+            img = ImageOps.exif_transpose(img)
+        self._rotated = orientation not in (None, 1)
+        self._image = img
+        self._image_edge = long_edge if drafted else None
+        return img
+
+    def _encode(self, long_edge: int) -> Variant:
+        img = self._decoded(long_edge)
+        width, height = img.size
+        if (
+            max(width, height) <= long_edge
+            and self._image_edge is None
+            and self._source_format in _PASSTHROUGH_FORMATS
+            and not self._rotated
+        ):
+            # Already small and upright: avoid recompressing it.
+            return Variant(self.data, self.original.mime, img.size)
+
+        if max(width, height) > long_edge:
+            scale = long_edge / float(max(width, height))
+            new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            img = img.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        fmt = output_format()
+        out = BytesIO()
+        if fmt == "WEBP":
+            img.save(out, format="WEBP", quality=QUALITY, method=2)
+        else:
+            img.save(out, format="JPEG", quality=QUALITY, optimize=True)
+        return Variant(out.getvalue(), f"image/{fmt.lower()}", img.size)
+
+
+def prepare(image: Union[bytes, PreparedImage]) -> PreparedImage:
+    """Wrap raw upload bytes; an already prepared image is returned unchanged."""
+    if isinstance(image, PreparedImage):
+        return image
+    return PreparedImage(image)
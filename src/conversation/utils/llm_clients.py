@@ -0,0 +1,189 @@
+"""
+Process-wide Gemini and OpenAI clients shared by every generation module.
+
+Each provider gets one pooled HTTP client per process (plus one async client
+per running event loop, since httpx connection pools are bound to the loop
+that opened them), a per-call timeout, and a cap on in-flight calls. All three
+come from ``settings.LLM_PROVIDERS``.
+
+Call sites use ``gemini_generate`` / ``openai_chat`` (``openai_chat_stream``
+for streamed completions, which holds its slot until the stream ends) or the
+async ``agemini_generate`` / ``aopenai_chat`` instead of building SDK clients
+at import time. When a provider is saturated, a caller waits up to the provider
+timeout for a slot and then raises ``ProviderBusy``. The model cascades treat
+that like any other failed attempt and move on to the next model.
+"""
+
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, Dict
+
+import httpx
+from decouple import config
+from django.conf import settings
+from google import genai
+from google.genai import types
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+GEMINI = "gemini"
+OPENAI = "openai"
+
+_DEFAULTS = {
+    "TIMEOUT": 60.0,
+    "MAX_CONCURRENCY": 64,
+    "MAX_CONNECTIONS": 100,
+}
+
+_sync_slots: Dict[str, threading.BoundedSemaphore] = {}
+_sync_slots_lock = threading.Lock()
+_loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+class ProviderBusy(Exception):
+    """No concurrency slot for the provider freed up within its timeout."""
+
+
+def provider_settings(provider: str) -> Dict[str, Any]:
+    configured = getattr(settings, "LLM_PROVIDERS", {}).get(provider, {})
+    return {**_DEFAULTS, **configured}
+
+
+def _limits(provider: str) -> httpx.Limits:
+    max_connections = provider_settings(provider)["MAX_CONNECTIONS"]
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=30.0,
+    )
+
+
+def _build_gemini_client() -> genai.Client:
+    limits = _limits(GEMINI)
+    return genai.Client(
+        api_key=config("GEMINI_API_KEY"),
+        http_options=types.HttpOptions(
+            timeout=int(provider_settings(GEMINI)["TIMEOUT"] * 1000),
+            client_args={"limits": limits},
+            async_client_args={"limits": limits},
+        ),
+    )
+
+
+@lru_cache(maxsize=1)
+def gemini_client() -> genai.Client:
+    return _build_gemini_client()
+
+
+@lru_cache(maxsize=1)
+def openai_client() -> OpenAI:
+    timeout = provider_settings(OPENAI)["TIMEOUT"]
+    return OpenAI(
+        api_key=config("GPT_API_KEY"),
+        timeout=timeout,
+        http_client=DefaultHttpxClient(limits=_limits(OPENAI), timeout=timeout),
+    )
+
+
+def _state_for_running_loop() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = {"clients": {}, "slots": {}}
+        _loop_state[loop] = state
+    return state
+
+
+def async_gemini_client():
+    """The ``client.aio`` handle bound to the running event loop."""
+    clients = _state_for_running_loop()["clients"]
+    if GEMINI not in clients:
+        clients[GEMINI] = _build_gemini_client()
+    return clients[GEMINI].aio
+
+
+def async_openai_client() -> AsyncOpenAI:
+    clients = _state_for_running_loop()["clients"]
+    if OPENAI not in clients:
+        timeout = provider_settings(OPENAI)["TIMEOUT"]
+        clients[OPENAI] = AsyncOpenAI(
+            api_key=config("GPT_API_KEY"),
+            timeout=timeout,
+            http_client=DefaultAsyncHttpxClient(limits=_limits(OPENAI), timeout=timeout),
+        )
+    return clients[OPENAI]
+
+
+def reset_clients() -> None:
+    """Drop cached clients and slots so new ``LLM_PROVIDERS`` settings apply."""
+    gemini_client.cache_clear()
+    openai_client.cache_clear()
+    with _sync_slots_lock:
+        _sync_slots.clear()
+    _loop_state.clear()
+
+
+@contextmanager
+def slot(provider: str):
+    """Hold one of the provider's in-flight call slots (threads)."""
+    opts = provider_settings(provider)
+    with _sync_slots_lock:
+        semaphore = _sync_slots.get(provider)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(opts["MAX_CONCURRENCY"])
+            _sync_slots[provider] = semaphore
+    if not semaphore.acquire(timeout=opts["TIMEOUT"]):
+        raise ProviderBusy(f"{provider}: {opts['MAX_CONCURRENCY']} calls already in flight")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+@asynccontextmanager
+async def aslot(provider: str):
+    """Hold one of the provider's in-flight call slots (event loop)."""
+    opts = provider_settings(provider)
+    slots = _state_for_running_loop()["slots"]
+    semaphore = slots.get(provider)
+    if semaphore is None:
+        semaphore = asyncio.BoundedSemaphore(opts["MAX_CONCURRENCY"])
+        slots[provider] = semaphore
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=opts["TIMEOUT"])
+    except asyncio.TimeoutError:
+        raise ProviderBusy(f"{provider}: {opts['MAX_CONCURRENCY']} calls already in flight") from None
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def gemini_generate(**kwargs):
+    """``models.generate_content`` on the shared Gemini client."""
+    with slot(GEMINI):
+        return gemini_client().models.generate_content(**kwargs)
+
+
+async def agemini_generate(**kwargs):
+    async with aslot(GEMINI):
+        return await async_gemini_client().models.generate_content(**kwargs)
+
+
+def openai_chat(**kwargs):
+    """``chat.completions.create`` on the shared OpenAI client."""
+    with slot(OPENAI):
+        return openai_client().chat.completions.create(**kwargs)
+
+
+def openai_chat_stream(**kwargs):
+    """Chunks of a streamed ``chat.completions.create``; the slot is held until the stream ends."""
+    with slot(OPENAI), openai_client().chat.completions.create(stream=True, **kwargs) as stream:
+        yield from stream
+
+
+async def aopenai_chat(**kwargs):
+    async with aslot(OPENAI):
+        return await async_openai_client().chat.completions.create(**kwargs)
@@ -0,0 +1,238 @@
+"""
+Fallback driver for the mobile model cascades.
+
+``run_cascade`` and ``arun_cascade`` try ``models`` in order, where ``call(model)``
+returns ``(ai_reply, usage)`` and raises on any failure. That includes output
+rejected by ``_validate_and_clean_json``.
+
+Without a hedge budget this is the strictly sequential walk. With
+``hedge_after_ms``, if the running model has not answered within the budget,
+the next model is started alongside it. The first call to return wins and the
+others are cancelled. A failure still starts the next model right away when
+nothing else is in flight.
+
+The returned ``hedge`` dict is recorded with the generation event:
+
+* ``fired``: a hedge call was started.
+* ``winner_role``: ``primary``, ``hedge`` (started by the budget) or
+  ``fallback`` (started after a failure).
+* ``extra_tokens``: tokens of losing calls that completed before the winner
+  was returned.
+* ``cancelled``: losing calls that were abandoned in flight.
+
+A sync call abandoned in flight cannot be interrupted and runs to completion
+in the background, after the event is recorded. Its tokens are logged when it
+finishes and added up in ``late_loser_stats()``.
+
+Sync calls run on a process-wide pool sized from the providers'
+``MAX_CONCURRENCY`` (``settings.LLM_PROVIDERS``), so abandoned losers cannot
+starve the primaries of other requests.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+CascadeResult = Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_MIN_WORKERS = 16
+
+_late_losers = {"calls": 0, "failed": 0, "tokens": 0}
+_late_losers_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    providers = getattr(settings, "LLM_PROVIDERS", {}) or {}
+    return max(_MIN_WORKERS, sum(int(opts.get("MAX_CONCURRENCY") or 0) for opts in providers.values()))
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_pool_size(), thread_name_prefix="model-hedge")
+        return _executor
+
+
+def late_loser_stats() -> Dict[str, int]:
+    """Abandoned sync losers that have since finished: count, failures and tokens spent."""
+    with _late_losers_lock:
+        return dict(_late_losers)
+
+
+def _log_failure(action: str, attempt: int, model: str, exc: BaseException) -> None:
+    print(f"[FAILSAFE] action={action} attempt={attempt} model={model} status=failed error={type(exc).__name__}: {str(exc)}")
+
+
+def _total_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    try:
+        return int((usage or {}).get("total_tokens") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _account_late_loser(action: str, model: str, future) -> None:
+    """Done-callback for a loser still running when its cascade returned."""
+    try:
+        _ai_reply, usage = future.result()
+    except Exception:
+        with _late_losers_lock:
+            _late_losers["failed"] += 1
+        return
+    tokens = _total_tokens(usage)
+    with _late_losers_lock:
+        _late_losers["calls"] += 1
+        _late_losers["tokens"] += tokens
+    print(f"[HEDGE] action={action} late_loser={model} extra_tokens={tokens}")
+
+
+class _Hedge:
+    """Launch bookkeeping shared by the sync and async drivers."""
+
+    def __init__(self, action: str, models: List[str], hedge_after_ms: int):
+        self.action = action
+        self.queue = list(enumerate(models, 1))
+        self.hedge_after_ms = hedge_after_ms
+        self.info = {
+            "after_ms": hedge_after_ms,
+            "fired": False,
+            "winner_role": None,
+            "extra_tokens": 0,
+            "cancelled": 0,
+        }
+
+    def budget(self) -> Optional[float]:
+        """Seconds to wait before hedging; None once no model is left to start."""
+        return self.hedge_after_ms / 1000.0 if self.queue else None
+
+    def take(self, role: str) -> Tuple[int, str, str]:
+        attempt, model = self.queue.pop(0)
+        if role == "hedge":
+            self.info["fired"] = True
+            print(
+                f"[HEDGE] action={self.action} attempt={attempt} model={model} "
+                f"after_ms={self.hedge_after_ms} status=fired"
+            )
+        return attempt, model, role
+
+    def finish(self, winner, losers_in_flight: int) -> CascadeResult:
+        self.info["cancelled"] = losers_in_flight
+        if winner is None:
+            return None, None, None, self.info
+        ai_reply, model, usage, role = winner
+        self.info["winner_role"] = role
+        if self.info["fired"]:
+            print(
+                f"[HEDGE] action={self.action} winner={model} role={role} "
+                f"extra_tokens={self.info['extra_tokens']} cancelled={losers_in_flight}"
+            )
+        return ai_reply, model, usage, self.info
+
+
+def run_cascade(
+    action: str,
+    models: List[str],
+    call: Callable[[str], Tuple[str, Dict[str, Any]]],
+    hedge_after_ms: int = 0,
+) -> CascadeResult:
+    """Return ``(ai_reply, model_used, usage, hedge)``; model_used is None if all failed."""
+    if not hedge_after_ms:
+        for attempt, model in enumerate(models, 1):
+            try:
+                ai_reply, usage = call(model)
+                return ai_reply, model, usage, None
+            except Exception as e:
+                _log_failure(action, attempt, model, e)
+        return None, None, None, None
+
+    hedge = _Hedge(action, models, hedge_after_ms)
+    executor = _hedge_executor()
+    running = {}
+    winner = None
+
+    def launch(role):
+        attempt, model, role = hedge.take(role)
+        running[executor.submit(call, model)] = (attempt, model, role)
+
+    launch("primary")
+    while running and winner is None:
+        done, _ = wait(running, timeout=hedge.budget(), return_when=FIRST_COMPLETED)
+        if not done:
+            launch("hedge")
+            continue
+        for future in done:
+            attempt, model, role = running.pop(future)
+            try:
+                ai_reply, usage = future.result()
+            except Exception as e:
+                _log_failure(action, attempt, model, e)
+                continue
+            if winner is None:
+                winner = (ai_reply, model, usage, role)
+            else:
+                hedge.info["extra_tokens"] += _total_tokens(usage)
+        if winner is None and not running and hedge.queue:
+            launch("fallback")
+
+    # Worker threads cannot be interrupted: a started loser runs to completion
+    # in the background; its tokens are counted when it finishes.
+    for future, (_attempt, model, _role) in running.items():
+        if not future.cancel():
+            future.add_done_callback(partial(_account_late_loser, action, model))
+    return hedge.finish(winner, len(running))
+
+
+async def arun_cascade(
+    action: str,
+    models: List[str],
+    call: Callable[[str], Any],
+    hedge_after_ms: int = 0,
+) -> CascadeResult:
+    """Async ``run_cascade``; ``call(model)`` is a coroutine function."""
+    if not hedge_after_ms:
+        for attempt, model in enumerate(models, 1):
+            try:
+                ai_reply, usage = await call(model)
+                return ai_reply, model, usage, None
+            except Exception as e:
+                _log_failure(action, attempt, model, e)
+        return None, None, None, None
+
+    hedge = _Hedge(action, models, hedge_after_ms)
+    running = {}
+    winner = None
+
+    def launch(role):
+        attempt, model, role = hedge.take(role)
+        running[asyncio.ensure_future(call(model))] = (attempt, model, role)
+
+    launch("primary")
+    try:
+        while running and winner is None:
+            done, _ = await asyncio.wait(running, timeout=hedge.budget(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch("hedge")
+                continue
+            for task in done:
+                attempt, model, role = running.pop(task)
+                try:
+                    ai_reply, usage = task.result()
+                except Exception as e:
+                    _log_failure(action, attempt, model, e)
+                    continue
+                if winner is None:
+                    winner = (ai_reply, model, usage, role)
+                else:
+                    hedge.info["extra_tokens"] += _total_tokens(usage)
+            if winner is None and not running and hedge.queue:
+                launch("fallback")
+    finally:
+        for task in running:
+            task.cancel()
+    return hedge.finish(winner, len(running))
@@ -4,11 +4,15 @@ Mirrors the structure of custom_gpt.py but uses Google's Gemini models.
 Includes failsafe fallback to GPT-4.1-mini when Gemini fails.
 """
 
-from google import genai
 from google.genai import types
-from decouple import config
+import asyncio
 import json
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List
+
+from conversation.utils import image_prep
+from conversation.utils.llm_clients import agemini_generate, gemini_generate
+
+from .cascade import arun_cascade, run_cascade
 
 from .prompts_mobile import (
     get_mobile_opener_prompt,
@@ -17,13 +21,12 @@ from .prompts_mobile import (
     get_mobile_reply_user_prompt,
 )
 from .openai_mobile import (
+    agenerate_openers_from_image_openai,
+    agenerate_replies_openai,
     generate_openers_from_image_openai,
     generate_replies_openai,
 )
 
-# Initialize Gemini client with the new unified SDK
-client = genai.Client(api_key=config('GEMINI_API_KEY'))
-
 # Model constants
 GEMINI_PRO = "gemini-3-pro-preview"      # For openers (paid users)
 GEMINI_FLASH = "gemini-3-flash-preview"  # For replies and free users
@@ -133,6 +136,19 @@ def _validate_and_clean_json(text: str) -> str:
     return json.dumps(cleaned)
 
 
+def _opener_contents(image_bytes: bytes, custom_instructions: str) -> List[Any]:
+    system_prompt = get_mobile_opener_prompt(custom_instructions)
+    user_prompt = get_mobile_opener_user_prompt()
+
+    # Create image part for vision, downsized for the opener task
+    image = image_prep.prepare(image_bytes).variant("opener")
+    image_part = types.Part.from_bytes(
+        data=image.data,
+        mime_type=image.mime
+    )
+    return [system_prompt, image_part, user_prompt]
+
+
 def _call_gemini_openers(
     image_bytes: bytes,
     custom_instructions: str,
@@ -154,22 +170,9 @@ def _call_gemini_openers(
     Raises:
         Exception: If API call or validation fails
     """
-    system_prompt = get_mobile_opener_prompt(custom_instructions)
-    user_prompt = get_mobile_opener_user_prompt()
-
-    # Create image part for vision
-    image_part = types.Part.from_bytes(
-        data=image_bytes,
-        mime_type="image/jpeg"
-    )
-
-    response = client.models.generate_content(
+    response = gemini_generate(
         model=model,
-        contents=[
-            system_prompt,
-            image_part,
-            user_prompt,
-        ],
+        contents=_opener_contents(image_bytes, custom_instructions),
         config=_make_image_config(thinking_level)
     )
 
@@ -179,6 +182,21 @@ def _call_gemini_openers(
     return ai_reply, usage_info
 
 
+async def _acall_gemini_openers(
+    image_bytes: bytes,
+    custom_instructions: str,
+    model: str,
+    thinking_level: str = "high",
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Async variant of _call_gemini_openers."""
+    response = await agemini_generate(
+        model=model,
+        contents=_opener_contents(image_bytes, custom_instructions),
+        config=_make_image_config(thinking_level)
+    )
+    return _validate_and_clean_json(response.text), _extract_usage(response)
+
+
 def _call_openai_openers(
     image_bytes: bytes,
     custom_instructions: str,
@@ -206,46 +224,24 @@ def _call_openai_openers(
     return _validate_and_clean_json(ai_reply), usage_info
 
 
-def generate_mobile_openers_from_image(
+async def _acall_openai_openers(
     image_bytes: bytes,
-    custom_instructions: str = "",
-    use_pro_model: bool = True,
-    thinking_level: Optional[str] = "high",
-    use_gpt_only: bool = False,
-    primary_model: Optional[str] = None,
-    fallback_model: str = GPT_MODEL,
-    return_meta: bool = False,
-) -> Tuple[str, bool]:
-    """
-    Generate opener suggestions from profile image with cascading fallback.
-
-    Fallback chain:
-    - Explicit config: primary_model -> fallback_model
-    - use_gpt_only=True: fallback_model only
-    - Legacy paid path (use_pro_model=True): Gemini Pro -> Gemini Flash -> fallback_model
-    - Legacy free path (use_pro_model=False): Gemini Flash -> fallback_model
+    custom_instructions: str,
+    model: str = GPT_MODEL,
+) -> Tuple[str, Dict[str, Any]]:
+    """Async variant of _call_openai_openers."""
+    ai_reply, usage_info = await agenerate_openers_from_image_openai(
+        image_bytes,
+        custom_instructions,
+        model=model,
+        return_usage=True,
+    )
+    return _validate_and_clean_json(ai_reply), usage_info
 
-    Args:
-        image_bytes: Raw bytes of the profile image
-        custom_instructions: Optional user-provided instructions
-        use_pro_model: Legacy selector when primary_model is not passed.
-        thinking_level: Thinking level for Gemini (low/medium/high)
-        use_gpt_only: If True, skip Gemini cascade and go straight to fallback_model
-        primary_model: Explicit first model to use (preferred for config-driven routing)
-        fallback_model: Explicit fallback model after primary_model
 
-    Returns:
-        Tuple of (JSON array string of openers, success boolean)
-        When return_meta=True, returns (reply, success, meta)
-    """
-    success = False
-    ai_reply = None
-    model_used = None
-    usage_info: Optional[Dict[str, Any]] = None
-    thinking_level = _normalize_thinking_level(thinking_level)
+def _opener_models(use_pro_model, use_gpt_only, primary_model, fallback_model) -> List[str]:
+    """Build the opener model cascade."""
     fallback_model = _normalize_model(fallback_model, GPT_MODEL)
-
-    # Build model cascade
     if use_gpt_only:
         models = [fallback_model]
     elif primary_model:
@@ -254,60 +250,65 @@ def generate_mobile_openers_from_image(
         models = [GEMINI_PRO, GEMINI_FLASH, fallback_model]
     else:
         models = [GEMINI_FLASH, fallback_model]
+    return _dedupe_models(models)
 
-    models = _dedupe_models(models)
-
-    # Try each model in sequence
-    for i, model in enumerate(models, 1):
-        try:
-            if _is_gemini_model(model):
-                ai_reply, usage_info = _call_gemini_openers(
-                    image_bytes,
-                    custom_instructions,
-                    model,
-                    thinking_level=thinking_level,
-                )
-            else:
-                ai_reply, usage_info = _call_openai_openers(
-                    image_bytes,
-                    custom_instructions,
-                    model=model,
-                )
-
-            # Success!
-            success = True
-            model_used = model
-            break
-
-        except Exception as e:
-            print(f"[FAILSAFE] action=openers attempt={i} model={model} status=failed error={type(e).__name__}: {str(e)}")
-            continue
 
+def _reply_models(use_gpt_only, primary_model, fallback_model) -> List[str]:
+    """Build the reply model cascade."""
+    fallback_model = _normalize_model(fallback_model, GPT_MODEL)
+    if use_gpt_only:
+        models = [fallback_model]
+    elif primary_model:
+        models = [primary_model, fallback_model]
+    else:
+        models = [GEMINI_FLASH, fallback_model]
+    return _dedupe_models(models)
+
+
+def _cascade_result(
+    action: str,
+    models: List[str],
+    thinking_level: str,
+    return_meta: bool,
+    ai_reply: Optional[str] = None,
+    model_used: Optional[str] = None,
+    usage_info: Optional[Dict[str, Any]] = None,
+    hedge: Optional[Dict[str, Any]] = None,
+):
+    """Log the cascade outcome and build the (reply, success[, meta]) result.
+
+    Called without ``model_used`` once every model has failed. ``hedge`` is the
+    hedging summary from the cascade driver (only when hedging is enabled).
+    """
+    success = model_used is not None
     usage_info = usage_info or _empty_usage()
 
     # Log final result
     if success:
-        thinking_for_log = thinking_level if _is_gemini_model(model_used or "") else "n/a"
+        thinking_used = thinking_level if _is_gemini_model(model_used) else "n/a"
         print(
-            f"[AI-ACTION] action=openers model_used={model_used} "
-            f"thinking={thinking_for_log} status=success"
+            f"[AI-ACTION] action={action} model_used={model_used} "
+            f"thinking={thinking_used} status=success"
         )
         print("[USAGE]", usage_info)
     else:
+        thinking_used = thinking_level
         print(
-            f"[AI-ACTION] action=openers model_used=none "
+            f"[AI-ACTION] action={action} model_used=none "
             f"thinking={thinking_level} status=all_failed attempts={len(models)}"
         )
         ai_reply = json.dumps([
-            {"message": "We hit a hiccup generating openers. Try again in a moment."}
+            {"message": f"We hit a hiccup generating {action}. Try again in a moment."}
         ])
 
     meta = {
         "model_used": model_used or "none",
-        "thinking_used": thinking_for_log if success else thinking_level,
+        "thinking_used": thinking_used,
         "usage": usage_info,
         "source_type": "ai",
     }
+    if hedge is not None:
+        meta["hedge"] = hedge
 
     print(ai_reply)
     if return_meta:
@@ -315,6 +316,100 @@ def generate_mobile_openers_from_image(
     return ai_reply, success
 
 
+def generate_mobile_openers_from_image(
+    image_bytes: bytes,
+    custom_instructions: str = "",
+    use_pro_model: bool = True,
+    thinking_level: Optional[str] = "high",
+    use_gpt_only: bool = False,
+    primary_model: Optional[str] = None,
+    fallback_model: str = GPT_MODEL,
+    return_meta: bool = False,
+    hedge_after_ms: int = 0,
+) -> Tuple[str, bool]:
+    """
+    Generate opener suggestions from profile image with cascading fallback.
+
+    Fallback chain:
+    - Explicit config: primary_model -> fallback_model
+    - use_gpt_only=True: fallback_model only
+    - Legacy paid path (use_pro_model=True): Gemini Pro -> Gemini Flash -> fallback_model
+    - Legacy free path (use_pro_model=False): Gemini Flash -> fallback_model
+
+    Args:
+        image_bytes: Raw bytes of the profile image (or a PreparedImage)
+        custom_instructions: Optional user-provided instructions
+        use_pro_model: Legacy selector when primary_model is not passed.
+        thinking_level: Thinking level for Gemini (low/medium/high)
+        use_gpt_only: If True, skip Gemini cascade and go straight to fallback_model
+        primary_model: Explicit first model to use (preferred for config-driven routing)
+        fallback_model: Explicit fallback model after primary_model
+        hedge_after_ms: Start the next model alongside a model that has not
+            answered within this many ms (0 = strictly sequential)
+
+    Returns:
+        Tuple of (JSON array string of openers, success boolean)
+        When return_meta=True, returns (reply, success, meta)
+    """
+    thinking_level = _normalize_thinking_level(thinking_level)
+    models = _opener_models(use_pro_model, use_gpt_only, primary_model, fallback_model)
+    # One PreparedImage for the whole cascade: hedged and fallback calls reuse its variant.
+    image = image_prep.prepare(image_bytes)
+
+    def call(model):
+        if _is_gemini_model(model):
+            return _call_gemini_openers(
+                image,
+                custom_instructions,
+                model,
+                thinking_level=thinking_level,
+            )
+        return _call_openai_openers(
+            image,
+            custom_instructions,
+            model=model,
+        )
+
+    ai_reply, model_used, usage_info, hedge = run_cascade("openers", models, call, hedge_after_ms)
+    return _cascade_result("openers", models, thinking_level, return_meta, ai_reply, model_used, usage_info, hedge)
+
+
+async def agenerate_mobile_openers_from_image(
+    image_bytes: bytes,
+    custom_instructions: str = "",
+    use_pro_model: bool = True,
+    thinking_level: Optional[str] = "high",
+    use_gpt_only: bool = False,
+    primary_model: Optional[str] = None,
+    fallback_model: str = GPT_MODEL,
+    return_meta: bool = False,
+    hedge_after_ms: int = 0,
+) -> Tuple[str, bool]:
+    """Async variant of generate_mobile_openers_from_image (same cascade and result)."""
+    thinking_level = _normalize_thinking_level(thinking_level)
+    models = _opener_models(use_pro_model, use_gpt_only, primary_model, fallback_model)
+    image = image_prep.prepare(image_bytes)
+    # Decode and re-encode off the event loop.
+    await asyncio.to_thread(image.variant, "opener")
+
+    async def call(model):
+        if _is_gemini_model(model):
+            return await _acall_gemini_openers(
+                image,
+                custom_instructions,
+                model,
+                thinking_level=thinking_level,
+            )
+        return await _acall_openai_openers(
+            image,
+            custom_instructions,
+            model=model,
+        )
+
+    ai_reply, model_used, usage_info, hedge = await arun_cascade("openers", models, call, hedge_after_ms)
+    return _cascade_result("openers", models, thinking_level, return_meta, ai_reply, model_used, usage_info, hedge)
+
+
 def _call_gemini_replies(last_text: str, custom_instructions: str, model: str = GEMINI_FLASH, thinking_level: str = "high") -> Tuple[str, Optional[Dict[str, Any]]]:
     """
     Call Gemini for reply generation.
@@ -340,6 +435,15 @@ def _call_gemini_replies(last_text: str, custom_instructions: str, model: str =
     return ai_reply, usage_info
 
 
+async def _acall_gemini_replies(last_text: str, custom_instructions: str, model: str = GEMINI_FLASH, thinking_level: str = "high") -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Async variant of _call_gemini_replies."""
+    system_prompt = get_mobile_reply_prompt(last_text, custom_instructions)
+    user_prompt = get_mobile_reply_user_prompt()
+
+    response, usage_info = await _agenerate_gemini_response(system_prompt, user_prompt, model=model, thinking_level=thinking_level)
+    return _validate_and_clean_json(response.text), usage_info
+
+
 def _call_openai_replies(
     last_text: str,
     custom_instructions: str,
@@ -367,6 +471,21 @@ def _call_openai_replies(
     return _validate_and_clean_json(ai_reply), usage_info
 
 
+async def _acall_openai_replies(
+    last_text: str,
+    custom_instructions: str,
+    model: str = GPT_MODEL,
+) -> Tuple[str, Dict[str, Any]]:
+    """Async variant of _call_openai_replies."""
+    ai_reply, usage_info = await agenerate_replies_openai(
+        last_text,
+        custom_instructions,
+        model=model,
+        return_usage=True,
+    )
+    return _validate_and_clean_json(ai_reply), usage_info
+
+
 def generate_mobile_response(
     last_text: str,
     situation: str,
@@ -378,6 +497,7 @@ def generate_mobile_response(
     primary_model: Optional[str] = None,
     fallback_model: str = GPT_MODEL,
     return_meta: bool = False,
+    hedge_after_ms: int = 0,
 ) -> Tuple[str, bool]:
     """
     Generate reply suggestions for mobile app with cascading fallback.
@@ -396,78 +516,57 @@ def generate_mobile_response(
         use_gpt_only: If True, skip Gemini cascade and go straight to fallback_model
         primary_model: Explicit first model to use (preferred for config-driven routing)
         fallback_model: Explicit fallback model after primary_model
+        hedge_after_ms: Start the next model alongside a model that has not
+            answered within this many ms (0 = strictly sequential)
 
     Returns:
         Tuple of (JSON array string of replies, success boolean)
         When return_meta=True, returns (reply, success, meta)
     """
-    success = False
-    ai_reply = None
-    model_used = None
-    usage_info: Optional[Dict[str, Any]] = None
     thinking_level = _normalize_thinking_level(thinking_level)
-    fallback_model = _normalize_model(fallback_model, GPT_MODEL)
-
-    if use_gpt_only:
-        models = [fallback_model]
-    elif primary_model:
-        models = [primary_model, fallback_model]
-    else:
-        models = [GEMINI_FLASH, fallback_model]
+    models = _reply_models(use_gpt_only, primary_model, fallback_model)
+
+    def call(model):
+        if _is_gemini_model(model):
+            return _call_gemini_replies(last_text, custom_instructions, model=model, thinking_level=thinking_level)
+        return _call_openai_replies(
+            last_text,
+            custom_instructions,
+            model=model,
+        )
 
-    models = _dedupe_models(models)
+    ai_reply, model_used, usage_info, hedge = run_cascade("replies", models, call, hedge_after_ms)
+    return _cascade_result("replies", models, thinking_level, return_meta, ai_reply, model_used, usage_info, hedge)
 
-    # Try each model in sequence
-    for i, model in enumerate(models, 1):
-        try:
-            if _is_gemini_model(model):
-                ai_reply, usage_info = _call_gemini_replies(last_text, custom_instructions, model=model, thinking_level=thinking_level)
-            else:
-                ai_reply, usage_info = _call_openai_replies(
-                    last_text,
-                    custom_instructions,
-                    model=model,
-                )
-
-            # Success!
-            success = True
-            model_used = model
-            break
-
-        except Exception as e:
-            print(f"[FAILSAFE] action=replies attempt={i} model={model} status=failed error={type(e).__name__}: {str(e)}")
-            continue
 
-    usage_info = usage_info or _empty_usage()
-
-    # Log final result
-    if success:
-        thinking_for_log = thinking_level if _is_gemini_model(model_used or "") else "n/a"
-        print(
-            f"[AI-ACTION] action=replies model_used={model_used} "
-            f"thinking={thinking_for_log} status=success"
-        )
-        print("[USAGE]", usage_info)
-    else:
-        print(
-            f"[AI-ACTION] action=replies model_used=none "
-            f"thinking={thinking_level} status=all_failed attempts={len(models)}"
+async def agenerate_mobile_response(
+    last_text: str,
+    situation: str,
+    her_info: str = "",
+    tone: str = "Natural",
+    custom_instructions: str = "",
+    thinking_level: Optional[str] = "high",
+    use_gpt_only: bool = False,
+    primary_model: Optional[str] = None,
+    fallback_model: str = GPT_MODEL,
+    return_meta: bool = False,
+    hedge_after_ms: int = 0,
+) -> Tuple[str, bool]:
+    """Async variant of generate_mobile_response (same cascade and result)."""
+    thinking_level = _normalize_thinking_level(thinking_level)
+    models = _reply_models(use_gpt_only, primary_model, fallback_model)
+
+    async def call(model):
+        if _is_gemini_model(model):
+            return await _acall_gemini_replies(last_text, custom_instructions, model=model, thinking_level=thinking_level)
+        return await _acall_openai_replies(
+            last_text,
+            custom_instructions,
+            model=model,
         )
-        ai_reply = json.dumps([
-            {"message": "We hit a hiccup generating replies. Try again in a moment."}
-        ])
 
-    meta = {
-        "model_used": model_used or "none",
-        "thinking_used": thinking_for_log if success else thinking_level,
-        "usage": usage_info,
-        "source_type": "ai",
-    }
-
-    print(ai_reply)
-    if return_meta:
-        return ai_reply, success, meta
-    return ai_reply, success
+    ai_reply, model_used, usage_info, hedge = await arun_cascade("replies", models, call, hedge_after_ms)
+    return _cascade_result("replies", models, thinking_level, return_meta, ai_reply, model_used, usage_info, hedge)
 
 
 def _generate_gemini_response(
@@ -488,7 +587,7 @@ def _generate_gemini_response(
     Returns:
         Tuple of (response object, usage info dict)
     """
-    response = client.models.generate_content(
+    response = gemini_generate(
         model=model,
         contents=[
             system_prompt,
@@ -501,6 +600,24 @@ def _generate_gemini_response(
     return response, usage_info
 
 
+async def _agenerate_gemini_response(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = GEMINI_PRO,
+    thinking_level: str = "high"
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Async variant of _generate_gemini_response."""
+    response = await agemini_generate(
+        model=model,
+        contents=[
+            system_prompt,
+            user_prompt,
+        ],
+        config=_make_text_config(thinking_level)
+    )
+    return response, _extract_usage(response)
+
+
 def _extract_usage(response) -> Dict[str, Any]:
     """
     Safely extract usage info from Gemini response.
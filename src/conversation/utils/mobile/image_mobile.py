@@ -4,19 +4,17 @@ Mirrors the structure of image_gpt.py but uses Google's Gemini models.
 Includes failsafe fallback to GPT-4.1-mini when Gemini fails.
 """
 
-import base64
-from io import BytesIO
-from google import genai
+import asyncio
 from google.genai import types
-from decouple import config
 import time
 from typing import Any, Dict
-from PIL import Image
 
-from .openai_mobile import extract_conversation_from_image_openai
+from asgiref.sync import sync_to_async
 
-# Initialize Gemini client
-client = genai.Client(api_key=config('GEMINI_API_KEY'))
+from conversation.utils import image_prep, response_cache
+from conversation.utils.llm_clients import agemini_generate, gemini_generate
+
+from .openai_mobile import aextract_conversation_from_image_openai, extract_conversation_from_image_openai
 
 GEMINI_FLASH = "gemini-3-flash-preview"
 GPT_MODEL = "gpt-4.1-mini-2025-04-14"
@@ -87,6 +85,79 @@ def _empty_usage() -> Dict[str, int]:
     }
 
 
+def _prepare_ocr_image(img_bytes: bytes) -> image_prep.PreparedImage:
+    """Prepare the upload and encode the resized OCR variant."""
+    image = image_prep.prepare(img_bytes)
+    resized = image.variant("ocr")
+
+    # Resize/compress large images to reduce latency and payload size
+    if len(resized.data) != len(image.data):
+        print(f"[DEBUG] Resized image bytes: {len(image.data)} -> {len(resized.data)}")
+
+    print(f"[DEBUG] Using MIME type: {resized.mime}")
+    print(f"[DEBUG] File size: {len(resized.data)} bytes")
+    return image
+
+
+def _ocr_success(output, model_used, thinking_level, usage_info, return_meta, note="", cache_info=None):
+    """Validate one attempt's output and build the result; raises if unusable."""
+    # Failsafe: require labeled lines with a timestamp bracket
+    if not any(tag in output.lower() for tag in ("you [", "her [", "system [")):
+        raise ValueError("OCR output missing labeled lines")
+
+    print(f"[AI-ACTION] action=ocr model_used={model_used} status=success{note}")
+    if usage_info and model_used == GEMINI_FLASH:
+        print("[USAGE]", usage_info)
+    if return_meta:
+        meta = {
+            "model_used": model_used,
+            "thinking_used": thinking_level if model_used == GEMINI_FLASH else "n/a",
+            "usage": usage_info or _empty_usage(),
+            "source_type": "ai",
+        }
+        if cache_info is not None:
+            meta["cache"] = cache_info
+        return output, True, meta
+    return output
+
+
+def _ocr_cache_key(img_bytes, thinking_level, prompt):
+    # The whole fallback chain shares one key; the entry records which model answered.
+    return response_cache.image_key("ocr", img_bytes, GEMINI_FLASH, thinking_level, prompt)
+
+
+def _ocr_cached(entry, thinking_level, return_meta, cache_info):
+    """Result for a cache hit: the stored transcription at zero token cost."""
+    model_used = entry.get("model_used") or GEMINI_FLASH
+    print(f"[AI-ACTION] action=ocr model_used={model_used} status=cache_hit saved_tokens={cache_info['saved_tokens']}")
+    if return_meta:
+        return entry["text"], True, {
+            "model_used": model_used,
+            "thinking_used": thinking_level if model_used == GEMINI_FLASH else "n/a",
+            "usage": _empty_usage(),
+            "source_type": "ai",
+            "cache": cache_info,
+        }
+    return entry["text"]
+
+
+def _ocr_failure(thinking_level, return_meta):
+    # All models failed
+    print(f"[AI-ACTION] action=ocr model_used=none status=all_failed attempts=3")
+    failed_text = (
+        "Failed to extract the conversation with timestamps. Please try uploading the screenshot again. "
+        "If it keeps happening, try a clearer, uncropped screenshot."
+    )
+    if return_meta:
+        return failed_text, False, {
+            "model_used": "none",
+            "thinking_used": thinking_level,
+            "usage": _empty_usage(),
+            "source_type": "ai",
+        }
+    return failed_text
+
+
 def extract_conversation_from_image_mobile(
     screenshot_file,
     thinking_level: str = "low",
@@ -108,79 +179,46 @@ def extract_conversation_from_image_mobile(
         Extracted conversation text with labels and timestamps
     """
     img_bytes = screenshot_file.read()
-    original_bytes = len(img_bytes)
     thinking_level = _normalize_thinking_level(thinking_level)
+    prompt = _get_conversation_prompt()
 
-    # Resize/compress large images to reduce latency and payload size
-    resized_bytes = _resize_image_bytes(img_bytes)
-    if len(resized_bytes) != original_bytes:
-        print(f"[DEBUG] Resized image bytes: {original_bytes} -> {len(resized_bytes)}")
-
-    mime = _detect_mime(img_bytes)
-    print(f"[DEBUG] Using MIME type: {mime}")
-    print(f"[DEBUG] File size: {len(resized_bytes)} bytes")
+    # Same upload seen recently: replay the accepted transcription
+    cache_key = _ocr_cache_key(img_bytes, thinking_level, prompt)
+    cached = response_cache.lookup(cache_key, "ocr")
+    cache_info = response_cache.cache_info("ocr", cached)
+    if cached is not None:
+        return _ocr_cached(cached, thinking_level, return_meta, cache_info)
 
-    prompt = _get_conversation_prompt()
-    model_used = None
+    image = _prepare_ocr_image(img_bytes)
+    resized, original = image.variant("ocr"), image.original
 
     # Attempt 1: Gemini Flash with resized image
     try:
-        start_time = time.time()
         output, usage_info = _run_ocr_call(
             prompt,
-            resized_bytes,
-            mime,
-            start_time,
+            resized.data,
+            resized.mime,
+            time.time(),
             thinking_level=thinking_level,
         )
-
-        # Failsafe: require labeled lines with a timestamp bracket
-        if not any(tag in output.lower() for tag in ("you [", "her [", "system [")):
-            raise ValueError("OCR output missing labeled lines")
-
-        model_used = GEMINI_FLASH
-        print(f"[AI-ACTION] action=ocr model_used={model_used} status=success")
-        if usage_info:
-            print("[USAGE]", usage_info)
-        if return_meta:
-            return output, True, {
-                "model_used": model_used,
-                "thinking_used": thinking_level,
-                "usage": usage_info or _empty_usage(),
-                "source_type": "ai",
-            }
-        return output
-
+        result = _ocr_success(output, GEMINI_FLASH, thinking_level, usage_info, return_meta, cache_info=cache_info)
+        response_cache.store(cache_key, output, usage_info, GEMINI_FLASH)
+        return result
     except Exception as e:
         print(f"[FAILSAFE] action=ocr attempt=1 model={GEMINI_FLASH} status=failed error={type(e).__name__}: {str(e)}")
 
     # Attempt 2: Gemini Flash with original image
     try:
-        start_time = time.time()
         output, usage_info = _run_ocr_call(
             prompt,
-            img_bytes,
-            mime,
-            start_time,
+            original.data,
+            original.mime,
+            time.time(),
             thinking_level=thinking_level,
         )
-
-        if not any(tag in output.lower() for tag in ("you [", "her [", "system [")):
-            raise ValueError("OCR output missing labeled lines")
-
-        model_used = GEMINI_FLASH
-        print(f"[AI-ACTION] action=ocr model_used={model_used} status=success (original_image)")
-        if usage_info:
-            print("[USAGE]", usage_info)
-        if return_meta:
-            return output, True, {
-                "model_used": model_used,
-                "thinking_used": thinking_level,
-                "usage": usage_info or _empty_usage(),
-                "source_type": "ai",
-            }
-        return output
-
+        result = _ocr_success(output, GEMINI_FLASH, thinking_level, usage_info, return_meta, " (original_image)", cache_info)
+        response_cache.store(cache_key, output, usage_info, GEMINI_FLASH)
+        return result
     except Exception as e:
         print(f"[FAILSAFE] action=ocr attempt=2 model={GEMINI_FLASH} status=failed error={type(e).__name__}: {str(e)}")
 
@@ -188,42 +226,73 @@ def extract_conversation_from_image_mobile(
     try:
         print(f"[FAILSAFE] action=ocr attempt=3 model={GPT_MODEL} status=attempting")
         output, usage_info = extract_conversation_from_image_openai(
-            img_bytes,
-            mime,
+            original.data,
+            original.mime,
             return_usage=True,
         )
+        result = _ocr_success(output, GPT_MODEL, thinking_level, usage_info, return_meta, cache_info=cache_info)
+        response_cache.store(cache_key, output, usage_info, GPT_MODEL)
+        return result
+    except Exception as e:
+        print(f"[FAILSAFE] action=ocr attempt=3 model={GPT_MODEL} status=failed error={type(e).__name__}: {str(e)}")
 
-        if not any(tag in output.lower() for tag in ("you [", "her [", "system [")):
-            raise ValueError("OCR output missing labeled lines")
+    return _ocr_failure(thinking_level, return_meta)
 
-        model_used = GPT_MODEL
-        print(f"[AI-ACTION] action=ocr model_used={model_used} status=success")
-        if return_meta:
-            return output, True, {
-                "model_used": model_used,
-                "thinking_used": "n/a",
-                "usage": usage_info or _empty_usage(),
-                "source_type": "ai",
-            }
-        return output
 
+async def aextract_conversation_from_image_mobile(
+    screenshot_file,
+    thinking_level: str = "low",
+    return_meta: bool = False,
+):
+    """Async variant of extract_conversation_from_image_mobile (same fallback chain).
+
+    The upload read and Pillow resize run in a worker thread so the event loop
+    only waits on the provider calls.
+    """
+    img_bytes = await asyncio.to_thread(screenshot_file.read)
+    thinking_level = _normalize_thinking_level(thinking_level)
+    prompt = _get_conversation_prompt()
+
+    # Cache I/O may hit the database backend, so it runs on the sync thread.
+    cache_key = _ocr_cache_key(img_bytes, thinking_level, prompt)
+    cached = await sync_to_async(response_cache.lookup)(cache_key, "ocr")
+    cache_info = await sync_to_async(response_cache.cache_info)("ocr", cached)
+    if cached is not None:
+        return _ocr_cached(cached, thinking_level, return_meta, cache_info)
+    store = sync_to_async(response_cache.store)
+
+    image = await asyncio.to_thread(_prepare_ocr_image, img_bytes)
+    resized, original = image.variant("ocr"), image.original
+
+    for attempt, payload, note in ((1, resized, ""), (2, original, " (original_image)")):
+        try:
+            output, usage_info = await _arun_ocr_call(
+                prompt,
+                payload.data,
+                payload.mime,
+                time.time(),
+                thinking_level=thinking_level,
+            )
+            result = _ocr_success(output, GEMINI_FLASH, thinking_level, usage_info, return_meta, note, cache_info)
+            await store(cache_key, output, usage_info, GEMINI_FLASH)
+            return result
+        except Exception as e:
+            print(f"[FAILSAFE] action=ocr attempt={attempt} model={GEMINI_FLASH} status=failed error={type(e).__name__}: {str(e)}")
+
+    try:
+        print(f"[FAILSAFE] action=ocr attempt=3 model={GPT_MODEL} status=attempting")
+        output, usage_info = await aextract_conversation_from_image_openai(
+            original.data,
+            original.mime,
+            return_usage=True,
+        )
+        result = _ocr_success(output, GPT_MODEL, thinking_level, usage_info, return_meta, cache_info=cache_info)
+        await store(cache_key, output, usage_info, GPT_MODEL)
+        return result
     except Exception as e:
         print(f"[FAILSAFE] action=ocr attempt=3 model={GPT_MODEL} status=failed error={type(e).__name__}: {str(e)}")
 
-    # All models failed
-    print(f"[AI-ACTION] action=ocr model_used=none status=all_failed attempts=3")
-    failed_text = (
-        "Failed to extract the conversation with timestamps. Please try uploading the screenshot again. "
-        "If it keeps happening, try a clearer, uncropped screenshot."
-    )
-    if return_meta:
-        return failed_text, False, {
-            "model_used": "none",
-            "thinking_used": thinking_level,
-            "usage": _empty_usage(),
-            "source_type": "ai",
-        }
-    return failed_text
+    return _ocr_failure(thinking_level, return_meta)
 
 
 def _run_ocr_call(prompt, img_bytes, mime, start_time, thinking_level: str = "low"):
@@ -231,7 +300,7 @@ def _run_ocr_call(prompt, img_bytes, mime, start_time, thinking_level: str = "lo
     image_part = types.Part.from_bytes(data=img_bytes, mime_type=mime)
     thinking_level = _normalize_thinking_level(thinking_level)
 
-    response = client.models.generate_content(
+    response = gemini_generate(
         model=GEMINI_FLASH,
         contents=[prompt, image_part],
         config=types.GenerateContentConfig(
@@ -248,42 +317,26 @@ def _run_ocr_call(prompt, img_bytes, mime, start_time, thinking_level: str = "lo
     return output, usage_info
 
 
-def _resize_image_bytes(img_bytes, max_long_edge=1280, quality=85):
-    """Resize image if too large."""
-    try:
-        with Image.open(BytesIO(img_bytes)) as img:
-            width, height = img.size
-            long_edge = max(width, height)
-
-            # Keep small JPEGs as-is to avoid unnecessary recompression
-            if long_edge <= max_long_edge and (img.format or '').upper() in ('JPEG', 'JPG'):
-                return img_bytes
-
-            if long_edge > max_long_edge:
-                scale = max_long_edge / float(long_edge)
-                new_size = (int(width * scale), int(height * scale))
-                img = img.resize(new_size, Image.LANCZOS)
-
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            out = BytesIO()
-            img.save(out, format='JPEG', quality=quality, optimize=True)
-            return out.getvalue()
-    except Exception as exc:
-        print(f"[WARN] Image resize failed: {exc}")
-        return img_bytes
-
-
-def _detect_mime(img_bytes):
-    """Detect image MIME type from bytes."""
-    if img_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-        return 'image/png'
-    if img_bytes.startswith(b'RIFF') and len(img_bytes) > 11 and img_bytes[8:12] == b'WEBP':
-        return 'image/webp'
-    if img_bytes.startswith(b'\xff\xd8\xff'):
-        return 'image/jpeg'
-    return 'image/jpeg'
+async def _arun_ocr_call(prompt, img_bytes, mime, start_time, thinking_level: str = "low"):
+    """Async variant of _run_ocr_call."""
+    image_part = types.Part.from_bytes(data=img_bytes, mime_type=mime)
+    thinking_level = _normalize_thinking_level(thinking_level)
+
+    response = await agemini_generate(
+        model=GEMINI_FLASH,
+        contents=[prompt, image_part],
+        config=types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(thinking_level=thinking_level)
+        )
+    )
+
+    usage_info = _extract_usage(response)
+
+    output = response.text.strip()
+    elapsed = time.time() - start_time
+    print(f"[DEBUG] Gemini OCR response time: {elapsed:.2f} seconds")
+
+    return output, usage_info
 
 
 def _get_conversation_prompt():
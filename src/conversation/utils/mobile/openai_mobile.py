@@ -3,11 +3,11 @@ Mobile-specific OpenAI wrapper for AI generation fallback.
 Used when Gemini models fail - provides GPT-4.1-mini as backup.
 """
 
-from openai import OpenAI
-from decouple import config
-import json
 import base64
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, List, Tuple, Union
+
+from conversation.utils import image_prep
+from conversation.utils.llm_clients import aopenai_chat, openai_chat
 
 from .prompts_mobile import (
     get_mobile_opener_prompt,
@@ -16,9 +16,6 @@ from .prompts_mobile import (
     get_mobile_reply_user_prompt,
 )
 
-# Initialize OpenAI client
-client = OpenAI(api_key=config('GPT_API_KEY'))
-
 # Model constant
 GPT_MODEL = "gpt-4.1-mini-2025-04-14"
 
@@ -53,6 +50,100 @@ def _build_usage_info(response: Any) -> Dict[str, int]:
     }
 
 
+def _opener_messages(image_bytes: bytes, custom_instructions: str) -> List[Dict[str, Any]]:
+    # Downsized, encoded data URL (memoized when image_bytes is a PreparedImage)
+    data_url = image_prep.prepare(image_bytes).data_url("opener")
+
+    system_prompt = get_mobile_opener_prompt(custom_instructions)
+
+    # Add formatting rules
+    system_prompt += "\nNo em dashes. No dashes. Do not put single quotes around words unless necessary."
+
+    if custom_instructions and custom_instructions.strip():
+        system_prompt += f"""
+
+User's custom instructions (MUST FOLLOW):
+{custom_instructions.strip()}"""
+
+    user_prompt = get_mobile_opener_user_prompt()
+
+    return [
+        {"role": "system", "content": system_prompt.strip()},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": user_prompt},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": data_url,
+                        "detail": "high"
+                    }
+                }
+            ]
+        }
+    ]
+
+
+def _reply_messages(last_text: str, custom_instructions: str) -> List[Dict[str, Any]]:
+    system_prompt = get_mobile_reply_prompt(last_text, custom_instructions)
+
+    # Add formatting rules
+    system_prompt += "\nNo em dashes. No dashes. Do not put single quotes around words unless necessary."
+
+    user_prompt = get_mobile_reply_user_prompt()
+
+    return [
+        {"role": "system", "content": system_prompt.strip()},
+        {"role": "user", "content": user_prompt.strip()}
+    ]
+
+
+_OCR_SYSTEM_PROMPT = """Extract the full conversation from the screenshot and output line-by-line text with sender labels and timestamps.
+
+Rules:
+- Transcribe ALL visible messages exactly as written.
+- For EACH message, include a timestamp in square brackets if visible.
+- Keep sender identification as 'you:' and 'her:'. If ambiguous, infer from bubble color/orientation.
+- If no time is visible, leave timestamp empty but keep brackets.
+
+Format (one message per line):
+you [<timestamp>]: <message text>
+her [<timestamp>]: <message text>
+system [<timestamp>]: <system message>
+
+Output ONLY the transcribed lines, no commentary."""
+
+
+def _ocr_messages(img_bytes: bytes, mime: str) -> List[Dict[str, Any]]:
+    # Encode image to base64
+    base64_image = base64.b64encode(img_bytes).decode('utf-8')
+
+    return [
+        {"role": "system", "content": _OCR_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Extract the conversation from this screenshot."},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime};base64,{base64_image}",
+                        "detail": "high"
+                    }
+                }
+            ]
+        }
+    ]
+
+
+def _chat_result(response: Any, return_usage: bool) -> Union[str, Tuple[str, Dict[str, int]]]:
+    output = response.choices[0].message.content.strip()
+    if return_usage:
+        return output, _build_usage_info(response)
+    return output
+
+
 def generate_openers_from_image_openai(
     image_bytes: bytes,
     custom_instructions: str = "",
@@ -74,51 +165,29 @@ def generate_openers_from_image_openai(
     Raises:
         Exception: If API call fails (caller should handle)
     """
-    # Encode image to base64
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-
-    system_prompt = get_mobile_opener_prompt(custom_instructions)
-
-    # Add formatting rules
-    system_prompt += "\nNo em dashes. No dashes. Do not put single quotes around words unless necessary."
-
-    if custom_instructions and custom_instructions.strip():
-        system_prompt += f"""
-
-User's custom instructions (MUST FOLLOW):
-{custom_instructions.strip()}"""
-
-    user_prompt = get_mobile_opener_user_prompt()
-
-    response = client.chat.completions.create(
+    response = openai_chat(
         model=model,
-        messages=[
-            {"role": "system", "content": system_prompt.strip()},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": user_prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}",
-                            "detail": "high"
-                        }
-                    }
-                ]
-            }
-        ],
+        messages=_opener_messages(image_bytes, custom_instructions),
         temperature=1.0,
         max_tokens=500
     )
+    return _chat_result(response, return_usage)
 
-    ai_reply = response.choices[0].message.content.strip()
-
-    usage_info = _build_usage_info(response)
 
-    if return_usage:
-        return ai_reply, usage_info
-    return ai_reply
+async def agenerate_openers_from_image_openai(
+    image_bytes: bytes,
+    custom_instructions: str = "",
+    model: str = GPT_MODEL,
+    return_usage: bool = False,
+) -> Union[str, Tuple[str, Dict[str, int]]]:
+    """Async variant of generate_openers_from_image_openai."""
+    response = await aopenai_chat(
+        model=model,
+        messages=_opener_messages(image_bytes, custom_instructions),
+        temperature=1.0,
+        max_tokens=500
+    )
+    return _chat_result(response, return_usage)
 
 
 def generate_replies_openai(
@@ -142,30 +211,29 @@ def generate_replies_openai(
     Raises:
         Exception: If API call fails (caller should handle)
     """
-    system_prompt = get_mobile_reply_prompt(last_text, custom_instructions)
-
-    # Add formatting rules
-    system_prompt += "\nNo em dashes. No dashes. Do not put single quotes around words unless necessary."
-
-    user_prompt = get_mobile_reply_user_prompt()
-
-    response = client.chat.completions.create(
+    response = openai_chat(
         model=model,
-        messages=[
-            {"role": "system", "content": system_prompt.strip()},
-            {"role": "user", "content": user_prompt.strip()}
-        ],
+        messages=_reply_messages(last_text, custom_instructions),
         temperature=1.0,
         max_tokens=500
     )
+    return _chat_result(response, return_usage)
 
-    ai_reply = response.choices[0].message.content.strip()
-
-    usage_info = _build_usage_info(response)
 
-    if return_usage:
-        return ai_reply, usage_info
-    return ai_reply
+async def agenerate_replies_openai(
+    last_text: str,
+    custom_instructions: str = "",
+    model: str = GPT_MODEL,
+    return_usage: bool = False,
+) -> Union[str, Tuple[str, Dict[str, int]]]:
+    """Async variant of generate_replies_openai."""
+    response = await aopenai_chat(
+        model=model,
+        messages=_reply_messages(last_text, custom_instructions),
+        temperature=1.0,
+        max_tokens=500
+    )
+    return _chat_result(response, return_usage)
 
 
 def extract_conversation_from_image_openai(
@@ -189,49 +257,26 @@ def extract_conversation_from_image_openai(
     Raises:
         Exception: If API call fails (caller should handle)
     """
-    # Encode image to base64
-    base64_image = base64.b64encode(img_bytes).decode('utf-8')
-
-    system_prompt = """Extract the full conversation from the screenshot and output line-by-line text with sender labels and timestamps.
-
-Rules:
-- Transcribe ALL visible messages exactly as written.
-- For EACH message, include a timestamp in square brackets if visible.
-- Keep sender identification as 'you:' and 'her:'. If ambiguous, infer from bubble color/orientation.
-- If no time is visible, leave timestamp empty but keep brackets.
-
-Format (one message per line):
-you [<timestamp>]: <message text>
-her [<timestamp>]: <message text>
-system [<timestamp>]: <system message>
-
-Output ONLY the transcribed lines, no commentary."""
-
-    response = client.chat.completions.create(
+    response = openai_chat(
         model=model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "Extract the conversation from this screenshot."},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime};base64,{base64_image}",
-                            "detail": "high"
-                        }
-                    }
-                ]
-            }
-        ],
+        messages=_ocr_messages(img_bytes, mime),
         temperature=0.3,  # Lower temperature for OCR accuracy
         max_tokens=2000   # Higher limit for longer conversations
     )
+    return _chat_result(response, return_usage)
 
-    output = response.choices[0].message.content.strip()
-    usage_info = _build_usage_info(response)
 
-    if return_usage:
-        return output, usage_info
-    return output
+async def aextract_conversation_from_image_openai(
+    img_bytes: bytes,
+    mime: str = "image/jpeg",
+    model: str = GPT_MODEL,
+    return_usage: bool = False,
+) -> Union[str, Tuple[str, Dict[str, int]]]:
+    """Async variant of extract_conversation_from_image_openai."""
+    response = await aopenai_chat(
+        model=model,
+        messages=_ocr_messages(img_bytes, mime),
+        temperature=0.3,
+        max_tokens=2000
+    )
+    return _chat_result(response, return_usage)
@@ -1,20 +1,18 @@
-import base64
-from openai import OpenAI
-from decouple import config
+from .llm_clients import openai_chat, openai_chat_stream
 import time
 from .custom_gpt import extract_usage
+from . import image_prep, response_cache
 
-client = OpenAI(api_key=config('GPT_API_KEY'))
+PROFILE_MODEL = "gpt-4.1-mini-2025-04-14"
 
 def analyze_profile_image(image_file):
     """Analyze a dating profile screenshot or photo to extract information"""
-    img_bytes = image_file.read()
+    image = image_prep.prepare(image_file.read())
+    payload = image.variant("profile")
 
-    mime = _detect_mime(img_bytes)
+    print(f"[DEBUG] Analyzing profile image - MIME: {payload.mime}, Size: {len(image.data)} -> {len(payload.data)} bytes")
 
-    print(f"[DEBUG] Analyzing profile image - MIME: {mime}, Size: {len(img_bytes)} bytes")
-
-    data_url = _build_data_url(img_bytes, mime)
+    data_url = payload.data_url
 
     prompt = """You are an image profiling assistant. Extract as much grounded, observable information as possible from the SINGLE provided dating profile photo, and output it as clean, human-readable TEXT (not JSON).
 
@@ -79,7 +77,7 @@ Return ONLY this formatted text report.
     start_time = time.time()
 
     try:
-        resp = client.chat.completions.create(
+        resp = openai_chat(
             model="gpt-4.1-mini-2025-04-14",
             messages=[{
                 "role": "user",
@@ -108,13 +106,29 @@ Return ONLY this formatted text report.
         return f"Failed to analyze image: {str(e)}"
 
 
-def stream_profile_analysis_bytes(img_bytes):
-    mime = _detect_mime(img_bytes)
-    data_url = _build_data_url(img_bytes, mime)
+def stream_profile_analysis_bytes(img_bytes, cache_info=None):
+    """Stream profile analysis deltas, replaying a cached analysis of the same image."""
+    image = image_prep.prepare(img_bytes)
     prompt = _get_profile_prompt()
+    usage = {}
+
+    def produce():
+        return _stream_profile_call(prompt, image.data_url("profile"), usage)
+
+    yield from response_cache.cached_stream(
+        response_cache.image_key("profile", image.data, PROFILE_MODEL, "n/a", prompt),
+        "profile",
+        produce,
+        model=PROFILE_MODEL,
+        accept=lambda text: len(text) >= 20,
+        usage=usage,
+        info=cache_info,
+    )
 
-    stream = client.chat.completions.create(
-        model="gpt-4.1-mini-2025-04-14",
+
+def _stream_profile_call(prompt, data_url, usage):
+    stream = openai_chat_stream(
+        model=PROFILE_MODEL,
         messages=[{
             "role": "user",
             "content": [
@@ -123,27 +137,14 @@ def stream_profile_analysis_bytes(img_bytes):
             ]
         }],
         max_tokens=800,
-        stream=True
+        stream_options={"include_usage": True},
     )
 
     for chunk in stream:
         if chunk.choices and chunk.choices[0].delta.content:
             yield chunk.choices[0].delta.content
-
-
-def _detect_mime(img_bytes):
-    if img_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-        return 'image/png'
-    if img_bytes.startswith(b'RIFF') and len(img_bytes) > 11 and img_bytes[8:12] == b'WEBP':
-        return 'image/webp'
-    if img_bytes.startswith(b'\xff\xd8\xff'):
-        return 'image/jpeg'
-    return 'image/jpeg'
-
-
-def _build_data_url(img_bytes, mime):
-    b64 = base64.b64encode(img_bytes).decode("utf-8")
-    return f"data:{mime};base64,{b64}"
+        if getattr(chunk, "usage", None):
+            usage.update(extract_usage(chunk))
 
 
 def _get_profile_prompt():
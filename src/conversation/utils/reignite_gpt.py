@@ -1,9 +1,6 @@
-from openai import OpenAI
-from decouple import config
+from .llm_clients import openai_chat
 import json
 
-client = OpenAI(api_key=config('GPT_API_KEY'))
-
 def generate_reignite_comeback(last_text, platform, what_happened):
     system_prompt = f"""You are a witty texting wingman helping revive stalled dating conversations.
 
@@ -50,7 +47,7 @@ Rules:
     return ai_reply, success
 
 def generate_gpt_response(system_prompt, user_prompt, model="gpt-4.1-mini-2025-04-14"):
-    response = client.chat.completions.create(
+    response = openai_chat(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt.strip()},
@@ -0,0 +1,143 @@
+"""
+Content-addressed cache for image model results.
+
+Users often re-submit the same screenshot: retries after a network error, or
+the resized/original double pass of the streaming OCR endpoint. Results are
+keyed by the SHA-256 of the uploaded bytes plus the model, thinking level and
+prompt, and kept in the ``llm_responses`` cache alias. TTL and eviction for
+that alias are configured in settings. Callers store only results they would
+accept, so a rejected transcription is never replayed.
+
+A byte hash rather than a perceptual hash: two screenshots of the same chat
+app differ mostly in their text, which is exactly what a perceptual hash
+throws away.
+
+Every lookup bumps shared hit/lookup counters per kind. ``cache_info`` turns
+one lookup into the ``{"hit", "saved_tokens", "hit_ratio"}`` dict that views
+record under ``MobileGenerationEvent.metadata["cache"]``.
+"""
+
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = "llm_responses"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def enabled() -> bool:
+    return getattr(settings, "LLM_RESPONSE_CACHE_ENABLED", True)
+
+
+def image_key(kind: str, img_bytes: bytes, model: str, thinking_level: str, prompt: str) -> str:
+    image_digest = hashlib.sha256(img_bytes).hexdigest()
+    prompt_digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"{kind}:{model}:{thinking_level}:{prompt_digest}:{image_digest}"
+
+
+def _count(kind: str, hit: bool) -> None:
+    cache = _cache()
+    for name in ("lookups", "hits") if hit else ("lookups",):
+        stat_key = f"stats:{kind}:{name}"
+        cache.add(stat_key, 0, timeout=None)
+        try:
+            cache.incr(stat_key)
+        except ValueError:
+            # Evicted between add and incr; the next lookup re-creates it.
+            pass
+
+
+def lookup(key: str, kind: str) -> Optional[Dict[str, Any]]:
+    """Cached ``{"text", "usage", "model_used"}`` for ``key``, or None."""
+    if not enabled():
+        return None
+    try:
+        entry = _cache().get(key)
+        _count(kind, entry is not None)
+    except Exception as exc:
+        logger.warning("Response cache lookup failed kind=%s: %s", kind, exc)
+        return None
+    return entry
+
+
+def store(key: str, text: str, usage: Optional[Dict[str, Any]], model_used: str) -> None:
+    if not enabled():
+        return
+    try:
+        _cache().set(key, {"text": text, "usage": dict(usage or {}), "model_used": model_used})
+    except Exception as exc:
+        logger.warning("Response cache store failed: %s", exc)
+
+
+def stats(kind: str) -> Dict[str, Any]:
+    try:
+        counts = _cache().get_many([f"stats:{kind}:lookups", f"stats:{kind}:hits"])
+    except Exception:
+        counts = {}
+    lookups = int(counts.get(f"stats:{kind}:lookups") or 0)
+    hits = int(counts.get(f"stats:{kind}:hits") or 0)
+    return {
+        "lookups": lookups,
+        "hits": hits,
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def cache_info(kind: str, entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Outcome of one lookup, for event metadata."""
+    saved = 0
+    if entry is not None:
+        try:
+            saved = int((entry.get("usage") or {}).get("total_tokens") or 0)
+        except (TypeError, ValueError):
+            saved = 0
+    return {
+        "hit": entry is not None,
+        "saved_tokens": saved,
+        "hit_ratio": stats(kind)["hit_ratio"],
+    }
+
+
+def replay(text: str) -> Iterator[str]:
+    """Re-chunk a cached result line by line for SSE endpoints."""
+    for line in text.splitlines(keepends=True):
+        yield line
+
+
+def cached_stream(
+    key: str,
+    kind: str,
+    produce: Callable[[], Iterable[str]],
+    *,
+    model: str,
+    accept: Callable[[str], bool],
+    usage: Optional[Dict[str, Any]] = None,
+    info: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """Yield deltas from ``produce()``, or replay the cached result for ``key``.
+
+    ``usage`` is filled in by ``produce`` with the call's token usage and is
+    stored with the text; ``info`` (if given) receives ``cache_info``.
+    """
+    entry = lookup(key, kind)
+    if info is not None:
+        info.update(cache_info(kind, entry))
+    if entry is not None:
+        yield from replay(entry["text"])
+        return
+
+    parts = []
+    for delta in produce():
+        parts.append(delta)
+        yield delta
+    text = "".join(parts).strip()
+    if accept(text):
+        store(key, text, usage, model)
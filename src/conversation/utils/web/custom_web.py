@@ -4,13 +4,12 @@ Uses web prompt builders with provider order from WebAppConfig.
 """
 
 import json
-from functools import lru_cache
 from typing import Any, Dict, Tuple, Union
 
-from decouple import config
-from google import genai
 from google.genai import types
 
+from conversation.config_snapshot import get_web_config
+from conversation.utils.llm_clients import gemini_generate
 from conversation.models import WebAppConfig
 
 from .prompts_web import (
@@ -26,11 +25,6 @@ VALID_THINKING_LEVELS = {"minimal", "low", "medium", "high"}
 WEB_DEFAULT_THINKING = "minimal"
 
 
-@lru_cache(maxsize=1)
-def _get_client():
-    return genai.Client(api_key=config("GEMINI_API_KEY"))
-
-
 def _normalize_thinking_level(thinking_level: str, default: str = WEB_DEFAULT_THINKING) -> str:
     level = (thinking_level or "").strip().lower()
     if level in VALID_THINKING_LEVELS:
@@ -39,8 +33,7 @@ def _normalize_thinking_level(thinking_level: str, default: str = WEB_DEFAULT_TH
 
 
 def _get_provider_order():
-    config = WebAppConfig.load()
-    return config.provider_order()
+    return get_web_config().provider_order()
 
 
 def _empty_usage() -> Dict[str, int]:
@@ -226,7 +219,7 @@ def generate_web_response(
                         custom_instructions=custom_instructions,
                     )
 
-                response = _get_client().models.generate_content(
+                response = gemini_generate(
                     model=GEMINI_FLASH,
                     contents=[
                         system_prompt,
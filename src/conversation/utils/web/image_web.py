@@ -3,15 +3,13 @@ Web-specific OCR extraction with provider order from WebAppConfig.
 """
 
 import time
-from functools import lru_cache
-from io import BytesIO
 from typing import Any, Dict, Tuple, Union
 
-from decouple import config
-from google import genai
 from google.genai import types
-from PIL import Image
 
+from conversation.config_snapshot import get_web_config
+from conversation.utils import image_prep
+from conversation.utils.llm_clients import gemini_generate
 from conversation.models import WebAppConfig
 
 from .openai_web import GPT_MODEL, extract_conversation_from_image_openai_web
@@ -21,11 +19,6 @@ VALID_THINKING_LEVELS = {"minimal", "low", "medium", "high"}
 WEB_DEFAULT_THINKING = "minimal"
 
 
-@lru_cache(maxsize=1)
-def _get_client():
-    return genai.Client(api_key=config("GEMINI_API_KEY"))
-
-
 def _normalize_thinking_level(thinking_level: str, default: str = WEB_DEFAULT_THINKING) -> str:
     level = (thinking_level or "").strip().lower()
     if level in VALID_THINKING_LEVELS:
@@ -34,8 +27,7 @@ def _normalize_thinking_level(thinking_level: str, default: str = WEB_DEFAULT_TH
 
 
 def _get_provider_order():
-    config = WebAppConfig.load()
-    return config.provider_order()
+    return get_web_config().provider_order()
 
 
 def _empty_usage() -> Dict[str, int]:
@@ -119,18 +111,17 @@ def extract_conversation_from_image_web(
             }
         return failed_text
 
-    original_bytes = len(img_bytes)
     thinking_level = _normalize_thinking_level(thinking_level)
-    resized_bytes = _resize_image_bytes(img_bytes)
-    if len(resized_bytes) != original_bytes:
-        print(f"[DEBUG] Resized image bytes: {original_bytes} -> {len(resized_bytes)}")
+    image = image_prep.prepare(img_bytes)
+    resized = image.variant("ocr")
+    if len(resized.data) != len(img_bytes):
+        print(f"[DEBUG] Resized image bytes: {len(img_bytes)} -> {len(resized.data)}")
 
-    mime = _detect_mime(img_bytes)
     prompt = _get_conversation_prompt()
 
     gemini_attempts = [
-        ("resized", resized_bytes),
-        ("original", img_bytes),
+        ("resized", resized),
+        ("original", image.original),
     ]
 
     provider_order = _get_provider_order()
@@ -141,8 +132,8 @@ def extract_conversation_from_image_web(
                 try:
                     output, usage_info = _run_ocr_call(
                         prompt=prompt,
-                        img_bytes=payload,
-                        mime=mime,
+                        img_bytes=payload.data,
+                        mime=payload.mime,
                         start_time=time.time(),
                         thinking_level=thinking_level,
                     )
@@ -172,8 +163,8 @@ def extract_conversation_from_image_web(
             try:
                 print(f"[FAILSAFE] action=web_ocr model={GPT_MODEL} status=attempting")
                 output, usage_info = extract_conversation_from_image_openai_web(
-                    img_bytes=img_bytes,
-                    mime=mime,
+                    img_bytes=image.original.data,
+                    mime=image.original.mime,
                     model=GPT_MODEL,
                     return_usage=True,
                 )
@@ -224,7 +215,7 @@ def _run_ocr_call(
     image_part = types.Part.from_bytes(data=img_bytes, mime_type=mime)
     thinking_level = _normalize_thinking_level(thinking_level)
 
-    response = _get_client().models.generate_content(
+    response = gemini_generate(
         model=GEMINI_FLASH,
         contents=[prompt, image_part],
         config=types.GenerateContentConfig(
@@ -240,41 +231,6 @@ def _run_ocr_call(
     return output, usage_info
 
 
-def _resize_image_bytes(img_bytes, max_long_edge=1280, quality=85):
-    try:
-        with Image.open(BytesIO(img_bytes)) as img:
-            width, height = img.size
-            long_edge = max(width, height)
-
-            if long_edge <= max_long_edge and (img.format or "").upper() in ("JPEG", "JPG"):
-                return img_bytes
-
-            if long_edge > max_long_edge:
-                scale = max_long_edge / float(long_edge)
-                new_size = (int(width * scale), int(height * scale))
-                img = img.resize(new_size, Image.LANCZOS)
-
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-
-            out = BytesIO()
-            img.save(out, format="JPEG", quality=quality, optimize=True)
-            return out.getvalue()
-    except Exception as exc:
-        print(f"[WARN] Image resize failed: {exc}")
-        return img_bytes
-
-
-def _detect_mime(img_bytes):
-    if img_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
-        return "image/png"
-    if img_bytes.startswith(b"RIFF") and len(img_bytes) > 11 and img_bytes[8:12] == b"WEBP":
-        return "image/webp"
-    if img_bytes.startswith(b"\xff\xd8\xff"):
-        return "image/jpeg"
-    return "image/jpeg"
-
-
 def _get_conversation_prompt():
     return """Extract the full conversation from the screenshot and output line-by-line text with sender labels and timestamps.
 
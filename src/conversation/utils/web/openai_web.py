@@ -4,11 +4,9 @@ Used when Gemini Flash fails for web replies or OCR.
 """
 
 import base64
-from functools import lru_cache
 from typing import Any, Dict, Tuple, Union
 
-from decouple import config
-from openai import OpenAI
+from conversation.utils.llm_clients import openai_chat
 
 from .prompts_web import (
     get_web_opener_prompt,
@@ -20,11 +18,6 @@ from .prompts_web import (
 GPT_MODEL = "gpt-4.1-mini-2025-04-14"
 
 
-@lru_cache(maxsize=1)
-def _get_client():
-    return OpenAI(api_key=config("GPT_API_KEY"))
-
-
 def _build_usage_info(response: Any) -> Dict[str, int]:
     usage = getattr(response, "usage", None)
 
@@ -117,7 +110,7 @@ def generate_replies_openai_web(
         custom_instructions=custom_instructions,
     )
 
-    response = _get_client().chat.completions.create(
+    response = openai_chat(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt.strip()},
@@ -160,7 +153,7 @@ system [<timestamp>]: <system message>
 
 Output ONLY the transcribed lines, no commentary."""
 
-    response = _get_client().chat.completions.create(
+    response = openai_chat(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
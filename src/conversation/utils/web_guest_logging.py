@@ -2,6 +2,7 @@ import hashlib
 import logging
 
 from conversation.models import GuestWebConversationAttempt
+from reignitehome import event_writer
 
 
 logger = logging.getLogger(__name__)
@@ -45,7 +46,7 @@ def log_guest_web_attempt(
 
     try:
         session_key_hash = _hash_session_key(_ensure_session_key(request))
-        GuestWebConversationAttempt.objects.create(
+        event_writer.record(GuestWebConversationAttempt(
             session_key_hash=session_key_hash,
             endpoint=endpoint,
             status=status,
@@ -53,7 +54,7 @@ def log_guest_web_attempt(
             input_payload=_normalize_payload(input_payload),
             output_payload=_normalize_payload(output_payload),
             error_message=(error_message or "").strip(),
-        )
+        ))
     except Exception:
         logger.exception(
             "Failed to persist guest web attempt endpoint=%s status=%s",
@@ -2,7 +2,8 @@ from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
-from .models import Conversation, ChatCredit, CopyEvent, GuestWebConversationAttempt, WebAppConfig
+from .config_snapshot import get_web_config
+from .models import Conversation, ChatCredit, CopyEvent, GuestWebConversationAttempt
 
 from conversation.utils.web.image_web import extract_conversation_from_image_web
 from conversation.utils.web.custom_web import generate_web_response
@@ -69,7 +70,7 @@ def _json_error(msg, status=400, redirect_url=None):
 
 
 def _get_web_config():
-    return WebAppConfig.load()
+    return get_web_config()
 
 
 def _read_reply_input(request):
@@ -16,6 +16,7 @@ from mobileapi.models import (
     MobileCopyEvent,
     MobileGenerationEvent,
     MobileInstallAttributionEvent,
+    PushNotification,
 )
 
 
@@ -122,6 +123,7 @@ class MobileAppConfigAdmin(admin.ModelAdmin):
         )}),
         ("Community", {"fields": ("community_default_sort",)}),
         ("Fallback & Legacy", {"fields": ("fallback_model", "subscriber_weekly_limit")}),
+        ("Hedged Fallback", {"fields": ("reply_hedge_after_ms", "opener_hedge_after_ms")}),
         ("Blur Settings", {"fields": ("blur_preview_word_count",)}),
     )
     inlines = [DegradationTierInline]
@@ -325,6 +327,29 @@ class MobileSignupSubscriptionFilter(admin.SimpleListFilter):
         return queryset
 
 
+@admin.register(PushNotification)
+class PushNotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "kind",
+        "recipient",
+        "post_id",
+        "event_count",
+        "status",
+        "attempts",
+        "latency_ms",
+        "sent_at",
+    )
+    list_filter = ("kind", "status", "created_at")
+    date_hierarchy = "created_at"
+    search_fields = ("recipient__username", "recipient__email", "post__title")
+    list_select_related = ("recipient",)
+    readonly_fields = tuple(field.name for field in PushNotification._meta.fields)
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(MobileSignupUser)
 class MobileSignupUserAdmin(admin.ModelAdmin):
     list_display = ("username", "email", "subscription_status", "last_active", "date_joined")
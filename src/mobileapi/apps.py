@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MobileapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mobileapi'
+
+    def ready(self):
+        from .community_cache import connect_signals
+
+        connect_signals()
@@ -0,0 +1,130 @@
+"""
+Per-user lookups that every community request repeats, cached in the default cache.
+
+Block sets: ``block_sets(user_id)`` returns ``(blocked, blocked_by)``, the users
+this user blocked and the users who blocked them, from one ``UserBlock`` query.
+The feed, detail and comment lists filter by ``blocked``. The comment push
+checks both directions. Any ``UserBlock`` save or delete (``toggle_block_user``,
+the admin) drops the entries of both users involved.
+
+Pro status: ``pro_user_ids(user_ids)`` caches one flag per author. A pro entry
+never outlives its ``subscription_expiry``, so lapsing needs no invalidation.
+``google_play_purchase``, ``verify_subscription`` and the expired-subscription
+downgrade call ``invalidate_pro_status`` when they change subscription state.
+"""
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from community.models import UserBlock
+from conversation.models import ChatCredit
+
+_BLOCKS_KEY = "community:blocks:{}"
+_PRO_KEY = "community:pro:{}"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "COMMUNITY_USER_CACHE_SECONDS", 0) or 0)
+
+
+def _delete(keys):
+    # Now, so the rest of this request reads fresh rows, and again after commit,
+    # in case a concurrent request re-cached the old state in between.
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def block_sets(user_id):
+    """``(blocked, blocked_by)`` frozensets of user IDs for ``user_id``."""
+    key = _BLOCKS_KEY.format(user_id)
+    cached = cache.get(key) if _ttl() else None
+    if cached is not None:
+        return cached
+    blocked, blocked_by = set(), set()
+    for blocker_id, blocked_user_id in UserBlock.objects.filter(
+        Q(blocker_id=user_id) | Q(blocked_user_id=user_id)
+    ).values_list("blocker_id", "blocked_user_id"):
+        if blocker_id == user_id:
+            blocked.add(blocked_user_id)
+        else:
+            blocked_by.add(blocker_id)
+    result = (frozenset(blocked), frozenset(blocked_by))
+    if _ttl():
+        cache.set(key, result, _ttl())
+    return result
+
+
+def blocked_user_ids(user_id):
+    return block_sets(user_id)[0]
+
+
+def is_blocked_between(user_id, other_id):
+    blocked, blocked_by = block_sets(user_id)
+    return other_id in blocked or other_id in blocked_by
+
+
+def invalidate_blocks(*user_ids):
+    _delete([_BLOCKS_KEY.format(user_id) for user_id in user_ids if user_id])
+
+
+def pro_user_ids(user_ids, now=None):
+    """The subset of ``user_ids`` with an active subscription."""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return set()
+    if now is None:
+        now = datetime.now(tz=timezone.utc)
+    ttl = _ttl()
+    keys = {_PRO_KEY.format(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(list(keys)) if ttl else {}
+
+    pro_ids = set()
+    for key, expires_at in cached.items():
+        # 0 = not pro; otherwise the timestamp the cached pro flag is good until.
+        if expires_at and expires_at > now.timestamp():
+            pro_ids.add(keys[key])
+    missing = {user_id for key, user_id in keys.items() if key not in cached}
+    if not missing:
+        return pro_ids
+
+    expiry_by_user = {
+        row["user_id"]: row["subscription_expiry"]
+        for row in ChatCredit.objects.filter(user_id__in=missing, is_subscribed=True).values(
+            "user_id", "subscription_expiry"
+        )
+    }
+    not_pro = {}
+    for user_id in missing:
+        if user_id in expiry_by_user:
+            expiry = expiry_by_user[user_id]
+            if expiry is None or expiry >= now:
+                pro_ids.add(user_id)
+                if ttl:
+                    expires_at = now.timestamp() + ttl if expiry is None else expiry.timestamp()
+                    timeout = max(1, min(ttl, int(expires_at - now.timestamp())))
+                    cache.set(_PRO_KEY.format(user_id), expires_at, timeout)
+                continue
+        not_pro[_PRO_KEY.format(user_id)] = 0
+    if not_pro and ttl:
+        cache.set_many(not_pro, ttl)
+    return pro_ids
+
+
+def invalidate_pro_status(*user_ids):
+    _delete([_PRO_KEY.format(user_id) for user_id in user_ids if user_id])
+
+
+def _user_block_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_blocks(instance.blocker_id, instance.blocked_user_id)
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    post_save.connect(_user_block_changed, sender=UserBlock, dispatch_uid="mobileapi_community_cache_block_save")
+    post_delete.connect(_user_block_changed, sender=UserBlock, dispatch_uid="mobileapi_community_cache_block_delete")
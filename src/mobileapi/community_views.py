@@ -5,18 +5,20 @@ Public (no auth): GET posts list, GET post detail.
 Auth required: create post, vote, comment, like, delete own content.
 """
 
+import hashlib
 import logging
 from datetime import datetime, timezone
 
 import cloudinary.uploader
 from django.conf import settings
 from django.db import IntegrityError, transaction
-from django.db.models import Count, ExpressionWrapper, IntegerField, Q
 from django_ratelimit.decorators import ratelimit
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from community import counters, feed_cache
+from community import search as community_search
 from community.models import (
     CommentLike,
     ContentReport,
@@ -27,8 +29,10 @@ from community.models import (
     PostVote,
     UserBlock,
 )
-from conversation.models import ChatCredit, MobileAppConfig
-from .push_notifications import send_post_comment_notification
+from conversation.config_snapshot import get_mobile_config
+from . import community_cache
+from .pagination import InvalidCursor, encode_cursor, keyset_page, snapshot_page
+from .push_notifications import enqueue_post_comment_notification
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +40,8 @@ PAGE_SIZE = 20
 COMMENT_PAGE_SIZE = 20
 # New post = published within this many hours
 NEW_HOURS = 6
-# Trending = published within 24 h and score >= threshold
+# Trending = stored hot score at least that of a post published 24 h ago with
+# the threshold score, and the post itself has at least that score.
 TRENDING_HOURS = 24
 TRENDING_SCORE_THRESHOLD = 5
 VALID_SORTS = ('new', 'hot', 'top')
@@ -67,21 +72,28 @@ def _parse_page(raw_value, default=1):
         return default
 
 
+def _parse_count(raw_value, default=0):
+    try:
+        return max(0, int(raw_value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _paginate(ordered_qs, ordering, page_size, tag, cursor, page):
+    """Return ``(rows, next_cursor)`` by cursor, or by ``page`` when no cursor was sent."""
+    if cursor is not None:
+        return keyset_page(ordered_qs, ordering, page_size, tag, cursor=cursor)
+    start = (page - 1) * page_size
+    rows = list(ordered_qs[start: start + page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    # Offset clients can switch to cursors from any page.
+    return rows, encode_cursor(rows[-1], ordering, tag)
+
+
 def _build_pro_user_ids(user_ids, now=None):
-    if not user_ids:
-        return set()
-    if now is None:
-        now = datetime.now(tz=timezone.utc)
-    credits = ChatCredit.objects.filter(
-        user_id__in=user_ids,
-        is_subscribed=True,
-    ).values('user_id', 'subscription_expiry')
-    pro_ids = set()
-    for credit in credits:
-        expiry = credit['subscription_expiry']
-        if expiry is None or expiry >= now:
-            pro_ids.add(credit['user_id'])
-    return pro_ids
+    return community_cache.pro_user_ids(user_ids, now=now)
 
 
 def _author_payload(user, pro_user_ids=None):
@@ -98,6 +110,14 @@ def _author_payload(user, pro_user_ids=None):
     }
 
 
+def _post_author_payload(post, pro_user_ids=None):
+    author = _author_payload(post.author, pro_user_ids=pro_user_ids)
+    custom_author_name = (getattr(post, 'author_display_name', '') or '').strip()
+    if custom_author_name:
+        author['username'] = custom_author_name
+    return author
+
+
 def _post_published_at(post):
     return getattr(post, 'published_at', post.created_at)
 
@@ -108,21 +128,14 @@ def _build_poll_payload_map(posts, request_user=None):
         return {}
 
     polls = list(
-        PostPoll.objects.filter(post_id__in=post_ids).values('id', 'post_id')
+        PostPoll.objects.filter(post_id__in=post_ids).values(
+            'id', 'post_id', 'send_it_count', 'dont_send_it_count'
+        )
     )
     if not polls:
         return {}
 
     poll_ids = [poll['id'] for poll in polls]
-    counts_by_poll = {
-        row['poll_id']: row
-        for row in PollVote.objects.filter(poll_id__in=poll_ids)
-        .values('poll_id')
-        .annotate(
-            send_it_count=Count('id', filter=Q(choice='send_it')),
-            dont_send_it_count=Count('id', filter=Q(choice='dont_send_it')),
-        )
-    }
 
     user_vote_by_poll = {}
     if request_user and request_user.is_authenticated:
@@ -135,12 +148,10 @@ def _build_poll_payload_map(posts, request_user=None):
 
     payload_by_post_id = {}
     for poll in polls:
-        poll_id = poll['id']
-        counts = counts_by_poll.get(poll_id) or {}
         payload_by_post_id[poll['post_id']] = {
-            'send_it_count': counts.get('send_it_count', 0),
-            'dont_send_it_count': counts.get('dont_send_it_count', 0),
-            'user_vote': user_vote_by_poll.get(poll_id),
+            'send_it_count': poll['send_it_count'],
+            'dont_send_it_count': poll['dont_send_it_count'],
+            'user_vote': user_vote_by_poll.get(poll['id']),
         }
     return payload_by_post_id
 
@@ -153,17 +164,11 @@ def _post_payload(
     pro_user_ids=None,
     poll_payload=None,
 ):
-    """Serialise a CommunityPost.
-
-    `post` must have been annotated with `upvotes`, `downvotes`,
-    and `comment_count` by the calling queryset.
-    """
+    """Serialise a CommunityPost (counters come from its stored columns)."""
     if now is None:
         now = datetime.now(tz=timezone.utc)
 
-    upvotes = getattr(post, 'upvotes', 0) or 0
-    downvotes = getattr(post, 'downvotes', 0) or 0
-    vote_score = upvotes - downvotes
+    vote_score = post.vote_score
     body_text = post.body or ''
     published_at = _post_published_at(post)
     hours_old = max(0, (now - published_at).total_seconds() / 3600)
@@ -178,10 +183,7 @@ def _post_payload(
     if is_anon and not is_own_post:
         author = {'id': None, 'username': 'Anonymous', 'is_pro': False}
     else:
-        author = _author_payload(post.author, pro_user_ids=pro_user_ids)
-        custom_author_name = (getattr(post, 'author_display_name', '') or '').strip()
-        if custom_author_name:
-            author['username'] = custom_author_name
+        author = _post_author_payload(post, pro_user_ids=pro_user_ids)
 
     return {
         'id': post.id,
@@ -192,7 +194,7 @@ def _post_payload(
         'category': post.category,
         'author': author,
         'vote_score': vote_score,
-        'comment_count': getattr(post, 'comment_count', 0) or 0,
+        'comment_count': post.comment_count,
         'image_url': post.image_url or None,
         'is_featured': post.is_featured,
         'is_pinned': post.is_pinned,
@@ -210,7 +212,6 @@ def _post_payload(
 
 
 def _comment_payload(comment, user_liked=False, pro_user_ids=None):
-    like_count = getattr(comment, 'like_count', 0) or 0
     author = _author_payload(comment.author, pro_user_ids=pro_user_ids)
     custom_author_name = (getattr(comment, 'author_display_name', '') or '').strip()
     if custom_author_name:
@@ -219,44 +220,48 @@ def _comment_payload(comment, user_liked=False, pro_user_ids=None):
         'id': comment.id,
         'author': author,
         'body': comment.body,
-        'like_count': like_count,
+        'like_count': comment.like_count,
         'user_liked': user_liked,
         'created_at': comment.created_at.isoformat(),
     }
 
 
-def _annotated_posts_qs(base_qs):
-    upvotes_expr = Count('votes', filter=Q(votes__vote_type='up'), distinct=True)
-    downvotes_expr = Count('votes', filter=Q(votes__vote_type='down'), distinct=True)
-    return base_qs.select_related('author').annotate(
-        upvotes=upvotes_expr,
-        downvotes=downvotes_expr,
-        vote_score=ExpressionWrapper(
-            upvotes_expr - downvotes_expr,
-            output_field=IntegerField(),
-        ),
-        comment_count=Count(
-            'comments',
-            filter=Q(comments__is_deleted=False),
-            distinct=True,
-        ),
-    )
+def _posts_qs(base_qs):
+    # Vote and comment counters are stored columns (community.counters), so
+    # the feed needs no join against votes or comments.
+    return base_qs.select_related('author')
+
+
+# Pinned posts always appear first, regardless of sort mode. Featured posts
+# float to the top within the non-pinned bucket. Each ordering is also a cursor
+# key (mobileapi.pagination) and has a matching index on CommunityPost.
+FEED_ORDERINGS = {
+    'new': ('-is_pinned', '-is_featured', '-published_at', '-id'),
+    'top': ('-is_pinned', '-is_featured', '-vote_score', '-published_at', '-id'),
+    # hot: stored time-decayed score (community.ranking), then recency.
+    'hot': ('-is_pinned', '-is_featured', '-hot_score', '-published_at', '-id'),
+}
+# hot_score changes on every vote and decay run, so hot cursors page through
+# a frozen list of the first HOT_SNAPSHOT_PAGES pages (mobileapi.pagination).
+HOT_SNAPSHOT_PAGES = 25
+HOT_SNAPSHOT_SECONDS = 15 * 60
+COMMENT_ORDERING = ('created_at', 'id')
+# Optional "top comments" slice on post detail, by stored like count.
+TOP_COMMENT_ORDERING = ('-like_count', 'created_at', 'id')
+TOP_COMMENTS_MAX = 10
+
+
+# Search results: relevance (community.search), newest id breaking ties.
+SEARCH_ORDERING = ('-search_rank', '-id')
 
 
 def _ordered_posts_qs(qs, sort):
-    # Pinned posts always appear first, regardless of sort mode.
-    # Featured posts float to the top within the non-pinned bucket.
-    if sort == 'new':
-        return qs.order_by('-is_pinned', '-is_featured', '-published_at', '-vote_score', '-id')
-    if sort == 'top':
-        return qs.order_by('-is_pinned', '-is_featured', '-vote_score', '-published_at', '-id')
-    # hot (default): recency first, then score.
-    return qs.order_by('-is_pinned', '-is_featured', '-published_at', '-vote_score', '-id')
+    return qs.order_by(*FEED_ORDERINGS.get(sort, FEED_ORDERINGS['hot']))
 
 
 def _default_feed_sort():
     try:
-        configured = (MobileAppConfig.load().community_default_sort or '').strip().lower()
+        configured = (get_mobile_config().community_default_sort or '').strip().lower()
     except Exception as exc:
         logger.warning('Falling back to community default sort "new": %s', exc)
         return 'new'
@@ -289,9 +294,7 @@ def _visible_post_qs(request, post_id):
 def _comments_qs_for_request(post_id, request_user):
     comments_qs = CommunityComment.objects.filter(post_id=post_id, is_deleted=False)
     if request_user.is_authenticated:
-        blocked_ids = set(
-            UserBlock.objects.filter(blocker=request_user).values_list('blocked_user_id', flat=True)
-        )
+        blocked_ids = community_cache.blocked_user_ids(request_user.pk)
         if blocked_ids:
             comments_qs = comments_qs.exclude(author_id__in=blocked_ids)
     return comments_qs
@@ -315,57 +318,146 @@ def community_post_list(request):
 def _list_posts(request):
     category = request.GET.get('category', '').strip()
     sort = _resolve_feed_sort(request.GET.get('sort'))
-    page = _parse_page(request.GET.get('page', 1))
+    cursor = request.GET.get('cursor')
+    page = None if cursor is not None else _parse_page(request.GET.get('page', 1))
+
+    # The guest rendering of a page is shared through community.feed_cache.
+    # Staff see scheduled posts, and users who block someone get pages
+    # without those authors (filtered in SQL, so pages stay full); both are
+    # built per request.
+    user = request.user
+    blocked_ids = community_cache.blocked_user_ids(user.pk) if user.is_authenticated else ()
+    shared = not (user.is_authenticated and user.is_staff) and not blocked_ids
+    cache_parts = {'category': category, 'sort': sort, 'page': page, 'cursor': cursor}
+    feed_page = feed_cache.get_page(cache_parts) if shared else None
+    if feed_page is None:
+        try:
+            feed_page = _build_feed_page(request, category, sort, cursor, page, blocked_ids)
+        except InvalidCursor:
+            return Response({'error': 'Invalid cursor.'}, status=400)
+        if shared:
+            feed_cache.set_page(cache_parts, feed_page)
+
+    return Response({
+        'posts': _overlay_feed_page(feed_page['entries'], user),
+        'page': page,
+        'sort': sort,
+        'has_more': feed_page['next_cursor'] is not None,
+        'next_cursor': feed_page['next_cursor'],
+    })
 
+
+def _build_feed_page(request, category, sort, cursor, page, blocked_ids=()):
+    """Serialise one feed page as a guest sees it, plus what the per-user overlay needs."""
     now = datetime.now(tz=timezone.utc)
     qs = _visible_posts_qs(request)
     if category:
         qs = qs.filter(category=category)
-    # Exclude posts from blocked users
-    if request.user.is_authenticated:
-        blocked_ids = set(
-            UserBlock.objects.filter(blocker=request.user).values_list('blocked_user_id', flat=True)
+    if blocked_ids:
+        qs = qs.exclude(author_id__in=blocked_ids)
+    ordered_qs = _ordered_posts_qs(_posts_qs(qs), sort)
+
+    # Pagination using page-size+1 to avoid COUNT(*). Clients that send
+    # `cursor` (empty for the first page) get keyset pages; `page` is the
+    # OFFSET mode older app versions use.
+    if sort == 'hot' and cursor is not None:
+        page_posts, next_cursor = snapshot_page(
+            ordered_qs, FEED_ORDERINGS[sort], PAGE_SIZE, f'posts:{sort}', cursor,
+            limit=HOT_SNAPSHOT_PAGES * PAGE_SIZE, ttl=HOT_SNAPSHOT_SECONDS,
         )
-        if blocked_ids:
-            qs = qs.exclude(author_id__in=blocked_ids)
-
-    qs = _annotated_posts_qs(qs)
-    ordered_qs = _ordered_posts_qs(qs, sort)
+    else:
+        page_posts, next_cursor = _paginate(
+            ordered_qs, FEED_ORDERINGS[sort], PAGE_SIZE, f'posts:{sort}', cursor, page
+        )
+    return {'entries': _feed_entries(page_posts, now), 'next_cursor': next_cursor}
 
-    # Pagination using page-size+1 to avoid COUNT(*)
-    start = (page - 1) * PAGE_SIZE
-    page_posts = list(ordered_qs[start: start + PAGE_SIZE + 1])
-    has_more = len(page_posts) > PAGE_SIZE
-    page_posts = page_posts[:PAGE_SIZE]
 
+def _feed_entries(page_posts, now):
     author_ids = {p.author_id for p in page_posts if p.author_id}
     pro_user_ids = _build_pro_user_ids(author_ids, now=now)
-    poll_payload_by_post = _build_poll_payload_map(page_posts, request_user=request.user)
-
-    # Resolve user votes in one query
-    user_votes = {}
-    if request.user.is_authenticated and page_posts:
-        ids = [p.id for p in page_posts]
-        user_votes = {
-            v.post_id: v.vote_type
-            for v in PostVote.objects.filter(user=request.user, post_id__in=ids)
+    poll_payload_by_post = _build_poll_payload_map(page_posts)
+
+    entries = []
+    for post in page_posts:
+        entry = {
+            'author_id': post.author_id,
+            'post': _post_payload(
+                post,
+                None,
+                now,
+                pro_user_ids=pro_user_ids,
+                poll_payload=poll_payload_by_post.get(post.id),
+            ),
         }
+        if post.is_anonymous and post.author_id:
+            # Shown instead of "Anonymous" when the author reads their own post.
+            entry['own_author'] = _post_author_payload(post, pro_user_ids=pro_user_ids)
+        entries.append(entry)
+    return entries
+
+
+def _overlay_feed_page(entries, user):
+    """Apply the requester's blocks, votes and own anonymous posts to a guest page."""
+    if not user.is_authenticated:
+        return [entry['post'] for entry in entries]
+
+    blocked_ids = community_cache.blocked_user_ids(user.pk)
+    entries = [entry for entry in entries if entry['author_id'] not in blocked_ids]
+    post_ids = [entry['post']['id'] for entry in entries]
+    if not post_ids:
+        return []
+
+    # Resolve user votes in one query each
+    user_votes = dict(
+        PostVote.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', 'vote_type')
+    )
+    poll_post_ids = [entry['post']['id'] for entry in entries if entry['post']['poll'] is not None]
+    poll_votes = dict(
+        PollVote.objects.filter(user=user, poll__post_id__in=poll_post_ids).values_list('poll__post_id', 'choice')
+    ) if poll_post_ids else {}
+
+    posts = []
+    for entry in entries:
+        payload = dict(entry['post'])
+        payload['user_vote'] = user_votes.get(payload['id'])
+        if payload['poll'] is not None:
+            payload['poll'] = {**payload['poll'], 'user_vote': poll_votes.get(payload['id'])}
+        if entry['author_id'] == user.pk and 'own_author' in entry:
+            payload['author'] = entry['own_author']
+        posts.append(payload)
+    return posts
 
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def community_post_search(request):
+    """Visible posts matching ``q`` in their title, body or comments, most relevant first."""
+    terms = community_search.query_terms(request.GET.get('q'))
+    if not terms:
+        return Response({'error': 'q must contain at least one word.'}, status=400)
+    category = request.GET.get('category', '').strip()
+    cursor = request.GET.get('cursor')
+
+    user = request.user
+    blocked_ids = community_cache.blocked_user_ids(user.pk) if user.is_authenticated else ()
+    qs = _visible_posts_qs(request)
+    if category:
+        qs = qs.filter(category=category)
+    ranked_qs = community_search.search_posts(_posts_qs(qs), terms, blocked_ids)
+    tag = 'search:' + hashlib.sha256(' '.join([category, *terms]).encode('utf-8')).hexdigest()[:16]
+    try:
+        page_posts, next_cursor = keyset_page(
+            ranked_qs.order_by(*SEARCH_ORDERING), SEARCH_ORDERING, PAGE_SIZE, tag, cursor=cursor
+        )
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor.'}, status=400)
+
+    now = datetime.now(tz=timezone.utc)
     return Response({
-        'posts': [
-            _post_payload(
-                p,
-                user_votes.get(p.id),
-                now,
-                request_user=request.user,
-                pro_user_ids=pro_user_ids,
-                poll_payload=poll_payload_by_post.get(p.id),
-            )
-            for p in page_posts
-        ],
-        'page': page,
-        'sort': sort,
-        'has_more': has_more,
+        'posts': _overlay_feed_page(_feed_entries(page_posts, now), user),
+        'query': ' '.join(terms),
+        'has_more': next_cursor is not None,
+        'next_cursor': next_cursor,
     })
 
 
@@ -447,18 +539,17 @@ def _create_post(request):
     if has_poll:
         PostPoll.objects.create(post=post)
 
-    # Return annotated post
-    annotated = _annotated_posts_qs(CommunityPost.objects.filter(pk=post.pk)).first()
+    # A new post has no votes or comments yet; its zeroed counters are already loaded.
     now = datetime.now(tz=timezone.utc)
-    pro_user_ids = _build_pro_user_ids([annotated.author_id], now=now)
-    poll_payload_by_post = _build_poll_payload_map([annotated], request_user=request.user)
+    pro_user_ids = _build_pro_user_ids([post.author_id], now=now)
+    poll_payload_by_post = _build_poll_payload_map([post], request_user=request.user)
     return Response(
         _post_payload(
-            annotated,
+            post,
             request_user=request.user,
             now=now,
             pro_user_ids=pro_user_ids,
-            poll_payload=poll_payload_by_post.get(annotated.id),
+            poll_payload=poll_payload_by_post.get(post.id),
         ),
         status=201,
     )
@@ -472,7 +563,7 @@ def community_post_detail(request, post_id):
     else:
         qs = CommunityPost.objects.filter(pk=post_id, is_deleted=False)
 
-    post = _annotated_posts_qs(qs).select_related('author').first()
+    post = _posts_qs(qs).first()
 
     if post is None:
         return Response({'error': 'Post not found.'}, status=404)
@@ -484,6 +575,7 @@ def community_post_detail(request, post_id):
             return Response({'error': 'You can only delete your own posts.'}, status=403)
         post.is_deleted = True
         CommunityPost.objects.filter(pk=post_id).update(is_deleted=True)
+        feed_cache.invalidate()
         return Response({'status': 'deleted'})
 
     # GET — post detail + comments
@@ -497,26 +589,35 @@ def community_post_detail(request, post_id):
 
     include_comments_raw = request.GET.get('include_comments')
     include_comments = True if include_comments_raw is None else _parse_bool(include_comments_raw)
+    top_count = min(_parse_count(request.GET.get('top_comments')), TOP_COMMENTS_MAX)
 
+    # Only the first comment page (and the optional top slice) is embedded, so
+    # the payload does not grow with the thread; clients follow
+    # comments_next_cursor into the comments endpoint for the rest.
     comments = []
+    top_comments = []
+    comments_next_cursor = None
     liked_ids = set()
     if include_comments:
-        comments = list(
-            _comments_qs_for_request(post_id, request.user)
-            .select_related('author')
-            .annotate(like_count=Count('likes'))
-            .order_by('created_at', 'id')
+        comments_qs = _comments_qs_for_request(post_id, request.user).select_related('author')
+        comments, comments_next_cursor = keyset_page(
+            comments_qs.order_by(*COMMENT_ORDERING), COMMENT_ORDERING, COMMENT_PAGE_SIZE, 'comments'
         )
-        if request.user.is_authenticated and comments:
+        if top_count:
+            top_comments = list(
+                comments_qs.filter(like_count__gt=0).order_by(*TOP_COMMENT_ORDERING)[:top_count]
+            )
+        embedded_ids = {c.id for c in comments} | {c.id for c in top_comments}
+        if request.user.is_authenticated and embedded_ids:
             liked_ids = set(
                 CommentLike.objects.filter(
-                    user=request.user, comment_id__in=[c.id for c in comments]
+                    user=request.user, comment_id__in=embedded_ids
                 ).values_list('comment_id', flat=True)
             )
 
     now = datetime.now(tz=timezone.utc)
     author_ids = {post.author_id}
-    author_ids.update(c.author_id for c in comments if c.author_id)
+    author_ids.update(c.author_id for c in comments + top_comments if c.author_id)
     pro_user_ids = _build_pro_user_ids(author_ids, now=now)
     poll_payload_by_post = _build_poll_payload_map([post], request_user=request.user)
 
@@ -532,7 +633,14 @@ def community_post_detail(request, post_id):
     payload['comments'] = [
         _comment_payload(c, user_liked=(c.id in liked_ids), pro_user_ids=pro_user_ids)
         for c in comments
-    ] if include_comments else []
+    ]
+    payload['comments_has_more'] = comments_next_cursor is not None
+    payload['comments_next_cursor'] = comments_next_cursor
+    if top_count:
+        payload['top_comments'] = [
+            _comment_payload(c, user_liked=(c.id in liked_ids), pro_user_ids=pro_user_ids)
+            for c in top_comments
+        ]
     return Response(payload)
 
 
@@ -549,34 +657,48 @@ def community_post_vote(request, post_id):
     except CommunityPost.DoesNotExist:
         return Response({'error': 'Post not found.'}, status=404)
 
-    existing = PostVote.objects.filter(user=request.user, post=post).first()
+    # The vote row and the post's counters change in one transaction. Inserts
+    # and deletes adjust the counters from signal receivers (community.counters).
+    with transaction.atomic():
+        existing = (
+            PostVote.objects.select_for_update()
+            .filter(user=request.user, post=post)
+            .first()
+        )
+
+        if existing is None:
+            try:
+                with transaction.atomic():
+                    PostVote.objects.create(user=request.user, post=post, vote_type=vote_type)
+                user_vote = vote_type
+            except IntegrityError:
+                # Rare race: another request created the vote between read and create.
+                existing = (
+                    PostVote.objects.select_for_update()
+                    .filter(user=request.user, post=post)
+                    .first()
+                )
 
-    if existing is None:
-        try:
-            PostVote.objects.create(user=request.user, post=post, vote_type=vote_type)
-            user_vote = vote_type
-        except IntegrityError:
-            # Rare race: another request created the vote between read and create.
-            existing = PostVote.objects.filter(user=request.user, post=post).first()
-
-    if existing is not None:
-        if existing.vote_type == vote_type:
-            # Same vote -> toggle off
-            existing.delete()
-            user_vote = None
-        else:
-            # Switch vote direction
-            existing.vote_type = vote_type
-            existing.save(update_fields=['vote_type'])
-            user_vote = vote_type
-
-    annotated = _annotated_posts_qs(
+        if existing is not None:
+            if existing.vote_type == vote_type:
+                # Same vote -> toggle off
+                existing.delete()
+                user_vote = None
+            else:
+                # Switch vote direction
+                PostVote.objects.filter(pk=existing.pk).update(vote_type=vote_type)
+                counters.vote_changed(post.pk, existing.vote_type, vote_type)
+                user_vote = vote_type
+
+    vote_score = (
         CommunityPost.objects.filter(pk=post_id, is_deleted=False)
-    ).first()
-    if annotated is None:
+        .values_list('vote_score', flat=True)
+        .first()
+    )
+    if vote_score is None:
         return Response({'error': 'Post not found.'}, status=404)
     return Response({
-        'vote_score': annotated.upvotes - annotated.downvotes,
+        'vote_score': vote_score,
         'user_vote': user_vote,
     })
 
@@ -585,16 +707,21 @@ def _list_post_comments(request, post_id):
     if not _visible_post_qs(request, post_id).exists():
         return Response({'error': 'Post not found.'}, status=404)
 
-    page = _parse_page(request.GET.get('page', 1))
-    start = (page - 1) * COMMENT_PAGE_SIZE
-    comments = list(
-        _comments_qs_for_request(post_id, request.user)
-        .select_related('author')
-        .annotate(like_count=Count('likes'))
-        .order_by('created_at', 'id')[start: start + COMMENT_PAGE_SIZE + 1]
-    )
-    has_more = len(comments) > COMMENT_PAGE_SIZE
-    comments = comments[:COMMENT_PAGE_SIZE]
+    cursor = request.GET.get('cursor')
+    page = None if cursor is not None else _parse_page(request.GET.get('page', 1))
+    try:
+        comments, next_cursor = _paginate(
+            _comments_qs_for_request(post_id, request.user)
+            .select_related('author')
+            .order_by(*COMMENT_ORDERING),
+            COMMENT_ORDERING,
+            COMMENT_PAGE_SIZE,
+            'comments',
+            cursor,
+            page,
+        )
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor.'}, status=400)
 
     liked_ids = set()
     if request.user.is_authenticated and comments:
@@ -617,7 +744,8 @@ def _list_post_comments(request, post_id):
             for comment in comments
         ],
         'page': page,
-        'has_more': has_more,
+        'has_more': next_cursor is not None,
+        'next_cursor': next_cursor,
     })
 
 
@@ -647,13 +775,12 @@ def _create_comment(request, post_id):
         author=request.user,
         body=body,
     )
-    transaction.on_commit(
-        lambda: send_post_comment_notification(
-            post_author_id=post.author_id,
-            comment_author_id=comment.author_id,
-            post_id=post.id,
-            comment_id=comment.id,
-        )
+    # Only writes an outbox row; dispatch_push_notifications does the sending.
+    enqueue_post_comment_notification(
+        post_author_id=post.author_id,
+        comment_author_id=comment.author_id,
+        post_id=post.id,
+        comment_id=comment.id,
     )
     now = datetime.now(tz=timezone.utc)
     pro_user_ids = _build_pro_user_ids([comment.author_id], now=now)
@@ -671,7 +798,9 @@ def community_comment_delete(request, comment_id):
     if comment.author_id != request.user.pk:
         return Response({'error': 'You can only delete your own comments.'}, status=403)
 
-    CommunityComment.objects.filter(pk=comment_id).update(is_deleted=True)
+    with transaction.atomic():
+        if CommunityComment.objects.filter(pk=comment_id, is_deleted=False).update(is_deleted=True):
+            counters.comments_hidden(comment.post_id)
     return Response({'status': 'deleted'})
 
 
@@ -695,9 +824,14 @@ def community_comment_like(request, comment_id):
         like.delete()
         liked = False
 
+    like_count = (
+        CommunityComment.objects.filter(pk=comment_id)
+        .values_list('like_count', flat=True)
+        .first()
+    )
     return Response({
         'liked': liked,
-        'like_count': comment.likes.count(),
+        'like_count': like_count or 0,
     })
 
 
@@ -810,9 +944,7 @@ def toggle_block_user(request, user_id):
 @permission_classes([IsAuthenticated])
 def blocked_users_list(request):
     """Return the list of user IDs blocked by the current user."""
-    blocked_ids = list(
-        UserBlock.objects.filter(blocker=request.user).values_list('blocked_user_id', flat=True)
-    )
+    blocked_ids = sorted(community_cache.blocked_user_ids(request.user.pk))
     return Response({'blocked_user_ids': blocked_ids})
 
 
@@ -833,26 +965,42 @@ def community_poll_vote(request, post_id):
     except PostPoll.DoesNotExist:
         return Response({'error': 'Poll not found.'}, status=404)
 
-    existing = PollVote.objects.filter(poll=poll, user=request.user).first()
+    # The vote row and the poll's tallies change in one transaction. Inserts
+    # and deletes adjust the tallies from signal receivers (community.counters).
+    with transaction.atomic():
+        existing = (
+            PollVote.objects.select_for_update()
+            .filter(poll=poll, user=request.user)
+            .first()
+        )
 
-    if existing is None:
-        try:
-            PollVote.objects.create(poll=poll, user=request.user, choice=choice)
-            user_vote = choice
-        except IntegrityError:
-            existing = PollVote.objects.filter(poll=poll, user=request.user).first()
-
-    if existing is not None:
-        if existing.choice == choice:
-            existing.delete()
-            user_vote = None
-        else:
-            existing.choice = choice
-            existing.save(update_fields=['choice'])
-            user_vote = choice
-
-    send_it = poll.votes.filter(choice='send_it').count()
-    dont_send_it = poll.votes.filter(choice='dont_send_it').count()
+        if existing is None:
+            try:
+                with transaction.atomic():
+                    PollVote.objects.create(poll=poll, user=request.user, choice=choice)
+                user_vote = choice
+            except IntegrityError:
+                # Rare race: another request created the vote between read and create.
+                existing = (
+                    PollVote.objects.select_for_update()
+                    .filter(poll=poll, user=request.user)
+                    .first()
+                )
+
+        if existing is not None:
+            if existing.choice == choice:
+                existing.delete()
+                user_vote = None
+            else:
+                PollVote.objects.filter(pk=existing.pk).update(choice=choice)
+                counters.poll_vote_changed(poll.pk, existing.choice, choice)
+                user_vote = choice
+
+        send_it, dont_send_it = (
+            PostPoll.objects.filter(pk=poll.pk)
+            .values_list('send_it_count', 'dont_send_it_count')
+            .get()
+        )
 
     return Response({
         'send_it_count': send_it,
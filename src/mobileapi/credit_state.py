@@ -0,0 +1,254 @@
+"""
+Per-request credit state for the mobile API.
+
+Every authenticated mobile endpoint needs the same handful of facts: the
+user's ChatCredit counters (after the lazy daily/weekly resets), whether the
+stored subscription is still active, today's shared-pool usage of the calling
+device and whether a locked reply is waiting. ``CreditState.get`` fetches all
+of them in one query, applies the rollovers in memory and persists them with a
+single conditional UPDATE, so building the subscription payload afterwards is
+free.
+"""
+
+from datetime import datetime, time as dt_time, timedelta
+from typing import Any, Dict, Optional
+
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from conversation.models import ChatCredit, DeviceDailyUsage, LockedReply
+
+_SUBSCRIPTION_EXPIRED_FIELDS = {
+    "is_subscribed": False,
+    "subscription_auto_renewing": False,
+    "subscription_purchase_token": None,
+    "subscription_product_id": None,
+    "subscription_platform": None,
+}
+
+
+def _start_of_day(now: datetime) -> datetime:
+    return datetime.combine(now.date(), dt_time.min, tzinfo=now.tzinfo)
+
+
+class CreditState:
+    """ChatCredit plus the request-scoped facts derived from it."""
+
+    def __init__(
+        self,
+        chat_credit: ChatCredit,
+        *,
+        device_hash: str = "",
+        device_used: int = 0,
+        has_pending_unlock: bool = False,
+        now: Optional[datetime] = None,
+    ):
+        self.chat_credit = chat_credit
+        self.device_hash = device_hash or ""
+        self.device_used = device_used or 0
+        self.has_pending_unlock = bool(has_pending_unlock)
+        self.now = now or timezone.now()
+        self._rollovers = set()
+        self._apply_rollovers()
+
+    # --- Loading ---------------------------------------------------------
+
+    @classmethod
+    def get(cls, user, device_hash: str = "") -> "CreditState":
+        """Read ChatCredit, device usage and pending-unlock flag in one query.
+
+        Raises ``ChatCredit.DoesNotExist`` like ``ChatCredit.objects.get``.
+        """
+        now = timezone.now()
+        chat_credit = cls._annotated_qs(device_hash, now).get(user=user)
+        chat_credit.user = user
+        state = cls(
+            chat_credit,
+            device_hash=device_hash,
+            device_used=chat_credit.device_used_today,
+            has_pending_unlock=chat_credit.has_pending_unlock_today,
+            now=now,
+        )
+        state.flush()
+        return state
+
+    @classmethod
+    def create(cls, user, device_hash: str = "", **fields) -> "CreditState":
+        """Create the ChatCredit row with its daily windows already opened."""
+        now = timezone.now()
+        fields.setdefault("subscriber_daily_reset_at", now)
+        fields.setdefault("free_daily_reset_at", now)
+        chat_credit = ChatCredit.objects.create(user=user, **fields)
+        return cls(
+            chat_credit,
+            device_hash=device_hash,
+            device_used=cls._device_used(device_hash),
+            now=now,
+        )
+
+    @classmethod
+    def for_chat_credit(cls, chat_credit: ChatCredit, device_hash: str = "") -> "CreditState":
+        """Build state around an already loaded ChatCredit (auth/purchase flows)."""
+        state = cls(
+            chat_credit,
+            device_hash=device_hash,
+            device_used=cls._device_used(device_hash),
+            has_pending_unlock=LockedReply.objects.filter(
+                user_id=chat_credit.user_id,
+                unlocked=False,
+                created_at__date=timezone.now().date(),
+            ).exists(),
+        )
+        state.flush()
+        return state
+
+    @staticmethod
+    def _annotated_qs(device_hash: str, now: datetime):
+        today = now.date()
+        if device_hash:
+            device_used = Coalesce(
+                Subquery(
+                    DeviceDailyUsage.objects.filter(
+                        device_hash=device_hash,
+                        day=today,
+                    ).values("used_count")[:1]
+                ),
+                Value(0),
+            )
+        else:
+            device_used = Value(0)
+        return ChatCredit.objects.annotate(
+            device_used_today=device_used,
+            has_pending_unlock_today=Exists(
+                LockedReply.objects.filter(
+                    user_id=OuterRef("user_id"),
+                    unlocked=False,
+                    created_at__date=today,
+                )
+            ),
+        )
+
+    @staticmethod
+    def _device_used(device_hash: str) -> int:
+        if not device_hash:
+            return 0
+        usage = DeviceDailyUsage.objects.filter(
+            device_hash=device_hash,
+            day=timezone.now().date(),
+        ).values_list("used_count", flat=True).first()
+        return usage or 0
+
+    # --- Lazy rollovers --------------------------------------------------
+
+    def _is_stale_day(self, reset_at) -> bool:
+        return not reset_at or reset_at.date() < self.now.date()
+
+    def _apply_rollovers(self):
+        cc = self.chat_credit
+        if cc.is_subscribed and cc.subscription_expiry and cc.subscription_expiry < self.now:
+            for field, value in _SUBSCRIPTION_EXPIRED_FIELDS.items():
+                setattr(cc, field, value)
+            self._rollovers.add("subscription")
+
+        if self._is_stale_day(cc.subscriber_daily_reset_at):
+            cc.subscriber_daily_openers = 0
+            cc.subscriber_daily_replies = 0
+            cc.subscriber_daily_reset_at = self.now
+            self._rollovers.add("subscriber_daily")
+
+        if self._is_stale_day(cc.free_daily_reset_at):
+            cc.free_daily_credits_used = 0
+            cc.free_daily_reset_at = self.now
+            self._rollovers.add("free_daily")
+
+        # The legacy weekly window is only consulted for subscribers.
+        if cc.is_subscribed:
+            reset_at = cc.subscriber_weekly_reset_at
+            if not reset_at or (self.now - reset_at).days >= 7:
+                cc.subscriber_weekly_actions = 0
+                cc.subscriber_weekly_reset_at = self.now
+                self._rollovers.add("subscriber_weekly")
+
+    def flush(self):
+        """Persist pending rollovers with one conditional UPDATE.
+
+        Each column is guarded by the same staleness test that triggered the
+        rollover, evaluated in SQL, so a concurrent request that already reset
+        (and started consuming) the window is never clobbered.
+        """
+        if not self._rollovers:
+            return
+        now = self.now
+        day_start = _start_of_day(now)
+        updates = {}
+
+        def _guarded(field, stale, value):
+            updates[field] = Case(
+                When(stale, then=Value(value)),
+                default=F(field),
+                output_field=ChatCredit._meta.get_field(field),
+            )
+
+        if "subscription" in self._rollovers:
+            expired = Q(is_subscribed=True, subscription_expiry__lt=now)
+            for field, value in _SUBSCRIPTION_EXPIRED_FIELDS.items():
+                _guarded(field, expired, value)
+        if "subscriber_daily" in self._rollovers:
+            stale = Q(subscriber_daily_reset_at__isnull=True) | Q(subscriber_daily_reset_at__lt=day_start)
+            _guarded("subscriber_daily_openers", stale, 0)
+            _guarded("subscriber_daily_replies", stale, 0)
+            _guarded("subscriber_daily_reset_at", stale, now)
+        if "free_daily" in self._rollovers:
+            stale = Q(free_daily_reset_at__isnull=True) | Q(free_daily_reset_at__lt=day_start)
+            _guarded("free_daily_credits_used", stale, 0)
+            _guarded("free_daily_reset_at", stale, now)
+        if "subscriber_weekly" in self._rollovers:
+            stale = Q(subscriber_weekly_reset_at__isnull=True) | Q(
+                subscriber_weekly_reset_at__lte=now - timedelta(days=7)
+            )
+            _guarded("subscriber_weekly_actions", stale, 0)
+            _guarded("subscriber_weekly_reset_at", stale, now)
+
+        ChatCredit.objects.filter(pk=self.chat_credit.pk).update(**updates)
+        self._rollovers.clear()
+
+    # --- Derived values --------------------------------------------------
+
+    @property
+    def is_subscribed(self) -> bool:
+        return bool(self.chat_credit.is_subscribed)
+
+    @property
+    def free_used(self) -> int:
+        """Effective free-pool usage across the account and the calling device."""
+        return max(self.chat_credit.free_daily_credits_used or 0, self.device_used)
+
+    def free_remaining(self, cfg) -> int:
+        return max(0, cfg.free_daily_credit_limit - self.free_used)
+
+    def subscription_payload(self, cfg) -> Dict[str, Any]:
+        """Subscription info payload for mobile clients."""
+        cc = self.chat_credit
+        expiry = cc.subscription_expiry.isoformat() if cc.subscription_expiry else None
+        return {
+            "is_subscribed": self.is_subscribed,
+            "subscription_expiry": expiry,
+            "subscription_product_id": cc.subscription_product_id,
+            "subscription_platform": cc.subscription_platform,
+            "subscription_auto_renewing": cc.subscription_auto_renewing,
+            # Subscriber daily usage
+            "daily_openers_used": cc.subscriber_daily_openers or 0,
+            "daily_replies_used": cc.subscriber_daily_replies or 0,
+            # Free user daily credits
+            "free_daily_credits_remaining": self.free_remaining(cfg),
+            "free_daily_credits_limit": cfg.free_daily_credit_limit,
+            # Pending unlock status
+            "has_pending_unlock": self.has_pending_unlock,
+            # Legacy weekly fields (backward compatibility)
+            "subscriber_weekly_remaining": max(
+                0,
+                cfg.subscriber_weekly_limit - (cc.subscriber_weekly_actions or 0)
+            ),
+            "subscriber_weekly_limit": cfg.subscriber_weekly_limit,
+        }
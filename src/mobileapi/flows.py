@@ -0,0 +1,137 @@
+"""
+Generation endpoints that run the same body under WSGI and ASGI.
+
+A flow is a generator function that takes the DRF request. It does its credit
+and DB work inline, ``yield``s a ``ModelCall`` when it needs a model result,
+and ``return``s the response. ``run_flow`` drives a flow inline for the
+existing sync DRF views. ``FlowAPIView`` is an async DRF view that runs each
+step between model calls in the request's sync thread and awaits the async
+model call on the event loop. Under ASGI a slow provider round-trip therefore
+holds no worker thread.
+"""
+
+from typing import Any, Callable, Generator, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django_ratelimit.core import is_ratelimited
+from django_ratelimit.exceptions import Ratelimited
+from rest_framework.views import APIView
+
+
+class ModelCall:
+    """One model invocation with its sync and async implementations."""
+
+    def __init__(self, func: Callable, afunc: Callable, *args: Any, **kwargs: Any):
+        self.func = func
+        self.afunc = afunc
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        return self.func(*self.args, **self.kwargs)
+
+    async def arun(self):
+        return await self.afunc(*self.args, **self.kwargs)
+
+
+Flow = Generator[ModelCall, Any, Any]
+
+
+def _advance(flow: Flow, value: Any = None, error: BaseException = None) -> Tuple[bool, Any]:
+    """Resume ``flow``; return (done, next ModelCall or the final response)."""
+    try:
+        step = flow.throw(error) if error is not None else flow.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+    return False, step
+
+
+def run_flow(flow: Flow):
+    """Drive ``flow`` synchronously, calling each model inline."""
+    done, step = _advance(flow)
+    while not done:
+        try:
+            result = step.run()
+        except Exception as exc:
+            done, step = _advance(flow, error=exc)
+        else:
+            done, step = _advance(flow, result)
+    return step
+
+
+async def arun_flow(flow: Flow):
+    """Drive ``flow`` from the event loop, awaiting each model call."""
+    advance = sync_to_async(_advance)
+    done, step = await advance(flow)
+    while not done:
+        try:
+            result = await step.arun()
+        except Exception as exc:
+            done, step = await advance(flow, error=exc)
+        else:
+            done, step = await advance(flow, result)
+    return step
+
+
+class FlowAPIView(APIView):
+    """Async POST endpoint for a flow: ``FlowAPIView.as_view(flow=...)``.
+
+    ``ratelimits`` holds ``(key, rate)`` pairs, checked in order like the
+    stacked ``@ratelimit`` decorators on the sync views, all counted under
+    ``ratelimit_group``.
+    """
+
+    http_method_names = ["post", "options"]
+    flow: Callable[..., Flow] = None
+    ratelimits: Sequence[Tuple[Any, Any]] = ()
+    ratelimit_group: str = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request, response = await sync_to_async(self._initial)(request, *args, **kwargs)
+        if response is None:
+            try:
+                response = await self.post(request, *args, **kwargs)
+            except Exception as exc:
+                response = await sync_to_async(self.handle_exception)(exc)
+        return await sync_to_async(self.finalize_response)(request, response, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await arun_flow(self.flow(request))
+
+    def _check_ratelimits(self, request):
+        for key, rate in self.ratelimits:
+            limited = is_ratelimited(
+                request=request,
+                group=self.ratelimit_group,
+                key=key,
+                rate=rate,
+                increment=True,
+            )
+            request.limited = limited or getattr(request, "limited", False)
+            if limited:
+                cls = getattr(settings, "RATELIMIT_EXCEPTION_CLASS", Ratelimited)
+                raise (import_string(cls) if isinstance(cls, str) else cls)()
+
+    def _initial(self, request, *args, **kwargs):
+        """Rate limits, DRF request setup, auth and permissions (sync).
+
+        Returns the DRF request and, when the flow must not run, the response.
+        """
+        self._check_ratelimits(request)
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            self.initial(request, *args, **kwargs)
+            method = request.method.lower()
+            if method == "options":
+                return request, self.options(request, *args, **kwargs)
+            if method != "post":
+                return request, self.http_method_not_allowed(request, *args, **kwargs)
+        except Exception as exc:
+            return request, self.handle_exception(exc)
+        return request, None
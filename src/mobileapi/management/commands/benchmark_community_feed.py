@@ -0,0 +1,181 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, IntegerField, Q
+from django.utils import timezone
+
+from community import ranking
+from community.models import CommunityComment, CommunityPost, PostVote
+from mobileapi.community_views import (
+    COMMENT_ORDERING,
+    COMMENT_PAGE_SIZE,
+    FEED_ORDERINGS,
+    PAGE_SIZE,
+    _ordered_posts_qs,
+    _posts_qs,
+)
+from mobileapi.pagination import encode_cursor, keyset_page
+
+_BATCH = 5000
+
+
+def _legacy_feed_qs(base_qs, sort):
+    """Reference copy of the pre-counter feed query: per-page Count(distinct) over votes x comments.
+
+    The annotations are prefixed because the model now has columns with the old names.
+    """
+    upvotes_expr = Count('votes', filter=Q(votes__vote_type='up'), distinct=True)
+    downvotes_expr = Count('votes', filter=Q(votes__vote_type='down'), distinct=True)
+    qs = base_qs.select_related('author').annotate(
+        legacy_upvotes=upvotes_expr,
+        legacy_downvotes=downvotes_expr,
+        legacy_score=ExpressionWrapper(upvotes_expr - downvotes_expr, output_field=IntegerField()),
+        legacy_comment_count=Count('comments', filter=Q(comments__is_deleted=False), distinct=True),
+    )
+    if sort == 'top':
+        return qs.order_by('-is_pinned', '-is_featured', '-legacy_score', '-published_at', '-id')
+    # "hot" used to be the same ordering as "new".
+    return qs.order_by('-is_pinned', '-is_featured', '-published_at', '-legacy_score', '-id')
+
+
+def _counter_feed_qs(base_qs, sort):
+    return _ordered_posts_qs(_posts_qs(base_qs), sort)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic community (rolled back afterwards) and compare feed page latency "
+        "between the old annotated query and the stored counter and hot-score columns, and "
+        "deep-page latency of OFFSET versus cursor pagination for the feed and a long comment thread."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=10000, help="Posts to seed (default: 10000).")
+        parser.add_argument("--votes", type=int, default=1000000, help="Votes to seed (default: 1000000).")
+        parser.add_argument("--comments", type=int, default=50000, help="Comments to seed (default: 50000).")
+        parser.add_argument("--runs", type=int, default=5, help="Timed runs per query (default: 5).")
+        parser.add_argument("--deep-page", type=int, default=50, help="Deep page number to time (default: 50).")
+        parser.add_argument(
+            "--thread",
+            type=int,
+            default=2000,
+            help="Extra comments on one post for the comment-list rows (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        posts, votes, comments, runs = (options[k] for k in ("posts", "votes", "comments", "runs"))
+        if posts <= 0 or runs <= 0 or options["deep_page"] <= 1:
+            raise CommandError("--posts and --runs must be positive and --deep-page greater than one.")
+        if votes < 0 or comments < 0 or options["thread"] < 0:
+            raise CommandError("--votes, --comments and --thread cannot be negative.")
+        voters = max(1, -(-votes // posts))
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            thread_post = self._seed(posts, votes, comments, voters, options["thread"])
+            self.stdout.write(
+                f"seeded posts={posts} votes={votes} comments={comments} users={voters} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            self.stdout.write(f"{'list':8s} {'page':>5s} {'query':9s} {'p50 ms':>9s} {'max ms':>9s}")
+            base_qs = CommunityPost.objects.filter(is_deleted=False, published_at__lte=timezone.now())
+            deep_page = options["deep_page"]
+            for sort in ("new", "hot", "top"):
+                for page in (1, deep_page):
+                    for label, build in (("legacy", _legacy_feed_qs), ("offset", _counter_feed_qs)):
+                        self._report(sort, page, label, self._time(build(base_qs, sort), page, PAGE_SIZE, runs))
+                ordered_qs = _counter_feed_qs(base_qs, sort)
+                timings = self._time_cursor(ordered_qs, FEED_ORDERINGS[sort], f"posts:{sort}", deep_page, PAGE_SIZE, runs)
+                self._report(sort, deep_page, "cursor", timings)
+            if thread_post is not None:
+                comments_qs = (
+                    CommunityComment.objects.filter(post=thread_post, is_deleted=False)
+                    .select_related("author")
+                    .order_by(*COMMENT_ORDERING)
+                )
+                timings = self._time(comments_qs, deep_page, COMMENT_PAGE_SIZE, runs)
+                self._report("comments", deep_page, "offset", timings)
+                timings = self._time_cursor(comments_qs, COMMENT_ORDERING, "comments", deep_page, COMMENT_PAGE_SIZE, runs)
+                self._report("comments", deep_page, "cursor", timings)
+            transaction.set_rollback(True)
+
+    def _report(self, listing, page, label, timings):
+        self.stdout.write(
+            f"{listing:8s} {page:5d} {label:9s} {statistics.median(timings):9.2f} {max(timings):9.2f}"
+        )
+
+    def _time(self, qs, page, page_size, runs):
+        start = (page - 1) * page_size
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            list(qs[start: start + page_size + 1])
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _time_cursor(self, qs, ordering, tag, page, page_size, runs):
+        # The cursor a client holds after reading the first page - 1 pages.
+        previous = list(qs[(page - 1) * page_size - 1:(page - 1) * page_size])
+        if not previous:
+            raise CommandError(f"Not enough rows for page {page}; seed more or lower --deep-page.")
+        cursor = encode_cursor(previous[0], ordering, tag)
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            keyset_page(qs, ordering, page_size, tag, cursor=cursor)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _seed(self, post_count, vote_count, comment_count, voter_count, thread_count):
+        rng = random.Random(7)
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            [User(username=f"bench_feed_{i}") for i in range(voter_count)], batch_size=_BATCH
+        )
+        posts = CommunityPost.objects.bulk_create(
+            [
+                CommunityPost(
+                    author=users[i % len(users)],
+                    title=f"Benchmark post {i}",
+                    body="body",
+                    category="dating_advice",
+                    published_at=now - timedelta(minutes=i),
+                )
+                for i in range(post_count)
+            ],
+            batch_size=_BATCH,
+        )
+        # bulk_create skips the counter receivers, so fill the columns directly.
+        vote_rows = []
+        for index in range(vote_count):
+            post = posts[index % len(posts)]
+            vote_type = "up" if rng.random() < 0.7 else "down"
+            if vote_type == "up":
+                post.upvote_count += 1
+            else:
+                post.downvote_count += 1
+            vote_rows.append(PostVote(user=users[index // len(posts)], post=post, vote_type=vote_type))
+            if len(vote_rows) >= _BATCH:
+                PostVote.objects.bulk_create(vote_rows)
+                vote_rows = []
+        PostVote.objects.bulk_create(vote_rows)
+        comment_rows = []
+        for index in range(comment_count + thread_count):
+            post = rng.choice(posts) if index < comment_count else posts[0]
+            post.comment_count += 1
+            comment_rows.append(CommunityComment(post=post, author=users[index % len(users)], body="c"))
+        CommunityComment.objects.bulk_create(comment_rows, batch_size=_BATCH)
+        for post in posts:
+            post.vote_score = post.upvote_count - post.downvote_count
+            post.hot_score = ranking.post_hot_score(post, now)
+        CommunityPost.objects.bulk_update(
+            posts,
+            ["upvote_count", "downvote_count", "vote_score", "comment_count", "hot_score"],
+            batch_size=_BATCH,
+        )
+        return posts[0] if thread_count else None
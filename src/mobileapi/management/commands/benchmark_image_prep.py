@@ -0,0 +1,151 @@
+import statistics
+import time
+from io import BytesIO
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw
+
+from conversation.utils import image_prep
+
+_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def _legacy_payload(img_bytes, task):
+    """Reference copy of the pre-image_prep behaviour: OCR resized to JPEG, the rest sent as-is."""
+    if task != "ocr":
+        return img_bytes
+    try:
+        with Image.open(BytesIO(img_bytes)) as img:
+            width, height = img.size
+            long_edge = max(width, height)
+            if long_edge <= 1280 and (img.format or "").upper() in ("JPEG", "JPG"):
+                return img_bytes
+            if long_edge > 1280:
+                scale = 1280 / float(long_edge)
+                img = img.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            out = BytesIO()
+            img.save(out, format="JPEG", quality=85, optimize=True)
+            return out.getvalue()
+    except Exception:
+        return img_bytes
+
+
+def _synthetic_screenshot(size, fmt, orientation=None):
+    """A chat-like screenshot: alternating bubbles of text on a light background."""
+    width, height = size
+    img = Image.new("RGB", size, (245, 245, 247))
+    draw = ImageDraw.Draw(img)
+    y = 40
+    row = 0
+    while y < height - 120:
+        mine = row % 2 == 0
+        bubble_width = int(width * (0.45 + 0.1 * (row % 3)))
+        x0 = width - bubble_width - 30 if mine else 30
+        draw.rounded_rectangle(
+            (x0, y, x0 + bubble_width, y + 90),
+            radius=28,
+            fill=(10, 132, 255) if mine else (229, 229, 234),
+        )
+        draw.text((x0 + 24, y + 20), f"message {row} lorem ipsum dolor sit amet", fill=(0, 0, 0))
+        draw.text((x0 + 24, y + 52), f"9:{row % 60:02d} PM", fill=(90, 90, 90))
+        y += 120
+        row += 1
+    out = BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        img.save(out, format=fmt, quality=92, exif=exif)
+    else:
+        img.save(out, format=fmt, quality=92)
+    return out.getvalue()
+
+
+def _default_corpus():
+    return [
+        ("iphone.png", _synthetic_screenshot((1170, 2532), "PNG")),
+        ("android-rotated.jpg", _synthetic_screenshot((2400, 1080), "JPEG", orientation=6)),
+        ("tablet.webp", _synthetic_screenshot((1440, 3200), "WEBP")),
+        ("small.jpg", _synthetic_screenshot((640, 1136), "JPEG")),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare vision payload size and preprocessing latency per task (ocr, profile, opener) "
+        "between the old per-module resize and conversation.utils.image_prep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus",
+            default="",
+            help="Directory of sample screenshots (png/jpg/webp). Default: synthetic screenshots.",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per image and task (default: 5).")
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        if repeat <= 0:
+            raise CommandError("--repeat must be greater than zero.")
+        corpus = self._load_corpus(options["corpus"])
+        self.stdout.write(f"corpus={len(corpus)} images format={image_prep.output_format()} repeat={repeat}")
+        self.stdout.write(
+            f"{'task':8s} {'pipeline':8s} {'orig KB':>9s} {'payload KB':>11s} {'b64 KB':>8s} "
+            f"{'p50 ms':>8s} {'max ms':>8s}"
+        )
+        for task in image_prep.TASK_LONG_EDGE:
+            for label, run in (("legacy", self._run_legacy), ("prep", self._run_prep)):
+                sizes, timings = [], []
+                for _, img_bytes in corpus:
+                    for _ in range(repeat):
+                        payload, elapsed = run(img_bytes, task)
+                        timings.append(elapsed)
+                    sizes.append((len(img_bytes), len(payload)))
+                original_kb = sum(size[0] for size in sizes) / len(sizes) / 1024
+                payload_kb = sum(size[1] for size in sizes) / len(sizes) / 1024
+                self.stdout.write(
+                    f"{task:8s} {label:8s} {original_kb:9.1f} {payload_kb:11.1f} {payload_kb * 4 / 3:8.1f} "
+                    f"{statistics.median(timings):8.2f} {max(timings):8.2f}"
+                )
+
+        # Memoization: every task on one request, and the stream retry's second pass.
+        started = time.perf_counter()
+        for _, img_bytes in corpus:
+            image = image_prep.prepare(img_bytes)
+            for task in image_prep.TASK_LONG_EDGE:
+                image.data_url(task)
+            image.data_url("ocr")
+            image.data_url()
+        elapsed = (time.perf_counter() - started) * 1000 / len(corpus)
+        self.stdout.write(f"all tasks + retry on one PreparedImage: {elapsed:.2f} ms/image")
+
+    def _load_corpus(self, directory):
+        if not directory:
+            return _default_corpus()
+        path = Path(directory)
+        if not path.is_dir():
+            raise CommandError(f"--corpus {directory} is not a directory.")
+        corpus = [
+            (item.name, item.read_bytes())
+            for item in sorted(path.iterdir())
+            if item.suffix.lower() in _EXTENSIONS
+        ]
+        if not corpus:
+            raise CommandError(f"No png/jpg/webp files in {directory}.")
+        return corpus
+
+    def _run_legacy(self, img_bytes, task):
+        started = time.perf_counter()
+        payload = _legacy_payload(img_bytes, task)
+        # The old paths base64-encoded on every attempt.
+        image_prep.Variant(payload, image_prep.detect_mime(payload)).data_url
+        return payload, (time.perf_counter() - started) * 1000
+
+    def _run_prep(self, img_bytes, task):
+        started = time.perf_counter()
+        variant = image_prep.prepare(img_bytes).variant(task)
+        variant.data_url
+        return variant.data, (time.perf_counter() - started) * 1000
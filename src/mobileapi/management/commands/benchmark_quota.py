@@ -0,0 +1,112 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from conversation.models import ChatCredit, DeviceDailyUsage
+from mobileapi import quota
+
+
+def _locking_consume(pk, limit, device_hash):
+    """Reference copy of the select_for_update read-modify-write path."""
+    today = timezone.now().date()
+    with transaction.atomic():
+        chat_credit = ChatCredit.objects.select_for_update().get(pk=pk)
+        user_used = chat_credit.free_daily_credits_used or 0
+        device_usage, _ = DeviceDailyUsage.objects.select_for_update().get_or_create(
+            device_hash=device_hash,
+            day=today,
+            defaults={"used_count": 0},
+        )
+        effective_used = max(user_used, device_usage.used_count or 0)
+        if effective_used >= limit:
+            return None
+        new_used = effective_used + 1
+        chat_credit.free_daily_credits_used = new_used
+        chat_credit.save(update_fields=["free_daily_credits_used"])
+        device_usage.used_count = new_used
+        device_usage.save(update_fields=["used_count", "last_seen"])
+    return new_used
+
+
+def _atomic_consume(pk, limit, device_hash):
+    return quota.consume_free_credit(pk, limit, device_hash=device_hash)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare free-pool consume throughput of the atomic quota engine "
+        "against the select_for_update path under concurrent threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent workers (default: 8).")
+        parser.add_argument("--attempts", type=int, default=50, help="Consumes per worker (default: 50).")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Daily pool size (default: half of threads * attempts, so both paths hit the cap).",
+        )
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        attempts = options["attempts"]
+        if threads <= 0 or attempts <= 0:
+            raise CommandError("--threads and --attempts must be greater than zero.")
+        limit = options["limit"] or max(1, threads * attempts // 2)
+
+        for label, consume in (("locking", _locking_consume), ("atomic", _atomic_consume)):
+            grants, retries, elapsed = self._run(consume, threads, attempts, limit)
+            total = threads * attempts
+            status = "OK" if grants == limit else "OVER-GRANT" if grants > limit else "UNDER-GRANT"
+            self.stdout.write(
+                f"{label:8s} attempts={total} granted={grants} limit={limit} "
+                f"lock_retries={retries} elapsed={elapsed:.3f}s "
+                f"throughput={total / elapsed:.0f}/s {status}"
+            )
+
+    def _run(self, consume, threads, attempts, limit):
+        tag = uuid.uuid4().hex[:10]
+        user = User.objects.create_user(username=f"quota-bench-{tag}", password=None)
+        chat_credit, _ = ChatCredit.objects.get_or_create(user=user)
+        device_hash = f"quota-bench-{tag}"
+        barrier = threading.Barrier(threads)
+        lock = threading.Lock()
+        counts = {"grants": 0, "retries": 0}
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(attempts):
+                    while True:
+                        try:
+                            granted = consume(chat_credit.pk, limit, device_hash)
+                            break
+                        except OperationalError as exc:
+                            if "locked" not in str(exc):
+                                raise
+                            with lock:
+                                counts["retries"] += 1
+                    if granted:
+                        with lock:
+                            counts["grants"] += 1
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        try:
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            DeviceDailyUsage.objects.filter(device_hash=device_hash).delete()
+            user.delete()
+        return counts["grants"], counts["retries"], elapsed
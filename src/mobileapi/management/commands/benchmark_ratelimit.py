@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django_ratelimit.decorators import ratelimit
+
+from mobileapi.views import _ratelimit_device
+
+_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "ratelimit-benchmark"),
+    "db": ("reignitehome.cache_backends.AtomicDatabaseCache", "django_cache_table"),
+    "file": ("reignitehome.cache_backends.LockingFileBasedCache", None),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+    "memcached": ("django.core.cache.backends.memcached.PyMemcacheCache", "127.0.0.1:11211"),
+}
+
+
+def _plain_view(request):
+    return HttpResponse("ok")
+
+
+# Same stacking as the generate endpoints: one IP and one device limit.
+_limited_view = ratelimit(key="ip", rate="1000000/h", block=True)(
+    ratelimit(key=_ratelimit_device, rate="1000000/h", block=True)(_plain_view)
+)
+
+
+class Command(BaseCommand):
+    help = "Measure per-request django-ratelimit overhead for each shared cache backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per backend (default: 500).")
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=sorted(_BACKENDS),
+            help="Backend to measure (repeatable). Default: locmem, db, file.",
+        )
+        parser.add_argument(
+            "--location",
+            action="append",
+            default=[],
+            metavar="BACKEND=LOCATION",
+            help="Override a backend location, e.g. redis=redis://cache:6379/0.",
+        )
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        if count <= 0:
+            raise CommandError("--requests must be greater than zero.")
+        locations = {}
+        for item in options["location"]:
+            name, _, location = item.partition("=")
+            if name not in _BACKENDS or not location:
+                raise CommandError(f"Invalid --location {item!r}")
+            locations[name] = location
+
+        factory = RequestFactory()
+        baseline = self._time(_plain_view, factory, count)
+        self.stdout.write(f"{'none':10s} {baseline * 1e6 / count:8.1f} us/request")
+
+        for name in options["backend"] or ["locmem", "db", "file"]:
+            backend, location = _BACKENDS[name]
+            scratch_dir = None
+            if location is None:
+                scratch_dir = tempfile.mkdtemp(prefix="ratelimit-benchmark-")
+                location = scratch_dir
+            location = locations.get(name, location)
+            cache_settings = {"default": {"BACKEND": backend, "LOCATION": location, "KEY_PREFIX": f"rlbench-{uuid.uuid4().hex[:8]}"}}
+            try:
+                with override_settings(CACHES=cache_settings, RATELIMIT_USE_CACHE="default"):
+                    if name == "db":
+                        call_command("createcachetable", verbosity=0)
+                    try:
+                        elapsed = self._time(_limited_view, factory, count)
+                    except Exception as exc:
+                        self.stdout.write(f"{name:10s} unavailable ({exc.__class__.__name__}: {exc})")
+                        continue
+            finally:
+                if scratch_dir:
+                    shutil.rmtree(scratch_dir, ignore_errors=True)
+            per_request = (elapsed - baseline) * 1e6 / count
+            self.stdout.write(f"{name:10s} {elapsed * 1e6 / count:8.1f} us/request (+{per_request:.1f} us ratelimit)")
+
+    @staticmethod
+    def _time(view, factory, count):
+        started = time.perf_counter()
+        for i in range(count):
+            request = factory.get(
+                "/",
+                REMOTE_ADDR=f"198.51.100.{i % 200}",
+                HTTP_X_DEVICE_FINGERPRINT=f"bench-device-{i % 50}",
+            )
+            view(request)
+        return time.perf_counter() - started
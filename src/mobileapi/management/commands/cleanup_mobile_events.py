@@ -8,6 +8,7 @@ from mobileapi.models import (
     MobileCopyEvent,
     MobileGenerationEvent,
     MobileInstallAttributionEvent,
+    PushNotification,
 )
 from reignitehome.models import MarketingClickEvent
 
@@ -15,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = "Delete mobile analytics events older than a retention cutoff."
+    help = "Delete mobile analytics events and finished push notifications older than a retention cutoff."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -36,19 +37,25 @@ class Command(BaseCommand):
         copy_deleted, _ = MobileCopyEvent.objects.filter(created_at__lt=cutoff).delete()
         install_deleted, _ = MobileInstallAttributionEvent.objects.filter(created_at__lt=cutoff).delete()
         click_deleted, _ = MarketingClickEvent.objects.filter(created_at__lt=cutoff).delete()
+        push_deleted, _ = (
+            PushNotification.objects.filter(created_at__lt=cutoff)
+            .exclude(status=PushNotification.Status.PENDING)
+            .delete()
+        )
         logger.info(
-            "cleanup_mobile_events completed cutoff=%s deleted_generation=%s deleted_copy=%s deleted_install=%s deleted_click=%s",
+            "cleanup_mobile_events completed cutoff=%s deleted_generation=%s deleted_copy=%s deleted_install=%s deleted_click=%s deleted_push=%s",
             cutoff.isoformat(),
             generation_deleted,
             copy_deleted,
             install_deleted,
             click_deleted,
+            push_deleted,
         )
 
         self.stdout.write(
             self.style.SUCCESS(
                 f"cleanup_mobile_events completed cutoff={cutoff.isoformat()} "
                 f"deleted_generation={generation_deleted} deleted_copy={copy_deleted} "
-                f"deleted_install={install_deleted} deleted_click={click_deleted}"
+                f"deleted_install={install_deleted} deleted_click={click_deleted} deleted_push={push_deleted}"
             )
         )
@@ -0,0 +1,52 @@
+"""
+Drain the push notification outbox (mobileapi.push_notifications).
+
+Run it once from cron, or keep one or more running with --loop. Concurrent
+dispatchers skip each other's claimed rows.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from mobileapi import push_notifications
+
+
+class Command(BaseCommand):
+    help = "Send due push notifications from the outbox, once or continuously with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Rows claimed per run (default: PUSH_OUTBOX).")
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox until interrupted.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop (default: 5).")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size is not None and batch_size <= 0:
+            raise CommandError("--batch-size must be greater than zero.")
+        interval = options["interval"]
+        if interval <= 0:
+            raise CommandError("--interval must be greater than zero.")
+        batch_size = batch_size or push_notifications.outbox_settings()["BATCH_SIZE"]
+
+        try:
+            while True:
+                close_old_connections()
+                totals = push_notifications.dispatch_due(batch_size=batch_size)
+                if totals["claimed"] or not options["loop"]:
+                    self.stdout.write(self._summary(totals))
+                if not options["loop"]:
+                    return
+                # A full batch means more rows may already be due.
+                if totals["claimed"] < batch_size:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+
+    def _summary(self, totals):
+        attempts = totals["sent"] + totals["retried"] + totals["failed"]
+        avg_ms = totals["latency_ms"] / attempts if attempts else 0
+        return self.style.SUCCESS(
+            f"Sent {totals['sent']} push(es) covering {totals['comments']} comment(s); "
+            f"retrying {totals['retried']}; failed {totals['failed']}. (avg {avg_ms:.0f}ms)"
+        )
@@ -0,0 +1,61 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mobileapi.models import MobileGenerationEvent
+
+
+class Command(BaseCommand):
+    help = "Summarize hedged-fallback outcomes (hedge win rate, extra tokens) from generation events."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Look-back window in days (default: 7).",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days <= 0:
+            raise CommandError("--days must be greater than zero.")
+
+        since = timezone.now() - timedelta(days=days)
+        rows = (
+            MobileGenerationEvent.objects.filter(created_at__gte=since, metadata__has_key="hedge")
+            .values_list("action_type", "metadata", "total_tokens")
+            .iterator()
+        )
+
+        stats = defaultdict(lambda: {"events": 0, "fired": 0, "hedge_wins": 0, "extra_tokens": 0, "tokens": 0})
+        for action_type, metadata, total_tokens in rows:
+            hedge = (metadata or {}).get("hedge") or {}
+            entry = stats[action_type]
+            entry["events"] += 1
+            entry["tokens"] += total_tokens or 0
+            if hedge.get("fired"):
+                entry["fired"] += 1
+                if hedge.get("winner_role") == "hedge":
+                    entry["hedge_wins"] += 1
+            entry["extra_tokens"] += int(hedge.get("extra_tokens") or 0)
+
+        if not stats:
+            self.stdout.write(f"No hedged generation events in the last {days} days.")
+            return
+
+        self.stdout.write(
+            f"{'action':10s} {'events':>8s} {'fired':>8s} {'fire%':>7s} {'hedge wins':>11s} {'win%':>7s} "
+            f"{'extra tokens':>13s} {'overhead%':>10s}"
+        )
+        for action_type in sorted(stats):
+            entry = stats[action_type]
+            fire_rate = 100.0 * entry["fired"] / entry["events"]
+            win_rate = 100.0 * entry["hedge_wins"] / entry["fired"] if entry["fired"] else 0.0
+            overhead = 100.0 * entry["extra_tokens"] / entry["tokens"] if entry["tokens"] else 0.0
+            self.stdout.write(
+                f"{action_type:10s} {entry['events']:8d} {entry['fired']:8d} {fire_rate:6.1f}% "
+                f"{entry['hedge_wins']:11d} {win_rate:6.1f}% {entry['extra_tokens']:13d} {overhead:9.1f}%"
+            )
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobileapi', '0006_push_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mobilecopyevent',
+            name='generation_event',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='copy_events', to='mobileapi.mobilegenerationevent'),
+        ),
+        migrations.AlterField(
+            model_name='mobilereplythread',
+            name='latest_generation_event',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reply_threads', to='mobileapi.mobilegenerationevent'),
+        ),
+    ]
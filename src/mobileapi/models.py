@@ -72,6 +72,8 @@ class MobileReplyThread(models.Model):
     stitched_transcript = models.TextField()
     latest_replies = models.JSONField(default=list, blank=True)
     thumbnail_url = models.TextField(blank=True, default="")
+    # No database constraint: generation events are written off-request
+    # (reignitehome.event_writer), so the id may arrive before its row.
     latest_generation_event = models.ForeignKey(
         MobileGenerationEvent,
         on_delete=models.SET_NULL,
@@ -79,6 +81,7 @@ class MobileReplyThread(models.Model):
         blank=True,
         related_name="reply_threads",
         db_index=True,
+        db_constraint=False,
     )
 
     class Meta:
@@ -120,6 +123,7 @@ class MobileCopyEvent(models.Model):
     copy_type = models.CharField(max_length=16, choices=CopyType.choices, db_index=True)
     copied_text = models.TextField()
     reply_context_ocr_text = models.TextField(null=True, blank=True)
+    # Unconstrained, like MobileReplyThread.latest_generation_event.
     generation_event = models.ForeignKey(
         MobileGenerationEvent,
         on_delete=models.SET_NULL,
@@ -127,6 +131,7 @@ class MobileCopyEvent(models.Model):
         blank=True,
         related_name="copy_events",
         db_index=True,
+        db_constraint=False,
     )
 
     class Meta:
@@ -201,3 +206,58 @@ class MobileInstallAttributionEvent(models.Model):
         actor = self.user.username if self.user_id else (self.guest_id_hash or "guest")
         campaign = self.utm_campaign or "organic"
         return f"install attribution by {actor} ({campaign})"
+
+
+class PushNotification(models.Model):
+    """A transactional push waiting in, or delivered from, the outbox (mobileapi.push_notifications)."""
+
+    class Kind(models.TextChoices):
+        POST_COMMENT = "post_comment", "Post Comment"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    kind = models.CharField(max_length=32, choices=Kind.choices)
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="push_notifications",
+    )
+    post = models.ForeignKey(
+        "community.CommunityPost",
+        on_delete=models.CASCADE,
+        related_name="push_notifications",
+    )
+    # Newest comment folded into this push, and how many comments it covers.
+    last_comment_id = models.BigIntegerField()
+    event_count = models.PositiveIntegerField(default=1)
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    # End of the coalescing window, then the next retry (or a dispatcher's lease).
+    send_after = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        verbose_name = "Push Notification"
+        verbose_name_plural = "Push Notifications"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "send_after"], name="mobileapi_push_due_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "recipient", "post"],
+                condition=models.Q(status="pending"),
+                name="mobileapi_push_one_pending_per_post",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} push to user {self.recipient_id} ({self.status}, {self.event_count} events)"
@@ -0,0 +1,200 @@
+"""
+Keyset (cursor) pagination for the community feed and comment lists.
+
+A cursor is the ordering key of the last row a client has seen, encoded as
+URL-safe base64 JSON together with a tag for the ordering it belongs to. The
+next page is ``WHERE (a, b, ..., id) < (cursor)`` (``>`` for ascending
+orderings) followed by ``LIMIT page_size + 1``. A row-value comparison lets
+PostgreSQL and SQLite seek straight to the cursor through the matching
+composite index. Unlike OFFSET, nothing before the cursor is read. Orderings
+that mix directions fall back to the lexicographic OR-chain.
+
+Every ordering must end in a unique field (``id``) so keys never tie. Keys
+may also be numeric annotations (the search rank); those travel as JSON
+numbers.
+
+A keyset cursor is only as stable as its keys. ``published_at`` and ``id``
+never change, so ``new`` pages never repeat or skip a row. A ``vote_score``
+key moves with every vote: a row voted up past the cursor is skipped, and a
+row voted down below it is shown again. The ``hot`` score also changes on
+every decay run, which reorders most of the feed. ``snapshot_page`` is for
+those listings. Its first page freezes the ids of the first rows in the
+default cache, and the cursor pages through that list by position.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import BooleanField, F, Func, Q, Value
+
+SNAPSHOT_CACHE_PREFIX = 'cursor_snapshot'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _field_name(order_field):
+    return order_field.lstrip('-')
+
+
+def _key_values(obj, ordering):
+    return [getattr(obj, _field_name(field)) for field in ordering]
+
+
+def _encode_payload(data):
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def encode_cursor(obj, ordering, tag, **extra):
+    """Cursor after ``obj``; ``extra`` (JSON values) travels alongside the key."""
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in _key_values(obj, ordering)
+    ]
+    return _encode_payload({**extra, 't': tag, 'k': values})
+
+
+def _key_to_python(model, name, value):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # An annotation; only numeric ones are used as keys.
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidCursor('Malformed cursor.')
+        return value
+    return field.to_python(value)
+
+
+def _payload(cursor, ordering, tag):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if data['t'] != tag or len(data['k']) != len(ordering):
+            raise InvalidCursor('Cursor does not match this listing.')
+        return data
+    except InvalidCursor:
+        raise
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursor('Malformed cursor.') from exc
+
+
+def decode_cursor(cursor, model, ordering, tag):
+    """Return the typed key values stored in ``cursor``; raise InvalidCursor on anything else."""
+    values = _payload(cursor, ordering, tag)['k']
+    try:
+        return [
+            _key_to_python(model, _field_name(field), value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError, ValidationError) as exc:
+        raise InvalidCursor('Malformed cursor.') from exc
+
+
+class _RowAfter(Func):
+    """``(f1, f2, ...) < (v1, v2, ...)``, or ``>`` for an ascending ordering."""
+
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, ordering, values):
+        self.operator = '<' if ordering[0].startswith('-') else '>'
+        super().__init__(
+            *[F(_field_name(field)) for field in ordering],
+            *[Value(value) for value in values],
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+        half = len(parts) // 2
+        return f"({', '.join(parts[:half])}) {self.operator} ({', '.join(parts[half:])})", params
+
+
+def _after(ordering, values):
+    """Condition for rows strictly after ``values`` in ``ordering``."""
+    if len({field.startswith('-') for field in ordering}) == 1:
+        return _RowAfter(ordering, values)
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = _field_name(field)
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def keyset_page(ordered_qs, ordering, page_size, tag, cursor=None):
+    """Return ``(rows, next_cursor)`` for the page after ``cursor`` (first page when empty)."""
+    qs = ordered_qs
+    if cursor:
+        qs = qs.filter(_after(ordering, decode_cursor(cursor, qs.model, ordering, tag)))
+    rows = list(qs[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1], ordering, tag)
+
+
+def _snapshot_key(digest):
+    return f'{SNAPSHOT_CACHE_PREFIX}:{digest}'
+
+
+def snapshot_page(ordered_qs, ordering, page_size, tag, cursor, limit, ttl):
+    """Like ``keyset_page``, for orderings whose keys change between page loads.
+
+    The first page stores the ids of the first ``limit`` rows (a multiple of
+    ``page_size``) for ``ttl`` seconds. Later pages slice that list, so no row
+    in it is repeated or skipped, whatever happens to its score. Rows deleted
+    or hidden since are left out. Past the end of a full list, pages continue
+    by keyset after its last row, excluding the listed ids. Cursors also carry
+    the keys of their last row: once the list has expired, or for a plain
+    ``keyset_page`` cursor, the walk continues by keyset from there.
+    """
+    data = None
+    if cursor:
+        data = _payload(cursor, ordering, tag)
+        digest, offset = data.get('s'), data.get('i')
+        ids = cache.get(_snapshot_key(digest)) if isinstance(digest, str) else None
+        if ids is None or not isinstance(offset, int) or offset < 0:
+            return keyset_page(ordered_qs, ordering, page_size, tag, cursor=cursor)
+    else:
+        ids = list(ordered_qs.values_list('pk', flat=True)[:limit])
+        digest = hashlib.sha256(json.dumps([tag, ids]).encode('utf-8')).hexdigest()[:32]
+        cache.set(_snapshot_key(digest), ids, ttl)
+        offset = 0
+
+    if data is not None and offset >= len(ids):
+        # Past a full list: keyset from the cursor, skipping the rows the list already showed.
+        qs = ordered_qs.exclude(pk__in=ids).filter(
+            _after(ordering, decode_cursor(cursor, ordered_qs.model, ordering, tag))
+        )
+        rows = list(qs[:page_size + 1])
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1], ordering, tag, s=digest, i=offset)
+
+    window = ids[offset:offset + page_size]
+    by_pk = ordered_qs.in_bulk(window)
+    rows = [by_pk[pk] for pk in window if pk in by_pk]
+    offset += page_size
+    if offset >= len(ids) and len(ids) < limit:
+        return rows, None
+    if rows:
+        return rows, encode_cursor(rows[-1], ordering, tag, s=digest, i=offset)
+    if data is None:
+        # The listed rows vanished before this first page was read.
+        return rows, None
+    # Every row on this page is gone; the previous cursor's keys still hold.
+    return rows, _encode_payload({**data, 'i': offset})
@@ -1,10 +1,49 @@
+"""
+Transactional OneSignal pushes, sent from a database outbox.
+
+Creating a comment used to POST to OneSignal inline, so a slow OneSignal held
+up the comment response and every push opened a fresh TLS connection. Now
+``enqueue_post_comment_notification`` records a ``PushNotification`` row and
+returns. ``dispatch_due``, run by ``manage.py dispatch_push_notifications
+--loop``, sends the rows whose time has come.
+
+* Coalescing: there is at most one pending row per (recipient, post); a
+  partial unique constraint enforces it. Another comment on the same post
+  bumps that row's ``event_count`` and ``last_comment_id``. It does not extend
+  ``send_after``, so the first comment waits at most
+  ``PUSH_OUTBOX["COALESCE_SECONDS"]``. The author then gets one "N new
+  replies" push instead of N pushes.
+* Claiming: a dispatcher locks due rows with SKIP LOCKED and moves their
+  ``send_after`` past a lease, so several dispatchers can share the outbox. A
+  crashed dispatcher's rows become due again when the lease runs out.
+* Retries: network errors, 429 and 5xx retry after ``BACKOFF_BASE_SECONDS``,
+  doubling up to ``BACKOFF_MAX_SECONDS``, and never sooner than a
+  Retry-After header. Other 4xx responses, and the last of ``MAX_ATTEMPTS``,
+  mark the row failed. Each row carries an idempotency key, so OneSignal
+  drops a retry of a send whose response was lost.
+* Metrics: every row keeps ``attempts``, ``latency_ms``, ``sent_at`` and
+  ``last_error``. ``dispatch_due`` returns per-run totals, which the command
+  prints.
+* HTTP: one pooled ``requests.Session`` per process.
+"""
+
 import logging
+import os
+import threading
+import time
+import uuid
+from datetime import timedelta
 
 import requests
 from django.conf import settings
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 
-from community.models import UserBlock
+from . import community_cache
+from .models import PushNotification
 
 logger = logging.getLogger(__name__)
 
@@ -13,23 +52,47 @@ _COMMENT_NOTIFICATION_TITLE = "Ooh, good answer... \U0001F440"
 _COMMENT_NOTIFICATION_BODY = (
     "The community is cooking. Tap to see the latest reply to your post!"
 )
+_COMMENT_DIGEST_BODY = (
+    "The community is cooking. Tap to see {count} new replies to your post!"
+)
 
+_DEFAULTS = {
+    "COALESCE_SECONDS": 60,
+    "BATCH_SIZE": 100,
+    "MAX_ATTEMPTS": 6,
+    "BACKOFF_BASE_SECONDS": 30,
+    "BACKOFF_MAX_SECONDS": 3600,
+    "TIMEOUT_SECONDS": 8.0,
+    "POOL_SIZE": 10,
+}
 
-def send_post_comment_notification(
+
+def outbox_settings() -> dict:
+    return {**_DEFAULTS, **getattr(settings, "PUSH_OUTBOX", {})}
+
+
+def _onesignal_keys():
+    app_id = getattr(settings, "ONESIGNAL_APP_ID", "").strip()
+    rest_api_key = getattr(settings, "ONESIGNAL_REST_API_KEY", "").strip()
+    return app_id, rest_api_key
+
+
+# --- Enqueue ----------------------------------------------------------------
+
+def enqueue_post_comment_notification(
     *,
     post_author_id: int | None,
     comment_author_id: int | None,
     post_id: int,
     comment_id: int,
 ) -> bool:
-    """Best-effort transactional push for post-comment events."""
+    """Queue a push for a new comment, folding it into a pending one; True if queued."""
     enabled = getattr(settings, "ONESIGNAL_COMMENT_NOTIFICATIONS_ENABLED", True)
     if not enabled:
         logger.debug("Comment push disabled via ONESIGNAL_COMMENT_NOTIFICATIONS_ENABLED.")
         return False
 
-    app_id = getattr(settings, "ONESIGNAL_APP_ID", "").strip()
-    rest_api_key = getattr(settings, "ONESIGNAL_REST_API_KEY", "").strip()
+    app_id, rest_api_key = _onesignal_keys()
     if not app_id or not rest_api_key:
         logger.debug("OneSignal keys missing; skipping comment push.")
         return False
@@ -46,11 +109,7 @@ def send_post_comment_notification(
         logger.debug("Comment push skipped for self-comment on post %s.", post_id)
         return False
 
-    blocked = UserBlock.objects.filter(
-        Q(blocker_id=post_author_id, blocked_user_id=comment_author_id)
-        | Q(blocker_id=comment_author_id, blocked_user_id=post_author_id)
-    ).exists()
-    if blocked:
+    if community_cache.is_blocked_between(post_author_id, comment_author_id):
         logger.debug(
             "Comment push suppressed due to block relationship. post_author_id=%s comment_author_id=%s",
             post_author_id,
@@ -58,49 +117,224 @@ def send_post_comment_notification(
         )
         return False
 
-    headers = {
-        "Authorization": f"Key {rest_api_key}",
-        "Content-Type": "application/json; charset=utf-8",
+    pending = PushNotification.objects.filter(
+        kind=PushNotification.Kind.POST_COMMENT,
+        recipient_id=post_author_id,
+        post_id=post_id,
+        status=PushNotification.Status.PENDING,
+    )
+    if _fold_into(pending, comment_id):
+        return True
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            PushNotification.objects.create(
+                kind=PushNotification.Kind.POST_COMMENT,
+                recipient_id=post_author_id,
+                post_id=post_id,
+                last_comment_id=comment_id,
+                send_after=now + timedelta(seconds=outbox_settings()["COALESCE_SECONDS"]),
+            )
+    except IntegrityError:
+        # Another comment opened the window between the update and the insert.
+        _fold_into(pending, comment_id)
+    return True
+
+
+def _fold_into(pending, comment_id) -> bool:
+    return bool(
+        pending.update(
+            event_count=F("event_count") + 1,
+            last_comment_id=Greatest(F("last_comment_id"), Value(comment_id)),
+            updated_at=timezone.now(),
+        )
+    )
+
+
+# --- HTTP -------------------------------------------------------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """The process-wide keep-alive session used for every OneSignal call."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=outbox_settings()["POOL_SIZE"])
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _forget_session() -> None:
+    # A forked child must not share the parent's sockets.
+    global _session
+    _session = None
+
+
+os.register_at_fork(after_in_child=_forget_session)
+
+
+def _comment_payload(app_id: str, notification: PushNotification) -> dict:
+    count = notification.event_count
+    data = {
+        "action": "community_comment",
+        "post_id": notification.post_id,
+        "comment_id": notification.last_comment_id,
     }
-    payload = {
+    body = _COMMENT_NOTIFICATION_BODY
+    if count > 1:
+        data["comment_count"] = count
+        body = _COMMENT_DIGEST_BODY.format(count=count)
+    return {
         "app_id": app_id,
+        # Stable across retries of the same push, so OneSignal drops duplicates.
+        "idempotency_key": str(uuid.uuid5(uuid.NAMESPACE_URL, f"push:{notification.pk}:{count}")),
         "target_channel": "push",
         "include_aliases": {
-            "external_id": [str(post_author_id)],
+            "external_id": [str(notification.recipient_id)],
         },
         "headings": {"en": _COMMENT_NOTIFICATION_TITLE},
-        "contents": {"en": _COMMENT_NOTIFICATION_BODY},
-        "data": {
-            "action": "community_comment",
-            "post_id": post_id,
-            "comment_id": comment_id,
-        },
+        "contents": {"en": body},
+        "data": data,
     }
 
+
+def _retry_after_seconds(response) -> int | None:
     try:
-        response = requests.post(
-            _ONESIGNAL_NOTIFICATIONS_URL,
+        return max(0, int(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _send(notification, app_id, rest_api_key, opts):
+    """POST one push; return ``(outcome, error, latency_ms, retry_after)``."""
+    url = getattr(settings, "ONESIGNAL_NOTIFICATIONS_URL", "") or _ONESIGNAL_NOTIFICATIONS_URL
+    headers = {
+        "Authorization": f"Key {rest_api_key}",
+        "Content-Type": "application/json; charset=utf-8",
+    }
+    started = time.monotonic()
+    try:
+        response = http_session().post(
+            url,
             headers=headers,
-            json=payload,
-            timeout=8,
+            json=_comment_payload(app_id, notification),
+            timeout=opts["TIMEOUT_SECONDS"],
         )
-    except requests.RequestException:
-        logger.warning(
-            "OneSignal comment push request failed for post_id=%s comment_id=%s.",
-            post_id,
-            comment_id,
-            exc_info=True,
+    except requests.RequestException as exc:
+        latency_ms = int((time.monotonic() - started) * 1000)
+        return "retry", f"{type(exc).__name__}: {exc}", latency_ms, None
+    latency_ms = int((time.monotonic() - started) * 1000)
+
+    if response.status_code < 400:
+        return "sent", "", latency_ms, None
+    error = f"HTTP {response.status_code}: {response.text[:400]}"
+    if response.status_code == 429 or response.status_code >= 500:
+        return "retry", error, latency_ms, _retry_after_seconds(response)
+    return "failed", error, latency_ms, None
+
+
+# --- Dispatch ---------------------------------------------------------------
+
+def _claim_due(now, batch_size, opts):
+    """Lock up to ``batch_size`` due rows and lease them to this dispatcher."""
+    with transaction.atomic():
+        batch = list(
+            PushNotification.objects.select_for_update(skip_locked=True)
+            .filter(status=PushNotification.Status.PENDING, send_after__lte=now)
+            .order_by("send_after", "pk")[:batch_size]
         )
-        return False
+        if batch:
+            # Long enough to work through the whole batch at the request timeout.
+            lease = timedelta(seconds=opts["TIMEOUT_SECONDS"] * (len(batch) + 1))
+            PushNotification.objects.filter(pk__in=[row.pk for row in batch]).update(send_after=now + lease)
+    return batch
 
-    if response.status_code >= 400:
-        logger.warning(
-            "OneSignal comment push failed with status=%s for post_id=%s comment_id=%s. body=%s",
-            response.status_code,
-            post_id,
-            comment_id,
-            response.text[:400],
+
+def _mark_sent(notification, latency_ms, now, opts) -> None:
+    with transaction.atomic():
+        current = PushNotification.objects.select_for_update().filter(pk=notification.pk).first()
+        if current is None:
+            return
+        PushNotification.objects.filter(pk=notification.pk).update(
+            status=PushNotification.Status.SENT,
+            attempts=notification.attempts + 1,
+            sent_at=now,
+            latency_ms=latency_ms,
+            last_error="",
+            event_count=notification.event_count,
+            last_comment_id=notification.last_comment_id,
+            updated_at=now,
         )
-        return False
+        extra = current.event_count - notification.event_count
+        if extra > 0:
+            # Comments folded in while this push was in flight open a new window.
+            PushNotification.objects.create(
+                kind=notification.kind,
+                recipient_id=notification.recipient_id,
+                post_id=notification.post_id,
+                last_comment_id=current.last_comment_id,
+                event_count=extra,
+                send_after=now + timedelta(seconds=opts["COALESCE_SECONDS"]),
+            )
 
-    return True
+
+def backoff_seconds(attempts: int, opts=None) -> int:
+    """Delay before the next try after ``attempts`` failed ones."""
+    opts = opts or outbox_settings()
+    return min(opts["BACKOFF_BASE_SECONDS"] * 2 ** (attempts - 1), opts["BACKOFF_MAX_SECONDS"])
+
+
+def dispatch_due(now=None, batch_size=None) -> dict:
+    """Send one batch of due pushes; return this run's delivery totals.
+
+    Each row's ``sent_at``, backoff and new coalescing window are taken from
+    the time its own send finished. Passing ``now`` pins that clock (tests).
+    """
+    opts = outbox_settings()
+    totals = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0, "comments": 0, "latency_ms": 0}
+    app_id, rest_api_key = _onesignal_keys()
+    if not app_id or not rest_api_key:
+        return totals
+
+    clock = (lambda: now) if now else timezone.now
+    batch = _claim_due(clock(), batch_size or opts["BATCH_SIZE"], opts)
+    totals["claimed"] = len(batch)
+    for notification in batch:
+        outcome, error, latency_ms, retry_after = _send(notification, app_id, rest_api_key, opts)
+        totals["latency_ms"] += latency_ms
+        attempts = notification.attempts + 1
+        # Sends are sequential: later rows in the batch finish well after the claim.
+        sent_now = clock()
+
+        if outcome == "sent":
+            _mark_sent(notification, latency_ms, sent_now, opts)
+            totals["sent"] += 1
+            totals["comments"] += notification.event_count
+            continue
+
+        updates = {"attempts": attempts, "latency_ms": latency_ms, "last_error": error, "updated_at": sent_now}
+        if outcome == "retry" and attempts < opts["MAX_ATTEMPTS"]:
+            delay = max(backoff_seconds(attempts, opts), retry_after or 0)
+            updates["send_after"] = sent_now + timedelta(seconds=delay)
+            totals["retried"] += 1
+        else:
+            updates["status"] = PushNotification.Status.FAILED
+            totals["failed"] += 1
+            logger.warning(
+                "OneSignal push %s failed after %s attempt(s) for post_id=%s: %s",
+                notification.pk,
+                attempts,
+                notification.post_id,
+                error,
+            )
+        PushNotification.objects.filter(pk=notification.pk).update(**updates)
+
+    if batch:
+        logger.info("Push outbox run %s", totals)
+    return totals
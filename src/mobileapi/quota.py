@@ -0,0 +1,184 @@
+"""
+Lock-free quota counters for the mobile credit pools.
+
+Each consume is a single conditional ``UPDATE ... SET used = used + 1 WHERE
+used < limit`` built from F-expressions, so concurrent generations from one
+account never serialize on a ``select_for_update`` row lock. Window rollovers
+(new UTC day, 7-day legacy window) are folded into the same statement: a stale
+row is treated as zero and its window restarted in place.
+"""
+
+from datetime import datetime, time as dt_time, timedelta
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from conversation.models import ChatCredit, DeviceDailyUsage
+
+
+def _start_of_day(now: datetime) -> datetime:
+    return datetime.combine(now.date(), dt_time.min, tzinfo=now.tzinfo)
+
+
+def _stale(reset_field: str, window_start: datetime) -> Q:
+    return Q(**{f"{reset_field}__isnull": True}) | Q(**{f"{reset_field}__lt": window_start})
+
+
+def _windowed(stale: Q, default):
+    """``0`` for a stale window, ``default`` otherwise."""
+    return Case(When(stale, then=Value(0)), default=default, output_field=IntegerField())
+
+
+def increment_counter(
+    pk: int,
+    field: str,
+    *,
+    reset_field: str,
+    window_start: datetime,
+    limit: Optional[int] = None,
+    also_reset: Iterable[str] = (),
+    now: Optional[datetime] = None,
+) -> bool:
+    """Atomically add one to ``ChatCredit.<field>``; return False at ``limit``.
+
+    When ``reset_field`` is older than ``window_start`` the counter (and every
+    ``also_reset`` sibling) counts from zero and the window restarts at ``now``.
+    """
+    if limit is not None and limit <= 0:
+        return False
+    now = now or timezone.now()
+    stale = _stale(reset_field, window_start)
+    current = _windowed(stale, F(field))
+    updates = {
+        field: current + 1,
+        reset_field: Case(When(stale, then=Value(now)), default=F(reset_field)),
+    }
+    for sibling in also_reset:
+        updates[sibling] = _windowed(stale, F(sibling))
+
+    qs = ChatCredit.objects.filter(pk=pk)
+    if limit is not None:
+        qs = qs.filter(stale | Q(**{f"{field}__lt": limit}))
+    return qs.update(**updates) == 1
+
+
+def consume_subscriber_daily(pk: int, usage_field: str, now: Optional[datetime] = None) -> None:
+    """Count one subscriber generation in today's degradation window."""
+    now = now or timezone.now()
+    siblings = {"subscriber_daily_openers", "subscriber_daily_replies"} - {usage_field}
+    increment_counter(
+        pk,
+        usage_field,
+        reset_field="subscriber_daily_reset_at",
+        window_start=_start_of_day(now),
+        also_reset=sorted(siblings),
+        now=now,
+    )
+
+
+def consume_subscriber_weekly(pk: int, limit: int, now: Optional[datetime] = None) -> bool:
+    """Count one action against the legacy weekly fair-use cap."""
+    now = now or timezone.now()
+    return increment_counter(
+        pk,
+        "subscriber_weekly_actions",
+        reset_field="subscriber_weekly_reset_at",
+        window_start=now - timedelta(days=7),
+        limit=limit,
+        now=now,
+    )
+
+
+def _ensure_device_row(device_hash: str, day) -> None:
+    # Upsert: a concurrent first request for the same device/day is a no-op.
+    DeviceDailyUsage.objects.bulk_create(
+        [DeviceDailyUsage(device_hash=device_hash, day=day, used_count=0)],
+        ignore_conflicts=True,
+    )
+
+
+def consume_free_credit(
+    pk: int,
+    limit: int,
+    device_hash: str = "",
+    now: Optional[datetime] = None,
+) -> Optional[int]:
+    """Claim one credit from the shared account + device daily pool.
+
+    Effective usage is ``max(account, device)``; a successful claim moves
+    both counters to at least ``effective + 1`` so switching accounts on a
+    device (or devices on an account) does not reset the pool. Returns the
+    new effective usage, or None when the pool is exhausted.
+    """
+    if limit <= 0:
+        return None
+    now = now or timezone.now()
+    day = now.date()
+    stale = _stale("free_daily_reset_at", _start_of_day(now))
+    account_used = _windowed(stale, F("free_daily_credits_used"))
+
+    if device_hash:
+        _ensure_device_row(device_hash, day)
+        device_used = Coalesce(
+            Subquery(
+                DeviceDailyUsage.objects.filter(device_hash=device_hash, day=day).values("used_count")[:1]
+            ),
+            Value(0),
+        )
+    else:
+        device_used = Value(0)
+    effective = Greatest(account_used, device_used, output_field=IntegerField())
+
+    with transaction.atomic():
+        claimed = (
+            ChatCredit.objects.filter(pk=pk)
+            .alias(effective_used=effective)
+            .filter(effective_used__lt=limit)
+            .update(
+                free_daily_credits_used=effective + 1,
+                free_daily_reset_at=Case(When(stale, then=Value(now)), default=F("free_daily_reset_at")),
+            )
+        )
+        if not claimed:
+            return None
+        if device_hash:
+            # The device counter is bumped with its own guard so two accounts
+            # racing on one device can never both take its last credit.
+            account_after = Subquery(
+                ChatCredit.objects.filter(pk=pk).values("free_daily_credits_used")[:1]
+            )
+            bumped = DeviceDailyUsage.objects.filter(
+                device_hash=device_hash,
+                day=day,
+                used_count__lt=limit,
+            ).update(
+                used_count=Greatest(F("used_count") + 1, account_after, output_field=IntegerField()),
+                last_seen=now,
+            )
+            if not bumped:
+                transaction.set_rollback(True)
+                return None
+        # Read back inside the transaction so the result matches this claim.
+        return read_free_usage(pk, device_hash, day)
+
+
+def read_free_usage(pk: int, device_hash: str = "", day=None) -> int:
+    """Current effective free-pool usage (one query)."""
+    day = day or timezone.now().date()
+    qs = ChatCredit.objects.filter(pk=pk)
+    if device_hash:
+        qs = qs.annotate(
+            device_used=Coalesce(
+                Subquery(
+                    DeviceDailyUsage.objects.filter(device_hash=device_hash, day=day).values("used_count")[:1]
+                ),
+                Value(0),
+            )
+        )
+        row = qs.values_list("free_daily_credits_used", "device_used").first()
+    else:
+        row = qs.values_list("free_daily_credits_used").first()
+    return max(row or (0,))
@@ -0,0 +1,276 @@
+"""
+Single-flight coalescing for duplicate generation requests.
+
+Double-taps and client retries send the same OCR or generation request twice
+within milliseconds. A flight is keyed by the caller (user, else device) plus
+a digest of the request payload. The first request leads: it takes a lock in
+the shared cache (``cache.add``, atomic on every configured backend, so the
+lock table spans threads and gunicorn workers) and runs the endpoint.
+Duplicates that arrive while it is in flight wait for the leader's response
+and return it unchanged. Credits are consumed and events logged only once.
+
+``coalesce`` wraps a flow (see ``mobileapi.flows``). Followers wait inside a
+``ModelCall`` so under ASGI the wait is awaited on the event loop instead of
+holding the sync thread. ``coalesce_stream`` does the same for SSE endpoints:
+the leader publishes its events in chunks and followers replay them as they
+arrive.
+
+Only in-flight requests are shared. Once the leader finishes, its lock is gone
+and the next identical request runs on its own, so "regenerate" still
+regenerates. If a leader dies without publishing, its followers run the
+endpoint themselves. Followers wait at most ``MOBILE_SINGLE_FLIGHT_WAIT_SECONDS``
+(for streams: without a new event), polling with backoff, then do the same.
+A stream follower that has already replayed events cannot start over; if the
+leader's stream stops before it completed, the follower ends with
+``STREAM_ABORTED_EVENT``.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .flows import ModelCall
+
+_PREFIX = "singleflight"
+_POLL_SECONDS = 0.025
+_MAX_POLL_SECONDS = 0.25
+_STREAM_FLUSH_SECONDS = 0.05
+_RESULT_TTL = 30
+STREAM_ABORTED_EVENT = "data: %s\n\n" % json.dumps(
+    {
+        "type": "error",
+        "error": "stream_interrupted",
+        "message": "The response was interrupted. Please try again.",
+    }
+)
+
+
+def _enabled() -> bool:
+    return getattr(settings, "MOBILE_SINGLE_FLIGHT_ENABLED", True)
+
+
+def _lock_ttl() -> int:
+    return getattr(settings, "MOBILE_SINGLE_FLIGHT_TTL", 120)
+
+
+def _wait_seconds() -> float:
+    return getattr(settings, "MOBILE_SINGLE_FLIGHT_WAIT_SECONDS", 20)
+
+
+def _backoff(delay: float) -> float:
+    return min(delay * 2, _MAX_POLL_SECONDS)
+
+
+def payload_digest(data: Any) -> str:
+    """Digest of a request payload; uploaded files are hashed by content."""
+    digest = hashlib.sha256()
+    items = data.items() if hasattr(data, "items") else []
+    for name, value in sorted(items, key=lambda item: item[0]):
+        digest.update(name.encode("utf-8") + b"\0")
+        if hasattr(value, "chunks"):
+            for chunk in value.chunks():
+                digest.update(chunk)
+            value.seek(0)
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def flight_key(endpoint: str, actor: str, data: Any) -> str:
+    actor_digest = hashlib.sha256(actor.encode("utf-8")).hexdigest()[:16]
+    return f"{_PREFIX}:{endpoint}:{actor_digest}:{payload_digest(data)}"
+
+
+class Flight:
+    """One caller's view of a flight: leader, or follower of ``token``."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.lock_key = f"{key}:lock"
+        self.token = uuid.uuid4().hex
+        if cache.add(self.lock_key, self.token, timeout=_lock_ttl()):
+            self.leader = True
+        else:
+            self.leader = False
+            self.token = cache.get(self.lock_key)
+            if self.token is None:
+                # The leader finished between add() and get(); run alone.
+                self.leader = None
+
+    def _result_key(self, token: str) -> str:
+        return f"{self.key}:{token}:result"
+
+    def release(self) -> None:
+        if cache.get(self.lock_key) == self.token:
+            cache.delete(self.lock_key)
+
+    # --- Response flights -------------------------------------------------
+
+    def publish(self, response) -> None:
+        if isinstance(response, Response):
+            cache.set(
+                self._result_key(self.token),
+                {"status": response.status_code, "data": response.data},
+                timeout=_RESULT_TTL,
+            )
+        self.release()
+
+    def _poll(self) -> Any:
+        """Leader's result, None while still in flight, False once it gave up."""
+        result = cache.get(self._result_key(self.token))
+        if result is not None:
+            return result
+        if cache.get(self.lock_key) != self.token:
+            # Lock released or expired: re-check for a result published just before.
+            return cache.get(self._result_key(self.token)) or False
+        return None
+
+    def wait(self) -> Optional[dict]:
+        """Leader's result, or None to run alone (it gave up, or took too long)."""
+        deadline = time.monotonic() + _wait_seconds()
+        delay = _POLL_SECONDS
+        while time.monotonic() < deadline:
+            result = self._poll()
+            if result is not None:
+                return result or None
+            time.sleep(delay)
+            delay = _backoff(delay)
+        return None
+
+    async def await_(self) -> Optional[dict]:
+        poll = sync_to_async(self._poll)
+        deadline = time.monotonic() + _wait_seconds()
+        delay = _POLL_SECONDS
+        while time.monotonic() < deadline:
+            result = await poll()
+            if result is not None:
+                return result or None
+            await asyncio.sleep(delay)
+            delay = _backoff(delay)
+        return None
+
+
+def coalesce(key_func: Callable[[Any], Optional[str]]):
+    """Decorate a flow so identical in-flight requests share one run.
+
+    ``key_func(request)`` returns the flight key, or None to skip coalescing.
+    """
+
+    def decorator(flow_func):
+        def flow(request):
+            key = key_func(request) if _enabled() else None
+            if not key:
+                return (yield from flow_func(request))
+            flight = Flight(key)
+            if flight.leader is False:
+                shared = yield ModelCall(flight.wait, flight.await_)
+                if shared is not None:
+                    return Response(shared["data"], status=shared["status"])
+            if not flight.leader:
+                return (yield from flow_func(request))
+            try:
+                response = yield from flow_func(request)
+            except BaseException:
+                flight.release()
+                raise
+            flight.publish(response)
+            return response
+
+        flow.__name__ = flow_func.__name__
+        flow.__doc__ = flow_func.__doc__
+        return flow
+
+    return decorator
+
+
+def coalesce_stream(key: Optional[str], produce: Callable[[], Iterable[str]]) -> Iterator[str]:
+    """Yield ``produce()``'s events, or replay an identical in-flight stream."""
+    if not key or not _enabled():
+        yield from produce()
+        return
+    flight = Flight(key)
+    if flight.leader is False:
+        replayed = yield from _follow_stream(flight)
+        if replayed:
+            return
+    if not flight.leader:
+        yield from produce()
+        return
+    yield from _lead_stream(flight, produce)
+
+
+def _chunk_key(flight: Flight, token: str, index: int) -> str:
+    return f"{flight.key}:{token}:chunk:{index}"
+
+
+def _lead_stream(flight: Flight, produce: Callable[[], Iterable[str]]) -> Iterator[str]:
+    count_key = f"{flight.key}:{flight.token}:count"
+    pending = {}
+    count = 0
+    last_flush = time.monotonic()
+
+    def flush(done=False):
+        nonlocal last_flush
+        if pending:
+            cache.set_many(pending, timeout=_RESULT_TTL)
+            pending.clear()
+        cache.set(count_key, {"count": count, "done": done}, timeout=_RESULT_TTL)
+        last_flush = time.monotonic()
+
+    try:
+        for event in produce():
+            pending[_chunk_key(flight, flight.token, count)] = event
+            count += 1
+            if time.monotonic() - last_flush >= _STREAM_FLUSH_SECONDS:
+                flush()
+            yield event
+        flush(done=True)
+    finally:
+        flight.release()
+
+
+def _follow_stream(flight: Flight):
+    """Replay the leader's events; return False if the caller should produce its own stream.
+
+    A follower that has sent events and loses the leader before ``done``
+    ends its stream with ``STREAM_ABORTED_EVENT``.
+    """
+    count_key = f"{flight.key}:{flight.token}:count"
+    sent = 0
+    deadline = time.monotonic() + _wait_seconds()
+    delay = _POLL_SECONDS
+    while time.monotonic() < deadline:
+        state = cache.get(count_key) or {"count": 0, "done": False}
+        if state["count"] > sent:
+            keys = [_chunk_key(flight, flight.token, i) for i in range(sent, state["count"])]
+            chunks = cache.get_many(keys)
+            if len(chunks) < len(keys):
+                # Chunks expired before we read them.
+                break
+            for chunk_key in keys:
+                yield chunks[chunk_key]
+            sent = state["count"]
+            # The wait limit is for silence; a leader still streaming is followed to the end.
+            deadline = time.monotonic() + _wait_seconds()
+            delay = _POLL_SECONDS
+        if state["done"]:
+            return True
+        if cache.get(flight.lock_key) != flight.token and not (cache.get(count_key) or {}).get("done"):
+            # Leader gone mid-stream.
+            break
+        time.sleep(delay)
+        delay = _backoff(delay)
+    if sent == 0:
+        # Nothing replayed yet: start over on our own.
+        return False
+    yield STREAM_ABORTED_EVENT
+    return True
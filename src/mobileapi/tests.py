@@ -1,10 +1,20 @@
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+import json
+import threading
+import time
 import requests
 
+from asgiref.sync import async_to_sync
+
 from django.contrib import admin
-from django.db import connection
+from django.db import OperationalError, connection, connections
+from conversation.config_snapshot import clear_local_snapshots
 from conversation.models import (
+    ChatCredit,
+    DeviceDailyUsage,
     RecommendedOpener,
     MobileAppConfig,
     DegradationTier,
@@ -12,18 +22,25 @@ from conversation.models import (
     TrialIP as ConversationTrialIP,
 )
 from django.core.cache import cache
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
-from django.test import RequestFactory, TestCase, override_settings
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from django_ratelimit.exceptions import Ratelimited
+from reignitehome import event_writer
 from reignitehome.models import MarketingClickEvent, TrialIP as HomeTrialIP
 from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
 from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from community import admin as community_admin, counters, ranking
 from community.models import (
+    CommentLike,
     CommunityComment,
     CommunityPost,
+    ContentReport,
     PollVote,
     PostPoll,
     PostVote,
@@ -31,14 +48,16 @@ from community.models import (
 )
 
 from mobileapi import admin as mobile_admin
-from mobileapi import views
+from mobileapi import community_cache, community_views, push_notifications, quota, singleflight, views
+from mobileapi.flows import ModelCall, arun_flow, run_flow
 from mobileapi.models import (
     MobileCopyEvent,
     MobileGenerationEvent,
     MobileInstallAttributionEvent,
     MobileReplyThread,
+    PushNotification,
 )
-from mobileapi.push_notifications import send_post_comment_notification
+from mobileapi.push_notifications import enqueue_post_comment_notification
 
 
 class RedactionHelperTests(TestCase):
@@ -278,6 +297,7 @@ class TokenRotationTests(TestCase):
         self.assertTrue(new_profile.data.get("success"))
 
 
+@override_settings(EVENT_WRITER={"MODE": "sync"})
 class PublicEndpointRateLimitTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -540,6 +560,7 @@ class PublicEndpointRateLimitTests(TestCase):
     MOBILE_RATELIMIT_GENERATE_OPENERS_DEVICE="100/m",
     MOBILE_RATELIMIT_EXTRACT_IP="100/m",
     MOBILE_RATELIMIT_EXTRACT_DEVICE="100/m",
+    EVENT_WRITER={"MODE": "sync"},
 )
 class MobileConfigRoutingTests(TestCase):
     def setUp(self):
@@ -581,6 +602,31 @@ class MobileConfigRoutingTests(TestCase):
         self.assertEqual(kwargs.get("fallback_model"), self.cfg.fallback_model)
         self.assertEqual(kwargs.get("thinking_level"), self.cfg.free_reply_thinking)
 
+    def test_reply_hedge_budget_is_passed_and_outcome_recorded(self):
+        self.cfg.reply_hedge_after_ms = 1800
+        self.cfg.save()
+        hedge = {"after_ms": 1800, "fired": True, "winner_role": "hedge", "extra_tokens": 0, "cancelled": 1}
+        meta = {"model_used": "gpt-4.1-mini-2025-04-14", "thinking_used": "n/a", "usage": {"total_tokens": 12}, "hedge": hedge}
+
+        with patch("mobileapi.views.generate_mobile_response", return_value=("reply", True, meta)) as mocked_generate:
+            response = self.client.post(
+                reverse("generate_text_with_credits"),
+                {"last_text": "hello", "situation": "just_matched", "tone": "Natural"},
+                format="json",
+                REMOTE_ADDR="203.0.113.22",
+                HTTP_X_DEVICE_FINGERPRINT="cfg-device-hedge",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mocked_generate.call_args.kwargs.get("hedge_after_ms"), 1800)
+        event = MobileGenerationEvent.objects.latest("id")
+        self.assertEqual(event.metadata["hedge"], hedge)
+
+        out = StringIO()
+        call_command("hedge_report", stdout=out)
+        self.assertIn("reply", out.getvalue())
+        self.assertIn("100.0%", out.getvalue())
+
     def test_guest_openers_use_configured_model_and_thinking(self):
         self.cfg.free_opener_model = "gemini-3-pro-preview"
         self.cfg.free_opener_thinking = "low"
@@ -880,6 +926,7 @@ class MobileConfigRoutingTests(TestCase):
     MOBILE_RATELIMIT_GENERATE_OPENERS_IP="100/m",
     MOBILE_RATELIMIT_GENERATE_OPENERS_DEVICE="100/m",
     MOBILE_RATELIMIT_RECOMMENDED_OPENERS_IP="100/m",
+    EVENT_WRITER={"MODE": "sync"},
 )
 class MobileAnalyticsEventTests(TestCase):
     def setUp(self):
@@ -1048,6 +1095,30 @@ class MobileAnalyticsEventTests(TestCase):
         self.assertEqual(event.total_tokens, 280)
         self.assertEqual(response.data.get("generation_event_id"), event.pk)
 
+    def test_extract_image_cache_hit_recorded_in_event_metadata(self):
+        cache_info = {"hit": True, "saved_tokens": 280, "hit_ratio": 0.25}
+        with patch(
+            "mobileapi.views.extract_conversation_from_image_mobile",
+            return_value=(
+                "you []: hi\nher []: hey",
+                True,
+                {"model_used": "gemini-3-flash-preview", "thinking_used": "low", "usage": {}, "cache": cache_info},
+            ),
+        ):
+            response = self.client.post(
+                reverse("extract_from_image_with_credits"),
+                {"screenshot": self._image("ocr-cache.png")},
+                format="multipart",
+                REMOTE_ADDR="203.0.113.109",
+                HTTP_X_DEVICE_FINGERPRINT="analytics-ocr-cache-device",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        event = MobileGenerationEvent.objects.latest("id")
+        self.assertEqual(event.total_tokens, 0)
+        self.assertEqual(event.metadata["cache"], cache_info)
+        self.assertEqual(event.metadata["endpoint"], "extract_from_image_with_credits")
+
     def test_generate_openers_logs_event_with_model_thinking_and_tokens(self):
         with patch(
             "mobileapi.views.generate_mobile_openers_from_image",
@@ -1106,6 +1177,47 @@ class MobileAnalyticsEventTests(TestCase):
         self.assertEqual(event.total_tokens, 0)
         self.assertEqual(response.data.get("generation_event_id"), event.pk)
 
+    @override_settings(EVENT_WRITER={"MODE": "background", "FLUSH_SECONDS": 60})
+    def test_queued_generation_event_id_is_accepted_before_its_row_is_written(self):
+        cache.clear()
+        RecommendedOpener.objects.create(text="Hey you.", why_it_works="Short.", is_active=True, sort_order=1)
+        writer = event_writer.EventWriter()
+
+        with patch.object(event_writer, "_writer", writer), patch.object(writer, "_ensure_thread"):
+            response = self.client.post(
+                reverse("recommended_openers"),
+                {"count": 1},
+                format="json",
+                REMOTE_ADDR="203.0.113.105",
+                HTTP_X_DEVICE_FINGERPRINT="analytics-queued-device",
+            )
+            event_id = response.data["generation_event_id"]
+            # Nothing flushed: this is what another worker sees.
+            self.assertFalse(MobileGenerationEvent.objects.filter(pk=event_id).exists())
+
+            copy_payload = {"copied_text": "Hey you.", "copy_type": "opener", "generation_event_id": event_id}
+            stranger = self.client.post(
+                reverse("mobile_copy_event"),
+                copy_payload,
+                format="json",
+                REMOTE_ADDR="203.0.113.106",
+                HTTP_X_DEVICE_FINGERPRINT="analytics-other-device",
+            )
+            owner = self.client.post(
+                reverse("mobile_copy_event"),
+                copy_payload,
+                format="json",
+                REMOTE_ADDR="203.0.113.105",
+                HTTP_X_DEVICE_FINGERPRINT="analytics-queued-device",
+            )
+
+        self.assertEqual(stranger.status_code, 400)
+        self.assertEqual(stranger.data["error"], "invalid_generation_event_id")
+        self.assertEqual(owner.status_code, 200)
+
+        writer._write(list(writer._queue.queue), 200)
+        self.assertEqual(MobileCopyEvent.objects.get().generation_event.pk, event_id)
+
     def test_recommended_openers_vault_guest_returns_full_archive_with_one_opened(self):
         RecommendedOpener.objects.all().delete()
         for idx in range(1, 6):
@@ -1428,6 +1540,7 @@ class MobileAnalyticsEventTests(TestCase):
 @override_settings(
     COMMUNITY_RATELIMIT_POST_CREATE="100/m",
     COMMUNITY_RATELIMIT_COMMENT_CREATE="100/m",
+    COMMUNITY_FEED_CACHE_SECONDS=0,
 )
 class CommunityApiTests(TestCase):
     def setUp(self):
@@ -2202,7 +2315,8 @@ class CommunityApiTests(TestCase):
             response = self.client.get(reverse("community_post_detail", args=[post.id]))
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data["comments"]), 30)
+        self.assertEqual(len(response.data["comments"]), 20)
+        self.assertTrue(response.data["comments_has_more"])
         self.assertLessEqual(
             len(query_ctx),
             8,
@@ -2218,13 +2332,12 @@ class CommunityApiTests(TestCase):
         )
         self._auth(self.other_token)
 
-        with patch("mobileapi.community_views.send_post_comment_notification") as send_mock:
-            with self.captureOnCommitCallbacks(execute=True):
-                response = self.client.post(
-                    reverse("community_post_comment", args=[post.id]),
-                    {"body": "New comment from another user."},
-                    format="json",
-                )
+        with patch("mobileapi.community_views.enqueue_post_comment_notification") as send_mock:
+            response = self.client.post(
+                reverse("community_post_comment", args=[post.id]),
+                {"body": "New comment from another user."},
+                format="json",
+            )
 
         self.assertEqual(response.status_code, 201)
         send_mock.assert_called_once()
@@ -2240,16 +2353,16 @@ class CommunityApiTests(TestCase):
         ONESIGNAL_COMMENT_NOTIFICATIONS_ENABLED=True,
     )
     def test_sender_skips_self_comment(self):
-        with patch("mobileapi.push_notifications.requests.post") as post_mock:
-            sent = send_post_comment_notification(
-                post_author_id=self.author.id,
-                comment_author_id=self.author.id,
-                post_id=123,
-                comment_id=456,
-            )
+        post = CommunityPost.objects.create(author=self.author, title="Mine", body="Body", category="wins")
+        sent = enqueue_post_comment_notification(
+            post_author_id=self.author.id,
+            comment_author_id=self.author.id,
+            post_id=post.id,
+            comment_id=456,
+        )
 
         self.assertFalse(sent)
-        post_mock.assert_not_called()
+        self.assertFalse(PushNotification.objects.exists())
 
     @override_settings(
         ONESIGNAL_APP_ID="test-app-id",
@@ -2258,17 +2371,17 @@ class CommunityApiTests(TestCase):
     )
     def test_sender_skips_when_users_are_blocked(self):
         UserBlock.objects.create(blocker=self.author, blocked_user=self.other_user)
+        post = CommunityPost.objects.create(author=self.author, title="Blocked", body="Body", category="wins")
 
-        with patch("mobileapi.push_notifications.requests.post") as post_mock:
-            sent = send_post_comment_notification(
-                post_author_id=self.author.id,
-                comment_author_id=self.other_user.id,
-                post_id=100,
-                comment_id=200,
-            )
+        sent = enqueue_post_comment_notification(
+            post_author_id=self.author.id,
+            comment_author_id=self.other_user.id,
+            post_id=post.id,
+            comment_id=200,
+        )
 
         self.assertFalse(sent)
-        post_mock.assert_not_called()
+        self.assertFalse(PushNotification.objects.exists())
 
     @override_settings(
         ONESIGNAL_APP_ID="test-app-id",
@@ -2276,22 +2389,25 @@ class CommunityApiTests(TestCase):
         ONESIGNAL_COMMENT_NOTIFICATIONS_ENABLED=True,
     )
     def test_sender_payload_uses_external_id_and_action_data(self):
+        post = CommunityPost.objects.create(author=self.author, title="Payload", body="Body", category="wins")
         response_mock = Mock()
         response_mock.status_code = 200
         response_mock.text = ""
+        session_mock = Mock()
+        session_mock.post.return_value = response_mock
 
-        with patch(
-            "mobileapi.push_notifications.requests.post",
-            return_value=response_mock,
-        ) as post_mock:
-            sent = send_post_comment_notification(
-                post_author_id=self.author.id,
-                comment_author_id=self.other_user.id,
-                post_id=77,
-                comment_id=88,
-            )
+        sent = enqueue_post_comment_notification(
+            post_author_id=self.author.id,
+            comment_author_id=self.other_user.id,
+            post_id=post.id,
+            comment_id=88,
+        )
+        with patch("mobileapi.push_notifications.http_session", return_value=session_mock):
+            totals = push_notifications.dispatch_due(now=timezone.now() + timedelta(hours=1))
 
         self.assertTrue(sent)
+        self.assertEqual(totals["sent"], 1)
+        post_mock = session_mock.post
         post_mock.assert_called_once()
         kwargs = post_mock.call_args.kwargs
         self.assertEqual(kwargs["headers"]["Authorization"], "Key test-rest-key")
@@ -2315,7 +2431,7 @@ class CommunityApiTests(TestCase):
             kwargs["json"]["data"],
             {
                 "action": "community_comment",
-                "post_id": 77,
+                "post_id": post.id,
                 "comment_id": 88,
             },
         )
@@ -2334,18 +2450,1063 @@ class CommunityApiTests(TestCase):
         )
         self._auth(self.other_token)
 
-        with patch(
-            "mobileapi.push_notifications.requests.post",
-            side_effect=requests.RequestException("network down"),
-        ):
-            with self.captureOnCommitCallbacks(execute=True):
-                response = self.client.post(
-                    reverse("community_post_comment", args=[post.id]),
-                    {"body": "Still should succeed."},
-                    format="json",
+        session_mock = Mock()
+        session_mock.post.side_effect = requests.RequestException("network down")
+
+        response = self.client.post(
+            reverse("community_post_comment", args=[post.id]),
+            {"body": "Still should succeed."},
+            format="json",
+        )
+        with patch("mobileapi.push_notifications.http_session", return_value=session_mock):
+            totals = push_notifications.dispatch_due(now=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(totals["retried"], 1)
+        notification = PushNotification.objects.get()
+        self.assertEqual(notification.status, PushNotification.Status.PENDING)
+        self.assertIn("network down", notification.last_error)
+
+
+class _OneSignalStub:
+    """Local HTTP server standing in for OneSignal; answers with queued statuses, then 200."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append(
+                    {"headers": dict(self.headers), "json": json.loads(body), "client_port": self.client_address[1]}
                 )
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                reply = b'{"id": "stub"}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.settings = override_settings(
+            ONESIGNAL_NOTIFICATIONS_URL=f"http://127.0.0.1:{self.server.server_port}/notifications"
+        )
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(
+    ONESIGNAL_APP_ID="test-app-id",
+    ONESIGNAL_REST_API_KEY="test-rest-key",
+    ONESIGNAL_COMMENT_NOTIFICATIONS_ENABLED=True,
+    PUSH_OUTBOX={"COALESCE_SECONDS": 60, "BACKOFF_BASE_SECONDS": 30, "MAX_ATTEMPTS": 3},
+)
+class CommunityPushOutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="pushauthor", password="StrongPass123!")
+        self.commenters = [
+            User.objects.create_user(username=f"pushcommenter{i}", password="StrongPass123!") for i in range(2)
+        ]
+        self.post = CommunityPost.objects.create(author=self.author, title="Push", body="Body", category="wins")
+
+    def _comment(self, user, post=None):
+        self.client.force_authenticate(user)
+        response = self.client.post(
+            reverse("community_post_comment", args=[(post or self.post).id]),
+            {"body": "Reply"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def _enqueue(self, post=None, comment_id=1):
+        return enqueue_post_comment_notification(
+            post_author_id=self.author.id,
+            comment_author_id=self.commenters[0].id,
+            post_id=(post or self.post).id,
+            comment_id=comment_id,
+        )
+
+    def test_comments_on_one_post_coalesce_into_one_push(self):
+        with _OneSignalStub() as stub:
+            comment_ids = [self._comment(user) for user in (*self.commenters, self.commenters[0])]
+            self.assertEqual(stub.requests, [])
+
+            notification = PushNotification.objects.get()
+            self.assertEqual(notification.event_count, 3)
+            self.assertEqual(notification.last_comment_id, comment_ids[-1])
+
+            self.assertEqual(push_notifications.dispatch_due()["claimed"], 0)
+            totals = push_notifications.dispatch_due(now=notification.send_after)
+
+        self.assertEqual((totals["sent"], totals["comments"]), (1, 3))
+        self.assertEqual(len(stub.requests), 1)
+        sent = stub.requests[0]
+        self.assertEqual(sent["headers"]["Authorization"], "Key test-rest-key")
+        self.assertEqual(sent["json"]["include_aliases"]["external_id"], [str(self.author.id)])
+        self.assertEqual(
+            sent["json"]["contents"],
+            {"en": "The community is cooking. Tap to see 3 new replies to your post!"},
+        )
+        self.assertEqual(
+            sent["json"]["data"],
+            {"action": "community_comment", "post_id": self.post.id, "comment_id": comment_ids[-1], "comment_count": 3},
+        )
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, PushNotification.Status.SENT)
+        self.assertEqual(notification.attempts, 1)
+        self.assertIsNotNone(notification.latency_ms)
+
+    def test_failed_sends_back_off_exponentially_then_deliver(self):
+        self._enqueue()
+        start = PushNotification.objects.get().send_after
+
+        with _OneSignalStub(statuses=[500, 503]) as stub:
+            self.assertEqual(push_notifications.dispatch_due(now=start)["retried"], 1)
+            self.assertEqual(PushNotification.objects.get().send_after, start + timedelta(seconds=30))
+
+            self.assertEqual(push_notifications.dispatch_due(now=start + timedelta(seconds=29))["claimed"], 0)
+            retry_at = start + timedelta(seconds=30)
+            self.assertEqual(push_notifications.dispatch_due(now=retry_at)["retried"], 1)
+            self.assertEqual(PushNotification.objects.get().send_after, retry_at + timedelta(seconds=60))
+
+            totals = push_notifications.dispatch_due(now=retry_at + timedelta(seconds=60))
+
+        self.assertEqual(totals["sent"], 1)
+        notification = PushNotification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), (PushNotification.Status.SENT, 3))
+        keys = {request["json"]["idempotency_key"] for request in stub.requests}
+        self.assertEqual((len(stub.requests), len(keys)), (3, 1))
+
+    def test_backoff_counts_from_each_rows_own_send(self):
+        other_post = CommunityPost.objects.create(author=self.author, title="Other", body="Body", category="wins")
+        self._enqueue()
+        self._enqueue(post=other_post)
+        PushNotification.objects.update(send_after=timezone.now() - timedelta(seconds=1))
+        send = push_notifications._send
+
+        def slow_send(*args, **kwargs):
+            time.sleep(0.2)
+            return send(*args, **kwargs)
+
+        before = timezone.now()
+        with _OneSignalStub(statuses=[500, 500]), patch.object(push_notifications, "_send", side_effect=slow_send):
+            self.assertEqual(push_notifications.dispatch_due()["retried"], 2)
+
+        first, second = PushNotification.objects.order_by("send_after")
+        self.assertGreaterEqual(first.send_after, before + timedelta(seconds=30.2))
+        self.assertGreaterEqual(second.send_after - first.send_after, timedelta(seconds=0.2))
+
+    def test_client_errors_and_exhausted_retries_mark_failed(self):
+        other_post = CommunityPost.objects.create(author=self.author, title="Other", body="Body", category="wins")
+        self._enqueue()
+        later = timezone.now() + timedelta(days=1)
+
+        with _OneSignalStub(statuses=[400]), self.assertLogs("mobileapi.push_notifications", "WARNING"):
+            self.assertEqual(push_notifications.dispatch_due(now=later)["failed"], 1)
+        self.assertEqual(PushNotification.objects.get().status, PushNotification.Status.FAILED)
+
+        self._enqueue(post=other_post)
+        with _OneSignalStub(statuses=[502, 502, 502]), self.assertLogs("mobileapi.push_notifications", "WARNING"):
+            for _ in range(3):
+                later += timedelta(hours=1)
+                totals = push_notifications.dispatch_due(now=later)
+        self.assertEqual(totals["failed"], 1)
+        notification = PushNotification.objects.get(post=other_post)
+        self.assertEqual((notification.status, notification.attempts), (PushNotification.Status.FAILED, 3))
+        self.assertIn("HTTP 502", notification.last_error)
+
+    def test_comment_arriving_mid_send_gets_its_own_push(self):
+        self._enqueue(comment_id=1)
+        send = push_notifications._send
+
+        def send_while_commented(*args, **kwargs):
+            self._enqueue(comment_id=2)
+            return send(*args, **kwargs)
+
+        with _OneSignalStub() as stub, patch.object(push_notifications, "_send", side_effect=send_while_commented):
+            push_notifications.dispatch_due(now=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(stub.requests[0]["json"]["data"]["comment_id"], 1)
+        sent, pending = (
+            PushNotification.objects.get(status=PushNotification.Status.SENT),
+            PushNotification.objects.get(status=PushNotification.Status.PENDING),
+        )
+        self.assertEqual((sent.event_count, sent.last_comment_id), (1, 1))
+        self.assertEqual((pending.event_count, pending.last_comment_id), (1, 2))
+
+    def test_pushes_share_one_pooled_connection(self):
+        other_post = CommunityPost.objects.create(author=self.author, title="Other", body="Body", category="wins")
+        self._enqueue()
+        self._enqueue(post=other_post)
+        PushNotification.objects.update(send_after=timezone.now() - timedelta(seconds=1))
+
+        with _OneSignalStub() as stub:
+            out = StringIO()
+            call_command("dispatch_push_notifications", stdout=out)
+
+        self.assertIn("Sent 2 push(es) covering 2 comment(s)", out.getvalue())
+        self.assertEqual(len({request["client_port"] for request in stub.requests}), 1)
+
+
+class CommunitySearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="searchauthor", password="StrongPass123!")
+        self.reader = User.objects.create_user(username="searchreader", password="StrongPass123!")
+        self.url = reverse("community_post_search")
+        now = timezone.now()
+        self.titled = CommunityPost.objects.create(
+            author=self.author, title="Texting after a first date", body="How soon is too soon?",
+            category="advice", published_at=now,
+        )
+        self.in_body = CommunityPost.objects.create(
+            author=self.author, title="Weekend plans", body="Should I keep texting her or wait?",
+            category="wins", published_at=now,
+        )
+        self.unrelated = CommunityPost.objects.create(
+            author=self.author, title="Gym crush", body="Say hi or not?", category="advice", published_at=now,
+        )
+
+    def _ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["posts"]]
+
+    def test_title_match_outranks_body_match_and_prefixes_match(self):
+        self.assertEqual(self._ids(q="text"), [self.titled.id, self.in_body.id])
+        self.assertEqual(self._ids(q="TEXTING first"), [self.titled.id])
+        self.assertEqual(self._ids(q="text", category="wins"), [self.in_body.id])
+
+    def test_posts_match_through_visible_comments_only(self):
+        comment = CommunityComment.objects.create(
+            post=self.unrelated, author=self.reader, body="Just smile and say hello at the squat rack."
+        )
+        self.assertEqual(self._ids(q="squat"), [self.unrelated.id])
+
+        comment.is_deleted = True
+        comment.save()
+        self.assertEqual(self._ids(q="squat"), [])
+
+    def test_edits_deletes_and_scheduled_posts_respect_visibility(self):
+        self.titled.title = "Calling after a first date"
+        self.titled.save()
+        self.assertEqual(self._ids(q="calling"), [self.titled.id])
+        self.assertNotIn(self.titled.id, self._ids(q="first texting"))
+
+        self.in_body.is_deleted = True
+        self.in_body.save()
+        self.assertEqual(self._ids(q="texting"), [])
+
+        self.unrelated.published_at = timezone.now() + timedelta(days=1)
+        self.unrelated.save()
+        self.assertEqual(self._ids(q="gym"), [])
+        staff = User.objects.create_user(username="searchstaff", password="StrongPass123!", is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertEqual(self._ids(q="gym"), [self.unrelated.id])
+
+    def test_blocked_authors_are_excluded_for_the_blocker(self):
+        other = User.objects.create_user(username="searchother", password="StrongPass123!")
+        CommunityComment.objects.create(post=self.unrelated, author=other, body="Texting works too.")
+        UserBlock.objects.create(blocker=self.reader, blocked_user=other)
+        UserBlock.objects.create(blocker=self.reader, blocked_user=self.author)
+
+        self.assertEqual(len(self._ids(q="texting")), 3)
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(self._ids(q="texting"), [])
+
+    def test_cursor_walk_returns_every_match_once(self):
+        for i in range(45):
+            CommunityPost.objects.create(
+                author=self.author, title=f"Ghosted {i}", body="ghosted " * (i % 4 + 1),
+                category="advice", published_at=timezone.now(),
+            )
+        ids, cursor, pages, first_cursor = [], None, 0, None
+        while True:
+            params = {"q": "ghosted"}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item["id"] for item in response.data["posts"])
+            pages += 1
+            cursor = response.data["next_cursor"]
+            first_cursor = first_cursor or cursor
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(ids), 45)
+        self.assertEqual(len(set(ids)), 45)
+
+        # A cursor belongs to the query that produced it.
+        other_query = self.client.get(self.url, {"q": "gym", "cursor": first_cursor})
+        self.assertEqual(other_query.status_code, 400)
+
+    def test_query_without_words_is_rejected(self):
+        for q in ("", "   ", "!!", "a"):
+            response = self.client.get(self.url, {"q": q})
+            self.assertEqual(response.status_code, 400)
+
+    def test_search_index_triggers_are_restored_after_migrate(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER community_post_fts_ai")
+        CommunityPost.objects.create(
+            author=self.author, title="Missed while unindexed", body="Body", category="advice",
+            published_at=timezone.now(),
+        )
+        self.assertEqual(self._ids(q="unindexed"), [])
+
+        call_command("migrate", "community", verbosity=0)
+
+        self.assertEqual(len(self._ids(q="unindexed")), 1)
 
+
+class CommunityCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="counterauthor", password="StrongPass123!")
+        self.voter = User.objects.create_user(username="countervoter", password="StrongPass123!")
+        self.voter_token = Token.objects.create(user=self.voter)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.voter_token.key}")
+        self.post = CommunityPost.objects.create(
+            author=self.author,
+            title="Counted",
+            body="Body",
+            category="wins",
+        )
+
+    def _counters(self):
+        self.post.refresh_from_db()
+        return (self.post.upvote_count, self.post.downvote_count, self.post.vote_score, self.post.comment_count)
+
+    def test_vote_up_switch_and_toggle_off_keep_counters_in_step(self):
+        url = reverse("community_post_vote", args=[self.post.id])
+
+        response = self.client.post(url, {"vote_type": "up"}, format="json")
+        self.assertEqual(response.data["vote_score"], 1)
+        self.assertEqual(self._counters(), (1, 0, 1, 0))
+
+        response = self.client.post(url, {"vote_type": "down"}, format="json")
+        self.assertEqual(response.data["vote_score"], -1)
+        self.assertEqual(self._counters(), (0, 1, -1, 0))
+
+        response = self.client.post(url, {"vote_type": "down"}, format="json")
+        self.assertEqual(response.data["vote_score"], 0)
+        self.assertEqual(self._counters(), (0, 0, 0, 0))
+
+    def test_comment_create_and_delete_adjust_comment_count(self):
+        response = self.client.post(
+            reverse("community_post_comment", args=[self.post.id]),
+            {"body": "First!"},
+            format="json",
+        )
         self.assertEqual(response.status_code, 201)
+        CommunityComment.objects.create(post=self.post, author=self.author, body="Second")
+        self.assertEqual(self._counters()[3], 2)
+
+        comment_id = response.data["id"]
+        response = self.client.delete(reverse("community_comment_delete", args=[comment_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._counters()[3], 1)
+
+        # Deleting twice must not decrement again.
+        response = self.client.delete(reverse("community_comment_delete", args=[comment_id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self._counters()[3], 1)
+
+    def test_comment_like_toggle_adjusts_like_count(self):
+        comment = CommunityComment.objects.create(post=self.post, author=self.author, body="Like me")
+        url = reverse("community_comment_like", args=[comment.id])
+
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"liked": True, "like_count": 1})
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"liked": False, "like_count": 0})
+        comment.refresh_from_db()
+        self.assertEqual(comment.like_count, 0)
+
+    def test_feed_reads_counters_without_joining_votes(self):
+        PostVote.objects.create(user=self.voter, post=self.post, vote_type="up")
+        CommunityComment.objects.create(post=self.post, author=self.author, body="Hi")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("community_post_list"), {"sort": "top"})
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.data["posts"][0]
+        self.assertEqual((payload["vote_score"], payload["comment_count"]), (1, 1))
+        feed_sql = [q["sql"] for q in ctx.captured_queries if 'FROM "community_communitypost"' in q["sql"]]
+        self.assertTrue(feed_sql)
+        self.assertFalse(any("community_postvote" in sql for sql in feed_sql))
+
+    def test_reconcile_repairs_drift(self):
+        PostVote.objects.create(user=self.voter, post=self.post, vote_type="up")
+        comment = CommunityComment.objects.create(post=self.post, author=self.author, body="Hi")
+        CommentLike.objects.create(user=self.voter, comment=comment)
+        CommunityPost.objects.filter(pk=self.post.pk).update(vote_score=99, comment_count=7)
+        CommunityComment.objects.filter(pk=comment.pk).update(like_count=5)
+
+        self.assertEqual(counters.reconcile_posts(dry_run=True), 1)
+        self.assertEqual(self._counters(), (1, 0, 99, 7))
+
+        out = StringIO()
+        call_command("reconcile_community_counters", stdout=out)
+        self.assertIn("Posts fixed: 1. Comments fixed: 1. Polls fixed: 0.", out.getvalue())
+        self.assertEqual(self._counters(), (1, 0, 1, 1))
+        comment.refresh_from_db()
+        self.assertEqual(comment.like_count, 1)
+        self.assertEqual(counters.reconcile_posts(), 0)
+
+    def _poll_counts(self, poll):
+        poll.refresh_from_db()
+        return (poll.send_it_count, poll.dont_send_it_count)
+
+    def test_poll_vote_switch_and_toggle_off_keep_tallies_in_step(self):
+        poll = PostPoll.objects.create(post=self.post)
+        url = reverse("community_poll_vote", args=[self.post.id])
+
+        response = self.client.post(url, {"choice": "send_it"}, format="json")
+        self.assertEqual((response.data["send_it_count"], response.data["dont_send_it_count"]), (1, 0))
+        response = self.client.post(url, {"choice": "dont_send_it"}, format="json")
+        self.assertEqual((response.data["send_it_count"], response.data["dont_send_it_count"]), (0, 1))
+        self.assertEqual(self._poll_counts(poll), (0, 1))
+        response = self.client.post(url, {"choice": "dont_send_it"}, format="json")
+        self.assertEqual(response.data["user_vote"], None)
+        self.assertEqual(self._poll_counts(poll), (0, 0))
+
+        # Rows written outside the API (admin inline, seed commands) count too.
+        vote = PollVote.objects.create(poll=poll, user=self.author, choice="send_it")
+        self.assertEqual(self._poll_counts(poll), (1, 0))
+        vote.choice = "dont_send_it"
+        vote.save()
+        self.assertEqual(self._poll_counts(poll), (0, 1))
+        vote.delete()
+        self.assertEqual(self._poll_counts(poll), (0, 0))
+
+    def test_reconcile_repairs_poll_drift(self):
+        poll = PostPoll.objects.create(post=self.post)
+        PollVote.objects.create(poll=poll, user=self.voter, choice="send_it")
+        PostPoll.objects.filter(pk=poll.pk).update(send_it_count=4, dont_send_it_count=2)
+
+        self.assertEqual(counters.reconcile_polls(dry_run=True), 1)
+        out = StringIO()
+        call_command("reconcile_community_counters", stdout=out)
+        self.assertIn("Polls fixed: 1.", out.getvalue())
+        self.assertEqual(self._poll_counts(poll), (1, 0))
+
+
+class CommunityPollTallyConcurrencyTests(TransactionTestCase):
+    """Many voters switching and toggling on one poll must leave exact tallies."""
+
+    THREADS = 8
+    ROUNDS = 6
+    CHOICES = ("send_it", "dont_send_it")
+
+    def _sequence(self, index):
+        # Deterministic per-thread mix of first votes, switches and toggle-offs.
+        return [self.CHOICES[(index + round_ // (1 + index % 3)) % 2] for round_ in range(self.ROUNDS)]
+
+    def test_concurrent_votes_match_vote_rows(self):
+        author = User.objects.create_user(username="pollracehost", password="x")
+        post = CommunityPost.objects.create(author=author, title="Send it?", body="Body", category="wins")
+        poll = PostPoll.objects.create(post=post)
+        tokens = [
+            Token.objects.create(user=User.objects.create_user(username=f"pollracer{i}", password="x")).key
+            for i in range(self.THREADS)
+        ]
+        url = reverse("community_poll_vote", args=[post.id])
+        factory = APIRequestFactory()
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for choice in self._sequence(index):
+                    while True:
+                        # Call the view directly: the test client re-raises any thread's
+                        # request exception (got_request_exception is global).
+                        request = factory.post(
+                            url, {"choice": choice}, format="json", HTTP_AUTHORIZATION=f"Token {tokens[index]}"
+                        )
+                        try:
+                            response = community_views.community_poll_vote(request, post_id=post.id)
+                            break
+                        except OperationalError as exc:
+                            # SQLite reports lock contention instead of blocking.
+                            if "locked" not in str(exc):
+                                raise
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        expected = {choice: 0 for choice in self.CHOICES}
+        for index in range(self.THREADS):
+            vote = None
+            for choice in self._sequence(index):
+                vote = None if vote == choice else choice
+            if vote:
+                expected[vote] += 1
+
+        poll.refresh_from_db()
+        rows = {choice: PollVote.objects.filter(poll=poll, choice=choice).count() for choice in self.CHOICES}
+        self.assertEqual(rows, expected)
+        self.assertEqual(
+            (poll.send_it_count, poll.dont_send_it_count),
+            (rows["send_it"], rows["dont_send_it"]),
+        )
+        self.assertEqual(counters.reconcile_polls(), 0)
+
+
+@override_settings(COMMUNITY_FEED_CACHE_SECONDS=0)
+class CommunityHotRankingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="hotauthor", password="StrongPass123!")
+        self.voters = [
+            User.objects.create_user(username=f"hotvoter{i}", password="StrongPass123!") for i in range(6)
+        ]
+
+    def _post(self, title, age):
+        return CommunityPost.objects.create(
+            author=self.author,
+            title=title,
+            body="Body",
+            category="wins",
+            published_at=timezone.now() - age,
+        )
+
+    def _upvote(self, post, count):
+        for voter in self.voters[:count]:
+            PostVote.objects.create(user=voter, post=post, vote_type="up")
+
+    def _feed(self, sort):
+        response = self.client.get(reverse("community_post_list"), {"sort": sort})
+        self.assertEqual(response.status_code, 200)
+        return response.data["posts"]
+
+    def test_hot_sort_reads_stored_score_refreshed_by_votes(self):
+        busy = self._post("Busy", timedelta(hours=3))
+        fresh = self._post("Fresh", timedelta(minutes=10))
+        self.assertEqual([p["id"] for p in self._feed("hot")], [fresh.id, busy.id])
+
+        self._upvote(busy, 6)
+        busy.refresh_from_db()
+        self.assertAlmostEqual(busy.hot_score, ranking.post_hot_score(busy), places=3)
+        self.assertEqual([p["id"] for p in self._feed("hot")], [busy.id, fresh.id])
+        self.assertEqual([p["id"] for p in self._feed("new")], [fresh.id, busy.id])
+
+    def test_trending_is_recent_and_well_voted_whatever_the_stored_score(self):
+        post = self._post("Trending", timedelta(hours=1))
+        self._upvote(post, 5)
+        self.assertTrue(self._feed("hot")[0]["is_trending"])
+
+        # A stale hot_score (decay job not run yet) does not keep it trending.
+        CommunityPost.objects.filter(pk=post.pk).update(published_at=timezone.now() - timedelta(hours=30))
+        self.assertFalse(self._feed("hot")[0]["is_trending"])
+
+    def test_decay_zeroes_posts_that_left_the_hot_window(self):
+        old = self._post("Old", timedelta(days=2))
+        self._upvote(old, 3)
+        CommunityPost.objects.filter(pk=old.pk).update(
+            published_at=timezone.now() - timedelta(hours=ranking.HOT_WINDOW_HOURS + 1)
+        )
+
+        self.assertEqual(ranking.decay_hot_scores(), 1)
+        old.refresh_from_db()
+        self.assertEqual(old.hot_score, 0)
+        self.assertEqual(ranking.decay_hot_scores(), 0)
+
+
+@override_settings(COMMUNITY_FEED_CACHE_SECONDS=0)
+class CommunityCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="cursorauthor", password="StrongPass123!")
+        self.voter = User.objects.create_user(username="cursorvoter", password="StrongPass123!")
+        now = timezone.now()
+        self.posts = [
+            CommunityPost.objects.create(
+                author=self.author,
+                title=f"Post {i}",
+                body="Body",
+                category="wins",
+                # Pairs share a timestamp so the id tiebreaker is exercised.
+                published_at=now - timedelta(minutes=i // 2),
+            )
+            for i in range(45)
+        ]
+        self.posts[30].is_pinned = True
+        self.posts[30].save()
+
+    def _walk(self, url, key, **params):
+        ids, cursor, pages = [], "", 0
+        while cursor is not None:
+            response = self.client.get(url, {**params, "cursor": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.data["page"])
+            ids.extend(item["id"] for item in response.data[key])
+            self.assertEqual(response.data["has_more"], response.data["next_cursor"] is not None)
+            cursor = response.data["next_cursor"]
+            pages += 1
+        return ids, pages
+
+    def test_feed_cursor_walk_matches_offset_order(self):
+        for sort in ("new", "hot", "top"):
+            offset_ids = []
+            for page in (1, 2, 3):
+                response = self.client.get(reverse("community_post_list"), {"sort": sort, "page": page})
+                offset_ids.extend(item["id"] for item in response.data["posts"])
+
+            cursor_ids, pages = self._walk(reverse("community_post_list"), "posts", sort=sort)
+
+            self.assertEqual(pages, 3)
+            self.assertEqual(cursor_ids, offset_ids)
+            self.assertEqual(len(set(cursor_ids)), 45)
+            self.assertEqual(cursor_ids[0], self.posts[30].id)
+
+    def test_cursor_pages_do_not_repeat_posts_when_votes_reorder_the_feed(self):
+        url = reverse("community_post_list")
+        first = self.client.get(url, {"sort": "top", "cursor": ""})
+        seen = [item["id"] for item in first.data["posts"]]
+        # A post further down jumps to the top between page loads.
+        PostVote.objects.create(user=self.voter, post=self.posts[44], vote_type="up")
+        PostVote.objects.create(user=self.author, post=self.posts[44], vote_type="up")
+
+        second = self.client.get(url, {"sort": "top", "cursor": first.data["next_cursor"]})
+        second_ids = [item["id"] for item in second.data["posts"]]
+        self.assertFalse(set(seen) & set(second_ids))
+
+    def test_hot_cursor_walk_is_stable_while_scores_change(self):
+        url = reverse("community_post_list")
+        ids, cursor, pages = [], "", 0
+        while cursor is not None:
+            response = self.client.get(url, {"sort": "hot", "cursor": cursor})
+            page_ids = [item["id"] for item in response.data["posts"]]
+            ids.extend(page_ids)
+            cursor = response.data["next_cursor"]
+            pages += 1
+            # Between page loads a post already shown sinks, an unseen one rises
+            # and every score decays.
+            voters = [
+                User.objects.create_user(username=f"hotwalk{pages}-{i}", password="StrongPass123!") for i in range(3)
+            ]
+            PostVote.objects.create(user=voters[0], post_id=page_ids[-1], vote_type="down")
+            unseen = CommunityPost.objects.exclude(pk__in=ids).order_by("published_at").first()
+            if unseen is not None:
+                for voter in voters:
+                    PostVote.objects.create(user=voter, post=unseen, vote_type="up")
+            call_command("decay_hot_scores", stdout=StringIO())
+        self.assertEqual(len(ids), 45)
+        self.assertEqual(set(ids), {post.id for post in self.posts})
+
+    def test_hot_cursor_continues_by_keyset_past_the_snapshot_or_after_it_expires(self):
+        url = reverse("community_post_list")
+        with patch("mobileapi.community_views.HOT_SNAPSHOT_PAGES", 1):
+            ids, pages = self._walk(url, "posts", sort="hot")
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(ids), sorted(post.id for post in self.posts))
+
+        first = self.client.get(url, {"sort": "hot", "cursor": ""})
+        cache.clear()
+        second = self.client.get(url, {"sort": "hot", "cursor": first.data["next_cursor"]})
+        self.assertEqual(second.status_code, 200)
+        offset_page = self.client.get(url, {"sort": "hot", "page": 2})
+        self.assertEqual(
+            [item["id"] for item in second.data["posts"]],
+            [item["id"] for item in offset_page.data["posts"]],
+        )
+
+    def test_offset_page_returns_a_cursor_for_the_next_page(self):
+        url = reverse("community_post_list")
+        page_1 = self.client.get(url, {"sort": "new", "page": 1})
+        page_2 = self.client.get(url, {"sort": "new", "page": 2})
+        by_cursor = self.client.get(url, {"sort": "new", "cursor": page_1.data["next_cursor"]})
+
+        self.assertEqual(page_1.data["page"], 1)
+        self.assertEqual(
+            [item["id"] for item in by_cursor.data["posts"]],
+            [item["id"] for item in page_2.data["posts"]],
+        )
+
+    def test_invalid_or_mismatched_cursor_is_rejected(self):
+        url = reverse("community_post_list")
+        top_cursor = self.client.get(url, {"sort": "top", "page": 1}).data["next_cursor"]
+
+        self.assertEqual(self.client.get(url, {"sort": "top", "cursor": "not-a-cursor"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"sort": "new", "cursor": top_cursor}).status_code, 400)
+
+    def test_comment_cursor_walk(self):
+        post = self.posts[0]
+        comments = [
+            CommunityComment.objects.create(post=post, author=self.voter, body=f"Comment {i}")
+            for i in range(25)
+        ]
+        CommunityComment.objects.filter(pk=comments[3].pk).update(is_deleted=True)
+
+        ids, pages = self._walk(reverse("community_post_comment", args=[post.id]), "comments")
+
+        self.assertEqual(pages, 2)
+        self.assertEqual(ids, [comment.id for comment in comments if comment.pk != comments[3].pk])
+
+    def test_post_detail_embeds_first_comment_page_and_continues_by_cursor(self):
+        post = self.posts[0]
+        comments = [
+            CommunityComment.objects.create(post=post, author=self.voter, body=f"Comment {i}")
+            for i in range(45)
+        ]
+
+        detail = self.client.get(reverse("community_post_detail", args=[post.id]))
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual([c["id"] for c in detail.data["comments"]], [c.id for c in comments[:20]])
+        self.assertTrue(detail.data["comments_has_more"])
+        self.assertNotIn("top_comments", detail.data)
+
+        rest = self.client.get(
+            reverse("community_post_comment", args=[post.id]),
+            {"cursor": detail.data["comments_next_cursor"]},
+        )
+        self.assertEqual([c["id"] for c in rest.data["comments"]], [c.id for c in comments[20:40]])
+
+    def test_post_detail_top_comments_are_ordered_by_stored_like_count(self):
+        post = self.posts[0]
+        likers = [self.voter, self.author]
+        comments = [
+            CommunityComment.objects.create(post=post, author=self.voter, body=f"Comment {i}")
+            for i in range(4)
+        ]
+        CommentLike.objects.create(user=likers[0], comment=comments[2])
+        CommentLike.objects.create(user=likers[1], comment=comments[2])
+        CommentLike.objects.create(user=likers[0], comment=comments[3])
+        self.client.force_authenticate(self.voter)
+
+        detail = self.client.get(reverse("community_post_detail", args=[post.id]), {"top_comments": 5})
+
+        top = detail.data["top_comments"]
+        self.assertEqual([c["id"] for c in top], [comments[2].id, comments[3].id])
+        self.assertEqual([c["like_count"] for c in top], [2, 1])
+        self.assertTrue(all(c["user_liked"] for c in top))
+        self.assertFalse(detail.data["comments_has_more"])
+
+    def test_post_detail_top_comments_zero_embeds_none(self):
+        post = self.posts[0]
+        comment = CommunityComment.objects.create(post=post, author=self.voter, body="Liked")
+        CommentLike.objects.create(user=self.author, comment=comment)
+
+        detail = self.client.get(reverse("community_post_detail", args=[post.id]), {"top_comments": 0})
+
+        self.assertEqual(detail.status_code, 200)
+        self.assertNotIn("top_comments", detail.data)
+
+
+@override_settings(COMMUNITY_FEED_CACHE_SECONDS=60)
+class CommunityFeedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="feedcacheauthor", password="StrongPass123!")
+        self.reader = User.objects.create_user(username="feedcachereader", password="StrongPass123!")
+        self.blocked = User.objects.create_user(username="feedcacheblocked", password="StrongPass123!")
+        now = timezone.now()
+        self.post = CommunityPost.objects.create(
+            author=self.author, title="Plain", body="Body", category="wins",
+            published_at=now - timedelta(minutes=3),
+        )
+        self.anon_post = CommunityPost.objects.create(
+            author=self.reader, title="Mine", body="Body", category="wins", is_anonymous=True,
+            published_at=now - timedelta(minutes=2),
+        )
+        self.blocked_post = CommunityPost.objects.create(
+            author=self.blocked, title="Blocked", body="Body", category="wins",
+            published_at=now - timedelta(minutes=1),
+        )
+        self.poll = PostPoll.objects.create(post=self.post)
+        self.url = reverse("community_post_list")
+
+    def _feed(self, user=None, **params):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        response = client.get(self.url, {"sort": "new", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data["posts"]
+
+    def test_repeat_guest_page_is_served_from_cache(self):
+        first = self._feed()
+        with self.assertNumQueries(0):
+            second = self._feed()
+        self.assertEqual(first, second)
+
+    def test_user_overlay_is_applied_to_the_cached_guest_page(self):
+        self._feed()  # populate as a guest
+        PostVote.objects.create(user=self.reader, post=self.post, vote_type="up")
+        PollVote.objects.create(poll=self.poll, user=self.reader, choice="send_it")
+        UserBlock.objects.create(blocker=self.reader, blocked_user=self.blocked)
+
+        posts = {item["id"]: item for item in self._feed(self.reader)}
+
+        self.assertNotIn(self.blocked_post.id, posts)
+        self.assertEqual(posts[self.post.id]["user_vote"], "up")
+        self.assertEqual(posts[self.post.id]["poll"]["user_vote"], "send_it")
+        self.assertEqual(posts[self.anon_post.id]["author"]["id"], self.reader.id)
+
+        guest_posts = {item["id"]: item for item in self._feed()}
+        self.assertIsNone(guest_posts[self.post.id]["user_vote"])
+        self.assertIsNone(guest_posts[self.post.id]["poll"]["user_vote"])
+        self.assertEqual(guest_posts[self.anon_post.id]["author"]["username"], "Anonymous")
+
+    def test_blocked_authors_are_filtered_in_sql_so_pages_stay_full(self):
+        now = timezone.now()
+        for i in range(25):
+            CommunityPost.objects.create(
+                author=self.blocked, title=f"Prolific {i}", body="Body", category="wins", published_at=now,
+            )
+        UserBlock.objects.create(blocker=self.reader, blocked_user=self.blocked)
+        self._feed()  # the cached guest page is all blocked posts
+
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        response = client.get(self.url, {"sort": "new", "cursor": ""})
+
+        self.assertEqual([item["id"] for item in response.data["posts"]], [self.anon_post.id, self.post.id])
+        self.assertFalse(response.data["has_more"])
+        self.assertEqual(len(self._feed()), 20)
+
+    def test_post_create_delete_and_admin_pin_invalidate_cached_pages(self):
+        self._feed()
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            created = self.client.post(
+                self.url, {"title": "Fresh", "body": "Body", "category": "wins"}, format="json"
+            )
+        self.assertEqual(created.status_code, 201)
+        new_id = created.data["id"]
+        self.assertEqual(self._feed()[0]["id"], new_id)
+
+        post_admin = community_admin.CommunityPostAdmin(CommunityPost, admin.site)
+        with self.captureOnCommitCallbacks(execute=True):
+            post_admin.pin_posts(None, CommunityPost.objects.filter(pk=self.post.pk))
+        self.assertEqual(self._feed()[0]["id"], self.post.id)
+
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("community_post_detail", args=[new_id]))
+        self.assertNotIn(new_id, [item["id"] for item in self._feed()])
+
+
+@override_settings(COMMUNITY_USER_CACHE_SECONDS=300)
+class CommunityUserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username="usercacheauthor", password="StrongPass123!")
+        self.reader = User.objects.create_user(username="usercachereader", password="StrongPass123!")
+        self.post = CommunityPost.objects.create(author=self.author, title="Post", body="Body", category="wins")
+        CommunityComment.objects.create(post=self.post, author=self.author, body="By author")
+        self.client.force_authenticate(self.reader)
+
+    def _comments(self):
+        response = self.client.get(reverse("community_post_comment", args=[self.post.id]))
+        self.assertEqual(response.status_code, 200)
+        return response.data["comments"]
+
+    def test_repeat_comment_list_skips_block_and_pro_queries(self):
+        with CaptureQueriesContext(connection) as cold:
+            self._comments()
+        with CaptureQueriesContext(connection) as warm:
+            self._comments()
+
+        self.assertEqual(len(cold) - len(warm), 2)
+        self.assertFalse(any("community_userblock" in q["sql"] for q in warm.captured_queries))
+        self.assertFalse(any("conversation_chatcredit" in q["sql"] for q in warm.captured_queries))
+
+    def test_block_toggle_invalidates_both_users(self):
+        self.assertEqual(len(self._comments()), 1)
+        self.assertFalse(community_cache.is_blocked_between(self.author.id, self.reader.id))
+
+        response = self.client.post(reverse("community_block_user", args=[self.author.id]))
+        self.assertTrue(response.data["blocked"])
+        self.assertEqual(self._comments(), [])
+        self.assertEqual(
+            self.client.get(reverse("community_blocked_users")).data["blocked_user_ids"], [self.author.id]
+        )
+        # The author's cached view sees the block from the other side.
+        self.assertTrue(community_cache.is_blocked_between(self.author.id, self.reader.id))
+
+        self.client.post(reverse("community_block_user", args=[self.author.id]))
+        self.assertEqual(len(self._comments()), 1)
+        self.assertFalse(community_cache.is_blocked_between(self.author.id, self.reader.id))
+
+    def test_pro_status_follows_verify_subscription_and_expires_with_it(self):
+        self.assertFalse(self._comments()[0]["author"]["is_pro"])
+
+        expiry = timezone.now() + timedelta(days=30)
+        self.client.force_authenticate(self.author)
+        with patch(
+            "mobileapi.views._verify_google_play_subscription",
+            return_value=(True, None, {"expiry": expiry, "auto_renewing": True}),
+        ):
+            response = self.client.post(
+                reverse("verify_subscription"),
+                {"product_id": "pro_monthly", "purchase_token": "token-1"},
+                format="json",
+            )
+        self.assertTrue(response.data["success"])
+        self.client.force_authenticate(self.reader)
+        self.assertTrue(self._comments()[0]["author"]["is_pro"])
+
+        # A cached pro flag is not trusted past the subscription's expiry.
+        self.assertEqual(
+            community_cache.pro_user_ids([self.author.id], now=expiry + timedelta(seconds=1)), set()
+        )
+
+
+class CommunityModerationAdminTests(TestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            username="moderator", email="moderator@example.com", password="StrongPass123!"
+        )
+        self.client.force_login(self.superuser)
+        self.author = User.objects.create_user(username="modauthor", password="StrongPass123!")
+        self.post = CommunityPost.objects.create(author=self.author, title="Reported post", body="Body", category="advice")
+        self.comment = CommunityComment.objects.create(post=self.post, author=self.author, body="Reported comment")
+        self._reporter_seq = 0
+
+    def _report(self, content_type, object_id, count=1):
+        reports = []
+        for _ in range(count):
+            self._reporter_seq += 1
+            reporter = User.objects.create_user(username=f"reporter{self._reporter_seq}", password="StrongPass123!")
+            reports.append(ContentReport.objects.create(
+                reporter=reporter, content_type=content_type, object_id=object_id, reason="spam"
+            ))
+        return reports
+
+    def _changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def _action(self, model_name, action, objects):
+        return self.client.post(
+            reverse(f"admin:community_{model_name}_changelist"),
+            {"action": action, "_selected_action": [obj.pk for obj in objects]},
+        )
+
+    def test_changelists_do_not_query_per_row(self):
+        self._report("post", self.post.pk, 2)
+        self._report("comment", self.comment.pk)
+        urls = [
+            reverse("admin:community_contentreport_changelist"),
+            reverse("admin:community_communitypost_changelist"),
+            reverse("admin:community_communitycomment_changelist"),
+        ]
+        for url in urls:
+            self.client.get(url)  # warm per-process caches (content types, permissions)
+        before = [self._changelist_queries(url) for url in urls]
+
+        for i in range(15):
+            post = CommunityPost.objects.create(author=self.author, title=f"Post {i}", body="Body", category="advice")
+            comment = CommunityComment.objects.create(post=post, author=self.author, body=f"Comment {i}")
+            self._report("post", post.pk)
+            self._report("comment", comment.pk)
+
+        self.assertEqual([self._changelist_queries(url) for url in urls], before)
+        response = self.client.get(urls[0])
+        self.assertContains(response, "Reported post")
+        self.assertContains(response, "Live")
+
+    def test_clear_votes_and_likes_reset_counters_in_one_pass(self):
+        voters = [User.objects.create_user(username=f"voter{i}", password="StrongPass123!") for i in range(5)]
+        for i, voter in enumerate(voters):
+            PostVote.objects.create(user=voter, post=self.post, vote_type="up" if i else "down")
+            CommentLike.objects.create(user=voter, comment=self.comment)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.vote_score, 3)
+
+        self._action("communitypost", "clear_votes", [self.post])
+        self._action("communitycomment", "clear_likes", [self.comment])
+
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertFalse(PostVote.objects.filter(post=self.post).exists())
+        self.assertFalse(CommentLike.objects.filter(comment=self.comment).exists())
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count, self.post.vote_score), (0, 0, 0))
+        self.assertEqual(self.comment.like_count, 0)
+        self.assertEqual(counters.reconcile_posts() + counters.reconcile_comments(), 0)
+
+    def test_remove_and_resolve_act_on_every_report_for_the_target(self):
+        post_reports = self._report("post", self.post.pk, 3)
+        comment_reports = self._report("comment", self.comment.pk, 2)
+        other = self._report("post", CommunityPost.objects.create(
+            author=self.author, title="Other", body="Body", category="advice"
+        ).pk)
+
+        self._action("contentreport", "soft_delete_reported_content", [post_reports[0], comment_reports[0]])
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertTrue(self.post.is_deleted)
+        self.assertTrue(self.comment.is_deleted)
+        self.assertEqual(self.post.comment_count, 0)
+
+        self._action("contentreport", "resolve_target_reports", [post_reports[0], comment_reports[1]])
+        self.assertEqual(list(ContentReport.objects.values_list("pk", flat=True)), [other[0].pk])
+
+    def test_reports_by_target_view_ranks_and_resolves_targets(self):
+        self._report("comment", self.comment.pk, 3)
+        self._report("post", self.post.pk)
+        url = reverse("admin:community_contentreport_by_target")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = response.context["rows"]
+        self.assertEqual(
+            [(row["content_type"], row["object_id"], row["report_count"]) for row in rows],
+            [("comment", self.comment.pk, 3), ("post", self.post.pk, 1)],
+        )
+        self.assertEqual(rows[0]["label"], "Reported comment")
+        self.assertEqual(len(self.client.get(url, {"content_type": "post"}).context["rows"]), 1)
+
+        response = self.client.post(
+            url, {"content_type": "comment", "object_id": self.comment.pk, "remove": "1"}, follow=True
+        )
+        self.assertContains(response, "Resolved 3 report(s) on comment")
+        self.comment.refresh_from_db()
+        self.assertTrue(self.comment.is_deleted)
+        self.assertEqual(ContentReport.objects.count(), 1)
+
+        staff = User.objects.create_user(username="modviewer", password="StrongPass123!", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 403)
 
 
 class MobileInstallAttributionEventTests(TestCase):
@@ -2615,6 +3776,25 @@ class MobileReplyThreadApiTests(TestCase):
             ["updated one", "updated two", "updated three"],
         )
 
+    def test_thread_accepts_a_generation_event_id_whose_row_is_still_queued(self):
+        cache.clear()
+        other = User.objects.create_user(username="other-archiver", password="StrongPass123!")
+        views._claim_generation_event(MobileGenerationEvent(pk=424242, user=self.user))
+        views._claim_generation_event(MobileGenerationEvent(pk=424243, user=other))
+
+        payload = {"conversation_text": "hi there", "latest_replies": [{"message": "reply"}]}
+        accepted = self.client.post(
+            reverse("mobile_reply_threads"), {**payload, "generation_event_id": 424242}, format="json"
+        )
+        rejected = self.client.post(
+            reverse("mobile_reply_threads"), {**payload, "generation_event_id": 424243}, format="json"
+        )
+
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(MobileReplyThread.objects.get().latest_generation_event_id, 424242)
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(rejected.data["error"], "invalid_generation_event_id")
+
     def test_delete_thread_removes_resource(self):
         thread = self._create_thread(1)
 
@@ -2624,3 +3804,522 @@ class MobileReplyThreadApiTests(TestCase):
 
         self.assertEqual(delete_response.status_code, 200)
         self.assertFalse(MobileReplyThread.objects.filter(id=thread.id).exists())
+
+
+# A snapshot re-check mid-test would add the config reload to the budgets.
+# The budgets include the generation event INSERT, so it is written inline.
+@override_settings(CONFIG_SNAPSHOT_CHECK_SECONDS=3600, EVENT_WRITER={"MODE": "sync"})
+class CreditStateQueryCountTests(TestCase):
+    """Pin the number of queries each credit-aware endpoint issues."""
+
+    def setUp(self):
+        cache.clear()
+        # Snapshots from earlier tests would otherwise outlive the cleared stamp.
+        clear_local_snapshots()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="querycounter",
+            email="querycounter@example.com",
+            password="StrongPass123!",
+        )
+        self.token = Token.objects.create(user=self.user)
+        now = timezone.now()
+        chat_credit = self.user.chat_credit
+        chat_credit.subscriber_daily_reset_at = now
+        chat_credit.free_daily_reset_at = now
+        chat_credit.subscriber_weekly_reset_at = now
+        chat_credit.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        # Create the config row first (creating it invalidates the snapshot),
+        # then warm the snapshot so it does not count against the budgets.
+        MobileAppConfig.load()
+        views._get_config()
+
+    def _subscribe(self):
+        chat_credit = self.user.chat_credit
+        chat_credit.is_subscribed = True
+        chat_credit.subscription_expiry = timezone.now() + timedelta(days=30)
+        chat_credit.save(update_fields=["is_subscribed", "subscription_expiry"])
+
+    def _image(self, name="test.png"):
+        return SimpleUploadedFile(
+            name,
+            b"\x89PNG\r\n\x1a\nfakepngdata",
+            content_type="image/png",
+        )
+
+    def _generate(self):
+        return self.client.post(
+            reverse("generate_text_with_credits"),
+            {"last_text": "hello", "situation": "just_matched", "tone": "Natural"},
+            format="json",
+            REMOTE_ADDR="203.0.113.90",
+            HTTP_X_DEVICE_FINGERPRINT="query-count-device",
+        )
+
+    def test_profile_query_count(self):
+        # token auth + credit state
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("mobile_profile"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["free_daily_credits_remaining"], 3)
+
+    def test_profile_flushes_stale_rollovers_with_one_update(self):
+        chat_credit = self.user.chat_credit
+        yesterday = timezone.now() - timedelta(days=1)
+        chat_credit.free_daily_credits_used = 3
+        chat_credit.free_daily_reset_at = yesterday
+        chat_credit.subscriber_daily_replies = 7
+        chat_credit.subscriber_daily_reset_at = yesterday
+        chat_credit.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("mobile_profile"))
+
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(response.data["free_daily_credits_remaining"], 3)
+        self.assertEqual(response.data["daily_replies_used"], 0)
+        chat_credit.refresh_from_db()
+        self.assertEqual(chat_credit.free_daily_credits_used, 0)
+        self.assertEqual(chat_credit.subscriber_daily_replies, 0)
+        self.assertEqual(chat_credit.free_daily_reset_at.date(), timezone.now().date())
+
+    def test_expired_subscription_downgrade_is_flushed(self):
+        chat_credit = self.user.chat_credit
+        chat_credit.is_subscribed = True
+        chat_credit.subscription_product_id = "monthly"
+        chat_credit.subscription_expiry = timezone.now() - timedelta(hours=1)
+        chat_credit.save()
+
+        response = self.client.get(reverse("mobile_profile"))
+
+        self.assertFalse(response.data["is_subscribed"])
+        chat_credit.refresh_from_db()
+        self.assertFalse(chat_credit.is_subscribed)
+        self.assertIsNone(chat_credit.subscription_product_id)
+
+    def test_free_reply_query_count(self):
+        with patch("mobileapi.views.generate_mobile_response", return_value=("reply", True)):
+            with self.assertNumQueries(9):
+                response = self._generate()
+        self.assertTrue(response.data["success"])
+        self.assertEqual(response.data["credits_remaining"], 2)
+        self.assertEqual(response.data["free_daily_credits_remaining"], 2)
+
+    def test_subscriber_reply_query_count(self):
+        self._subscribe()
+        with patch("mobileapi.views.generate_mobile_response", return_value=("reply", True)):
+            with self.assertNumQueries(4):
+                response = self._generate()
+        self.assertTrue(response.data["success"])
+        self.assertEqual(response.data["daily_replies_used"], 1)
+
+    def test_free_openers_query_count(self):
+        with patch("mobileapi.views.generate_mobile_openers_from_image", return_value=("openers", True)):
+            with self.assertNumQueries(9):
+                response = self.client.post(
+                    reverse("generate_openers_from_image"),
+                    {"profile_image": self._image("query-count.png")},
+                    format="multipart",
+                    REMOTE_ADDR="203.0.113.91",
+                    HTTP_X_DEVICE_FINGERPRINT="query-count-device",
+                )
+        self.assertTrue(response.data["success"])
+        self.assertEqual(response.data["free_daily_credits_remaining"], 2)
+
+    def test_reply_threads_query_count(self):
+        for i in range(4):
+            MobileReplyThread.objects.create(
+                user=self.user,
+                title=f"Thread {i}",
+                stitched_transcript=f"line {i}",
+                latest_replies=[{"message": f"reply {i}"}],
+            )
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("mobile_reply_threads"))
+        self.assertEqual(len(response.data["threads"]), 4)
+
+    def test_extract_stream_query_count(self):
+        with patch(
+            "mobileapi.views.stream_conversation_from_image_bytes",
+            return_value=iter(["you [12:00]: hey"]),
+        ):
+            with self.assertNumQueries(2):
+                response = self.client.post(
+                    reverse("extract_from_image_with_credits_stream"),
+                    {"screenshot": self._image("stream-count.png")},
+                    format="multipart",
+                    REMOTE_ADDR="203.0.113.92",
+                    HTTP_X_DEVICE_FINGERPRINT="query-count-device",
+                )
+                body = b"".join(response.streaming_content).decode()
+        self.assertIn('"type": "done"', body)
+        self.assertIn('"free_daily_credits_remaining": 3', body)
+
+
+class QuotaEngineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="quotauser", password="StrongPass123!")
+        self.other = User.objects.create_user(username="quotaother", password="StrongPass123!")
+        self.credit = self.user.chat_credit
+        self.other_credit = self.other.chat_credit
+
+    def test_free_pool_is_shared_between_accounts_on_one_device(self):
+        self.assertEqual(quota.consume_free_credit(self.credit.pk, 3, device_hash="dev-a"), 1)
+        self.assertEqual(quota.consume_free_credit(self.credit.pk, 3, device_hash="dev-a"), 2)
+        # A second account on the same device inherits the device usage.
+        self.assertEqual(quota.consume_free_credit(self.other_credit.pk, 3, device_hash="dev-a"), 3)
+        self.assertIsNone(quota.consume_free_credit(self.credit.pk, 3, device_hash="dev-a"))
+        self.assertIsNone(quota.consume_free_credit(self.other_credit.pk, 3, device_hash="dev-a"))
+
+        self.other_credit.refresh_from_db()
+        self.assertEqual(self.other_credit.free_daily_credits_used, 3)
+        usage = DeviceDailyUsage.objects.get(device_hash="dev-a")
+        self.assertEqual(usage.used_count, 3)
+
+    def test_free_pool_follows_account_to_a_new_device(self):
+        quota.consume_free_credit(self.credit.pk, 3, device_hash="dev-a")
+        quota.consume_free_credit(self.credit.pk, 3, device_hash="dev-a")
+
+        self.assertEqual(quota.consume_free_credit(self.credit.pk, 3, device_hash="dev-b"), 3)
+        self.assertEqual(DeviceDailyUsage.objects.get(device_hash="dev-b").used_count, 3)
+
+    def test_stale_free_window_restarts_in_the_same_update(self):
+        ChatCredit.objects.filter(pk=self.credit.pk).update(
+            free_daily_credits_used=3,
+            free_daily_reset_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertEqual(quota.consume_free_credit(self.credit.pk, 3), 1)
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.free_daily_reset_at.date(), timezone.now().date())
+
+    def test_subscriber_daily_rollover_resets_sibling_counter(self):
+        ChatCredit.objects.filter(pk=self.credit.pk).update(
+            subscriber_daily_openers=9,
+            subscriber_daily_replies=4,
+            subscriber_daily_reset_at=timezone.now() - timedelta(days=1),
+        )
+
+        quota.consume_subscriber_daily(self.credit.pk, "subscriber_daily_replies")
+
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.subscriber_daily_replies, 1)
+        self.assertEqual(self.credit.subscriber_daily_openers, 0)
+
+    def test_subscriber_weekly_cap(self):
+        self.assertTrue(quota.consume_subscriber_weekly(self.credit.pk, 2))
+        self.assertTrue(quota.consume_subscriber_weekly(self.credit.pk, 2))
+        self.assertFalse(quota.consume_subscriber_weekly(self.credit.pk, 2))
+
+
+class QuotaEngineConcurrencyTests(TransactionTestCase):
+    """Many threads hammering one pool must never be granted more than the limit."""
+
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 4
+    LIMIT = 5
+
+    def _hammer(self, consume):
+        barrier = threading.Barrier(self.THREADS)
+        grants = []
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    while True:
+                        try:
+                            result = consume()
+                            break
+                        except OperationalError as exc:
+                            # SQLite reports lock contention instead of blocking.
+                            if "locked" not in str(exc):
+                                raise
+                    if result:
+                        grants.append(result)
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return grants
+
+    def test_free_pool_never_over_grants(self):
+        users = [User.objects.create_user(username=f"racer{i}", password="x") for i in range(2)]
+        credit_ids = [user.chat_credit.pk for user in users]
+        counter = iter(range(10_000))
+
+        def consume():
+            pk = credit_ids[next(counter) % len(credit_ids)]
+            return quota.consume_free_credit(pk, self.LIMIT, device_hash="shared-device")
+
+        grants = self._hammer(consume)
+
+        self.assertEqual(len(grants), self.LIMIT)
+        self.assertEqual(
+            DeviceDailyUsage.objects.get(device_hash="shared-device").used_count,
+            self.LIMIT,
+        )
+
+    def test_weekly_cap_never_over_grants(self):
+        user = User.objects.create_user(username="weeklyracer", password="x")
+        pk = user.chat_credit.pk
+
+        grants = self._hammer(lambda: quota.consume_subscriber_weekly(pk, self.LIMIT))
+
+        self.assertEqual(len(grants), self.LIMIT)
+        self.assertEqual(ChatCredit.objects.get(pk=pk).subscriber_weekly_actions, self.LIMIT)
+
+    def test_subscriber_daily_counts_every_increment(self):
+        user = User.objects.create_user(username="dailyracer", password="x")
+        pk = user.chat_credit.pk
+
+        def consume():
+            quota.consume_subscriber_daily(pk, "subscriber_daily_replies")
+            return True
+
+        grants = self._hammer(consume)
+
+        self.assertEqual(len(grants), self.THREADS * self.ATTEMPTS_PER_THREAD)
+        self.assertEqual(
+            ChatCredit.objects.get(pk=pk).subscriber_daily_replies,
+            self.THREADS * self.ATTEMPTS_PER_THREAD,
+        )
+
+
+@override_settings(EVENT_WRITER={"MODE": "sync"})
+class AsyncGenerationViewTests(TestCase):
+    """The ASGI generation views run the same flow as the sync views."""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_snapshots()
+        self.factory = RequestFactory()
+        self.cfg = MobileAppConfig.load()
+        self.user = User.objects.create_user(
+            username="asyncviews",
+            email="asyncviews@example.com",
+            password="StrongPass123!",
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def _post_reply(self, view=views.generate_text_with_credits_async, **extra):
+        request = self.factory.post(
+            "/api/mobile/generate/",
+            data=json.dumps({"last_text": "hey there", "situation": "just_matched", "tone": "Natural"}),
+            content_type="application/json",
+            HTTP_X_DEVICE_FINGERPRINT="async-device",
+            **extra,
+        )
+        return async_to_sync(view)(request)
+
+    def test_guest_reply_awaits_async_model_call(self):
+        with patch("mobileapi.views.generate_mobile_response") as sync_generate, patch(
+            "mobileapi.views.agenerate_mobile_response",
+            new=AsyncMock(return_value=("reply", True)),
+        ) as async_generate:
+            response = self._post_reply()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["success"])
+        self.assertTrue(response.data["is_trial"])
+        self.assertEqual(response.data["trial_credits_remaining"], self.cfg.guest_lifetime_credits - 1)
+        self.assertEqual(async_generate.await_args.kwargs["primary_model"], self.cfg.free_reply_model)
+        sync_generate.assert_not_called()
+        self.assertEqual(MobileGenerationEvent.objects.count(), 1)
+
+    def test_signed_in_reply_consumes_free_credit(self):
+        with patch("mobileapi.views.agenerate_mobile_response", new=AsyncMock(return_value=("reply", True))):
+            response = self._post_reply(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.assertTrue(response.data["success"])
+        self.assertEqual(response.data["credits_remaining"], self.cfg.free_daily_credit_limit - 1)
+        self.user.chat_credit.refresh_from_db()
+        self.assertEqual(self.user.chat_credit.free_daily_credits_used, 1)
+
+    def test_model_exception_reaches_flow_error_handler(self):
+        with patch("mobileapi.views.agenerate_mobile_response", new=AsyncMock(side_effect=RuntimeError("boom"))):
+            response = self._post_reply()
+
+        self.assertEqual(response.data, {"success": False, "error": "Generation failed", "message": "boom"})
+
+    @override_settings(MOBILE_RATELIMIT_GENERATE_IP="1/m")
+    def test_ratelimits_apply_before_the_flow(self):
+        with patch("mobileapi.views.agenerate_mobile_response", new=AsyncMock(return_value=("reply", True))):
+            self._post_reply()
+            with self.assertRaises(Ratelimited):
+                self._post_reply()
+
+    def test_extract_and_openers_use_async_variants(self):
+        upload = SimpleUploadedFile("shot.png", b"\x89PNG\r\n\x1a\nfakepngdata", content_type="image/png")
+        request = self.factory.post("/api/mobile/extract-image/", {"screenshot": upload})
+        with patch(
+            "mobileapi.views.aextract_conversation_from_image_mobile",
+            new=AsyncMock(return_value="you []: hi"),
+        ) as async_extract:
+            response = async_to_sync(views.extract_from_image_with_credits_async)(request)
+        self.assertEqual(response.data["conversation"], "you []: hi")
+        self.assertEqual(async_extract.await_args.args[0].name, "shot.png")
+
+        upload = SimpleUploadedFile("profile.png", b"\x89PNG\r\n\x1a\nfakepngdata", content_type="image/png")
+        request = self.factory.post("/api/mobile/generate-openers-from-image/", {"profile_image": upload})
+        with patch(
+            "mobileapi.views.agenerate_mobile_openers_from_image",
+            new=AsyncMock(return_value=("openers", True)),
+        ) as async_openers:
+            response = async_to_sync(views.generate_openers_from_profile_image_async)(request)
+        self.assertEqual(response.data["reply"], "openers")
+        self.assertEqual(async_openers.await_args.args[0], b"\x89PNG\r\n\x1a\nfakepngdata")
+
+
+
+class SingleFlightTests(TestCase):
+    """Identical in-flight requests share one model call and one credit charge."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _coalesced(self, model_call, key="flight-key"):
+        @singleflight.coalesce(lambda request: key)
+        def flow(request):
+            result = yield ModelCall(model_call, None)
+            return Response({"result": result})
+
+        return flow
+
+    def _in_threads(self, target, count):
+        barrier = threading.Barrier(count)
+        results, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(target())
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_concurrent_duplicates_share_one_model_call(self):
+        calls = []
+
+        def slow_model():
+            calls.append(1)
+            time.sleep(0.3)
+            return "shared reply"
+
+        flow = self._coalesced(slow_model)
+        responses = self._in_threads(lambda: run_flow(flow(None)), 4)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r.data for r in responses], [{"result": "shared reply"}] * 4)
+        # The flight is over: the next identical request runs again.
+        run_flow(flow(None))
+        self.assertEqual(len(calls), 2)
+
+    def test_failed_leader_releases_the_flight(self):
+        def broken_model():
+            raise RuntimeError("provider down")
+
+        with self.assertRaises(RuntimeError):
+            run_flow(self._coalesced(broken_model)(None))
+        response = run_flow(self._coalesced(lambda: "ok")(None))
+        self.assertEqual(response.data, {"result": "ok"})
+
+    def test_async_follower_awaits_leader_result(self):
+        flight = singleflight.Flight("async-key")
+        self.assertTrue(flight.leader)
+
+        def finish_later():
+            time.sleep(0.1)
+            flight.publish(Response({"result": "from leader"}, status=201))
+
+        model = Mock(return_value="own result")
+        thread = threading.Thread(target=finish_later)
+        thread.start()
+        response = async_to_sync(arun_flow)(self._coalesced(model, key="async-key")(None))
+        thread.join()
+
+        model.assert_not_called()
+        self.assertEqual((response.status_code, response.data), (201, {"result": "from leader"}))
+
+    def test_stream_followers_replay_leader_events(self):
+        produced = []
+
+        def produce():
+            produced.append(1)
+            for i in range(5):
+                time.sleep(0.05)
+                yield f"data: {i}\n\n"
+
+        streams = self._in_threads(lambda: list(singleflight.coalesce_stream("stream-key", produce)), 3)
+
+        self.assertEqual(len(produced), 1)
+        self.assertEqual(streams, [[f"data: {i}\n\n" for i in range(5)]] * 3)
+
+    def test_stream_follower_reports_a_leader_that_stopped_mid_stream(self):
+        cache.set("stream-key:lock", "leader-token")
+        cache.set("stream-key:leader-token:count", {"count": 2, "done": False})
+        cache.set_many({f"stream-key:leader-token:chunk:{i}": f"data: {i}\n\n" for i in range(2)})
+        produce = Mock(return_value=iter(["data: own\n\n"]))
+
+        def leader_dies():
+            time.sleep(0.1)
+            cache.delete("stream-key:lock")
+
+        thread = threading.Thread(target=leader_dies)
+        thread.start()
+        events = list(singleflight.coalesce_stream("stream-key", produce))
+        thread.join()
+
+        produce.assert_not_called()
+        self.assertEqual(events, ["data: 0\n\n", "data: 1\n\n", singleflight.STREAM_ABORTED_EVENT])
+
+    @override_settings(MOBILE_SINGLE_FLIGHT_WAIT_SECONDS=0.2)
+    def test_followers_stop_waiting_on_a_stuck_leader(self):
+        cache.set("flight-key:lock", "stuck-token")
+        cache.set("stream-key:lock", "stuck-token")
+
+        started = time.monotonic()
+        response = run_flow(self._coalesced(lambda: "own result")(None))
+        events = list(singleflight.coalesce_stream("stream-key", lambda: iter(["data: own\n\n"])))
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(response.data, {"result": "own result"})
+        self.assertEqual(events, ["data: own\n\n"])
+
+    def test_follower_request_gets_leader_response_without_charging(self):
+        user = User.objects.create_user(username="doubletap", password="StrongPass123!")
+        token = Token.objects.create(user=user)
+        payload = {"last_text": "hey", "situation": "just_matched", "tone": "Natural"}
+        key = singleflight.flight_key(reverse("generate_text_with_credits"), f"user:{user.pk}", payload)
+        leader_data = {"success": True, "reply": "leader reply", "generation_event_id": 41}
+        cache.set(f"{key}:lock", "leader-token")
+        cache.set(f"{key}:leader-token:result", {"status": 200, "data": leader_data})
+        credit_before = ChatCredit.objects.values().get(user=user)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        with patch("mobileapi.views.generate_mobile_response") as mocked_generate:
+            response = client.post(reverse("generate_text_with_credits"), payload, format="json")
+
+        mocked_generate.assert_not_called()
+        self.assertEqual(response.data, leader_data)
+        self.assertEqual(ChatCredit.objects.values().get(user=user), credit_before)
+        self.assertFalse(MobileGenerationEvent.objects.exists())
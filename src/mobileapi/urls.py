@@ -1,7 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from . import community_views
 
+# Under ASGI the model-calling endpoints run as async views (see mobileapi.flows).
+_generation_views = {
+    "generate": views.generate_text_with_credits,
+    "openers": views.generate_openers_from_profile_image,
+    "extract": views.extract_from_image_with_credits,
+}
+if settings.MOBILE_ASYNC_GENERATION_VIEWS:
+    _generation_views = {
+        "generate": views.generate_text_with_credits_async,
+        "openers": views.generate_openers_from_profile_image_async,
+        "extract": views.extract_from_image_with_credits_async,
+    }
+
 urlpatterns = [
     # Authentication
     path("register/", views.register, name="mobile_register"),
@@ -16,15 +30,15 @@ urlpatterns = [
     path("profile/", views.profile, name="mobile_profile"),
     
     # Generation with credits
-    path("generate/", views.generate_text_with_credits, name="generate_text_with_credits"),
-    path("generate-openers-from-image/", views.generate_openers_from_profile_image, name="generate_openers_from_image"),
+    path("generate/", _generation_views["generate"], name="generate_text_with_credits"),
+    path("generate-openers-from-image/", _generation_views["openers"], name="generate_openers_from_image"),
     path("unlock-reply/", views.unlock_reply, name="unlock_reply"),
     path("recommended-openers/", views.recommended_openers, name="recommended_openers"),
     path("copy-event/", views.copy_event, name="mobile_copy_event"),
     path("reply-threads/", views.reply_threads, name="mobile_reply_threads"),
     path("reply-threads/<int:thread_id>/", views.reply_thread_detail, name="mobile_reply_thread_detail"),
     path("install-attribution/", views.install_attribution, name="mobile_install_attribution"),
-    path("extract-image/", views.extract_from_image_with_credits, name="extract_from_image_with_credits"),
+    path("extract-image/", _generation_views["extract"], name="extract_from_image_with_credits"),
     path("extract-image-stream/", views.extract_from_image_with_credits_stream, name="extract_from_image_with_credits_stream"),
     path("analyze-profile/", views.analyze_profile, name="analyze_profile"),
     path("analyze-profile-stream/", views.analyze_profile_stream, name="analyze_profile_stream"),
@@ -32,6 +46,7 @@ urlpatterns = [
 
     # Community
     path("community/posts/", community_views.community_post_list, name="community_post_list"),
+    path("community/posts/search/", community_views.community_post_search, name="community_post_search"),
     path("community/posts/<int:post_id>/", community_views.community_post_detail, name="community_post_detail"),
     path("community/posts/<int:post_id>/vote/", community_views.community_post_vote, name="community_post_vote"),
     path("community/posts/<int:post_id>/comments/", community_views.community_post_comment, name="community_post_comment"),
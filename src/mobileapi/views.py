@@ -9,6 +9,7 @@ from allauth.account.forms import ResetPasswordForm
 from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
+from django.core.cache import cache
 from django.core.validators import validate_email
 from decimal import Decimal, InvalidOperation
 import random
@@ -23,11 +24,26 @@ from datetime import datetime, timedelta, timezone as dt_timezone
 from urllib.parse import parse_qs
 
 from conversation.utils.custom_gpt import generate_custom_response, generate_openers_from_image
-from conversation.utils.mobile.custom_mobile import generate_mobile_response, generate_mobile_openers_from_image
-from conversation.utils.mobile.image_mobile import extract_conversation_from_image_mobile
+from conversation.utils.mobile.custom_mobile import (
+    agenerate_mobile_openers_from_image,
+    agenerate_mobile_response,
+    generate_mobile_openers_from_image,
+    generate_mobile_response,
+)
+from conversation.utils.mobile.image_mobile import (
+    aextract_conversation_from_image_mobile,
+    extract_conversation_from_image_mobile,
+)
+from conversation.utils import image_prep
 from conversation.utils.image_gpt import extract_conversation_from_image, stream_conversation_from_image_bytes
 from conversation.utils.profile_analyzer import analyze_profile_image, stream_profile_analysis_bytes
+from conversation.config_snapshot import get_mobile_config
+from reignitehome import event_writer
 from .auth import normalize_authorization_header
+from . import community_cache, quota
+from .credit_state import CreditState
+from . import singleflight
+from .flows import FlowAPIView, ModelCall, run_flow
 from .renderers import EventStreamRenderer
 from .models import (
     MobileCopyEvent,
@@ -40,9 +56,7 @@ from conversation.models import (
     TrialIP,
     GuestTrial,
     RecommendedOpener,
-    MobileAppConfig,
     LockedReply,
-    DeviceDailyUsage,
 )
 from reignitehome.models import ContactMessage, MarketingClickEvent
 from pricing.models import CreditPurchase
@@ -79,8 +93,8 @@ def _log_ai_action(action_type: str, model: str, is_subscribed: bool, is_signed_
     log_line = f"[AI DEBUG] {model_name} | {action_type} | {subscription_status} | {user_status}"
     logger.info(log_line)
 def _get_config():
-    """Load admin-configurable settings from the MobileAppConfig singleton."""
-    return MobileAppConfig.load()
+    """Read-only snapshot of the MobileAppConfig singleton (no query once warm)."""
+    return get_mobile_config()
 
 def _mask_token(token):
     if not token:
@@ -187,6 +201,7 @@ def _normalize_generation_result(result: Any) -> Tuple[str, bool, Dict[str, Any]
             "thinking_used": str(meta.get("thinking_used") or "n/a"),
             "source_type": str(meta.get("source_type") or MobileGenerationEvent.SourceType.AI),
             "usage": _normalize_usage_payload(meta.get("usage")),
+            "hedge": meta.get("hedge") if isinstance(meta.get("hedge"), dict) else None,
         },
     )
 
@@ -235,8 +250,14 @@ def _persist_mobile_generation_event(
     usage: Dict[str, int],
     reply_ocr_text: Optional[str] = None,
     metadata: Optional[Dict[str, Any]] = None,
+    hedge: Optional[Dict[str, Any]] = None,
+    cache: Optional[Dict[str, Any]] = None,
 ) -> Optional[MobileGenerationEvent]:
     try:
+        if hedge:
+            metadata = {**(metadata or {}), "hedge": hedge}
+        if cache:
+            metadata = {**(metadata or {}), "cache": cache}
         user_type = _resolve_mobile_user_type(request, chat_credit=chat_credit)
         user = request.user if request.user.is_authenticated else None
         guest_hash = ""
@@ -244,7 +265,7 @@ def _persist_mobile_generation_event(
             guest_hash = _get_guest_hash_for_mobile_analytics(request)
 
         usage = _normalize_usage_payload(usage)
-        event = MobileGenerationEvent.objects.create(
+        event = MobileGenerationEvent(
             user=user,
             guest_id_hash=guest_hash or None,
             user_type=user_type,
@@ -260,8 +281,13 @@ def _persist_mobile_generation_event(
             reply_ocr_text=(reply_ocr_text or "").strip() or None,
             metadata=metadata or {},
         )
+        # Written off-request; the id is reserved up front because clients
+        # send it back as generation_event_id.
+        if not event_writer.record(event, allocate_pk=True):
+            return None
+        _claim_generation_event(event)
         logger.info(
-            "Mobile generation event persisted id=%s action_type=%s user_type=%s source_type=%s",
+            "Mobile generation event recorded id=%s action_type=%s user_type=%s source_type=%s",
             event.pk,
             event.action_type,
             event.user_type,
@@ -273,13 +299,47 @@ def _persist_mobile_generation_event(
         return None
 
 
+# How long a reserved generation event id stays usable on its cache claim
+# alone; the event writer flushes its row well within this.
+_GENERATION_EVENT_CLAIM_SECONDS = 10 * 60
+
+
+def _generation_event_claim_key(event_id) -> str:
+    return f"mobile_generation_event_claim:{event_id}"
+
+
+def _claim_generation_event(event: MobileGenerationEvent) -> None:
+    cache.set(
+        _generation_event_claim_key(event.pk),
+        [event.user_id, event.guest_id_hash],
+        _GENERATION_EVENT_CLAIM_SECONDS,
+    )
+
+
+def _generation_event_owner(event_id) -> Optional[Tuple[Optional[int], Optional[str]]]:
+    """``(user_id, guest_id_hash)`` of generation event ``event_id``, or None if unknown.
+
+    The row may still be queued in another worker's event writer, so a miss
+    falls back to the claim recorded in the shared cache when the id was
+    reserved.
+    """
+    owner = (
+        MobileGenerationEvent.objects.filter(pk=event_id)
+        .values_list("user_id", "guest_id_hash")
+        .first()
+    )
+    if owner is None:
+        owner = cache.get(_generation_event_claim_key(event_id))
+    return tuple(owner) if owner else None
+
+
 def _persist_mobile_copy_event(
     *,
     request,
     chat_credit: Optional[ChatCredit],
     copy_type: str,
     copied_text: str,
-    generation_event: Optional[MobileGenerationEvent] = None,
+    generation_event_id: Optional[int] = None,
     reply_context_ocr_text: Optional[str] = None,
 ) -> Optional[MobileCopyEvent]:
     try:
@@ -289,18 +349,20 @@ def _persist_mobile_copy_event(
         if not user:
             guest_hash = _get_guest_hash_for_mobile_analytics(request)
 
-        event = MobileCopyEvent.objects.create(
+        event = MobileCopyEvent(
             user=user,
             guest_id_hash=guest_hash or None,
             user_type=user_type,
             copy_type=copy_type,
             copied_text=copied_text,
             reply_context_ocr_text=(reply_context_ocr_text or "").strip() or None,
-            generation_event=generation_event,
+            generation_event_id=generation_event_id,
         )
+        # A copy event dropped under backpressure is counted by the writer;
+        # the client does not need to retry it.
+        event_writer.record(event)
         logger.info(
-            "Mobile copy event persisted id=%s copy_type=%s user_type=%s",
-            event.pk,
+            "Mobile copy event recorded copy_type=%s user_type=%s",
             event.copy_type,
             event.user_type,
         )
@@ -355,6 +417,7 @@ def _normalize_ocr_result(result: Any, fallback_thinking_level: str) -> Tuple[st
         "thinking_used": str(meta.get("thinking_used") or fallback_thinking_level or "n/a"),
         "source_type": str(meta.get("source_type") or MobileGenerationEvent.SourceType.AI),
         "usage": _normalize_usage_payload(meta.get("usage")),
+        "cache": meta.get("cache") if isinstance(meta.get("cache"), dict) else None,
     }
     return str(conversation or ""), bool(success), normalized
 
@@ -469,14 +532,30 @@ def _ratelimit_username(group, request):
 
 
 def _ratelimit_device(group, request):
+    # Stacked decorators ask for the key once each; hash the fingerprint once.
+    cached = getattr(request, "_ratelimit_device_key", None)
+    if cached is not None:
+        return cached
     raw = (
         request.META.get("HTTP_X_DEVICE_FINGERPRINT")
         or request.META.get("HTTP_X_GUEST_ID")
         or ""
     ).strip()
     if raw:
-        return _hash_device_fingerprint(raw[:256])
-    return f"ip:{get_client_ip(request)}"
+        key = _hash_device_fingerprint(raw[:256])
+    else:
+        key = f"ip:{get_client_ip(request)}"
+    setattr(request, "_ratelimit_device_key", key)
+    return key
+
+
+def _single_flight_key(request) -> Optional[str]:
+    """Coalescing key for duplicate in-flight generation requests (see mobileapi.singleflight)."""
+    if request.user.is_authenticated:
+        actor = f"user:{request.user.pk}"
+    else:
+        actor = _ratelimit_device(None, request)
+    return singleflight.flight_key(request.path, actor, request.data)
 
 
 def _rotate_user_token(user):
@@ -667,6 +746,7 @@ def _is_subscription_active(chat_credit):
             "subscription_product_id",
             "subscription_platform",
         ])
+        community_cache.invalidate_pro_status(chat_credit.user_id)
         return False
     return True
 
@@ -685,15 +765,10 @@ def _check_subscriber_allowance(chat_credit):
 def _consume_subscriber_allowance(chat_credit):
     """Consume one weekly fair-use action after a successful generation."""
     cfg = _get_config()
-    with transaction.atomic():
-        chat_credit = ChatCredit.objects.select_for_update().get(pk=chat_credit.pk)
-        _reset_weekly_counter(chat_credit)
-        used = chat_credit.subscriber_weekly_actions or 0
-        if used >= cfg.subscriber_weekly_limit:
-            return False, 0
-        chat_credit.subscriber_weekly_actions = used + 1
-        chat_credit.save(update_fields=["subscriber_weekly_actions"])
-        remaining = max(0, cfg.subscriber_weekly_limit - chat_credit.subscriber_weekly_actions)
+    if not quota.consume_subscriber_weekly(chat_credit.pk, cfg.subscriber_weekly_limit):
+        return False, 0
+    chat_credit.subscriber_weekly_actions = (chat_credit.subscriber_weekly_actions or 0) + 1
+    remaining = max(0, cfg.subscriber_weekly_limit - chat_credit.subscriber_weekly_actions)
     return True, remaining
 
 
@@ -712,19 +787,6 @@ def _reset_daily_counters(chat_credit):
         ])
 
 
-def _reset_free_daily_counter(chat_credit):
-    """Reset free user daily counter if a new day has started (UTC)."""
-    now = timezone.now()
-    reset_at = chat_credit.free_daily_reset_at
-    if not reset_at or reset_at.date() < now.date():
-        chat_credit.free_daily_credits_used = 0
-        chat_credit.free_daily_reset_at = now
-        chat_credit.save(update_fields=[
-            "free_daily_credits_used",
-            "free_daily_reset_at"
-        ])
-
-
 def _get_device_fingerprint(request):
     """Prefer explicit device fingerprint header, fallback to legacy guest id."""
     raw = (
@@ -745,91 +807,28 @@ def _hash_device_fingerprint(raw_fingerprint):
     return hmac.new(key, msg, hashlib.sha256).hexdigest()
 
 
-def _get_device_daily_usage(request):
-    """Return today's usage count for a device fingerprint."""
-    raw_fingerprint = _get_device_fingerprint(request)
-    device_hash = _hash_device_fingerprint(raw_fingerprint)
-    if not device_hash:
-        return 0
-    today = timezone.now().date()
-    usage = DeviceDailyUsage.objects.filter(
-        device_hash=device_hash,
-        day=today,
-    ).first()
-    return usage.used_count if usage else 0
-
-
-def _check_free_credit_allowance(chat_credit, cfg, request=None):
+def _check_free_credit_allowance(credit_state, cfg):
     """Check free user daily shared pool across account + device. Returns (allowed, remaining)."""
-    _reset_free_daily_counter(chat_credit)
-    user_used = chat_credit.free_daily_credits_used or 0
-
-    if request is None:
-        if user_used >= cfg.free_daily_credit_limit:
-            return False, 0
-        remaining = max(0, cfg.free_daily_credit_limit - user_used)
-        return True, remaining
-
-    device_used = _get_device_daily_usage(request)
-    effective_used = max(user_used, device_used)
-    if effective_used >= cfg.free_daily_credit_limit:
-        return False, 0
-    remaining = max(0, cfg.free_daily_credit_limit - effective_used)
-    return True, remaining
+    remaining = credit_state.free_remaining(cfg)
+    return remaining > 0, remaining
 
 
 def _consume_free_credit_allowance(chat_credit, cfg, request=None):
-    """Consume one free daily credit after a successful generation."""
-    _reset_free_daily_counter(chat_credit)
-
-    if request is None:
-        with transaction.atomic():
-            chat_credit = ChatCredit.objects.select_for_update().get(pk=chat_credit.pk)
-            _reset_free_daily_counter(chat_credit)
-            user_used = chat_credit.free_daily_credits_used or 0
-            if user_used >= cfg.free_daily_credit_limit:
-                return False, 0
-            chat_credit.free_daily_credits_used = user_used + 1
-            chat_credit.save(update_fields=["free_daily_credits_used"])
-            remaining = max(0, cfg.free_daily_credit_limit - chat_credit.free_daily_credits_used)
-        return True, remaining
-
-    raw_fingerprint = _get_device_fingerprint(request)
-    device_hash = _hash_device_fingerprint(raw_fingerprint)
-    today = timezone.now().date()
-    device_used = 0
-    device_usage = None
-
-    with transaction.atomic():
-        # Re-read row in transaction to avoid racey increments.
-        chat_credit = ChatCredit.objects.select_for_update().get(pk=chat_credit.pk)
-        _reset_free_daily_counter(chat_credit)
-        user_used = chat_credit.free_daily_credits_used or 0
-
-        if device_hash:
-            device_usage, _ = DeviceDailyUsage.objects.select_for_update().get_or_create(
-                device_hash=device_hash,
-                day=today,
-                defaults={"used_count": 0},
-            )
-            device_used = device_usage.used_count or 0
-
-        effective_used = max(user_used, device_used)
-        if effective_used >= cfg.free_daily_credit_limit:
-            return False, 0
+    """Consume one free daily credit after a successful generation.
 
-        new_used = effective_used + 1
-
-        if chat_credit.free_daily_credits_used != new_used:
-            chat_credit.free_daily_credits_used = new_used
-            chat_credit.save(update_fields=["free_daily_credits_used"])
-
-        if device_usage and device_usage.used_count != new_used:
-            device_usage.used_count = new_used
-            device_usage.save(update_fields=["used_count", "last_seen"])
-
-    remaining = max(0, cfg.free_daily_credit_limit - new_used)
-    return True, remaining
+    The caller's ``chat_credit`` is updated in place so a CreditState built
+    around it reports the post-consumption counters without a re-read.
+    """
+    device_hash = _device_hash_for_request(request) if request is not None else ""
+    new_used = quota.consume_free_credit(
+        chat_credit.pk,
+        cfg.free_daily_credit_limit,
+        device_hash=device_hash,
+    )
+    if new_used is None:
+        return False, 0
+    chat_credit.free_daily_credits_used = new_used
+    return True, max(0, cfg.free_daily_credit_limit - new_used)
 
 
 def _get_subscriber_tier(chat_credit, cfg, tier_type, usage_field):
@@ -838,8 +837,7 @@ def _get_subscriber_tier(chat_credit, cfg, tier_type, usage_field):
     _reset_daily_counters(chat_credit)
     used = getattr(chat_credit, usage_field)
 
-    tiers = cfg.tiers.filter(tier_type=tier_type).order_by('sort_order')
-    for tier in tiers:
+    for tier in cfg.tiers_for(tier_type):
         if used < tier.threshold:
             return tier.model, tier.thinking_level or None
     return cfg.fallback_model, None
@@ -847,12 +845,8 @@ def _get_subscriber_tier(chat_credit, cfg, tier_type, usage_field):
 
 def _consume_subscriber_daily_usage(chat_credit, usage_field):
     """Consume one subscriber daily usage unit after successful generation."""
-    with transaction.atomic():
-        chat_credit = ChatCredit.objects.select_for_update().get(pk=chat_credit.pk)
-        _reset_daily_counters(chat_credit)
-        used = getattr(chat_credit, usage_field) or 0
-        setattr(chat_credit, usage_field, used + 1)
-        chat_credit.save(update_fields=[usage_field])
+    quota.consume_subscriber_daily(chat_credit.pk, usage_field)
+    setattr(chat_credit, usage_field, (getattr(chat_credit, usage_field) or 0) + 1)
 
 
 def _has_pending_locked_reply(user):
@@ -903,39 +897,40 @@ def _extract_full_message_preview(reply_json_str):
         return []
 
 
-def _subscription_payload(chat_credit, request=None):
-    """Return subscription info payload for mobile clients."""
-    cfg = _get_config()
-    _reset_daily_counters(chat_credit)  # Ensure counters are fresh
-    _reset_free_daily_counter(chat_credit)
-    user_used = chat_credit.free_daily_credits_used or 0
-    device_used = _get_device_daily_usage(request) if request is not None else 0
-    effective_used = max(user_used, device_used)
-    remaining_free = max(0, cfg.free_daily_credit_limit - effective_used)
-    expiry = chat_credit.subscription_expiry.isoformat() if chat_credit.subscription_expiry else None
-    return {
-        "is_subscribed": _is_subscription_active(chat_credit),
-        "subscription_expiry": expiry,
-        "subscription_product_id": chat_credit.subscription_product_id,
-        "subscription_platform": chat_credit.subscription_platform,
-        "subscription_auto_renewing": chat_credit.subscription_auto_renewing,
-        # Subscriber daily usage
-        "daily_openers_used": chat_credit.subscriber_daily_openers or 0,
-        "daily_replies_used": chat_credit.subscriber_daily_replies or 0,
-        # Free user daily credits
-        "free_daily_credits_remaining": remaining_free,
-        "free_daily_credits_limit": cfg.free_daily_credit_limit,
-        # Pending unlock status
-        "has_pending_unlock": LockedReply.objects.filter(
-            user=chat_credit.user, unlocked=False, created_at__date=timezone.now().date()
-        ).exists(),
-        # Legacy weekly fields (backward compatibility)
-        "subscriber_weekly_remaining": max(
-            0,
-            cfg.subscriber_weekly_limit - (chat_credit.subscriber_weekly_actions or 0)
-        ),
-        "subscriber_weekly_limit": cfg.subscriber_weekly_limit,
-    }
+def _device_hash_for_request(request):
+    return _hash_device_fingerprint(_get_device_fingerprint(request))
+
+
+def _get_credit_state(request):
+    """CreditState for the authenticated user, built from a single query.
+
+    Raises ChatCredit.DoesNotExist when the user has no credit row yet.
+    """
+    return CreditState.get(request.user, device_hash=_device_hash_for_request(request))
+
+
+def _create_credit_state(request, **fields):
+    """Create the user's ChatCredit row and wrap it in a CreditState."""
+    return CreditState.create(request.user, device_hash=_device_hash_for_request(request), **fields)
+
+
+def _credit_state_or_none(request) -> Optional[CreditState]:
+    try:
+        return _get_credit_state(request)
+    except ChatCredit.DoesNotExist:
+        return None
+
+
+def _subscription_payload(credit, request=None):
+    """Return subscription info payload for mobile clients.
+
+    ``credit`` is normally the request's CreditState (no queries). Auth and
+    purchase flows that only hold a ChatCredit get a state built for them.
+    """
+    if not isinstance(credit, CreditState):
+        device_hash = _device_hash_for_request(request) if request is not None else ""
+        credit = CreditState.for_chat_credit(credit, device_hash=device_hash)
+    return credit.subscription_payload(_get_config())
 
 
 def _reset_trial_if_stale(trial_ip):
@@ -1609,6 +1604,7 @@ def google_play_purchase(request):
 
         chat_credit, _ = ChatCredit.objects.get_or_create(user=request.user)
         chat_credit.add_credits(credits, reason="google_play_purchase")
+        community_cache.invalidate_pro_status(request.user.pk)
 
         CreditPurchase.objects.create(
             user=request.user,
@@ -1714,6 +1710,7 @@ def verify_subscription(request):
                 "subscription_auto_renewing",
                 "subscription_last_checked",
             ])
+            community_cache.invalidate_pro_status(request.user.pk)
             payload = _subscription_payload(chat_credit, request=request)
             return Response({"success": True, **payload})
 
@@ -1735,6 +1732,7 @@ def verify_subscription(request):
             "subscription_platform",
             "subscription_last_checked",
         ])
+        community_cache.invalidate_pro_status(request.user.pk)
         return Response(
             {"success": False, "error": error_code or "verification_failed"},
             status=400,
@@ -1811,8 +1809,9 @@ def profile(request):
     """Get user profile"""
     try:
         user = request.user
-        chat_credit = ChatCredit.objects.get(user=user)
-        subscription_info = _subscription_payload(chat_credit, request=request)
+        credit_state = _get_credit_state(request)
+        chat_credit = credit_state.chat_credit
+        subscription_info = _subscription_payload(credit_state)
         
         return Response({
             "success": True,
@@ -1826,8 +1825,9 @@ def profile(request):
         })
     except ChatCredit.DoesNotExist:
         # Create chat credit if doesn't exist
-        chat_credit = ChatCredit.objects.create(user=user, balance=10)
-        subscription_info = _subscription_payload(chat_credit, request=request)
+        credit_state = _create_credit_state(request, balance=10)
+        chat_credit = credit_state.chat_credit
+        subscription_info = _subscription_payload(credit_state)
         return Response({
             "success": True,
             "user": {
@@ -1953,12 +1953,9 @@ def delete_account(request):
             status=500,
         )
 
-@ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_GENERATE_IP"), block=True)
-@ratelimit(key=_ratelimit_device, rate=_rate("MOBILE_RATELIMIT_GENERATE_DEVICE"), block=True)
-@api_view(["POST"])
-@permission_classes([AllowAny])
-def generate_text_with_credits(request):
-    """Generate text with credit system"""
+@singleflight.coalesce(_single_flight_key)
+def _generate_text_flow(request):
+    """Body of generate_text_with_credits; yields its model calls (see mobileapi.flows)."""
     try:
         _normalize_mobile_auth_header(request)
         auth_header_present = bool(request.META.get("HTTP_AUTHORIZATION"))
@@ -1991,7 +1988,8 @@ def generate_text_with_credits(request):
         if request.user.is_authenticated:
             logger.info(f"Authenticated user: {request.user.username}")
             try:
-                chat_credit = ChatCredit.objects.get(user=request.user)
+                credit_state = _get_credit_state(request)
+                chat_credit = credit_state.chat_credit
                 logger.info(f"User credits: {chat_credit.balance}")
 
                 # Safety: ensure every non-subscriber gets at least 3 free generations total
@@ -2007,7 +2005,9 @@ def generate_text_with_credits(request):
                     model, thinking = _get_subscriber_tier(chat_credit, cfg, 'reply', 'subscriber_daily_replies')
                     _log_ai_action("replies", model, True, True, request.user.username)
 
-                    result = generate_mobile_response(
+                    result = yield ModelCall(
+                        generate_mobile_response,
+                        agenerate_mobile_response,
                         last_text,
                         situation,
                         her_info,
@@ -2016,6 +2016,7 @@ def generate_text_with_credits(request):
                         thinking_level=thinking,
                         primary_model=model,
                         fallback_model=cfg.fallback_model,
+                        hedge_after_ms=cfg.reply_hedge_after_ms,
                         return_meta=True,
                     )
                     reply, success, meta = _normalize_generation_result(result)
@@ -2031,6 +2032,7 @@ def generate_text_with_credits(request):
                             model_used=meta["model_used"],
                             thinking_used=meta["thinking_used"],
                             usage=meta["usage"],
+                            hedge=meta.get("hedge"),
                             reply_ocr_text=ocr_text if input_source == "ocr" else None,
                             metadata={
                                 "endpoint": "generate_text_with_credits",
@@ -2046,16 +2048,16 @@ def generate_text_with_credits(request):
                             if generation_event is not None
                             else {}
                         ),
-                        **_subscription_payload(chat_credit, request=request),
+                        **_subscription_payload(credit_state),
                     })
 
                 # --- Signed-in non-subscriber path (daily shared pool + blurred cliff) ---
                 cfg = _get_config()
-                allowed, remaining = _check_free_credit_allowance(chat_credit, cfg, request=request)
+                allowed, remaining = _check_free_credit_allowance(credit_state, cfg)
 
                 if not allowed:
                     # Daily credits exhausted — check one-pending-reply rule
-                    existing = _has_pending_locked_reply(request.user)
+                    existing = _has_pending_locked_reply(request.user) if credit_state.has_pending_unlock else None
 
                     if existing:
                         # Already has a pending locked reply today — paywall immediately (no AI call)
@@ -2066,12 +2068,14 @@ def generate_text_with_credits(request):
                             "has_pending_unlock": True,
                             "locked_reply_id": existing.pk,
                             "locked_preview": existing.preview,
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         })
 
                     # First time at limit today — generate ONE blurred reply, store server-side
                     _log_ai_action("replies", cfg.registered_reply_model, False, True, request.user.username)
-                    result = generate_mobile_response(
+                    result = yield ModelCall(
+                        generate_mobile_response,
+                        agenerate_mobile_response,
                         last_text,
                         situation,
                         her_info,
@@ -2080,6 +2084,7 @@ def generate_text_with_credits(request):
                         thinking_level=cfg.registered_reply_thinking,
                         primary_model=cfg.registered_reply_model,
                         fallback_model=cfg.fallback_model,
+                        hedge_after_ms=cfg.reply_hedge_after_ms,
                         return_meta=True,
                     )
                     reply, success, meta = _normalize_generation_result(result)
@@ -2094,6 +2099,7 @@ def generate_text_with_credits(request):
                             model_used=meta["model_used"],
                             thinking_used=meta["thinking_used"],
                             usage=meta["usage"],
+                            hedge=meta.get("hedge"),
                             reply_ocr_text=ocr_text if input_source == "ocr" else None,
                             metadata={
                                 "endpoint": "generate_text_with_credits",
@@ -2104,6 +2110,7 @@ def generate_text_with_credits(request):
                         )
                         preview = _extract_blur_preview(reply, cfg.blur_preview_word_count)
                         locked = _create_locked_reply(request.user, reply, preview, 'reply')
+                        credit_state.has_pending_unlock = True
                         return Response({
                             "success": True,
                             "is_locked": True,
@@ -2114,19 +2121,21 @@ def generate_text_with_credits(request):
                                 if generation_event is not None
                                 else {}
                             ),
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         })
                     else:
                         return Response({
                             "success": False,
                             "error": "generation_failed",
                             "message": "Something went wrong. Please try again.",
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         })
 
                 # Normal free user path (has daily credits remaining)
                 _log_ai_action("replies", cfg.registered_reply_model, False, True, request.user.username)
-                result = generate_mobile_response(
+                result = yield ModelCall(
+                    generate_mobile_response,
+                    agenerate_mobile_response,
                     last_text,
                     situation,
                     her_info,
@@ -2135,6 +2144,7 @@ def generate_text_with_credits(request):
                     thinking_level=cfg.registered_reply_thinking,
                     primary_model=cfg.registered_reply_model,
                     fallback_model=cfg.fallback_model,
+                    hedge_after_ms=cfg.reply_hedge_after_ms,
                     return_meta=True,
                 )
                 reply, success, meta = _normalize_generation_result(result)
@@ -2152,6 +2162,7 @@ def generate_text_with_credits(request):
                         model_used=meta["model_used"],
                         thinking_used=meta["thinking_used"],
                         usage=meta["usage"],
+                        hedge=meta.get("hedge"),
                         reply_ocr_text=ocr_text if input_source == "ocr" else None,
                         metadata={
                             "endpoint": "generate_text_with_credits",
@@ -2169,16 +2180,19 @@ def generate_text_with_credits(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
 
             except ChatCredit.DoesNotExist:
                 logger.warning(f"ChatCredit not found for user {request.user.username}, creating one")
                 # Create chat credit for user
-                chat_credit = ChatCredit.objects.create(user=request.user, balance=5)  # 6-1
+                credit_state = _create_credit_state(request, balance=5)  # 6-1
+                chat_credit = credit_state.chat_credit
                 cfg = _get_config()
                 _log_ai_action("replies", cfg.registered_reply_model, False, True, request.user.username)
-                result = generate_mobile_response(
+                result = yield ModelCall(
+                    generate_mobile_response,
+                    agenerate_mobile_response,
                     last_text,
                     situation,
                     her_info,
@@ -2187,6 +2201,7 @@ def generate_text_with_credits(request):
                     thinking_level=cfg.registered_reply_thinking,
                     primary_model=cfg.registered_reply_model,
                     fallback_model=cfg.fallback_model,
+                    hedge_after_ms=cfg.reply_hedge_after_ms,
                     return_meta=True,
                 )
                 reply, success, meta = _normalize_generation_result(result)
@@ -2202,6 +2217,7 @@ def generate_text_with_credits(request):
                         model_used=meta["model_used"],
                         thinking_used=meta["thinking_used"],
                         usage=meta["usage"],
+                        hedge=meta.get("hedge"),
                         reply_ocr_text=ocr_text if input_source == "ocr" else None,
                         metadata={
                             "endpoint": "generate_text_with_credits",
@@ -2218,7 +2234,7 @@ def generate_text_with_credits(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
         else:
             logger.info("Guest user detected")
@@ -2251,7 +2267,9 @@ def generate_text_with_credits(request):
 
             # Generate response with tone and custom instructions
             _log_ai_action("replies", cfg.free_reply_model, False, False)
-            result = generate_mobile_response(
+            result = yield ModelCall(
+                generate_mobile_response,
+                agenerate_mobile_response,
                 last_text,
                 situation,
                 her_info,
@@ -2260,6 +2278,7 @@ def generate_text_with_credits(request):
                 thinking_level=cfg.free_reply_thinking,
                 primary_model=cfg.free_reply_model,
                 fallback_model=cfg.fallback_model,
+                hedge_after_ms=cfg.reply_hedge_after_ms,
                 return_meta=True,
             )
             reply, success, meta = _normalize_generation_result(result)
@@ -2281,6 +2300,7 @@ def generate_text_with_credits(request):
                     model_used=meta["model_used"],
                     thinking_used=meta["thinking_used"],
                     usage=meta["usage"],
+                    hedge=meta.get("hedge"),
                     reply_ocr_text=ocr_text if input_source == "ocr" else None,
                     metadata={
                         "endpoint": "generate_text_with_credits",
@@ -2306,12 +2326,30 @@ def generate_text_with_credits(request):
         return Response({"success": False, "error": "Generation failed", "message": str(e)})
 
 
-@ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_EXTRACT_IP"), block=True)
-@ratelimit(key=_ratelimit_device, rate=_rate("MOBILE_RATELIMIT_EXTRACT_DEVICE"), block=True)
+@ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_GENERATE_IP"), block=True)
+@ratelimit(key=_ratelimit_device, rate=_rate("MOBILE_RATELIMIT_GENERATE_DEVICE"), block=True)
 @api_view(["POST"])
 @permission_classes([AllowAny])
-def extract_from_image_with_credits(request):
-    """Extract from image with credit system"""
+def generate_text_with_credits(request):
+    """Generate text with credit system"""
+    return run_flow(_generate_text_flow(request))
+
+
+# ASGI variant, routed when MOBILE_ASYNC_GENERATION_VIEWS is on.
+generate_text_with_credits_async = FlowAPIView.as_view(
+    flow=_generate_text_flow,
+    permission_classes=[AllowAny],
+    ratelimit_group=f"{__name__}.generate_text_with_credits_async",
+    ratelimits=[
+        ("ip", _rate("MOBILE_RATELIMIT_GENERATE_IP")),
+        (_ratelimit_device, _rate("MOBILE_RATELIMIT_GENERATE_DEVICE")),
+    ],
+)
+
+
+@singleflight.coalesce(_single_flight_key)
+def _extract_from_image_flow(request):
+    """Body of extract_from_image_with_credits; yields its model calls (see mobileapi.flows)."""
     try:
         _normalize_mobile_auth_header(request)
         auth_header_present = bool(request.META.get("HTTP_AUTHORIZATION"))
@@ -2343,7 +2381,8 @@ def extract_from_image_with_credits(request):
         # Check if user is authenticated
         if request.user.is_authenticated:
             try:
-                chat_credit = ChatCredit.objects.get(user=request.user)
+                credit_state = _get_credit_state(request)
+                chat_credit = credit_state.chat_credit
                 is_sub_active = _is_subscription_active(chat_credit)
                 if is_sub_active:
                     allowed, remaining = _check_subscriber_allowance(chat_credit)
@@ -2353,13 +2392,15 @@ def extract_from_image_with_credits(request):
                                 "success": False,
                                 "error": "fair_use_exceeded",
                                 "conversation": "You hit the weekly fair-use limit. Try again soon.",
-                                **_subscription_payload(chat_credit, request=request),
+                                **_subscription_payload(credit_state),
                             },
                             status=429,
                         )
                 # For non-subscribers, OCR is free (do not check or deduct credits)
 
-                ocr_result = extract_conversation_from_image_mobile(
+                ocr_result = yield ModelCall(
+                    extract_conversation_from_image_mobile,
+                    aextract_conversation_from_image_mobile,
                     screenshot,
                     thinking_level=cfg.ocr_thinking,
                     return_meta=True,
@@ -2379,6 +2420,7 @@ def extract_from_image_with_credits(request):
                         model_used=ocr_meta["model_used"],
                         thinking_used=ocr_meta["thinking_used"],
                         usage=ocr_meta["usage"],
+                        cache=ocr_meta["cache"],
                         metadata={"endpoint": "extract_from_image_with_credits"},
                     )
                 if is_sub_active and conversation and not conversation.lower().startswith("failed to extract"):
@@ -2394,12 +2436,15 @@ def extract_from_image_with_credits(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
 
             except ChatCredit.DoesNotExist:
-                chat_credit = ChatCredit.objects.create(user=request.user, balance=9)  # legacy field retained
-                ocr_result = extract_conversation_from_image_mobile(
+                credit_state = _create_credit_state(request, balance=9)
+                chat_credit = credit_state.chat_credit  # legacy field retained
+                ocr_result = yield ModelCall(
+                    extract_conversation_from_image_mobile,
+                    aextract_conversation_from_image_mobile,
                     screenshot,
                     thinking_level=cfg.ocr_thinking,
                     return_meta=True,
@@ -2419,6 +2464,7 @@ def extract_from_image_with_credits(request):
                         model_used=ocr_meta["model_used"],
                         thinking_used=ocr_meta["thinking_used"],
                         usage=ocr_meta["usage"],
+                        cache=ocr_meta["cache"],
                         metadata={"endpoint": "extract_from_image_with_credits"},
                     )
                 
@@ -2430,11 +2476,13 @@ def extract_from_image_with_credits(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
         else:
             # Guests: OCR is free and does not consume trial credits
-            ocr_result = extract_conversation_from_image_mobile(
+            ocr_result = yield ModelCall(
+                extract_conversation_from_image_mobile,
+                aextract_conversation_from_image_mobile,
                 screenshot,
                 thinking_level=cfg.ocr_thinking,
                 return_meta=True,
@@ -2454,6 +2502,7 @@ def extract_from_image_with_credits(request):
                     model_used=ocr_meta["model_used"],
                     thinking_used=ocr_meta["thinking_used"],
                     usage=ocr_meta["usage"],
+                    cache=ocr_meta["cache"],
                     metadata={"endpoint": "extract_from_image_with_credits"},
                 )
             return Response({
@@ -2473,6 +2522,27 @@ def extract_from_image_with_credits(request):
         }, status=500)
 
 
+@ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_EXTRACT_IP"), block=True)
+@ratelimit(key=_ratelimit_device, rate=_rate("MOBILE_RATELIMIT_EXTRACT_DEVICE"), block=True)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def extract_from_image_with_credits(request):
+    """Extract from image with credit system"""
+    return run_flow(_extract_from_image_flow(request))
+
+
+# ASGI variant, routed when MOBILE_ASYNC_GENERATION_VIEWS is on.
+extract_from_image_with_credits_async = FlowAPIView.as_view(
+    flow=_extract_from_image_flow,
+    permission_classes=[AllowAny],
+    ratelimit_group=f"{__name__}.extract_from_image_with_credits_async",
+    ratelimits=[
+        ("ip", _rate("MOBILE_RATELIMIT_EXTRACT_IP")),
+        (_ratelimit_device, _rate("MOBILE_RATELIMIT_EXTRACT_DEVICE")),
+    ],
+)
+
+
 @ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_EXTRACT_STREAM_IP"), block=True)
 @ratelimit(key=_ratelimit_device, rate=_rate("MOBILE_RATELIMIT_EXTRACT_STREAM_DEVICE"), block=True)
 @api_view(["POST"])
@@ -2496,7 +2566,8 @@ def extract_from_image_with_credits_stream(request):
     if screenshot.content_type and screenshot.content_type not in allowed_types:
         logger.warning(f"Unusual content type: {screenshot.content_type}")
 
-    img_bytes = screenshot.read()
+    # Shared by the resized pass and the original-image retry
+    image = image_prep.prepare(screenshot.read())
 
     def _has_labeled_lines(text):
         lowered = text.lower()
@@ -2504,24 +2575,26 @@ def extract_from_image_with_credits_stream(request):
 
     if request.user.is_authenticated:
         try:
-            chat_credit = ChatCredit.objects.get(user=request.user)
+            credit_state = _get_credit_state(request)
+            chat_credit = credit_state.chat_credit
             is_sub_active = _is_subscription_active(chat_credit)
             if is_sub_active:
                 allowed, remaining = _check_subscriber_allowance(chat_credit)
                 if not allowed:
                     return StreamingHttpResponse(
-                        _error_stream("fair_use_exceeded", "You hit the weekly fair-use limit. Try again soon.", _subscription_payload(chat_credit, request=request)),
+                        _error_stream("fair_use_exceeded", "You hit the weekly fair-use limit. Try again soon.", _subscription_payload(credit_state)),
                         content_type="text/event-stream",
                     )
             # For non-subscribers, OCR streaming is free (no credit gate)
         except ChatCredit.DoesNotExist:
-            chat_credit = ChatCredit.objects.create(user=request.user, balance=9)
+            credit_state = _create_credit_state(request, balance=9)
+            chat_credit = credit_state.chat_credit
             is_sub_active = _is_subscription_active(chat_credit)
 
         def gen():
             output_parts = []
             try:
-                for delta in stream_conversation_from_image_bytes(img_bytes, use_resize=True):
+                for delta in stream_conversation_from_image_bytes(image, use_resize=True):
                     output_parts.append(delta)
                     yield _sse_event(json.dumps({"type": "delta", "text": delta}))
 
@@ -2529,7 +2602,7 @@ def extract_from_image_with_credits_stream(request):
                 if not _has_labeled_lines(full):
                     yield _sse_event(json.dumps({"type": "reset"}))
                     output_parts = []
-                    for delta in stream_conversation_from_image_bytes(img_bytes, use_resize=False):
+                    for delta in stream_conversation_from_image_bytes(image, use_resize=False):
                         output_parts.append(delta)
                         yield _sse_event(json.dumps({"type": "delta", "text": delta}))
                     full = "".join(output_parts).strip()
@@ -2549,7 +2622,7 @@ def extract_from_image_with_credits_stream(request):
                             "type": "done",
                             "conversation": full,
                             "credits_remaining": chat_credit.balance,
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         }
                     )
                 )
@@ -2558,13 +2631,16 @@ def extract_from_image_with_credits_stream(request):
                     json.dumps({"type": "error", "error": "ocr_failed", "message": str(exc)})
                 )
 
-        response = StreamingHttpResponse(gen(), content_type="text/event-stream")
+        response = StreamingHttpResponse(
+            singleflight.coalesce_stream(_single_flight_key(request), gen),
+            content_type="text/event-stream",
+        )
     else:
         # Guests: OCR streaming is free and does not consume trial credits
         def gen():
             output_parts = []
             try:
-                for delta in stream_conversation_from_image_bytes(img_bytes, use_resize=True):
+                for delta in stream_conversation_from_image_bytes(image, use_resize=True):
                     output_parts.append(delta)
                     yield _sse_event(json.dumps({"type": "delta", "text": delta}))
 
@@ -2572,7 +2648,7 @@ def extract_from_image_with_credits_stream(request):
                 if not _has_labeled_lines(full):
                     yield _sse_event(json.dumps({"type": "reset"}))
                     output_parts = []
-                    for delta in stream_conversation_from_image_bytes(img_bytes, use_resize=False):
+                    for delta in stream_conversation_from_image_bytes(image, use_resize=False):
                         output_parts.append(delta)
                         yield _sse_event(json.dumps({"type": "delta", "text": delta}))
                     full = "".join(output_parts).strip()
@@ -2591,7 +2667,10 @@ def extract_from_image_with_credits_stream(request):
                     json.dumps({"type": "error", "error": "ocr_failed", "message": str(exc)})
                 )
 
-        response = StreamingHttpResponse(gen(), content_type="text/event-stream")
+        response = StreamingHttpResponse(
+            singleflight.coalesce_stream(_single_flight_key(request), gen),
+            content_type="text/event-stream",
+        )
 
     response["Cache-Control"] = "no-cache"
     response["X-Accel-Buffering"] = "no"
@@ -2606,6 +2685,7 @@ def analyze_profile(request):
     try:
         _normalize_mobile_auth_header(request)
         chat_credit = None
+        credit_state = None
         is_sub_active = False
         profile_image = request.FILES.get("profile_image")
         
@@ -2628,9 +2708,11 @@ def analyze_profile(request):
         # Apply subscription/fair-use gating for authenticated users
         if request.user.is_authenticated:
             try:
-                chat_credit = ChatCredit.objects.get(user=request.user)
+                credit_state = _get_credit_state(request)
+                chat_credit = credit_state.chat_credit
             except ChatCredit.DoesNotExist:
-                chat_credit = ChatCredit.objects.create(user=request.user, balance=5)
+                credit_state = _create_credit_state(request, balance=5)
+                chat_credit = credit_state.chat_credit
 
             is_sub_active = _is_subscription_active(chat_credit)
             if is_sub_active:
@@ -2640,14 +2722,14 @@ def analyze_profile(request):
                         "success": False,
                         "error": "fair_use_exceeded",
                         "profile_info": "You hit the weekly fair-use limit. Try again soon.",
-                        **_subscription_payload(chat_credit, request=request),
+                        **_subscription_payload(credit_state),
                     }, status=429)
             elif chat_credit.balance <= 0:
                 return Response({
                     "success": False,
                     "error": "subscription_required",
                     "profile_info": "Start your subscription to continue.",
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
 
         # Analyze the profile image
@@ -2661,8 +2743,9 @@ def analyze_profile(request):
             })
 
         if request.user.is_authenticated:
-            if chat_credit is None:
-                chat_credit, _ = ChatCredit.objects.get_or_create(user=request.user)
+            if credit_state is None:
+                credit_state = _get_credit_state(request)
+                chat_credit = credit_state.chat_credit
                 is_sub_active = _is_subscription_active(chat_credit)
             if is_sub_active:
                 consumed, _ = _consume_subscriber_allowance(chat_credit)
@@ -2678,10 +2761,7 @@ def analyze_profile(request):
             "success": True,
             "profile_info": analysis,
             **(
-                _subscription_payload(
-                    ChatCredit.objects.get(user=request.user),
-                    request=request,
-                )
+                _subscription_payload(credit_state)
                 if request.user.is_authenticated
                 else {}
             ),
@@ -2752,6 +2832,7 @@ def analyze_profile_stream(request):
     """Stream profile analysis"""
     _normalize_mobile_auth_header(request)
     chat_credit = None
+    credit_state = None
     is_sub_active = False
     profile_image = request.FILES.get("profile_image")
 
@@ -2772,22 +2853,24 @@ def analyze_profile_stream(request):
 
     if request.user.is_authenticated:
         try:
-            chat_credit = ChatCredit.objects.get(user=request.user)
+            credit_state = _get_credit_state(request)
+            chat_credit = credit_state.chat_credit
             is_sub_active = _is_subscription_active(chat_credit)
             if is_sub_active:
                 allowed, remaining = _check_subscriber_allowance(chat_credit)
                 if not allowed:
                     return StreamingHttpResponse(
-                        _error_stream("fair_use_exceeded", "You hit the weekly fair-use limit. Try again soon.", _subscription_payload(chat_credit, request=request)),
+                        _error_stream("fair_use_exceeded", "You hit the weekly fair-use limit. Try again soon.", _subscription_payload(credit_state)),
                         content_type="text/event-stream",
                     )
             elif chat_credit.balance <= 0:
                 return StreamingHttpResponse(
-                    _error_stream("subscription_required", "No credits remaining. Start your subscription to continue.", _subscription_payload(chat_credit, request=request)),
+                    _error_stream("subscription_required", "No credits remaining. Start your subscription to continue.", _subscription_payload(credit_state)),
                     content_type="text/event-stream",
                 )
         except ChatCredit.DoesNotExist:
-            chat_credit = ChatCredit.objects.create(user=request.user, balance=9)
+            credit_state = _create_credit_state(request, balance=9)
+            chat_credit = credit_state.chat_credit
             is_sub_active = _is_subscription_active(chat_credit)
 
     def gen():
@@ -2816,7 +2899,7 @@ def analyze_profile_stream(request):
 
             yield _sse_event(
                 json.dumps(
-                    {"type": "done", "success": True, "profile_info": full, **(_subscription_payload(chat_credit, request=request) if chat_credit else {})}
+                    {"type": "done", "success": True, "profile_info": full, **(_subscription_payload(credit_state) if chat_credit else {})}
                 )
             )
         except Exception as exc:
@@ -2824,22 +2907,18 @@ def analyze_profile_stream(request):
                 json.dumps({"type": "error", "error": "analysis_failed", "message": str(exc)})
             )
 
-    response = StreamingHttpResponse(gen(), content_type="text/event-stream")
+    response = StreamingHttpResponse(
+        singleflight.coalesce_stream(_single_flight_key(request), gen),
+        content_type="text/event-stream",
+    )
     response["Cache-Control"] = "no-cache"
     response["X-Accel-Buffering"] = "no"
     return response
 
 
-@ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_GENERATE_OPENERS_IP"), block=True)
-@ratelimit(
-    key=_ratelimit_device,
-    rate=_rate("MOBILE_RATELIMIT_GENERATE_OPENERS_DEVICE"),
-    block=True,
-)
-@api_view(["POST"])
-@permission_classes([AllowAny])
-def generate_openers_from_profile_image(request):
-    """Generate opener messages directly from a profile image (no extraction step)."""
+@singleflight.coalesce(_single_flight_key)
+def _generate_openers_flow(request):
+    """Body of generate_openers_from_profile_image; yields its model calls (see mobileapi.flows)."""
     try:
         _normalize_mobile_auth_header(request)
         auth_header_present = bool(request.META.get("HTTP_AUTHORIZATION"))
@@ -2875,7 +2954,8 @@ def generate_openers_from_profile_image(request):
         if request.user.is_authenticated:
             logger.info(f"Authenticated user: {request.user.username}")
             try:
-                chat_credit = ChatCredit.objects.get(user=request.user)
+                credit_state = _get_credit_state(request)
+                chat_credit = credit_state.chat_credit
                 logger.info(f"User credits: {chat_credit.balance}")
 
                 # Safety: ensure every non-subscriber gets at least 3 free generations total
@@ -2891,12 +2971,15 @@ def generate_openers_from_profile_image(request):
                     model, thinking = _get_subscriber_tier(chat_credit, cfg, 'opener', 'subscriber_daily_openers')
                     _log_ai_action("openers", model, True, True, request.user.username)
 
-                    result = generate_mobile_openers_from_image(
+                    result = yield ModelCall(
+                        generate_mobile_openers_from_image,
+                        agenerate_mobile_openers_from_image,
                         img_bytes,
                         custom_instructions=custom_instructions,
                         thinking_level=thinking,
                         primary_model=model,
                         fallback_model=cfg.fallback_model,
+                        hedge_after_ms=cfg.opener_hedge_after_ms,
                         return_meta=True,
                     )
                     reply, success, meta = _normalize_generation_result(result)
@@ -2912,6 +2995,7 @@ def generate_openers_from_profile_image(request):
                             model_used=meta["model_used"],
                             thinking_used=meta["thinking_used"],
                             usage=meta["usage"],
+                            hedge=meta.get("hedge"),
                             metadata={"endpoint": "generate_openers_from_profile_image"},
                         )
 
@@ -2923,16 +3007,16 @@ def generate_openers_from_profile_image(request):
                             if generation_event is not None
                             else {}
                         ),
-                        **_subscription_payload(chat_credit, request=request),
+                        **_subscription_payload(credit_state),
                     })
 
                 # --- Signed-in non-subscriber path (daily shared pool + blurred cliff) ---
                 cfg = _get_config()
-                allowed, remaining = _check_free_credit_allowance(chat_credit, cfg, request=request)
+                allowed, remaining = _check_free_credit_allowance(credit_state, cfg)
 
                 if not allowed:
                     # Daily credits exhausted — check one-pending-reply rule
-                    existing = _has_pending_locked_reply(request.user)
+                    existing = _has_pending_locked_reply(request.user) if credit_state.has_pending_unlock else None
 
                     if existing:
                         # Already has a pending locked reply today — paywall immediately
@@ -2943,17 +3027,20 @@ def generate_openers_from_profile_image(request):
                             "has_pending_unlock": True,
                             "locked_reply_id": existing.pk,
                             "locked_preview": existing.preview,
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         })
 
                     # First time at limit today — generate ONE blurred opener, store server-side
                     _log_ai_action("openers", cfg.registered_opener_model, False, True, request.user.username)
-                    result = generate_mobile_openers_from_image(
+                    result = yield ModelCall(
+                        generate_mobile_openers_from_image,
+                        agenerate_mobile_openers_from_image,
                         img_bytes,
                         custom_instructions=custom_instructions,
                         thinking_level=cfg.registered_opener_thinking,
                         primary_model=cfg.registered_opener_model,
                         fallback_model=cfg.fallback_model,
+                        hedge_after_ms=cfg.opener_hedge_after_ms,
                         return_meta=True,
                     )
                     reply, success, meta = _normalize_generation_result(result)
@@ -2968,6 +3055,7 @@ def generate_openers_from_profile_image(request):
                             model_used=meta["model_used"],
                             thinking_used=meta["thinking_used"],
                             usage=meta["usage"],
+                            hedge=meta.get("hedge"),
                             metadata={
                                 "endpoint": "generate_openers_from_profile_image",
                                 "is_locked_preview": True,
@@ -2976,6 +3064,7 @@ def generate_openers_from_profile_image(request):
                         )
                         preview = _extract_full_message_preview(reply)
                         locked = _create_locked_reply(request.user, reply, preview, 'opener')
+                        credit_state.has_pending_unlock = True
                         return Response({
                             "success": True,
                             "is_locked": True,
@@ -2986,24 +3075,27 @@ def generate_openers_from_profile_image(request):
                                 if generation_event is not None
                                 else {}
                             ),
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         })
                     else:
                         return Response({
                             "success": False,
                             "error": "generation_failed",
                             "message": "Something went wrong. Please try again.",
-                            **_subscription_payload(chat_credit, request=request),
+                            **_subscription_payload(credit_state),
                         })
 
                 # Normal free user path (has daily credits remaining)
                 _log_ai_action("openers", cfg.registered_opener_model, False, True, request.user.username)
-                result = generate_mobile_openers_from_image(
+                result = yield ModelCall(
+                    generate_mobile_openers_from_image,
+                    agenerate_mobile_openers_from_image,
                     img_bytes,
                     custom_instructions=custom_instructions,
                     thinking_level=cfg.registered_opener_thinking,
                     primary_model=cfg.registered_opener_model,
                     fallback_model=cfg.fallback_model,
+                    hedge_after_ms=cfg.opener_hedge_after_ms,
                     return_meta=True,
                 )
                 reply, success, meta = _normalize_generation_result(result)
@@ -3021,6 +3113,7 @@ def generate_openers_from_profile_image(request):
                         model_used=meta["model_used"],
                         thinking_used=meta["thinking_used"],
                         usage=meta["usage"],
+                        hedge=meta.get("hedge"),
                         metadata={"endpoint": "generate_openers_from_profile_image"},
                     )
 
@@ -3034,20 +3127,24 @@ def generate_openers_from_profile_image(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
 
             except ChatCredit.DoesNotExist:
                 logger.warning(f"ChatCredit not found for user {request.user.username}, creating one")
-                chat_credit = ChatCredit.objects.create(user=request.user, balance=5)
+                credit_state = _create_credit_state(request, balance=5)
+                chat_credit = credit_state.chat_credit
                 cfg = _get_config()
                 _log_ai_action("openers", cfg.registered_opener_model, False, True, request.user.username)
-                result = generate_mobile_openers_from_image(
+                result = yield ModelCall(
+                    generate_mobile_openers_from_image,
+                    agenerate_mobile_openers_from_image,
                     img_bytes,
                     custom_instructions=custom_instructions,
                     thinking_level=cfg.registered_opener_thinking,
                     primary_model=cfg.registered_opener_model,
                     fallback_model=cfg.fallback_model,
+                    hedge_after_ms=cfg.opener_hedge_after_ms,
                     return_meta=True,
                 )
                 reply, success, meta = _normalize_generation_result(result)
@@ -3063,6 +3160,7 @@ def generate_openers_from_profile_image(request):
                         model_used=meta["model_used"],
                         thinking_used=meta["thinking_used"],
                         usage=meta["usage"],
+                        hedge=meta.get("hedge"),
                         metadata={"endpoint": "generate_openers_from_profile_image"},
                     )
 
@@ -3075,7 +3173,7 @@ def generate_openers_from_profile_image(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 })
         else:
             logger.info("Guest user detected")
@@ -3106,12 +3204,15 @@ def generate_openers_from_profile_image(request):
 
             # Generate openers from image using configured free tier model/thinking
             _log_ai_action("openers", cfg.free_opener_model, False, False)
-            result = generate_mobile_openers_from_image(
+            result = yield ModelCall(
+                generate_mobile_openers_from_image,
+                agenerate_mobile_openers_from_image,
                 img_bytes,
                 custom_instructions=custom_instructions,
                 thinking_level=cfg.free_opener_thinking,
                 primary_model=cfg.free_opener_model,
                 fallback_model=cfg.fallback_model,
+                hedge_after_ms=cfg.opener_hedge_after_ms,
                 return_meta=True,
             )
             reply, success, meta = _normalize_generation_result(result)
@@ -3132,6 +3233,7 @@ def generate_openers_from_profile_image(request):
                     model_used=meta["model_used"],
                     thinking_used=meta["thinking_used"],
                     usage=meta["usage"],
+                    hedge=meta.get("hedge"),
                     metadata={
                         "endpoint": "generate_openers_from_profile_image",
                         "guest_trial_created": created,
@@ -3155,6 +3257,31 @@ def generate_openers_from_profile_image(request):
         return Response({"success": False, "error": "Generation failed", "message": str(e)})
 
 
+@ratelimit(key="ip", rate=_rate("MOBILE_RATELIMIT_GENERATE_OPENERS_IP"), block=True)
+@ratelimit(
+    key=_ratelimit_device,
+    rate=_rate("MOBILE_RATELIMIT_GENERATE_OPENERS_DEVICE"),
+    block=True,
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def generate_openers_from_profile_image(request):
+    """Generate opener messages directly from a profile image (no extraction step)."""
+    return run_flow(_generate_openers_flow(request))
+
+
+# ASGI variant, routed when MOBILE_ASYNC_GENERATION_VIEWS is on.
+generate_openers_from_profile_image_async = FlowAPIView.as_view(
+    flow=_generate_openers_flow,
+    permission_classes=[AllowAny],
+    ratelimit_group=f"{__name__}.generate_openers_from_profile_image_async",
+    ratelimits=[
+        ("ip", _rate("MOBILE_RATELIMIT_GENERATE_OPENERS_IP")),
+        (_ratelimit_device, _rate("MOBILE_RATELIMIT_GENERATE_OPENERS_DEVICE")),
+    ],
+)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def unlock_reply(request):
@@ -3164,7 +3291,8 @@ def unlock_reply(request):
         return HttpResponseBadRequest("Missing locked_reply_id")
 
     try:
-        chat_credit = ChatCredit.objects.get(user=request.user)
+        credit_state = _get_credit_state(request)
+        chat_credit = credit_state.chat_credit
     except ChatCredit.DoesNotExist:
         return Response({"success": False, "error": "profile_required"}, status=400)
 
@@ -3183,12 +3311,13 @@ def unlock_reply(request):
     # Mark as unlocked
     locked.unlocked = True
     locked.save(update_fields=["unlocked"])
+    credit_state.has_pending_unlock = _has_pending_locked_reply(request.user) is not None
 
     return Response({
         "success": True,
         "reply": locked.reply_json,
         "is_locked": False,
-        **_subscription_payload(chat_credit, request=request),
+        **_subscription_payload(credit_state),
     })
 
 
@@ -3224,7 +3353,8 @@ def recommended_openers(request):
             ]
 
             if request.user.is_authenticated:
-                chat_credit = ChatCredit.objects.get(user=request.user)
+                credit_state = _get_credit_state(request)
+                chat_credit = credit_state.chat_credit
                 generation_event = _persist_mobile_generation_event(
                     request=request,
                     chat_credit=chat_credit,
@@ -3245,7 +3375,7 @@ def recommended_openers(request):
                             if generation_event is not None
                             else {}
                         ),
-                        **_subscription_payload(chat_credit, request=request),
+                        **_subscription_payload(credit_state),
                     }
                 )
 
@@ -3297,7 +3427,8 @@ def recommended_openers(request):
         guest_unlocked_ids = {opener.id for opener in guest_unlocked_openers}
 
         if request.user.is_authenticated:
-            chat_credit = ChatCredit.objects.get(user=request.user)
+            credit_state = _get_credit_state(request)
+            chat_credit = credit_state.chat_credit
             is_elite = _is_subscription_active(chat_credit)
             tier = "elite" if is_elite else "free"
             if is_elite:
@@ -3346,7 +3477,7 @@ def recommended_openers(request):
                         if generation_event is not None
                         else {}
                     ),
-                    **_subscription_payload(chat_credit, request=request),
+                    **_subscription_payload(credit_state),
                 }
             )
 
@@ -3404,19 +3535,12 @@ def recommended_openers(request):
         return Response({"success": False, "error": "generation_failed"}, status=500)
 
 
-def _chat_credit_or_none(user: User) -> Optional[ChatCredit]:
-    try:
-        return ChatCredit.objects.get(user=user)
-    except ChatCredit.DoesNotExist:
-        return None
-
-
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
 def reply_threads(request):
-    chat_credit = _chat_credit_or_none(request.user)
-    is_subscribed = bool(chat_credit and _is_subscription_active(chat_credit))
-    subscription_payload = _subscription_payload(chat_credit, request=request) if chat_credit else {}
+    credit_state = _credit_state_or_none(request)
+    is_subscribed = bool(credit_state and credit_state.is_subscribed)
+    subscription_payload = _subscription_payload(credit_state) if credit_state else {}
 
     if request.method == "GET":
         threads = list(
@@ -3495,7 +3619,7 @@ def reply_threads(request):
                     status=403,
                 )
 
-    generation_event = None
+    generation_event_id = None
     if generation_event_id_raw not in (None, ""):
         try:
             generation_event_id = int(generation_event_id_raw)
@@ -3508,11 +3632,8 @@ def reply_threads(request):
                 },
                 status=400,
             )
-        generation_event = MobileGenerationEvent.objects.filter(
-            id=generation_event_id,
-            user=request.user,
-        ).first()
-        if generation_event is None:
+        owner = _generation_event_owner(generation_event_id)
+        if owner is None or owner[0] != request.user.id:
             return Response(
                 {
                     "success": False,
@@ -3544,7 +3665,7 @@ def reply_threads(request):
     thread.stitched_transcript = stitched_transcript
     thread.latest_replies = latest_replies
     thread.thumbnail_url = thumbnail_url
-    thread.latest_generation_event = generation_event
+    thread.latest_generation_event_id = generation_event_id
     thread.save()
 
     unlocked_ids = set() if is_subscribed else _get_archive_unlocked_ids(request.user)
@@ -3562,9 +3683,9 @@ def reply_threads(request):
 @api_view(["GET", "DELETE"])
 @permission_classes([IsAuthenticated])
 def reply_thread_detail(request, thread_id):
-    chat_credit = _chat_credit_or_none(request.user)
-    is_subscribed = bool(chat_credit and _is_subscription_active(chat_credit))
-    subscription_payload = _subscription_payload(chat_credit, request=request) if chat_credit else {}
+    credit_state = _credit_state_or_none(request)
+    is_subscribed = bool(credit_state and credit_state.is_subscribed)
+    subscription_payload = _subscription_payload(credit_state) if credit_state else {}
 
     thread = MobileReplyThread.objects.filter(id=thread_id, user=request.user).first()
     if thread is None:
@@ -3670,7 +3791,7 @@ def copy_event(request):
             except ChatCredit.DoesNotExist:
                 chat_credit = None
 
-        generation_event = None
+        generation_event_id_int = None
         if generation_event_id not in (None, ""):
             try:
                 generation_event_id_int = int(generation_event_id)
@@ -3688,8 +3809,8 @@ def copy_event(request):
                     status=400,
                 )
 
-            generation_event = MobileGenerationEvent.objects.filter(pk=generation_event_id_int).first()
-            if generation_event is None:
+            owner = _generation_event_owner(generation_event_id_int)
+            if owner is None:
                 logger.warning(
                     "Invalid mobile copy-event payload reason=generation_event_not_found id=%s",
                     generation_event_id_int,
@@ -3704,12 +3825,12 @@ def copy_event(request):
                 )
 
             if request.user.is_authenticated:
-                if generation_event.user_id != request.user.id:
+                if owner[0] != request.user.id:
                     logger.warning(
                         "Invalid mobile copy-event payload reason=generation_event_user_mismatch id=%s user=%s event_user_id=%s",
                         generation_event_id_int,
                         request.user.username,
-                        generation_event.user_id,
+                        owner[0],
                     )
                     return Response(
                         {
@@ -3723,8 +3844,8 @@ def copy_event(request):
                 guest_hash = _get_guest_hash_for_mobile_analytics(request)
                 if (
                     not guest_hash
-                    or generation_event.user_id is not None
-                    or generation_event.guest_id_hash != guest_hash
+                    or owner[0] is not None
+                    or owner[1] != guest_hash
                 ):
                     logger.warning(
                         "Invalid mobile copy-event payload reason=generation_event_guest_mismatch id=%s",
@@ -3744,7 +3865,7 @@ def copy_event(request):
             chat_credit=chat_credit,
             copy_type=copy_type,
             copied_text=copied_text,
-            generation_event=generation_event,
+            generation_event_id=generation_event_id_int,
             reply_context_ocr_text=reply_context_ocr_text,
         )
 
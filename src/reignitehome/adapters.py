@@ -3,7 +3,8 @@ from django.conf import settings
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 
-from conversation.models import ChatCredit, WebAppConfig
+from conversation.config_snapshot import get_web_config
+from conversation.models import ChatCredit
 
 
 class AccountAdapter(DefaultAccountAdapter):
@@ -33,7 +34,7 @@ class AccountAdapter(DefaultAccountAdapter):
         if not commit:
             return user
 
-        cfg = WebAppConfig.load()
+        cfg = get_web_config()
         bonus_credits = cfg.signup_bonus_credits
         chat_credit, _ = ChatCredit.objects.get_or_create(
             user=user,
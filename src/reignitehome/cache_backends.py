@@ -0,0 +1,96 @@
+"""
+Cache backends for the shared cache tier (see ``CACHE_BACKEND`` in settings).
+
+django-ratelimit counts with ``cache.add()`` followed by ``cache.incr()``.
+Django's stock database and file backends implement ``incr`` as a get + set,
+so two gunicorn workers hitting the same key can lose increments. The
+subclasses below make ``add``/``incr`` atomic so either backend can serve as
+the cross-worker rate-limit store when Redis/memcached is not available.
+"""
+
+import base64
+import os
+import pickle
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connections, models, router, transaction
+from django.utils.timezone import now as tz_now
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None
+
+
+class AtomicDatabaseCache(DatabaseCache):
+    """DatabaseCache whose ``incr`` locks the cache row for the update."""
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self._table)
+        for_update = " FOR UPDATE" if connection.features.has_select_for_update else ""
+
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT %s, %s FROM %s WHERE %s = %%s%s"
+                % (quote_name("value"), quote_name("expires"), table, quote_name("cache_key"), for_update),
+                [key],
+            )
+            row = cursor.fetchone()
+            if row is None or self._is_expired(row[1], connection):
+                raise ValueError("Key '%s' not found" % key)
+
+            value = pickle.loads(base64.b64decode(connection.ops.process_clob(row[0]).encode()))
+            new_value = value + delta
+            pickled = base64.b64encode(pickle.dumps(new_value, self.pickle_protocol)).decode("latin1")
+            cursor.execute(
+                "UPDATE %s SET %s = %%s WHERE %s = %%s"
+                % (table, quote_name("value"), quote_name("cache_key")),
+                [pickled, key],
+            )
+        return new_value
+
+    @staticmethod
+    def _is_expired(expires, connection):
+        expression = models.Expression(output_field=models.DateTimeField())
+        converters = connection.ops.get_db_converters(expression) + expression.get_db_converters(connection)
+        for converter in converters:
+            expires = converter(expires, expression, connection)
+        return expires < tz_now()
+
+
+class LockingFileBasedCache(FileBasedCache):
+    """FileBasedCache with ``add``/``incr`` serialized by a striped flock."""
+
+    lock_stripes = 64
+
+    @contextmanager
+    def _key_lock(self, key, version=None):
+        if fcntl is None:
+            yield
+            return
+        # A fixed pool of lock files keeps the directory bounded while keys
+        # (e.g. one per rate-limit window) come and go.
+        stripe = int(os.path.basename(self._key_to_file(key, version))[:8], 16) % self.lock_stripes
+        lock_dir = os.path.join(self._dir, "locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f"{stripe}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._key_lock(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._key_lock(key, version):
+            return super().incr(key, delta, version)
@@ -1,6 +1,6 @@
 from django.db.utils import OperationalError, ProgrammingError
 
-from conversation.models import WebAppConfig
+from conversation.config_snapshot import get_web_config
 
 
 DEFAULT_WEB_GUEST_REPLY_LIMIT = 5
@@ -14,7 +14,7 @@ def web_marketing_limits(request):
     signup_bonus = DEFAULT_WEB_SIGNUP_BONUS_CREDITS
 
     try:
-        cfg = WebAppConfig.load()
+        cfg = get_web_config()
         guest_limit = int(cfg.guest_reply_limit or DEFAULT_WEB_GUEST_REPLY_LIMIT)
         signup_bonus = int(cfg.signup_bonus_credits or DEFAULT_WEB_SIGNUP_BONUS_CREDITS)
     except (OperationalError, ProgrammingError):
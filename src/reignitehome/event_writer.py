@@ -0,0 +1,297 @@
+"""
+Buffered, off-request writer for analytics event rows.
+
+Generation, copy, guest-attempt and marketing-click events used to be one
+synchronous INSERT each, large JSON bodies included, on the request's
+critical path. Now ``record(instance)`` puts the unsaved row on a bounded
+in-process queue. A daemon flusher thread groups queued rows by model and
+writes them with ``bulk_create``, once ``EVENT_WRITER["BATCH_SIZE"]`` rows are
+waiting or ``FLUSH_SECONDS`` have passed.
+
+* Backpressure: ``record`` waits up to ``BLOCK_SECONDS`` for room in a full
+  queue, then drops the row. Drops, writes and failures are counted in
+  ``stats()``.
+* Primary keys: callers that hand an id back to the client
+  (``generation_event_id``) pass ``allocate_pk=True``. The id is reserved from
+  the table's own sequence in blocks of ``ID_BLOCK``, so ids stay integers
+  and rows inserted elsewhere never collide with them. The id can reach
+  another worker before its row is flushed, so code that accepts it back
+  must not require the row to exist yet (see ``mobileapi.views``).
+* Shutdown: ``shutdown()`` drains the queue. It runs from gunicorn's
+  ``worker_exit`` hook (see gunicorn.conf.py) and at interpreter exit.
+* ``EVENT_WRITER["MODE"] = "sync"`` saves each row inline. Tests use it.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    "MODE": "background",
+    "MAX_QUEUE": 5000,
+    "BATCH_SIZE": 200,
+    "FLUSH_SECONDS": 0.5,
+    "BLOCK_SECONDS": 0.05,
+    "ID_BLOCK": 20,
+}
+
+
+def writer_settings() -> dict:
+    return {**_DEFAULTS, **getattr(settings, "EVENT_WRITER", {})}
+
+
+# --- Primary key reservation ------------------------------------------------
+
+def _reserve_ids(model, count: int) -> List[int]:
+    """Reserve ``count`` ids from ``model``'s own id sequence."""
+    db = router.db_for_write(model)
+    conn = connections[db]
+    table = model._meta.db_table
+    pk_column = model._meta.pk.column
+    if conn.vendor == "postgresql":
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                [table, pk_column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    if conn.vendor == "sqlite":
+        # AUTOINCREMENT tables draw new rowids from sqlite_sequence; bumping
+        # it makes every later INSERT skip the reserved block.
+        qtable = conn.ops.quote_name(table)
+        qpk = conn.ops.quote_name(pk_column)
+        with transaction.atomic(using=db), conn.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT COALESCE(MAX({qpk}), 0) FROM {qtable})) + %s "
+                "WHERE name = %s",
+                [count, table],
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    f"INSERT INTO sqlite_sequence (name, seq) SELECT %s, COALESCE(MAX({qpk}), 0) + %s FROM {qtable}",
+                    [table, count],
+                )
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+            last = cursor.fetchone()[0]
+        return list(range(last - count + 1, last + 1))
+    raise NotImplementedError(f"id reservation is not supported on {conn.vendor}")
+
+
+class _IdBlocks:
+    """Hands out reserved ids, reserving a new block when one runs out."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks: Dict[type, List[int]] = {}
+
+    def next(self, model) -> int:
+        with self._lock:
+            block = self._blocks.get(model)
+            if not block:
+                block = _reserve_ids(model, writer_settings()["ID_BLOCK"])
+                self._blocks[model] = block
+            return block.pop(0)
+
+
+# --- Writer -----------------------------------------------------------------
+
+class _Flush:
+    """Queue marker: write everything queued before it, then signal."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class EventWriter:
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # Also runs in a forked child: the parent's thread and queue do not
+        # survive the fork.
+        opts = writer_settings()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=opts["MAX_QUEUE"])
+        self._thread: Optional[threading.Thread] = None
+        self._ids = _IdBlocks()
+        self._stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "pending": self._queue.qsize()}
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, instance, allocate_pk: bool = False) -> bool:
+        """Persist ``instance`` off-request; False if it had to be dropped."""
+        opts = writer_settings()
+        if opts["MODE"] == "sync":
+            instance.save()
+            self._count("written")
+            return True
+
+        if allocate_pk and instance.pk is None:
+            try:
+                instance.pk = self._ids.next(type(instance))
+            except NotImplementedError:
+                instance.save()
+                self._count("written")
+                return True
+
+        self._ensure_thread()
+        try:
+            self._queue.put(instance, timeout=opts["BLOCK_SECONDS"])
+        except queue.Full:
+            self._count("dropped")
+            logger.warning(
+                "Event writer queue full; dropped %s (dropped so far: %s)",
+                type(instance).__name__,
+                self.stats()["dropped"],
+            )
+            return False
+        self._count("queued")
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Write everything queued so far.
+
+        True once the flusher has caught up; False if no flusher is running
+        (nothing buffered) or it did not catch up within ``timeout``.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        flushed = self.flush(timeout)
+        try:
+            self._queue.put(_STOP, timeout=1.0)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=1.0)
+        stats = self.stats()
+        logger.info("Event writer stopped flushed=%s stats=%s", flushed, stats)
+
+    # --- Flusher thread -----------------------------------------------------
+
+    def _run(self) -> None:
+        opts = writer_settings()
+        try:
+            while True:
+                batch, markers, stop = self._take_batch(opts["BATCH_SIZE"], opts["FLUSH_SECONDS"])
+                if batch:
+                    self._write(batch, opts["BATCH_SIZE"])
+                for marker in markers:
+                    marker.done.set()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def _take_batch(self, batch_size: int, flush_seconds: float):
+        batch, markers = [], []
+        try:
+            item = self._queue.get()
+        except Exception:  # pragma: no cover - interpreter shutdown
+            return batch, markers, True
+        deadline = time.monotonic() + flush_seconds
+        while True:
+            if item is _STOP:
+                return batch, markers, True
+            if isinstance(item, _Flush):
+                markers.append(item)
+                return batch, markers, False
+            batch.append(item)
+            if len(batch) >= batch_size:
+                return batch, markers, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, markers, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, markers, False
+
+    def _write(self, batch, batch_size: int) -> None:
+        close_old_connections()
+        # Grouped by model in first-seen order, so rows queued before a row
+        # that references them are written first.
+        groups: "OrderedDict[type, list]" = OrderedDict()
+        for instance in batch:
+            groups.setdefault(type(instance), []).append(instance)
+        for model, rows in groups.items():
+            try:
+                model.objects.bulk_create(rows, batch_size=batch_size)
+            except Exception:
+                logger.warning(
+                    "Event writer bulk insert of %s %s rows failed; retrying row by row",
+                    len(rows),
+                    model.__name__,
+                    exc_info=True,
+                )
+                self._write_rows(rows)
+            else:
+                self._count("written", len(rows))
+                self._count("batches")
+
+    def _write_rows(self, rows) -> None:
+        """Isolate the rows that broke a batch so the rest still land."""
+        for instance in rows:
+            try:
+                instance.save(force_insert=True)
+            except Exception:
+                self._count("failed")
+                logger.exception("Event writer dropped an unwritable %s row", type(instance).__name__)
+            else:
+                self._count("written")
+
+
+_writer = EventWriter()
+
+
+def record(instance, allocate_pk: bool = False) -> bool:
+    return _writer.record(instance, allocate_pk=allocate_pk)
+
+
+def flush(timeout: float = 5.0) -> bool:
+    return _writer.flush(timeout)
+
+
+def shutdown(timeout: float = 10.0) -> None:
+    _writer.shutdown(timeout)
+
+
+def stats() -> dict:
+    return _writer.stats()
+
+
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_writer._reset)
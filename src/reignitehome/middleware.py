@@ -0,0 +1,22 @@
+"""
+Project middleware.
+
+``RatelimitMiddleware`` replaces django_ratelimit's middleware of the same
+name. The upstream class is sync-only, which makes Django run every async
+view behind a sync hop, one thread per request. This version serves both
+modes and keeps the same behavior: a ``Ratelimited`` raised by a view is
+rendered with ``settings.RATELIMIT_VIEW``.
+"""
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+from django_ratelimit.exceptions import Ratelimited
+
+
+class RatelimitMiddleware(MiddlewareMixin):
+    def process_exception(self, request, exception):
+        if not isinstance(exception, Ratelimited):
+            return None
+        view = import_string(settings.RATELIMIT_VIEW)
+        return view(request, exception)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -113,6 +114,173 @@ ONESIGNAL_COMMENT_NOTIFICATIONS_ENABLED = config(
     cast=bool,
     default=True,
 )
+ONESIGNAL_NOTIFICATIONS_URL = config(
+    "ONESIGNAL_NOTIFICATIONS_URL",
+    default="https://api.onesignal.com/notifications",
+)
+
+# Comment pushes go through a database outbox (mobileapi.push_notifications)
+# drained by `manage.py dispatch_push_notifications --loop`. Comments on the
+# same post within COALESCE_SECONDS become one push. Failed sends retry after
+# BACKOFF_BASE_SECONDS, doubling up to BACKOFF_MAX_SECONDS, for MAX_ATTEMPTS.
+PUSH_OUTBOX = {
+    "COALESCE_SECONDS": config("PUSH_OUTBOX_COALESCE_SECONDS", cast=int, default=60),
+    "BATCH_SIZE": config("PUSH_OUTBOX_BATCH_SIZE", cast=int, default=100),
+    "MAX_ATTEMPTS": config("PUSH_OUTBOX_MAX_ATTEMPTS", cast=int, default=6),
+    "BACKOFF_BASE_SECONDS": config("PUSH_OUTBOX_BACKOFF_BASE_SECONDS", cast=int, default=30),
+    "BACKOFF_MAX_SECONDS": config("PUSH_OUTBOX_BACKOFF_MAX_SECONDS", cast=int, default=3600),
+    "TIMEOUT_SECONDS": config("PUSH_OUTBOX_TIMEOUT_SECONDS", cast=float, default=8.0),
+    "POOL_SIZE": config("PUSH_OUTBOX_POOL_SIZE", cast=int, default=10),
+}
+
+# Shared cache tier. django-ratelimit counters and the config snapshot stamp
+# live in the default cache, so with more than one gunicorn worker it must be
+# a backend every worker can see:
+#   redis / memcached -> CACHE_LOCATION is the server URL (needs redis / pymemcache installed)
+#   db                -> CACHE_LOCATION is the table (run `createcachetable`)
+#   file              -> CACHE_LOCATION is a directory on a volume shared by the workers
+#   locmem            -> per-process; local development and tests only
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+CACHE_LOCATION = config("CACHE_LOCATION", default="")
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "reignite-default"),
+    "db": ("reignitehome.cache_backends.AtomicDatabaseCache", "django_cache_table"),
+    "file": ("reignitehome.cache_backends.LockingFileBasedCache", os.path.join(tempfile.gettempdir(), "reignite-cache")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+    "memcached": ("django.core.cache.backends.memcached.PyMemcacheCache", "127.0.0.1:11211"),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ValueError(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}; expected one of {sorted(CACHE_BACKENDS)}")
+
+
+def _cache_location(name):
+    """Storage of its own for cache alias ``name``.
+
+    locmem, file and db cull by counting everything in their location, so an
+    alias sharing one with ``default`` would evict ratelimit counters and
+    version stamps. redis/memcached evict by the server's LRU policy instead.
+    """
+    location = CACHE_LOCATION or CACHE_BACKENDS[CACHE_BACKEND][1]
+    if CACHE_BACKEND == "locmem":
+        return f"reignite-{name}"
+    if CACHE_BACKEND == "file":
+        return os.path.join(location, name)
+    if CACHE_BACKEND == "db":
+        return f"{location}_{name.replace('-', '_')}"
+    return location
+
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": CACHE_LOCATION or CACHE_BACKENDS[CACHE_BACKEND][1],
+        "KEY_PREFIX": config("CACHE_KEY_PREFIX", default="reignite"),
+        "TIMEOUT": config("CACHE_DEFAULT_TIMEOUT", cast=int, default=300),
+    },
+    # Image model results (conversation.utils.response_cache): same backend,
+    # own location (the db backend needs `createcachetable` for its table),
+    # key prefix and TTL. locmem (LRU), file and db cull at MAX_ENTRIES.
+    "llm_responses": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": _cache_location("llm-responses"),
+        "KEY_PREFIX": config("CACHE_KEY_PREFIX", default="reignite") + "-llm",
+        "TIMEOUT": config("LLM_RESPONSE_CACHE_TTL", cast=int, default=86400),
+        **(
+            {"OPTIONS": {"MAX_ENTRIES": config("LLM_RESPONSE_CACHE_MAX_ENTRIES", cast=int, default=5000)}}
+            if CACHE_BACKEND in ("locmem", "file", "db")
+            else {}
+        ),
+    },
+    # Rendered SEO pages (seoapp.page_cache) and sitemap bodies
+    # (reignitehome.sitemap): a few hundred large entries per crawl, kept off
+    # the default alias so they never evict ratelimit counters or stamps.
+    # Every write passes its own TTL (SEO_PAGE_CACHE_SECONDS,
+    # SITEMAP_CACHE_SECONDS), so the alias sets none.
+    "seo_pages": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": _cache_location("seo-pages"),
+        "KEY_PREFIX": config("CACHE_KEY_PREFIX", default="reignite") + "-seo",
+        "TIMEOUT": None,
+        **(
+            {"OPTIONS": {"MAX_ENTRIES": config("SEO_PAGE_CACHE_MAX_ENTRIES", cast=int, default=2000)}}
+            if CACHE_BACKEND in ("locmem", "file", "db")
+            else {}
+        ),
+    },
+}
+RATELIMIT_USE_CACHE = "default"
+LLM_RESPONSE_CACHE_ENABLED = config("LLM_RESPONSE_CACHE_ENABLED", cast=bool, default=True)
+
+# Config snapshots (conversation.config_snapshot): how often each process
+# re-checks the shared version stamp for admin edits made in other workers.
+CONFIG_SNAPSHOT_CHECK_SECONDS = config("CONFIG_SNAPSHOT_CHECK_SECONDS", cast=float, default=2.0)
+
+# Model provider clients (conversation.utils.llm_clients). TIMEOUT bounds one
+# model call and should stay under the gunicorn timeout; MAX_CONCURRENCY caps
+# in-flight calls per process (callers past it wait up to TIMEOUT, then the
+# cascade moves on to the next model); MAX_CONNECTIONS sizes the HTTP pool.
+LLM_PROVIDERS = {
+    "gemini": {
+        "TIMEOUT": config("GEMINI_TIMEOUT_SECONDS", cast=float, default=60.0),
+        "MAX_CONCURRENCY": config("GEMINI_MAX_CONCURRENCY", cast=int, default=64),
+        "MAX_CONNECTIONS": config("GEMINI_MAX_CONNECTIONS", cast=int, default=100),
+    },
+    "openai": {
+        "TIMEOUT": config("OPENAI_TIMEOUT_SECONDS", cast=float, default=45.0),
+        "MAX_CONCURRENCY": config("OPENAI_MAX_CONCURRENCY", cast=int, default=64),
+        "MAX_CONNECTIONS": config("OPENAI_MAX_CONNECTIONS", cast=int, default=100),
+    },
+}
+
+# Route /generate/, /generate-openers-from-image/ and /extract-image/ to their
+# async views. Turn on when serving reignitehome.asgi:application, e.g.
+#   gunicorn reignitehome.asgi:application -k uvicorn.workers.UvicornWorker
+MOBILE_ASYNC_GENERATION_VIEWS = config("MOBILE_ASYNC_GENERATION_VIEWS", cast=bool, default=False)
+
+# Identical generation/OCR requests from one user or device that arrive while
+# the first is still running share its result (mobileapi.singleflight). The
+# lock lives in the default cache, so it spans workers on a shared backend.
+# TTL bounds how long a lock outlives a crashed leader; keep it >= the
+# gunicorn timeout.
+MOBILE_SINGLE_FLIGHT_ENABLED = config("MOBILE_SINGLE_FLIGHT_ENABLED", cast=bool, default=True)
+MOBILE_SINGLE_FLIGHT_TTL = config("MOBILE_SINGLE_FLIGHT_TTL", cast=int, default=120)
+# How long a duplicate waits on the leader (for streams: between events)
+# before running on its own; it holds a sync worker while it waits.
+MOBILE_SINGLE_FLIGHT_WAIT_SECONDS = config("MOBILE_SINGLE_FLIGHT_WAIT_SECONDS", cast=float, default=20.0)
+
+# Analytics event rows (generation/copy events, guest web attempts, marketing
+# clicks) are written off-request by reignitehome.event_writer. "sync" writes
+# inline instead.
+EVENT_WRITER = {
+    "MODE": config("EVENT_WRITER_MODE", default="background"),
+    "MAX_QUEUE": config("EVENT_WRITER_MAX_QUEUE", cast=int, default=5000),
+    "BATCH_SIZE": config("EVENT_WRITER_BATCH_SIZE", cast=int, default=200),
+    "FLUSH_SECONDS": config("EVENT_WRITER_FLUSH_SECONDS", cast=float, default=0.5),
+}
+
+# Re-encode format for downsized vision payloads (conversation.utils.image_prep):
+# WEBP or JPEG. WEBP falls back to JPEG when Pillow lacks WebP support.
+IMAGE_PREP_FORMAT = config("IMAGE_PREP_FORMAT", default="WEBP")
+
+# Serialized community feed pages (community.feed_cache) are shared across
+# requests for this many seconds; new, deleted, pinned or featured posts retire
+# them immediately. 0 disables the cache.
+COMMUNITY_FEED_CACHE_SECONDS = config("COMMUNITY_FEED_CACHE_SECONDS", cast=int, default=15)
+# Per-user block sets and author pro status (mobileapi.community_cache). Block
+# and subscription changes invalidate them; pro entries also expire with the
+# subscription. 0 disables.
+COMMUNITY_USER_CACHE_SECONDS = config("COMMUNITY_USER_CACHE_SECONDS", cast=int, default=300)
+# Rendered pickup-line, situation and glossary pages (seoapp.page_cache).
+# Pickup data edits and seed_pickup_data retire them immediately. 0 disables
+# the cache.
+SEO_PAGE_CACHE_SECONDS = config("SEO_PAGE_CACHE_SECONDS", cast=int, default=3600)
+# Output of `manage.py export_seo_pages` (seoapp.static_export), served by the
+# front proxy, and the host its canonical URLs are rendered for.
+SEO_EXPORT_DIR = config("SEO_EXPORT_DIR", default=str(BASE_DIR / "seo_export"))
+SEO_EXPORT_HOST = config("SEO_EXPORT_HOST", default="tryagaintext.com")
+# Prebuilt sitemap index and gzipped shards (reignitehome.sitemap). Pickup
+# data edits regenerate them; 0 disables the cache.
+SITEMAP_CACHE_SECONDS = config("SITEMAP_CACHE_SECONDS", cast=int, default=86400)
 
 # settings.py
 # Mobile API public endpoint rate limits (Phase 1).
@@ -171,7 +339,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django_ratelimit.middleware.RatelimitMiddleware',
+    'reignitehome.middleware.RatelimitMiddleware',
     
     # Add the account middleware:
     "allauth.account.middleware.AccountMiddleware",
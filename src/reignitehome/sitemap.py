@@ -0,0 +1,210 @@
+"""
+The sitemap: an index at ``/sitemap.xml`` and gzipped shards under ``/sitemaps/``.
+
+There is a shard per section: ``static`` (the core pages), ``situations``
+and ``pickup-<category>`` for each category with active topics. Each shard
+is split into files of at most ``SHARD_SIZE`` URLs, the protocol's limit.
+``<lastmod>`` comes from ``PickupTopic.updated_at``:
+
+* a topic's page uses its own date;
+* a category page uses the newest date among its topics;
+* the pickup directory uses the newest date overall.
+
+Pages built from Python data carry no ``<lastmod>``.
+
+Bodies are cached in the ``seo_pages`` alias for ``SITEMAP_CACHE_SECONDS`` under
+``seoapp.page_cache.content_version()``. Pickup edits and
+``seed_pickup_data`` move that version, so a shard is regenerated only
+after its rows change. A shard that misses the cache is streamed. Rows come
+from ``iterator()`` and the XML is gzipped as it is written, so memory stays
+flat however many topics there are. The compressed bytes are cached once the
+stream completes.
+
+``sitemap_paths`` lists the same URLs for ``seoapp.static_export``.
+"""
+
+import hashlib
+import math
+import zlib
+from collections import namedtuple
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.urls import reverse
+
+from seoapp import page_cache
+from seoapp.models import PickupTopic
+from seoapp.situation_pages import SITUATION_PAGE_ORDER
+
+SHARD_SIZE = 50_000
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+CORE_URL_NAMES = (
+    "home",
+    "situation_index",
+    "pickup_lines_index",
+    "glossary",
+    "pricing:pricing",
+    "privacy_policy",
+    "terms_and_conditions",
+    "refund_policy",
+    "contact",
+    "safety_standards",
+    "screenclean_privacy_policy",
+)
+
+Section = namedtuple("Section", ["name", "pages", "lastmod"])
+
+_PICKUP_PREFIX = "pickup-"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "SITEMAP_CACHE_SECONDS", 0) or 0)
+
+
+def _pages(url_count) -> int:
+    return max(1, math.ceil(url_count / SHARD_SIZE))
+
+
+def sections():
+    """Every section in sitemap order, with its shard count and newest ``updated_at``."""
+    rows = (
+        PickupTopic.objects.filter(is_active=True)
+        .values("category__slug")
+        .annotate(topics=Count("id"), latest=Max("updated_at"))
+        .order_by("category__sort_order", "category__slug")
+    )
+    pickup = [
+        # The category page comes first in its own shard.
+        Section(f"{_PICKUP_PREFIX}{row['category__slug']}", _pages(row["topics"] + 1), row["latest"])
+        for row in rows
+    ]
+    latest = max((section.lastmod for section in pickup), default=None)
+    return [
+        Section("static", _pages(len(CORE_URL_NAMES)), latest),
+        Section("situations", _pages(len(SITUATION_PAGE_ORDER)), None),
+        *pickup,
+    ]
+
+
+def _static_entries(latest):
+    for name in CORE_URL_NAMES:
+        yield reverse(name), latest if name == "pickup_lines_index" else None
+
+
+def _situation_entries():
+    for slug in SITUATION_PAGE_ORDER:
+        yield reverse("situation_landing", kwargs={"slug": slug}), None
+
+
+def _pickup_entries(section, start, stop):
+    category_path = reverse(
+        "pickup_category_detail", kwargs={"category_slug": section.name[len(_PICKUP_PREFIX):]}
+    )
+    if start == 0:
+        yield category_path, section.lastmod
+    topics = (
+        PickupTopic.objects.filter(category__slug=section.name[len(_PICKUP_PREFIX):], is_active=True)
+        .order_by("sort_order", "slug")
+        .values_list("slug", "updated_at")
+    )
+    # pickup_line_detail nests under the category path: one reverse() per shard, not per topic.
+    for slug, updated_at in topics[max(start - 1, 0):stop - 1].iterator(chunk_size=2000):
+        yield f"{category_path}{slug}/", updated_at
+
+
+def _entries(section, page):
+    """``(path, lastmod)`` of the URLs in shard ``page`` (from 1) of ``section``."""
+    start = (page - 1) * SHARD_SIZE
+    stop = start + SHARD_SIZE
+    if section.name == "static":
+        return islice(_static_entries(section.lastmod), start, stop)
+    if section.name == "situations":
+        return islice(_situation_entries(), start, stop)
+    return _pickup_entries(section, start, stop)
+
+
+def sitemap_paths():
+    """Site-relative paths of every sitemap URL, in sitemap order."""
+    return [
+        path
+        for section in sections()
+        for page in range(1, section.pages + 1)
+        for path, _ in _entries(section, page)
+    ]
+
+
+def _w3c(value) -> str:
+    return value.replace(microsecond=0).isoformat()
+
+
+def _cache_key(base_url, name) -> str:
+    site = hashlib.sha256(base_url.encode("utf-8")).hexdigest()[:16]
+    return f"sitemap:{page_cache.content_version()}:{SHARD_SIZE}:{site}:{name}"
+
+
+def index_xml(base_url) -> str:
+    """The sitemap index; ``base_url`` is the scheme and host without a trailing slash."""
+    ttl = _ttl()
+    key = _cache_key(base_url, "index")
+    body = page_cache.page_store().get(key) if ttl else None
+    if body is None:
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{XMLNS}">']
+        for section in sections():
+            for page in range(1, section.pages + 1):
+                loc = base_url + reverse("sitemap_section", kwargs={"section": section.name, "page": page})
+                lines.append(f"  <sitemap>\n    <loc>{escape(loc)}</loc>")
+                if section.lastmod:
+                    lines.append(f"    <lastmod>{_w3c(section.lastmod)}</lastmod>")
+                lines.append("  </sitemap>")
+        lines.append("</sitemapindex>\n")
+        body = "\n".join(lines)
+        if ttl:
+            page_cache.page_store().set(key, body, ttl)
+    return body
+
+
+def _urlset(base_url, entries):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n'
+    batch = []
+    for path, lastmod in entries:
+        batch.append(f"  <url>\n    <loc>{escape(base_url + path)}</loc>\n")
+        if lastmod:
+            batch.append(f"    <lastmod>{_w3c(lastmod)}</lastmod>\n")
+        batch.append("  </url>\n")
+        if len(batch) >= 3000:
+            yield "".join(batch)
+            batch = []
+    batch.append("</urlset>\n")
+    yield "".join(batch)
+
+
+def _gzipped(chunks, key, ttl):
+    # wbits=31 writes a gzip container; its mtime is 0, so equal XML gives equal bytes.
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    parts = []
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            parts.append(data)
+            yield data
+    data = compressor.flush()
+    parts.append(data)
+    yield data
+    if ttl:
+        page_cache.page_store().set(key, b"".join(parts), ttl)
+
+
+def shard_gzip(base_url, name, page):
+    """Chunks of the gzipped shard ``page`` of section ``name``, or None when there is no such shard."""
+    ttl = _ttl()
+    key = _cache_key(base_url, f"{name}-{page}")
+    body = page_cache.page_store().get(key) if ttl else None
+    if body is not None:
+        return [body]
+    section = next((section for section in sections() if section.name == name), None)
+    if section is None or not 1 <= page <= section.pages:
+        return None
+    return _gzipped(_urlset(base_url, _entries(section, page)), key, ttl)
@@ -1,16 +1,26 @@
 ﻿from urllib.parse import parse_qs, urlparse
 from uuid import UUID
 
+import shutil
+import tempfile
+import threading
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django_ratelimit.core import is_ratelimited
 from unittest.mock import patch
 
 from community.models import CommunityPost
 from conversation.models import ChatCredit, GuestWebConversationAttempt, WebAppConfig
-from reignitehome.models import MarketingClickEvent
+from reignitehome import event_writer
+from reignitehome.models import MarketingClickEvent, TrialIP
 
 
+@override_settings(EVENT_WRITER={"MODE": "sync"})
 class FlirtfixRedirectTests(TestCase):
     def _assert_valid_play_redirect(self, response):
         self.assertEqual(response.status_code, 302)
@@ -200,6 +210,35 @@ class WebMarketingAndSignupConfigTests(TestCase):
         self.assertTrue(chat_credit.signup_bonus_given)
 
 
+class GuestCreditsEndpointTests(TestCase):
+    def setUp(self):
+        self.url = reverse("guest_credits")
+        cfg = WebAppConfig.load()
+        cfg.guest_reply_limit = 4
+        cfg.save()
+
+    def test_new_guest_gets_the_allowance_without_any_writes(self):
+        response = self.client.get(self.url, REMOTE_ADDR="10.1.1.1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"credits": 4})
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+        self.assertFalse(TrialIP.objects.exists())
+        self.assertNotIn("sessionid", response.cookies)
+        # Statically exported pages post with this cookie.
+        self.assertIn("csrftoken", response.cookies)
+
+    def test_session_balance_and_used_trial_are_reported(self):
+        session = self.client.session
+        session["chat_credits"] = 2
+        session.save()
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="10.1.1.2").json(), {"credits": 2})
+
+        TrialIP.objects.create(ip_address="10.1.1.2", trial_used=True)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="10.1.1.2").json(), {"credits": 0})
+
+
+@override_settings(EVENT_WRITER={"MODE": "sync"})
 class AjaxReplyHomeGuestLoggingTests(TestCase):
     def setUp(self):
         self.url = reverse("ajax_reply_home")
@@ -354,3 +393,127 @@ class CommunityWebPagesTests(TestCase):
         )
 
 
+class SharedCacheBackendTests(TestCase):
+    """The db/file fallbacks must count rate limits exactly across writers."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="reignite-cache-test-")
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+    def _caches(self):
+        return {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "db": {
+                "BACKEND": "reignitehome.cache_backends.AtomicDatabaseCache",
+                "LOCATION": "test_ratelimit_cache",
+            },
+            "file": {
+                "BACKEND": "reignitehome.cache_backends.LockingFileBasedCache",
+                "LOCATION": self.cache_dir,
+            },
+        }
+
+    def test_database_cache_incr_is_counted(self):
+        with override_settings(CACHES=self._caches()):
+            call_command("createcachetable", verbosity=0)
+            cache = caches["db"]
+            self.assertTrue(cache.add("counter", 0, 60))
+            self.assertFalse(cache.add("counter", 0, 60))
+            for _ in range(5):
+                cache.incr("counter")
+            self.assertEqual(cache.get("counter"), 5)
+            with self.assertRaises(ValueError):
+                cache.incr("missing")
+
+    def test_file_cache_incr_is_atomic_across_threads(self):
+        with override_settings(CACHES=self._caches()):
+            cache = caches["file"]
+            cache.add("counter", 0, 60)
+
+            def worker():
+                local_cache = caches["file"]
+                for _ in range(25):
+                    local_cache.incr("counter")
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(cache.get("counter"), 200)
+
+    def test_ratelimit_blocks_through_file_backend(self):
+        request = RequestFactory().post("/", REMOTE_ADDR="203.0.113.50")
+        with override_settings(CACHES=self._caches(), RATELIMIT_USE_CACHE="file"):
+            results = [
+                is_ratelimited(request, group="shared-cache-test", key="ip", rate="3/m", increment=True)
+                for _ in range(4)
+            ]
+        self.assertEqual(results, [False, False, False, True])
+
+
+class EventWriterTests(TransactionTestCase):
+    """Background mode batches event rows and never blocks or raises on the request path."""
+
+    def _writer(self, **opts):
+        settings_override = override_settings(EVENT_WRITER={"MODE": "background", "FLUSH_SECONDS": 5, **opts})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        writer = event_writer.EventWriter()
+        self.addCleanup(connections.close_all)
+        self.addCleanup(writer.shutdown)
+        return writer
+
+    def _click(self, **kwargs):
+        return MarketingClickEvent(route_key="flirtfix", target_url="https://example.com/", **kwargs)
+
+    def test_rows_are_written_in_one_batch_on_flush(self):
+        writer = self._writer()
+        for _ in range(5):
+            self.assertTrue(writer.record(self._click()))
+        self.assertTrue(writer.flush())
+
+        self.assertEqual(MarketingClickEvent.objects.count(), 5)
+        stats = writer.stats()
+        self.assertEqual(stats["written"], 5)
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_allocated_pk_is_known_before_the_write_and_never_reused(self):
+        writer = self._writer(ID_BLOCK=3)
+        event = self._click()
+        writer.record(event, allocate_pk=True)
+        self.assertIsInstance(event.pk, int)
+
+        direct = MarketingClickEvent.objects.create(route_key="direct", target_url="https://example.com/")
+        self.assertGreater(direct.pk, event.pk)
+
+        writer.flush()
+        self.assertEqual(MarketingClickEvent.objects.get(pk=event.pk).route_key, "flirtfix")
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        writer = self._writer(MAX_QUEUE=1, BLOCK_SECONDS=0.01)
+        with patch.object(writer, "_ensure_thread"):
+            self.assertTrue(writer.record(self._click()))
+            self.assertFalse(writer.record(self._click()))
+        self.assertEqual(writer.stats()["dropped"], 1)
+
+    def test_bad_row_does_not_sink_its_batch(self):
+        existing = MarketingClickEvent.objects.create(route_key="direct", target_url="https://example.com/")
+        writer = self._writer()
+        writer.record(self._click())
+        writer.record(self._click(click_id=existing.click_id))
+        writer.record(self._click())
+        writer.flush()
+
+        stats = writer.stats()
+        self.assertEqual(stats["written"], 2)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(MarketingClickEvent.objects.filter(route_key="flirtfix").count(), 2)
+
+    def test_sync_mode_saves_inline(self):
+        with override_settings(EVENT_WRITER={"MODE": "sync"}):
+            event = self._click()
+            self.assertTrue(event_writer.record(event))
+        self.assertTrue(MarketingClickEvent.objects.filter(pk=event.pk).exists())
@@ -10,10 +10,12 @@ from reignitehome.views import (
     contact_view,
     delete_account_request,
     flirtfix_redirect,
+    guest_credits_status,
     home,
     privacy_policy,
     refund_policy,
     safety_standards,
+    sitemap_section,
     sitemap_xml,
     terms_and_conditions,
 )
@@ -31,9 +33,11 @@ urlpatterns = [
     ),
     path("", include("seoapp.urls")),
     path("sitemap.xml", sitemap_xml, name="sitemap_xml"),
+    path("sitemaps/<slug:section>-<int:page>.xml.gz", sitemap_section, name="sitemap_section"),
     re_path(r'^flirtfix/?$', flirtfix_redirect, name='flirtfix_redirect'),
     path('conversations/',include('conversation.urls')), 
     path('ajax-reply-home/', ajax_reply_home, name='ajax_reply_home'),
+    path('guest-credits/', guest_credits_status, name='guest_credits'),
     path('accounts/', include('allauth.urls')),  
     path('pricing/', include('pricing.urls')), 
     path('api/', include('mobileapi.urls')), 
@@ -0,0 +1,32 @@
+"""
+Guest reply credits for the reply tool on public pages.
+
+Home and the situation / pickup-line guides render the tool with the
+configured guest allowance and never touch the session or ``TrialIP``. A GET
+from a crawler therefore writes nothing, and the HTML is the same for every
+visitor. The tool asks ``guest_credits`` for the visitor's own balance the
+first time someone interacts with it. ``ajax_reply_home`` still enforces the
+limit when a reply is requested.
+"""
+
+from django.urls import reverse
+
+from conversation.config_snapshot import get_web_config
+from reignitehome.models import TrialIP
+from reignitehome.utils.ip_check import get_client_ip
+
+
+def page_context():
+    """Visitor-independent context for pages that embed the reply tool."""
+    return {
+        "chat_credits": get_web_config().guest_reply_limit,
+        "guest_credits_url": reverse("guest_credits"),
+    }
+
+
+def remaining_credits(request):
+    """The guest's balance, read without creating a session or a ``TrialIP`` row."""
+    credits = request.session.get("chat_credits", get_web_config().guest_reply_limit)
+    if TrialIP.objects.filter(ip_address=get_client_ip(request), trial_used=True).exists():
+        return 0
+    return credits
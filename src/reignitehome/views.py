@@ -8,19 +8,21 @@ from urllib.parse import urlencode, urlparse
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods, require_POST
 from django_ratelimit.decorators import ratelimit
 
-from conversation.models import GuestWebConversationAttempt, WebAppConfig
+from conversation.config_snapshot import get_web_config
+from conversation.models import GuestWebConversationAttempt
 from conversation.utils.web_guest_logging import log_guest_web_attempt
 from conversation.utils.reignite_gpt import generate_reignite_comeback
+from reignitehome import event_writer, sitemap
 from reignitehome.models import ContactMessage, MarketingClickEvent, TrialIP
+from reignitehome.utils import guest_credits
 from reignitehome.utils.ip_check import get_client_ip
-from seoapp.models import PickupCategory, PickupTopic
-from seoapp.situation_pages import SITUATION_PAGE_ORDER
 
 # Whitelists (match your <select> values in home.html)
 PLATFORM_ALLOWED = {
@@ -86,23 +88,12 @@ DEFAULT_TOOL_UPLOAD_HINT = "Drag & drop a chat screenshot, or paste your convo b
 
 
 def _get_web_config():
-    return WebAppConfig.load()
+    return get_web_config()
 
 
 def _build_guest_chat_context(request):
-    if "chat_credits" not in request.session:
-        request.session["chat_credits"] = _get_web_config().guest_reply_limit
-
-    current_chat_credits = request.session["chat_credits"]
-
-    ip = get_client_ip(request)
-    trial_record, created = TrialIP.objects.get_or_create(ip_address=ip)
-    if not created and trial_record.trial_used:
-        current_chat_credits = 0
-
-    return {
-        "chat_credits": current_chat_credits,
-    }
+    # Read-only, so these GETs stay cacheable; see reignitehome.utils.guest_credits.
+    return guest_credits.page_context()
 
 
 def _build_tool_config(**overrides):
@@ -234,7 +225,7 @@ def flirtfix_redirect(request):
         )
     else:
         raw_query = {key: request.GET.getlist(key) for key in request.GET.keys()}
-        MarketingClickEvent.objects.create(
+        event_writer.record(MarketingClickEvent(
             route_key=FLIRTFIX_ROUTE_KEY,
             click_id=click_id,
             utm_source=utm_data["utm_source"],
@@ -247,7 +238,7 @@ def flirtfix_redirect(request):
             user_agent=user_agent[:255],
             target_url=target_url,
             raw_query=raw_query,
-        )
+        ))
 
     response = redirect(target_url)
     response["Cache-Control"] = "no-store, no-cache, max-age=0, must-revalidate"
@@ -267,6 +258,16 @@ def ratelimited_error(request, exception=None):
     )
 
 
+@require_http_methods(["GET"])
+def guest_credits_status(request):
+    """The guest's remaining reply credits, fetched by the reply tool on first use."""
+    # Sets the CSRF cookie, which statically exported pages (no token in the form) post with.
+    get_token(request)
+    response = JsonResponse({"credits": guest_credits.remaining_credits(request)})
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
 def home(request):
     context = _build_guest_chat_context(request)
     context["tool_config"] = _build_tool_config(
@@ -344,55 +345,21 @@ def community_create(request):
     return render(request, "community/create.html", context)
 
 
+def _site_url(request):
+    return request.build_absolute_uri("/").rstrip("/")
+
+
 @require_http_methods(["GET"])
 def sitemap_xml(request):
-    absolute_urls = [
-        request.build_absolute_uri(reverse("home")),
-        request.build_absolute_uri(reverse("situation_index")),
-        request.build_absolute_uri(reverse("pickup_lines_index")),
-        request.build_absolute_uri(reverse("glossary")),
-        request.build_absolute_uri(reverse("pricing:pricing")),
-        request.build_absolute_uri(reverse("privacy_policy")),
-        request.build_absolute_uri(reverse("terms_and_conditions")),
-        request.build_absolute_uri(reverse("refund_policy")),
-        request.build_absolute_uri(reverse("contact")),
-        request.build_absolute_uri(reverse("safety_standards")),
-        request.build_absolute_uri(reverse("screenclean_privacy_policy")),
-    ]
-
-    for slug in SITUATION_PAGE_ORDER:
-        absolute_urls.append(
-            request.build_absolute_uri(
-                reverse("situation_landing", kwargs={"slug": slug})
-            )
-        )
-
-    for cat in PickupCategory.objects.order_by("sort_order"):
-        absolute_urls.append(
-            request.build_absolute_uri(
-                reverse("pickup_category_detail", kwargs={"category_slug": cat.slug})
-            )
-        )
+    return HttpResponse(sitemap.index_xml(_site_url(request)), content_type="application/xml")
 
-    for topic in PickupTopic.objects.filter(is_active=True).select_related("category"):
-        absolute_urls.append(
-            request.build_absolute_uri(
-                reverse(
-                    "pickup_line_detail",
-                    kwargs={
-                        "category_slug": topic.category.slug,
-                        "topic_slug": topic.slug,
-                    },
-                )
-            )
-        )
 
-    return render(
-        request,
-        "sitemap.xml",
-        {"urls": absolute_urls},
-        content_type="application/xml",
-    )
+@require_http_methods(["GET"])
+def sitemap_section(request, section, page):
+    chunks = sitemap.shard_gzip(_site_url(request), section, page)
+    if chunks is None:
+        raise Http404("Sitemap not found.")
+    return StreamingHttpResponse(chunks, content_type="application/gzip")
 
 
 @ratelimit(key='ip', rate='10/d', block=True)   # keep your current limit
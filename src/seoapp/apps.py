@@ -4,3 +4,8 @@
 class SeoappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'seoapp'
+
+    def ready(self):
+        from . import page_cache
+
+        page_cache.connect_signals()
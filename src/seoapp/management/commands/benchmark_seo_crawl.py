@@ -0,0 +1,109 @@
+import itertools
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from seoapp.models import PickupCategory, PickupTopic
+from seoapp.situation_pages import list_situation_pages
+
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+_DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+def _written_table(sql):
+    words = sql.split()
+    # INSERT INTO t / DELETE FROM t / REPLACE INTO t, but UPDATE t.
+    return words[1 if words[0].upper() == "UPDATE" else 2].strip('"`')
+
+
+def crawl_urls():
+    """Every public SEO page, interleaved by kind so a short crawl still covers each template."""
+    kinds = [
+        [reverse("home"), reverse("situation_index"), reverse("pickup_lines_index"), reverse("glossary")],
+        [reverse("situation_landing", kwargs={"slug": page["slug"]}) for page in list_situation_pages()],
+        [
+            reverse("pickup_category_detail", kwargs={"category_slug": slug})
+            for slug in PickupCategory.objects.filter(topics__is_active=True)
+            .distinct()
+            .order_by("sort_order")
+            .values_list("slug", flat=True)
+        ],
+        [
+            reverse("pickup_line_detail", kwargs={"category_slug": category_slug, "topic_slug": slug})
+            for category_slug, slug in PickupTopic.objects.filter(is_active=True)
+            .order_by("category__sort_order", "sort_order", "slug")
+            .values_list("category__slug", "slug")
+        ],
+    ]
+    return [url for group in itertools.zip_longest(*kinds) for url in group if url]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the public SEO pages the way a crawler does (no cookies, a new IP per view) "
+        "and report database writes per 1k page views and render latency. Writes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--views", type=int, default=1000, help="Page views to make (default: 1000).")
+        parser.add_argument("--user-agent", default=_DEFAULT_USER_AGENT, help="User-Agent to send (default: Googlebot).")
+
+    def handle(self, *args, **options):
+        views = options["views"]
+        if views <= 0:
+            raise CommandError("--views must be positive.")
+        urls = crawl_urls()
+        if not urls:
+            raise CommandError("No SEO pages to crawl; run seed_pickup_data first.")
+        host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+
+        def crawl(index, url):
+            # A fresh client per view: crawlers do not send cookies back.
+            client = Client(
+                HTTP_HOST=host,
+                HTTP_USER_AGENT=options["user_agent"],
+                REMOTE_ADDR=f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+            )
+            return client.get(url, secure=True)
+
+        writes = []
+        queries = 0
+
+        def count_statements(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            if sql.lstrip().split(None, 1)[0].upper() in _WRITE_VERBS:
+                writes.append(sql)
+            return execute(sql, params, many, context)
+
+        timings = []
+        failures = 0
+        with transaction.atomic():
+            # Untimed and uncounted: creates the config singletons and fills
+            # process caches, as the first request after a deploy does.
+            crawl(views, urls[0])
+            with connection.execute_wrapper(count_statements):
+                for index, url in zip(range(views), itertools.cycle(urls)):
+                    started = time.perf_counter()
+                    response = crawl(index, url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        failures += 1
+            transaction.set_rollback(True)
+
+        per_1k = len(writes) * 1000 / views
+        self.stdout.write(
+            f"Crawled {views} page view(s) over {min(views, len(urls))} URL(s): "
+            f"{len(writes)} DB write(s) ({per_1k:.1f} per 1k views), "
+            f"{queries / views:.1f} queries/view, "
+            f"p50 {statistics.median(timings):.1f}ms, max {max(timings):.1f}ms, "
+            f"{failures} non-200 response(s)."
+        )
+        tables = sorted({_written_table(sql) for sql in writes})
+        if tables:
+            self.stdout.write(f"Tables written: {', '.join(tables)}")
@@ -0,0 +1,53 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from seoapp import static_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render the sitemap's situation, pickup-line and glossary pages to static HTML "
+        "(with .gz and .br variants) for the front proxy. Only pages whose inputs changed "
+        "since the last build are rendered; see seoapp.static_export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default=settings.SEO_EXPORT_DIR, help="Export directory (default: SEO_EXPORT_DIR)."
+        )
+        parser.add_argument(
+            "--host", default=settings.SEO_EXPORT_HOST, help="Host the pages are rendered for (default: SEO_EXPORT_HOST)."
+        )
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1, help="Render processes (default: one per CPU)."
+        )
+        parser.add_argument("--force", action="store_true", help="Render every page, ignoring the manifest.")
+
+    def handle(self, *args, **options):
+        if options["workers"] <= 0:
+            raise CommandError("--workers must be positive.")
+        report = static_export.export(
+            options["output"], options["host"], workers=options["workers"], force=options["force"]
+        )
+
+        self.stdout.write(
+            f"Exported {report['pages']} page(s) to {options['output']} in {report['seconds']:.1f}s "
+            f"with {report['workers']} worker(s): {report['rendered']} rendered "
+            f"({report['written']} written, {report['unchanged']} with unchanged HTML), "
+            f"{report['skipped']} skipped (inputs unchanged), {report['removed']} removed."
+        )
+        if report["written"]:
+            sizes = report["bytes"]
+            self.stdout.write(
+                f"Written: {sizes['html'] / 1024:.0f} KiB HTML, {sizes['gz'] / 1024:.0f} KiB gzip"
+                + (f", {sizes['br'] / 1024:.0f} KiB brotli." if report["brotli"] else ".")
+            )
+        if not report["brotli"]:
+            self.stdout.write(self.style.WARNING("brotli is not installed; no .br files were written."))
+        if report["missing"]:
+            self.stdout.write(
+                self.style.WARNING(f"Not found (not exported): {', '.join(sorted(report['missing']))}")
+            )
+        self.stdout.write(f"Left to Django: {len(report['live'])} sitemap URL(s) that are not page-cached.")
@@ -1,6 +1,8 @@
+import time
+
 from django.core.management.base import BaseCommand
 
-from seoapp.models import PickupCategory, PickupTopic
+from seoapp import seeding
 from seoapp.seed_data import (
     literature, zodiac, mbti, enneagram, hobbies, professions, dog_breeds, fandoms, music_genres,
     attachment_styles, love_languages, astrology_placements, book_genres, gaming_niches, wellness,
@@ -16,52 +18,38 @@ SEED_MODULES = [
 
 
 class Command(BaseCommand):
-    help = "Seed the database with pickup line categories and topics (idempotent)."
+    help = (
+        "Seed the database with pickup line categories and topics (idempotent). Only rows that "
+        "differ from the seed data are written, in one transaction; topics no longer in it are "
+        "deactivated. Topics deactivated in the admin stay inactive unless --reactivate is given. "
+        "See seoapp.seeding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Print the summary of what would change without writing."
+        )
+        parser.add_argument(
+            "--reactivate", action="store_true", help="Also reactivate seeded topics that were deactivated."
+        )
 
     def handle(self, *args, **options):
-        total_created = 0
-        total_updated = 0
-
-        for module in SEED_MODULES:
-            data = module.DATA
-            category, _ = PickupCategory.objects.update_or_create(
-                slug=data["category_slug"],
-                defaults={
-                    "name": data["category_name"],
-                    "sort_order": data.get("sort_order", 0),
-                },
-            )
-
-            for i, topic in enumerate(data["topics"]):
-                _, created = PickupTopic.objects.update_or_create(
-                    category=category,
-                    slug=topic["slug"],
-                    defaults={
-                        "keyword": topic["keyword"],
-                        "h1": topic["h1"],
-                        "title": topic["title"],
-                        "meta_description": topic["meta_description"],
-                        "seo_intro": topic["seo_intro"],
-                        "witty_lines": topic["witty_lines"],
-                        "flirty_lines": topic["flirty_lines"],
-                        "cheesy_lines": topic["cheesy_lines"],
-                        "prefill_text": topic["prefill_text"],
-                        "upload_hint": topic["upload_hint"],
-                        "her_info_prefill": topic.get("her_info_prefill", ""),
-                        "sort_order": i,
-                    },
-                )
-                if created:
-                    total_created += 1
-                else:
-                    total_updated += 1
-
-            self.stdout.write(
-                f"  {category.name}: {len(data['topics'])} topics"
-            )
-
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Done. Created {total_created}, updated {total_updated}."
-            )
+        started = time.perf_counter()
+        plan = seeding.diff(SEED_MODULES, reactivate=options["reactivate"])
+        if not options["dry_run"]:
+            seeding.apply(plan)
+        elapsed = time.perf_counter() - started
+
+        if options["verbosity"] >= 2:
+            for module in SEED_MODULES:
+                self.stdout.write(f"  {module.DATA['category_name']}: {len(module.DATA['topics'])} topics")
+
+        summary = (
+            f"topics {len(plan.new_topics)} created, {len(plan.changed_topics)} updated, "
+            f"{plan.unchanged_topics} unchanged, {len(plan.deactivated_topics)} deactivated; "
+            f"categories {len(plan.new_categories)} created, {len(plan.changed_categories)} updated"
         )
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run in {elapsed:.2f}s, nothing written: {summary}.")
+        elif options["verbosity"]:
+            self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.2f}s: {summary}."))
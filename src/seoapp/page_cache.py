@@ -0,0 +1,213 @@
+"""
+Rendered-HTML cache for the pickup-line, situation and glossary pages.
+
+Each page is rendered once into a shell, with placeholders where a
+visitor's own markup goes: the navbar (auth state, credits) and the reply
+form's CSRF token. The shell is cached per scheme, host and path for
+``SEO_PAGE_CACHE_SECONDS``, in the ``seo_pages`` alias so a crawl cannot
+evict the default cache's ratelimit counters and stamps. Every response
+fills the placeholders per request: ``navbar.html`` is rendered on its own
+and ``get_token`` supplies the token. The reply tool's guest credits are
+already fetched lazily (``reignitehome.utils.guest_credits``).
+``render_static`` fills the shell for a visitor without cookies, for
+``seoapp.static_export``.
+
+Responses carry a weak ETag over the shell and a Last-Modified date. For
+pickup pages that date is the newest ``PickupTopic.updated_at`` shown; for
+other pages it is the time of rendering. A matching ``If-None-Match`` or
+``If-Modified-Since`` is answered with 304 before anything is rendered.
+Requests with a session cookie get neither validators nor 304s: their
+navbar shows the signed-in user and credit balance, which the shell's
+validators do not cover.
+
+Keys embed a version stamp held in the default cache, as
+``community.feed_cache`` does, plus the web config version and
+``CONTENT_VERSION``, a hash of the Python-defined situation and glossary
+data. Saving or deleting a ``PickupTopic`` or ``PickupCategory`` publishes a
+new stamp. ``seed_pickup_data`` publishes one when it changes anything
+(``seoapp.seeding``), since its bulk writes skip signals.
+"""
+
+import hashlib
+import json
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from conversation.config_snapshot import config_version
+
+from .glossary_terms import GLOSSARY_TERMS
+from .models import PickupCategory, PickupTopic
+from .situation_pages import SITUATION_PAGE_ORDER, SITUATION_PAGES
+
+# Pages live in their own alias; the version stamp stays in the default cache.
+CACHE_ALIAS = "seo_pages"
+VERSION_CACHE_KEY = "seo_page:version"
+# Must match the placeholder in base.html.
+NAVBAR_PLACEHOLDER = "<!-- page-cache:navbar -->"
+CSRF_PLACEHOLDER = "page-cache-csrf-token"
+
+CONTENT_VERSION = hashlib.sha256(
+    json.dumps([SITUATION_PAGES, SITUATION_PAGE_ORDER, GLOSSARY_TERMS], sort_keys=True, default=str).encode("utf-8")
+).hexdigest()[:16]
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "SEO_PAGE_CACHE_SECONDS", 0) or 0)
+
+
+def enabled() -> bool:
+    return _ttl() > 0
+
+
+def page_store():
+    """The cache holding rendered shells and sitemap bodies."""
+    return caches[CACHE_ALIAS]
+
+
+def _version() -> str:
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY) or uuid.uuid4().hex
+    return version
+
+
+def content_version() -> str:
+    """Changes whenever the pickup rows or the situation and glossary data do (also keys the sitemap)."""
+    return f"{_version()}:{CONTENT_VERSION}"
+
+
+def _page_key(request) -> str:
+    # Query strings (utm tags and the like) never change these pages.
+    url = f"{request.scheme}://{request.get_host()}{request.path}"
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return f"seo_page:{content_version()}:{config_version()}:{digest}"
+
+
+def invalidate():
+    """Retire every cached page once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None))
+
+
+def render_shell(request, template_name, context, last_modified=None):
+    """Render a page with placeholders for the per-visitor parts; see ``cached_page``."""
+    response = render(
+        request,
+        template_name,
+        {**context, "page_cache_shell": True, "csrf_token": CSRF_PLACEHOLDER},
+    )
+    response.page_cache_last_modified = last_modified
+    return response
+
+
+def _entry(response):
+    body = response.content.decode(response.charset)
+    last_modified = response.page_cache_last_modified
+    return {
+        "body": body,
+        "content_type": response["Content-Type"],
+        "etag": 'W/"%s"' % hashlib.md5(body.encode("utf-8"), usedforsecurity=False).hexdigest(),
+        "last_modified": int(last_modified.timestamp() if last_modified else time.time()),
+    }
+
+
+def _with_validators(response, entry):
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    # Browsers may keep the page but must check back; the navbar differs per visitor.
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def _has_session(request) -> bool:
+    return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def _fill(request, entry):
+    body = entry["body"]
+    if NAVBAR_PLACEHOLDER in body:
+        body = body.replace(NAVBAR_PLACEHOLDER, render_to_string("navbar.html", request=request), 1)
+    if CSRF_PLACEHOLDER in body:
+        body = body.replace(CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(body, content_type=entry["content_type"])
+    if _has_session(request):
+        # The navbar carries this visitor's account and balance; never let it be revalidated.
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ("Cookie",))
+        return response
+    return _with_validators(response, entry)
+
+
+def cached_page(view):
+    """Serve ``view``'s ``render_shell`` output from the cache, with conditional GET."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = _page_key(request) if enabled() else None
+        entry = page_store().get(key) if key else None
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or not hasattr(response, "page_cache_last_modified"):
+                return response
+            entry = _entry(response)
+            if key:
+                # Recomputed: rendering may have published the first config version.
+                page_store().set(_page_key(request), entry, _ttl())
+
+        if _has_session(request):
+            return _fill(request, entry)
+        conditional = get_conditional_response(request, etag=entry["etag"], last_modified=entry["last_modified"])
+        if conditional is not None:
+            # 304 Not Modified (or 412 for a failed If-Match).
+            return _with_validators(conditional, entry)
+        return _fill(request, entry)
+
+    wrapper.page_cache_view = view
+    return wrapper
+
+
+def is_cached_page(view) -> bool:
+    return hasattr(view, "page_cache_view")
+
+
+def render_static(view, request, *args, **kwargs):
+    """The page a ``cached_page`` view serves to a visitor without cookies, for static export.
+
+    The navbar is rendered for ``request.user`` (set it to an anonymous user)
+    and the CSRF field is left empty. Returns None when the page does not exist.
+    """
+    try:
+        response = view.page_cache_view(request, *args, **kwargs)
+    except Http404:
+        return None
+    if response.status_code != 200 or not hasattr(response, "page_cache_last_modified"):
+        return None
+    body = response.content.decode(response.charset)
+    body = body.replace(NAVBAR_PLACEHOLDER, render_to_string("navbar.html", request=request), 1)
+    return body.replace(CSRF_PLACEHOLDER, "")
+
+
+def _content_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate()
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    for model in (PickupCategory, PickupTopic):
+        uid = f"seo_page_cache_{model._meta.model_name}"
+        post_save.connect(_content_changed, sender=model, dispatch_uid=f"{uid}_save")
+        post_delete.connect(_content_changed, sender=model, dispatch_uid=f"{uid}_delete")
@@ -0,0 +1,166 @@
+"""
+Bulk, diffing seeder behind ``manage.py seed_pickup_data``.
+
+``diff`` loads every category and topic in two queries and compares them
+with the seed modules' ``DATA`` in memory. It writes nothing, which is all
+``--dry-run`` needs. ``apply`` writes only the differences, in one
+transaction:
+
+* new rows go through ``bulk_create``;
+* rows with changed fields go through ``bulk_update``;
+* topics no longer in the seed data are deactivated (never deleted).
+
+``is_active`` is otherwise left alone, so a topic a moderator hid in the
+admin stays hidden. ``reactivate=True`` (``--reactivate``) turns every
+seeded topic back on.
+
+Unchanged rows keep their ``updated_at``, so sitemap ``<lastmod>`` values
+and the page and sitemap caches (``page_cache.invalidate``) move only when
+content does. Bulk writes send no model signals, so ``apply`` invalidates
+the page cache itself.
+"""
+
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import page_cache
+from .models import PickupCategory, PickupTopic
+
+BATCH_SIZE = 500
+
+CATEGORY_FIELDS = ("name", "sort_order")
+# Every seed topic must define these; her_info_prefill is optional.
+SEEDED_TOPIC_FIELDS = (
+    "keyword",
+    "h1",
+    "title",
+    "meta_description",
+    "seo_intro",
+    "witty_lines",
+    "flirty_lines",
+    "cheesy_lines",
+    "prefill_text",
+    "upload_hint",
+)
+
+SeedPlan = namedtuple(
+    "SeedPlan",
+    [
+        "new_categories",  # unsaved PickupCategory rows
+        "changed_categories",  # PickupCategory rows with the seed values set
+        "new_topics",  # (category slug, unsaved PickupTopic) pairs
+        "changed_topics",  # PickupTopic rows with the seed values set
+        "changed_topic_fields",  # union of the fields that differ on changed_topics
+        "deactivated_topics",  # active PickupTopic rows missing from the seed data
+        "unchanged_topics",  # count
+    ],
+)
+
+
+def _desired(modules, reactivate=False):
+    """``({category slug: values}, {(category slug, topic slug): values})`` from the seed modules."""
+    categories, topics = {}, {}
+    for module in modules:
+        data = module.DATA
+        categories[data["category_slug"]] = {
+            "name": data["category_name"],
+            "sort_order": data.get("sort_order", 0),
+        }
+        for i, topic in enumerate(data["topics"]):
+            values = {field: topic[field] for field in SEEDED_TOPIC_FIELDS}
+            values.update(her_info_prefill=topic.get("her_info_prefill", ""), sort_order=i)
+            if reactivate:
+                values["is_active"] = True
+            topics[(data["category_slug"], topic["slug"])] = values
+    return categories, topics
+
+
+def _set_changed(obj, values):
+    """Set ``values`` on ``obj``; return the names of the fields that changed."""
+    changed = [field for field, value in values.items() if getattr(obj, field) != value]
+    for field in changed:
+        setattr(obj, field, values[field])
+    return changed
+
+
+def diff(modules, reactivate=False) -> SeedPlan:
+    """Compare the seed modules with the database; nothing is written."""
+    desired_categories, desired_topics = _desired(modules, reactivate)
+    existing_categories = {category.slug: category for category in PickupCategory.objects.all()}
+    category_slugs = {category.pk: slug for slug, category in existing_categories.items()}
+
+    new_categories, changed_categories = [], []
+    for slug, values in desired_categories.items():
+        category = existing_categories.get(slug)
+        if category is None:
+            new_categories.append(PickupCategory(slug=slug, **values))
+        elif _set_changed(category, values):
+            changed_categories.append(category)
+
+    changed_topics, changed_fields, deactivated, unchanged = [], set(), [], 0
+    for topic in PickupTopic.objects.order_by("pk"):
+        values = desired_topics.pop((category_slugs[topic.category_id], topic.slug), None)
+        if values is None:
+            if topic.is_active:
+                deactivated.append(topic)
+            continue
+        changed = _set_changed(topic, values)
+        if changed:
+            changed_topics.append(topic)
+            changed_fields.update(changed)
+        else:
+            unchanged += 1
+
+    # Whatever is left in the seed data has no row yet.
+    new_topics = [
+        (category_slug, PickupTopic(slug=slug, **values))
+        for (category_slug, slug), values in desired_topics.items()
+    ]
+    return SeedPlan(
+        new_categories,
+        changed_categories,
+        new_topics,
+        changed_topics,
+        sorted(changed_fields),
+        deactivated,
+        unchanged,
+    )
+
+
+def has_changes(plan: SeedPlan) -> bool:
+    return any(
+        (plan.new_categories, plan.changed_categories, plan.new_topics, plan.changed_topics, plan.deactivated_topics)
+    )
+
+
+def apply(plan: SeedPlan, now=None):
+    """Write ``plan`` in one transaction and retire the cached pages if anything changed."""
+    if not has_changes(plan):
+        return
+    now = now or timezone.now()
+    with transaction.atomic():
+        PickupCategory.objects.bulk_create(plan.new_categories, batch_size=BATCH_SIZE)
+        PickupCategory.objects.bulk_update(plan.changed_categories, CATEGORY_FIELDS, batch_size=BATCH_SIZE)
+
+        if plan.new_topics:
+            category_ids = dict(PickupCategory.objects.values_list("slug", "pk"))
+            for category_slug, topic in plan.new_topics:
+                topic.category_id = category_ids[category_slug]
+            PickupTopic.objects.bulk_create([topic for _, topic in plan.new_topics], batch_size=BATCH_SIZE)
+
+        if plan.changed_topics:
+            # bulk_update() skips auto_now; the edit time is part of the change.
+            for topic in plan.changed_topics:
+                topic.updated_at = now
+            PickupTopic.objects.bulk_update(
+                plan.changed_topics, [*plan.changed_topic_fields, "updated_at"], batch_size=BATCH_SIZE
+            )
+
+        if plan.deactivated_topics:
+            PickupTopic.objects.filter(pk__in=[topic.pk for topic in plan.deactivated_topics]).update(
+                is_active=False, updated_at=now
+            )
+
+        page_cache.invalidate()
@@ -0,0 +1,273 @@
+"""
+Static export of the SEO page tree, for the front proxy to serve directly.
+
+``manage.py export_seo_pages`` renders every sitemap URL whose view is
+page-cached (situations, pickup lines, glossary). Each one becomes
+``<output>/<path>/index.html`` plus precompressed ``index.html.gz`` and,
+when the ``brotli`` package is installed, ``index.html.br``. The other
+sitemap URLs (home, pricing, policies) stay with Django.
+
+The files hold what a visitor without cookies sees: the guest navbar and an
+empty CSRF field. The reply tool posts with the CSRF cookie that its first
+``guest_credits`` request sets. The proxy should serve them only to requests
+without a session cookie, for example with nginx::
+
+    location @seo_static {
+        root /srv/seo_export;  # SEO_EXPORT_DIR
+        gzip_static on;
+        brotli_static on;
+        try_files $uri/index.html @django;
+    }
+
+Builds are incremental. A page's input hash covers its own data and a build
+fingerprint. The own data is the topic row, the category and its topics, or
+the directory listing. The fingerprint covers every template file, the
+situation and glossary data, the web config values the pages show, the
+host and the export format. ``manifest.json`` records the hashes from the
+last build. A page is rendered only when its hash changed, and its files are
+rewritten only when the HTML did. Pages that left the sitemap are deleted.
+A code change that alters the HTML changes no hash; build with ``--force``
+after such a deploy.
+"""
+
+import gzip
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.template.utils import get_app_template_dirs
+from django.test import RequestFactory
+from django.urls import resolve
+
+from reignitehome.context_processors import web_marketing_limits
+from reignitehome.sitemap import sitemap_paths
+from reignitehome.utils import guest_credits
+
+from . import page_cache
+from .models import PickupTopic
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional; only .gz files are written
+    brotli = None
+
+# Bump when the exporter's output changes for the same inputs.
+EXPORT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.html"
+
+
+def _digest(value) -> str:
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _template_files():
+    dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get("DIRS", [])]
+    dirs += [Path(d) for d in get_app_template_dirs("templates")]
+    for root in dirs:
+        for path in sorted(root.rglob("*")):
+            if path.is_file():
+                yield path
+
+
+def build_fingerprint(host: str) -> str:
+    """Hash of the inputs every exported page shares."""
+    sha = hashlib.sha256()
+    for path in _template_files():
+        sha.update(str(path).encode("utf-8"))
+        sha.update(hashlib.sha256(path.read_bytes()).digest())
+    shared = {
+        "format": EXPORT_FORMAT,
+        "host": host,
+        "static_url": settings.STATIC_URL,
+        "content": page_cache.CONTENT_VERSION,
+        "config": {**web_marketing_limits(None), **guest_credits.page_context()},
+    }
+    sha.update(_digest(shared).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def _pickup_inputs():
+    """Per-URL inputs of the pickup pages, keyed by (url name, kwargs)."""
+    inputs = {}
+    categories = {}
+    topics = (
+        PickupTopic.objects.filter(is_active=True)
+        .select_related("category")
+        .order_by("category__sort_order", "category_id", "sort_order", "keyword")
+    )
+    for topic in topics:
+        topic_hash = _digest(topic.to_dict())
+        inputs[("pickup_line_detail", (topic.category.slug, topic.slug))] = topic_hash
+        categories.setdefault(topic.category, []).append(topic_hash)
+
+    directory = []
+    for category, topic_hashes in categories.items():
+        inputs[("pickup_category_detail", (category.slug,))] = _digest([category.name, topic_hashes])
+        directory.append([category.sort_order, category.slug, category.name, len(topic_hashes)])
+    inputs[("pickup_lines_index", ())] = _digest(sorted(directory))
+    return inputs
+
+
+def plan_pages(host: str):
+    """Return ``(pages, live_paths)``: ``{path: input hash}`` to export, and sitemap paths left to Django."""
+    fingerprint = build_fingerprint(host)
+    pickup = _pickup_inputs()
+    pages, live = {}, []
+    for path in sitemap_paths():
+        match = resolve(path)
+        if not page_cache.is_cached_page(match.func):
+            live.append(path)
+            continue
+        # Situation and glossary pages depend on the fingerprint alone.
+        own = pickup.get((match.url_name, tuple(match.kwargs.values())), "")
+        pages[path] = _digest([fingerprint, path, own])
+    return pages, live
+
+
+def page_dir(output_dir, path) -> Path:
+    return Path(output_dir, *[part for part in path.split("/") if part])
+
+
+def _write_atomic(target: Path, data: bytes):
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+
+
+def _write_page(directory: Path, html: bytes) -> dict:
+    directory.mkdir(parents=True, exist_ok=True)
+    # mtime=0 keeps the .gz byte-identical across builds of the same HTML.
+    variants = {INDEX_NAME: html, f"{INDEX_NAME}.gz": gzip.compress(html, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[f"{INDEX_NAME}.br"] = brotli.compress(html, quality=11)
+    for name, data in variants.items():
+        _write_atomic(directory / name, data)
+    return {name.rsplit(".", 1)[-1]: len(data) for name, data in variants.items()}
+
+
+def _remove_page(output_dir, path):
+    directory = page_dir(output_dir, path)
+    for name in (INDEX_NAME, f"{INDEX_NAME}.gz", f"{INDEX_NAME}.br"):
+        (directory / name).unlink(missing_ok=True)
+    root = Path(output_dir).resolve()
+    directory = directory.resolve()
+    while directory != root and root in directory.parents:
+        try:
+            directory.rmdir()
+        except OSError:
+            break
+        directory = directory.parent
+
+
+def render_chunk(jobs, host, output_dir):
+    """Render ``[(path, previous html sha)]`` and write the pages whose HTML changed.
+
+    Runs in a worker process (or inline). Returns ``(path, html sha or None,
+    file sizes or None)`` per job; sizes are None when the files were kept.
+    """
+    factory = RequestFactory()
+    results = []
+    for path, previous_sha in jobs:
+        request = factory.get(path, secure=True, HTTP_HOST=host)
+        request.user = AnonymousUser()
+        match = resolve(path)
+        html = page_cache.render_static(match.func, request, *match.args, **match.kwargs)
+        if html is None:
+            results.append((path, None, None))
+            continue
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        directory = page_dir(output_dir, path)
+        if sha == previous_sha and (directory / INDEX_NAME).exists():
+            results.append((path, sha, None))
+        else:
+            results.append((path, sha, _write_page(directory, data)))
+    return results
+
+
+def load_manifest(output_dir) -> dict:
+    try:
+        with open(Path(output_dir, MANIFEST_NAME), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest.get("pages", {}) if isinstance(manifest, dict) else {}
+
+
+def export(output_dir, host, workers=1, force=False) -> dict:
+    """Bring ``output_dir`` up to date; return the build report."""
+    started = time.perf_counter()
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(output_dir)
+    pages, live = plan_pages(host)
+
+    jobs = [
+        (path, (previous.get(path) or {}).get("html"))
+        for path, input_hash in pages.items()
+        if force
+        or (previous.get(path) or {}).get("inputs") != input_hash
+        or not (page_dir(output_dir, path) / INDEX_NAME).exists()
+    ]
+    results = []
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        if jobs:
+            results = render_chunk(jobs, host, output_dir)
+    else:
+        # Several chunks per worker, so one slow chunk does not idle the rest.
+        size = math.ceil(len(jobs) / (workers * 4))
+        chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        # Forked workers open their own database connections; none may be inherited.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = [pool.submit(render_chunk, chunk, host, str(output_dir)) for chunk in chunks]
+            for future in as_completed(futures):
+                results.extend(future.result())
+
+    rendered = {path for path, _ in jobs}
+    manifest = {path: previous[path] for path in pages if path in previous and path not in rendered}
+    report = {
+        "pages": len(pages),
+        "rendered": len(results),
+        "written": 0,
+        "unchanged": 0,
+        "skipped": len(pages) - len(jobs),
+        "missing": [],
+        "removed": 0,
+        "live": live,
+        "workers": workers,
+        "bytes": {"html": 0, "gz": 0, "br": 0},
+        "brotli": brotli is not None,
+    }
+    for path, sha, sizes in results:
+        if sha is None:
+            report["missing"].append(path)
+            continue
+        manifest[path] = {"inputs": pages[path], "html": sha}
+        if sizes is None:
+            report["unchanged"] += 1
+            continue
+        report["written"] += 1
+        for kind, size in sizes.items():
+            report["bytes"][kind] += size
+
+    for path in set(previous) - set(manifest):
+        _remove_page(output_dir, path)
+        report["removed"] += 1
+
+    _write_atomic(
+        Path(output_dir, MANIFEST_NAME),
+        json.dumps({"format": EXPORT_FORMAT, "host": host, "pages": manifest}, indent=1, sort_keys=True).encode("utf-8"),
+    )
+    report["seconds"] = time.perf_counter() - started
+    return report
@@ -1,12 +1,30 @@
-﻿import re
+﻿import gzip
+import json
+import math
+import re
+import tempfile
+from io import StringIO
 from pathlib import Path
+from unittest import mock
 
 from django.conf import settings
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.html import escape
+from django.utils.http import http_date
 
+from conversation.config_snapshot import clear_local_snapshots
+from reignitehome import sitemap
+from reignitehome.models import TrialIP
 from reignitehome.views import DEFAULT_TOOL_CONVERSATION_PLACEHOLDER
+from seoapp import page_cache, static_export
 from seoapp.models import PickupCategory, PickupTopic
 from seoapp.situation_pages import SITUATION_PAGE_ORDER, list_situation_pages
 
@@ -18,6 +36,16 @@ def _list_pickup_topics():
     ]
 
 
+def _read_sitemap_shards(client, index_response):
+    """The concatenated, decompressed shards listed in a sitemap index."""
+    body = b""
+    for loc in re.findall(r"<loc>([^<]+)</loc>", index_response.content.decode()):
+        shard = client.get(loc)
+        assert shard.status_code == 200, loc
+        body += gzip.decompress(b"".join(shard.streaming_content))
+    return body
+
+
 class SituationSeoPagesTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -117,6 +145,7 @@ class SituationSeoPagesTests(TestCase):
         response = self.client.get(reverse("sitemap_xml"))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response["Content-Type"], "application/xml")
+        response.content = _read_sitemap_shards(self.client, response)
 
         expected_core_urls = [
             "http://testserver/",
@@ -455,3 +484,337 @@ class SituationSeoPagesTests(TestCase):
         )
 
 
+class SeoCrawlerSideEffectTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_pickup_data", verbosity=0)
+
+    def test_crawler_page_views_write_nothing(self):
+        topic = PickupTopic.objects.filter(is_active=True).select_related("category").first()
+        urls = [
+            reverse("home"),
+            reverse("situation_landing", kwargs={"slug": SITUATION_PAGE_ORDER[0]}),
+            reverse("pickup_category_detail", kwargs={"category_slug": topic.category.slug}),
+            reverse("pickup_line_detail", kwargs={"category_slug": topic.category.slug, "topic_slug": topic.slug}),
+        ]
+        for index, url in enumerate(urls):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, REMOTE_ADDR=f"10.0.0.{index}", HTTP_USER_AGENT="Googlebot/2.1")
+            self.assertEqual(response.status_code, 200)
+            writes = [q["sql"] for q in ctx.captured_queries if not q["sql"].lstrip().upper().startswith("SELECT")]
+            self.assertEqual(writes, [])
+            self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+            if "data-reply-tool-shared" in response.content.decode():
+                self.assertContains(response, f'data-guest-credits-url="{reverse("guest_credits")}"', html=False)
+        self.assertFalse(TrialIP.objects.exists())
+        self.assertFalse(Session.objects.exists())
+
+    def test_crawl_benchmark_reports_zero_writes_per_1k_views(self):
+        out = StringIO()
+        call_command("benchmark_seo_crawl", views=40, stdout=out)
+
+        self.assertIn("40 page view(s)", out.getvalue())
+        self.assertIn(": 0 DB write(s) (0.0 per 1k views)", out.getvalue())
+        self.assertIn("0 non-200 response(s)", out.getvalue())
+
+
+@override_settings(SEO_PAGE_CACHE_SECONDS=300)
+class SeoPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_pickup_data", verbosity=0)
+
+    def setUp(self):
+        cache.clear()
+        caches[page_cache.CACHE_ALIAS].clear()
+        # Snapshots loaded by earlier tests would otherwise outlive the cleared stamp.
+        clear_local_snapshots()
+        self.topic = PickupTopic.objects.filter(is_active=True).select_related("category").first()
+        self.detail_url = reverse(
+            "pickup_line_detail",
+            kwargs={"category_slug": self.topic.category.slug, "topic_slug": self.topic.slug},
+        )
+
+    @staticmethod
+    def _without_csrf(content):
+        return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]+"', b"", content)
+
+    def test_cached_pages_skip_queries_and_answer_conditional_gets(self):
+        urls = [
+            reverse("pickup_lines_index"),
+            reverse("pickup_category_detail", kwargs={"category_slug": self.topic.category.slug}),
+            self.detail_url,
+            reverse("situation_index"),
+            reverse("situation_landing", kwargs={"slug": SITUATION_PAGE_ORDER[0]}),
+            reverse("glossary"),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first["ETag"].startswith('W/"'))
+
+                with CaptureQueriesContext(connection) as ctx:
+                    second = self.client.get(url, {"utm_source": "newsletter"})
+                # Identical apart from the per-request masked CSRF token.
+                self.assertEqual(self._without_csrf(second.content), self._without_csrf(first.content))
+                self.assertEqual(second["ETag"], first["ETag"])
+                self.assertFalse([q for q in ctx.captured_queries if "seoapp_pickup" in q["sql"]])
+
+                by_etag = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+                by_date = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+                for response in (by_etag, by_date):
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b"")
+                    self.assertEqual(response["ETag"], first["ETag"])
+
+        detail = self.client.get(self.detail_url)
+        self.assertEqual(detail["Last-Modified"], http_date(self.topic.updated_at.timestamp()))
+
+    def test_navbar_and_csrf_token_are_filled_per_visitor(self):
+        guest = self.client.get(self.detail_url)
+        self.assertContains(guest, "Login / Signup")
+        self.assertNotContains(guest, "page-cache")
+
+        user = User.objects.create_user(username="seoreader", email="seoreader@example.com", password="StrongPass123!")
+        member_client = Client(enforce_csrf_checks=True)
+        member_client.force_login(user)
+        member = member_client.get(self.detail_url)
+        self.assertContains(member, "seoreader@example.com")
+        self.assertNotContains(member, "Login / Signup")
+        self.assertFalse(member.has_header("ETag"))
+        self.assertFalse(member.has_header("Last-Modified"))
+
+        # A signed-in browser replaying the guest validators still gets its own navbar, not a 304.
+        revalidated = member_client.get(
+            self.detail_url, HTTP_IF_NONE_MATCH=guest["ETag"], HTTP_IF_MODIFIED_SINCE=guest["Last-Modified"]
+        )
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertContains(revalidated, "seoreader@example.com")
+
+        # The token in the cached page is this visitor's: CSRF passes and the
+        # view answers 405, where a foreign token is refused with 403.
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', member.content.decode()).group(1)
+        self.assertEqual(member_client.post(reverse("guest_credits"), {"csrfmiddlewaretoken": token}).status_code, 405)
+        self.assertEqual(member_client.post(reverse("guest_credits"), {"csrfmiddlewaretoken": "x" * 64}).status_code, 403)
+
+    def test_topic_edits_and_reseeding_retire_cached_pages(self):
+        before = self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.title = "A freshly edited title"
+            self.topic.save()
+        edited = self.client.get(self.detail_url)
+        self.assertContains(edited, "A freshly edited title")
+        self.assertNotEqual(edited["ETag"], before["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("seed_pickup_data", verbosity=0, stdout=StringIO())
+        self.assertNotContains(self.client.get(self.detail_url), "A freshly edited title")
+
+
+class SeoStaticExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_pickup_data", verbosity=0)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output = Path(tmp.name)
+        self.topic = PickupTopic.objects.filter(is_active=True).select_related("category").first()
+
+    def _export(self, **kwargs):
+        return static_export.export(self.output, "tryagaintext.com", **kwargs)
+
+    def _page(self, path):
+        return static_export.page_dir(self.output, path) / "index.html"
+
+    def test_export_writes_anonymous_compressed_pages(self):
+        stdout = StringIO()
+        call_command("export_seo_pages", output=str(self.output), workers=1, stdout=stdout)
+        self.assertIn("Left to Django: 8 sitemap URL(s)", stdout.getvalue())
+
+        active = PickupTopic.objects.filter(is_active=True)
+        expected = (
+            active.count()
+            + active.values("category").distinct().count()
+            + len(SITUATION_PAGE_ORDER)
+            + 3  # situation index, pickup directory, glossary
+        )
+        manifest = json.loads((self.output / "manifest.json").read_text())
+        self.assertEqual(len(manifest["pages"]), expected)
+        self.assertFalse((self.output / "index.html").exists())  # home stays dynamic
+
+        detail = self._page(
+            reverse("pickup_line_detail", kwargs={"category_slug": self.topic.category.slug, "topic_slug": self.topic.slug})
+        )
+        html = detail.read_text()
+        self.assertIn(escape(self.topic.title), html)
+        self.assertIn("Login / Signup", html)
+        self.assertIn('name="csrfmiddlewaretoken" value=""', html)
+        self.assertNotIn("page-cache", html)
+        self.assertIn(
+            f'href="https://tryagaintext.com/pickup-lines/{self.topic.category.slug}/{self.topic.slug}/"', html
+        )
+        self.assertEqual(gzip.decompress(Path(f"{detail}.gz").read_bytes()), detail.read_bytes())
+
+    def test_rebuilds_render_only_pages_whose_inputs_changed(self):
+        first = self._export()
+        self.assertEqual(first["rendered"], first["pages"])
+
+        again = self._export()
+        self.assertEqual((again["rendered"], again["skipped"]), (0, first["pages"]))
+
+        self.topic.title = "A freshly edited title"
+        self.topic.save()
+        edited = self._export()
+        # The topic's page and its category's listing are rendered (the directory
+        # only counts topics), but the listing does not show titles.
+        self.assertEqual((edited["rendered"], edited["written"], edited["unchanged"]), (2, 1, 1))
+        detail_url = reverse(
+            "pickup_line_detail", kwargs={"category_slug": self.topic.category.slug, "topic_slug": self.topic.slug}
+        )
+        self.assertIn("A freshly edited title", self._page(detail_url).read_text())
+
+        gone = PickupTopic.objects.filter(category=self.topic.category, is_active=True).exclude(pk=self.topic.pk).first()
+        gone.is_active = False
+        gone.save()
+        pruned = self._export()
+        self.assertEqual((pruned["rendered"], pruned["removed"]), (2, 1))
+        self.assertFalse(
+            self._page(reverse("pickup_line_detail", kwargs={"category_slug": gone.category.slug, "topic_slug": gone.slug})).exists()
+        )
+
+        self.assertEqual(self._export(force=True)["unchanged"], pruned["pages"])
+
+
+class SitemapShardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_pickup_data", verbosity=0)
+
+    def setUp(self):
+        cache.clear()
+        caches[page_cache.CACHE_ALIAS].clear()
+        self.topic = PickupTopic.objects.filter(is_active=True).select_related("category").first()
+        self.topic_loc = "http://testserver" + reverse(
+            "pickup_line_detail", kwargs={"category_slug": self.topic.category.slug, "topic_slug": self.topic.slug}
+        )
+
+    def _shard(self, section, page=1):
+        response = self.client.get(reverse("sitemap_section", kwargs={"section": section, "page": page}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        return gzip.decompress(b"".join(response.streaming_content)).decode()
+
+    def test_index_lists_a_shard_per_section_with_lastmod(self):
+        index = self.client.get(reverse("sitemap_xml")).content.decode()
+        category_slugs = list(
+            PickupCategory.objects.filter(topics__is_active=True).distinct().order_by("sort_order").values_list("slug", flat=True)
+        )
+        shard_locs = re.findall(r"<loc>http://testserver/sitemaps/([^<]+)</loc>", index)
+        self.assertEqual(
+            shard_locs,
+            ["static-1.xml.gz", "situations-1.xml.gz"] + [f"pickup-{slug}-1.xml.gz" for slug in category_slugs],
+        )
+
+        latest = PickupTopic.objects.filter(category=self.topic.category, is_active=True).aggregate(Max("updated_at"))
+        self.assertIn(
+            f"<loc>http://testserver/sitemaps/pickup-{self.topic.category.slug}-1.xml.gz</loc>\n"
+            f"    <lastmod>{latest['updated_at__max'].replace(microsecond=0).isoformat()}</lastmod>",
+            index,
+        )
+
+        shard = self._shard(f"pickup-{self.topic.category.slug}")
+        self.assertIn(
+            f"<loc>{self.topic_loc}</loc>\n    <lastmod>{self.topic.updated_at.replace(microsecond=0).isoformat()}</lastmod>",
+            shard,
+        )
+        self.assertNotIn("<lastmod>", self._shard("situations"))
+
+        for section, page in (("pickup-no-such-category", 1), ("static", 2), ("situations", 0)):
+            response = self.client.get(reverse("sitemap_section", kwargs={"section": section, "page": page}))
+            self.assertEqual(response.status_code, 404)
+
+    def test_large_sections_are_split_into_shards(self):
+        with mock.patch.object(sitemap, "SHARD_SIZE", 5):
+            topics = PickupTopic.objects.filter(category=self.topic.category, is_active=True).count()
+            index = self.client.get(reverse("sitemap_xml"))
+            section = f"pickup-{self.topic.category.slug}"
+            self.assertEqual(index.content.decode().count(f"/sitemaps/{section}-"), math.ceil((topics + 1) / 5))
+            self.assertEqual(self._shard(section).count("<url>"), 5)
+
+            locs = re.findall(r"<loc>http://testserver([^<]+)</loc>", _read_sitemap_shards(self.client, index).decode())
+            self.assertEqual(locs, sitemap.sitemap_paths())
+            self.assertEqual(len(locs), len(set(locs)))
+
+    @override_settings(SITEMAP_CACHE_SECONDS=300)
+    def test_cached_bodies_are_reused_until_pickup_rows_change(self):
+        section = f"pickup-{self.topic.category.slug}"
+        self.client.get(reverse("sitemap_xml"))
+        first = self._shard(section)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("sitemap_xml"))
+            self.assertEqual(self._shard(section), first)
+        self.assertFalse([q for q in queries.captured_queries if "seoapp_pickup" in q["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.is_active = False
+            self.topic.save()
+        self.assertIn(self.topic_loc, first)
+        self.assertNotIn(self.topic_loc, self._shard(section))
+
+
+class SeedPickupDataTests(TestCase):
+    def _seed(self, *args):
+        stdout = StringIO()
+        call_command("seed_pickup_data", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_reseeding_writes_only_what_changed(self):
+        first = self._seed()
+        topics = PickupTopic.objects.count()
+        self.assertIn(f"topics {topics} created, 0 updated, 0 unchanged, 0 deactivated", first)
+        stamps = dict(PickupTopic.objects.values_list("pk", "updated_at"))
+
+        with CaptureQueriesContext(connection) as queries:
+            again = self._seed()
+        self.assertIn(f"topics 0 created, 0 updated, {topics} unchanged, 0 deactivated", again)
+        self.assertEqual([q["sql"].split()[0] for q in queries.captured_queries], ["SELECT", "SELECT"])
+        self.assertEqual(dict(PickupTopic.objects.values_list("pk", "updated_at")), stamps)
+
+        edited, hidden = PickupTopic.objects.order_by("pk")[:2]
+        PickupTopic.objects.filter(pk=edited.pk).update(title="Hand-edited title")
+        PickupTopic.objects.filter(pk=hidden.pk).update(is_active=False)
+        stray = PickupTopic.objects.create(
+            category=edited.category, slug="not-in-seed-data", keyword="Stray", h1="h", title="t",
+            meta_description="m", seo_intro="s", prefill_text="p", upload_hint="u",
+        )
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            repaired = self._seed()
+        self.assertIn(f"topics 0 created, 1 updated, {topics - 1} unchanged, 1 deactivated", repaired)
+        self.assertEqual(len(callbacks), 1)  # page_cache.invalidate()
+
+        edited.refresh_from_db()
+        hidden.refresh_from_db()
+        stray.refresh_from_db()
+        self.assertNotEqual(edited.title, "Hand-edited title")
+        self.assertFalse(hidden.is_active)  # a moderator's choice survives reseeding
+        self.assertFalse(stray.is_active)
+        self.assertGreater(edited.updated_at, stamps[edited.pk])
+        untouched = PickupTopic.objects.exclude(pk__in=[edited.pk, hidden.pk, stray.pk])
+        for pk, updated_at in untouched.values_list("pk", "updated_at"):
+            self.assertEqual(updated_at, stamps[pk])
+
+        reactivated = self._seed("--reactivate")
+        self.assertIn(f"topics 0 created, 1 updated, {topics - 1} unchanged, 0 deactivated", reactivated)
+        hidden.refresh_from_db()
+        self.assertTrue(hidden.is_active)
+
+    def test_dry_run_reports_without_writing(self):
+        with CaptureQueriesContext(connection) as queries:
+            output = self._seed("--dry-run")
+        self.assertIn("Dry run", output)
+        self.assertIn("categories 18 created, 0 updated", output)
+        self.assertFalse(PickupCategory.objects.exists())
+        self.assertEqual([q["sql"].split()[0] for q in queries.captured_queries], ["SELECT", "SELECT"])
@@ -1,13 +1,12 @@
-﻿from django.http import Http404
-from django.shortcuts import render
+﻿from django.db.models import Max
+from django.http import Http404
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
-from conversation.models import WebAppConfig
-from reignitehome.models import TrialIP
-from reignitehome.utils.ip_check import get_client_ip
+from reignitehome.utils import guest_credits
 from django.db.models import Count, Q
 
+from seoapp import page_cache
 from seoapp.models import PickupCategory, PickupTopic
 from seoapp.glossary_terms import GLOSSARY_BY_ALPHA
 from seoapp.situation_pages import (
@@ -21,24 +20,9 @@ DEFAULT_TOOL_CONVERSATION_PLACEHOLDER = "you: hey, free thursday?\nher: (seen, n
 DEFAULT_TOOL_UPLOAD_HINT = "Drag & drop a chat screenshot, or paste your convo below."
 
 
-def _get_web_config():
-    return WebAppConfig.load()
-
-
 def _build_guest_chat_context(request):
-    if "chat_credits" not in request.session:
-        request.session["chat_credits"] = _get_web_config().guest_reply_limit
-
-    current_chat_credits = request.session["chat_credits"]
-
-    ip = get_client_ip(request)
-    trial_record, created = TrialIP.objects.get_or_create(ip_address=ip)
-    if not created and trial_record.trial_used:
-        current_chat_credits = 0
-
-    return {
-        "chat_credits": current_chat_credits,
-    }
+    # Read-only, so these GETs stay cacheable; see reignitehome.utils.guest_credits.
+    return guest_credits.page_context()
 
 
 def _build_tool_config(**overrides):
@@ -105,6 +89,7 @@ def _split_pickup_heading(heading):
 
 
 @require_http_methods(["GET"])
+@page_cache.cached_page
 def situation_index(request):
     canonical_url = request.build_absolute_uri(reverse("situation_index"))
     context = _build_guest_chat_context(request)
@@ -123,10 +108,11 @@ def situation_index(request):
             "og_url": canonical_url,
         }
     )
-    return render(request, "seoapp/situations/index.html", context)
+    return page_cache.render_shell(request, "seoapp/situations/index.html", context)
 
 
 @require_http_methods(["GET"])
+@page_cache.cached_page
 def situation_landing(request, slug):
     situation_page = get_situation_page(slug)
     if not situation_page:
@@ -160,10 +146,11 @@ def situation_landing(request, slug):
             ),
         }
     )
-    return render(request, "seoapp/situations/landing.html", context)
+    return page_cache.render_shell(request, "seoapp/situations/landing.html", context)
 
 
 @require_http_methods(["GET"])
+@page_cache.cached_page
 def pickup_lines_index(request):
     canonical_url = request.build_absolute_uri(reverse("pickup_lines_index"))
     categories = (
@@ -187,21 +174,23 @@ def pickup_lines_index(request):
             "og_url": canonical_url,
         }
     )
-    return render(request, "seoapp/pickup_lines/index.html", context)
+    last_modified = PickupTopic.objects.filter(is_active=True).aggregate(latest=Max("updated_at"))["latest"]
+    return page_cache.render_shell(request, "seoapp/pickup_lines/index.html", context, last_modified)
 
 
 @require_http_methods(["GET"])
+@page_cache.cached_page
 def pickup_category_detail(request, category_slug):
     try:
         category = PickupCategory.objects.get(slug=category_slug)
     except PickupCategory.DoesNotExist:
         raise Http404("Category not found.")
-    topics = [
-        t.to_dict()
-        for t in PickupTopic.objects.filter(
+    topic_objs = list(
+        PickupTopic.objects.filter(
             category=category, is_active=True
         ).select_related("category").order_by("sort_order", "keyword")
-    ]
+    )
+    topics = [t.to_dict() for t in topic_objs]
     if not topics:
         raise Http404("Category not found.")
     canonical_url = request.build_absolute_uri(
@@ -219,10 +208,12 @@ def pickup_category_detail(request, category_slug):
             "og_url": canonical_url,
         }
     )
-    return render(request, "seoapp/pickup_lines/category.html", context)
+    last_modified = max(t.updated_at for t in topic_objs)
+    return page_cache.render_shell(request, "seoapp/pickup_lines/category.html", context, last_modified)
 
 
 @require_http_methods(["GET"])
+@page_cache.cached_page
 def pickup_line_detail(request, category_slug, topic_slug):
     try:
         topic_obj = (
@@ -273,11 +264,12 @@ def pickup_line_detail(request, category_slug, topic_slug):
             ),
         }
     )
-    return render(request, "seoapp/pickup_lines/detail.html", context)
+    return page_cache.render_shell(request, "seoapp/pickup_lines/detail.html", context, topic_obj.updated_at)
 
 @require_http_methods(["GET"])
+@page_cache.cached_page
 def glossary_view(request):
-    canonical_url = request.build_absolute_uri()
+    canonical_url = request.build_absolute_uri(reverse("glossary"))
     context = {
         "meta_description": "Straight definitions for every modern dating term — breadcrumbing, love bombing, situationship, orbiting, and more.",
         "og_title": "Dating Terms Glossary | TryAgainText",
@@ -286,4 +278,4 @@ def glossary_view(request):
         "canonical_url": canonical_url,
         "glossary_terms": GLOSSARY_BY_ALPHA,
     }
-    return render(request, "seoapp/glossary.html", context)
+    return page_cache.render_shell(request, "seoapp/glossary.html", context)
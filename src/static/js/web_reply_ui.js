@@ -32,8 +32,21 @@
         switching_platforms: 'You: This app keeps glitching on my side.\nHer: Same here honestly.',
     };
 
+    function getCookie(name) {
+        const cookies = (document.cookie || '').split(';');
+        for (const part of cookies) {
+            const value = part.trim();
+            if (value.startsWith(`${name}=`)) {
+                return decodeURIComponent(value.slice(name.length + 1));
+            }
+        }
+        return '';
+    }
+
     function getCsrfToken() {
-        return document.querySelector('input[name=csrfmiddlewaretoken]')?.value || '';
+        // Statically exported pages ship an empty token; the guest credits
+        // request sets the CSRF cookie before the tool is first used.
+        return document.querySelector('input[name=csrfmiddlewaretoken]')?.value || getCookie('csrftoken');
     }
 
     function getResponsePanel() {
@@ -340,6 +353,41 @@
         });
     }
 
+    function setupLazyGuestCredits() {
+        // Public pages render the guest allowance; the visitor's own balance is
+        // fetched only once someone starts using the tool, never on page view.
+        const toolRoot = document.querySelector('[data-reply-tool-shared][data-guest-credits-url]');
+        if (!toolRoot) {
+            return;
+        }
+
+        let requested = false;
+        function loadCredits() {
+            if (requested) {
+                return;
+            }
+            requested = true;
+            fetch(toolRoot.dataset.guestCreditsUrl, {
+                credentials: 'same-origin',
+                headers: { Accept: 'application/json' },
+            })
+                .then(function (response) {
+                    return response.ok ? response.json() : null;
+                })
+                .then(function (payload) {
+                    if (payload) {
+                        updateCredits(payload.credits);
+                    }
+                })
+                .catch(function () {
+                    requested = false;
+                });
+        }
+
+        toolRoot.addEventListener('focusin', loadCredits);
+        toolRoot.addEventListener('pointerdown', loadCredits);
+    }
+
     function parseEventDetail(detail) {
         if (!detail) {
             return {};
@@ -438,6 +486,11 @@
             return;
         }
 
+        form.addEventListener('htmx:configRequest', function (event) {
+            // An empty csrfmiddlewaretoken field makes Django read the header instead.
+            event.detail.headers['X-CSRFToken'] = getCsrfToken();
+        });
+
         form.addEventListener('htmx:beforeRequest', function () {
             setGenerateButtonLoading(form, true);
             const responsePanel = getResponsePanel();
@@ -698,6 +751,7 @@
         setupCopyButtons();
         setupConversationLoadAndDelete();
         setupOcrUpload();
+        setupLazyGuestCredits();
         setSidebarVisibility();
         setActiveConversationItem(document.getElementById('conversation-id')?.value || '');
 